@@ -8,13 +8,158 @@ Data sources:
 - 日本野球機構 NPB (https://npb.jp)
 """
 
+import asyncio
+import bisect
+import gzip
 import json
+import os
+import threading
+import time
+from collections import OrderedDict
 from enum import Enum
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 from fastapi import FastAPI, HTTPException, Path as PathParam, Query
-from config import DATA_END_YEAR, TARGET_YEAR
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.datastructures import Headers, MutableHeaders
+from api_metrics import MetricsMiddleware, TimedRoute, count_search, metrics, stage_timer
+from config import DATA_END_YEAR, DATA_START_YEAR, TARGET_YEAR
+from player_names import fuzzy_key, normalize_name
+from table_store import load_table
+from team_simulation import SeasonDraws, compute_probabilities, load_park_factors
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+
+def _json_default(obj):
+    """標準jsonフォールバック用: numpyスカラー/配列をPython型に変換"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class NPBJSONResponse(JSONResponse):
+    """orjsonで直接UTF-8にシリアライズするレスポンス。
+
+    日本語キーは \\uXXXX エスケープせずそのまま出力する。numpyスカラー（np.int64等）も
+    変換なしで扱えるため、ハンドラは pandas の値を round() したまま返してよい。
+    orjson が無い環境では標準 json（ensure_ascii=False）にフォールバック。
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        with stage_timer("serialization"):
+            if HAS_ORJSON:
+                return orjson.dumps(
+                    content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+                )
+            return json.dumps(
+                content, ensure_ascii=False, separators=(",", ":"), default=_json_default,
+            ).encode("utf-8")
+
+
+def _negotiate_encoding(accept_encoding: str) -> str | None:
+    """Accept-Encoding からレスポンス圧縮方式を選ぶ（br > gzip、q=0 は除外）"""
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    wildcard = accepted.get("*", 0.0)
+    for enc in (("br",) if HAS_BROTLI else ()) + ("gzip",):
+        if accepted.get(enc, wildcard) > 0:
+            return enc
+    return None
+
+
+class CompressionMiddleware:
+    """大きいレスポンスのみ br / gzip で圧縮するASGIミドルウェア。
+
+    一括で返るボディ（JSON API）だけを対象にし、ストリーミング応答はそのまま通す。
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        with stage_timer("compression"):
+            if encoding == "br":
+                return brotli.compress(body, quality=self.brotli_quality)
+            return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: dict | None = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            body = self._compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
 
 app = FastAPI(
     title="NPB 成績予測 API",
@@ -32,7 +177,14 @@ app = FastAPI(
         "- [日本野球機構 NPB](https://npb.jp)\n"
     ),
     version="0.5.0",
+    default_response_class=NPBJSONResponse,
 )
+# 全ルートのハンドラ時間を計測（ルート定義より前に設定する）
+app.router.route_class = TimedRoute
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+# 計測は最外側に置き、圧縮を含めたレイテンシを記録する（NPB_API_METRICS=0 で無効化）
+if os.environ.get("NPB_API_METRICS", "1") != "0":
+    app.add_middleware(MetricsMiddleware)
 
 
 class TeamName(str, Enum):
@@ -54,42 +206,27 @@ PROJ_DIR = Path(__file__).parent / "data" / "projections"
 METRICS_DIR = Path(__file__).parent / "data" / "metrics"
 
 
-def _norm(name: str) -> str:
-    """全角スペース→半角、前後空白除去"""
-    return name.replace("\u3000", " ").strip()
-
-
 def _load_csv(filename: str) -> pd.DataFrame:
-    path = PROJ_DIR / filename
-    if not path.exists():
-        return pd.DataFrame()
-    df = pd.read_csv(path)
+    df = load_table(PROJ_DIR / filename)
     if "player" in df.columns:
-        df["player"] = df["player"].apply(_norm)
+        df["player"] = df["player"].apply(normalize_name)
     if "team" in df.columns:
-        df["team"] = df["team"].apply(_norm)
+        df["team"] = df["team"].apply(normalize_name)
     return df
 
 
-# --- 起動時にCSVをメモリに読み込み ---
-marcel_hitters = _load_csv(f"marcel_hitters_{TARGET_YEAR}.csv")
-marcel_pitchers = _load_csv(f"marcel_pitchers_{TARGET_YEAR}.csv")
-ml_hitters = _load_csv(f"ml_hitters_{TARGET_YEAR}.csv")
-ml_pitchers = _load_csv(f"ml_pitchers_{TARGET_YEAR}.csv")
-bayes_hitters = _load_csv(f"bayes_hitters_{TARGET_YEAR}.csv")
-bayes_pitchers = _load_csv(f"bayes_pitchers_{TARGET_YEAR}.csv")
-foreign_hitters = _load_csv(f"foreign_hitters_{TARGET_YEAR}.csv")
-foreign_pitchers = _load_csv(f"foreign_pitchers_{TARGET_YEAR}.csv")
+def _load_json(filename: str) -> dict:
+    path = PROJ_DIR / filename
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# --- 起動時に実績系CSV（全年度を1ファイルに持つ）をメモリに読み込み ---
 sabermetrics = _load_csv(f"npb_sabermetrics_2015_{DATA_END_YEAR}.csv")
 pythagorean = _load_csv(f"pythagorean_2015_{DATA_END_YEAR}.csv")
 
-# チームシミュレーション結果
-_team_sim_path = PROJ_DIR / f"team_sim_{TARGET_YEAR}.json"
-team_sim: dict = {}
-if _team_sim_path.exists():
-    with open(_team_sim_path, encoding="utf-8") as f:
-        team_sim = json.load(f)
-
 
 def _load_all_metrics() -> list[dict]:
     """data/metrics/ 配下の metrics_*.json を年度順に返す"""
@@ -106,19 +243,357 @@ all_metrics = _load_all_metrics()
 
 
 def _search_player(df: pd.DataFrame, name: str) -> pd.DataFrame:
-    """部分一致で選手を検索"""
-    q = _norm(name)
-    mask = df["player"].str.contains(q, na=False)
-    return df[mask]
+    """部分一致で選手を検索（データが無い年度は空のまま返す）"""
+    if df.empty:
+        return df
+    with stage_timer("lookup"):
+        q = normalize_name(name)
+        mask = df["player"].str.contains(q, na=False)
+        found = df[mask]
+    count_search("player", hit=not found.empty)
+    return found
+
+
+# Marcel予測からのwRAA簡易推定: wRAA ≈ (OPS - リーグ平均OPS) × PA / 補正係数
+# NPBリーグ平均OPS ≈ .700、係数は経験的に3.2程度
+LEAGUE_AVG_OPS = 0.700
+OPS_WRAA_DIVISOR = 3.2
+
+def _build_wraa_table(saber: pd.DataFrame, marcel: pd.DataFrame) -> pd.DataFrame:
+    """(正規化選手名, チーム, 年度) → wRAA の参照テーブルを作る（データ読み込み時に1回だけ）。
+
+    index は fuzzy_key 済みの選手名（ソート済み）。sabermetrics の各行に加え、
+    Marcel予測にしかいない選手は year/wRAA が NaN の行として持つ。
+    marcel_wRAA 列は Marcel予測から推定したフォールバック値。
+    """
+    cols = ["player", "team", "year", "wRAA"]
+    if saber.empty:
+        actual = pd.DataFrame(columns=["key"] + cols + ["order"])
+    else:
+        actual = saber[cols].copy()
+        actual["key"] = actual["player"].map(fuzzy_key)
+        actual["order"] = np.arange(len(actual))
+
+    if marcel.empty:
+        est = pd.DataFrame(columns=["key", "marcel_player", "marcel_wRAA"])
+    else:
+        est = pd.DataFrame({
+            "key": marcel["player"].map(fuzzy_key),
+            "marcel_player": marcel["player"],
+            "marcel_wRAA": ((marcel["OPS"] - LEAGUE_AVG_OPS) * marcel["PA"] / OPS_WRAA_DIVISOR).round(1),
+        }).drop_duplicates("key")
+
+    table = actual.merge(est, on="key", how="outer")
+    table["player"] = table["player"].fillna(table["marcel_player"])
+    table["team"] = table["team"].fillna("")
+    table["order"] = table["order"].fillna(len(actual))
+    return table.drop(columns="marcel_player").set_index("key").sort_index()
+
+
+class WraaLookup:
+    """_build_wraa_table の結果を numpy 配列に展開した検索用インデックス。
+
+    キーごとの行範囲（index がソート済みなので連続）を持ち、add/remove の
+    選手リスト全体を1回の lexsort で解決する。データスナップショットごとに1つ作る。
+    """
+
+    def __init__(self, table: pd.DataFrame):
+        self.table = table
+        keys = table.index.to_numpy()
+        self.keys = pd.unique(keys).tolist()
+        starts = np.searchsorted(keys, self.keys, side="left")
+        stops = np.searchsorted(keys, self.keys, side="right")
+        self.ranges = dict(zip(self.keys, zip(starts.tolist(), stops.tolist())))
+        # 全キーを改行で連結した検索用文字列と各キーの開始位置（部分一致を str.find で走査）
+        self.haystack = "\n".join(self.keys)
+        self.offsets = np.cumsum([0] + [len(k) + 1 for k in self.keys[:-1]]).tolist()
+
+        self.player = table["player"].to_numpy(dtype=object)
+        self.team = table["team"].to_numpy(dtype=object)
+        self.year = table["year"].to_numpy(dtype=float)
+        self.wraa = table["wRAA"].to_numpy(dtype=float)
+        self.marcel_wraa = table["marcel_wRAA"].to_numpy(dtype=float)
+        self.order = table["order"].to_numpy(dtype=float)
+
+    def match_keys(self, q: str) -> list[str]:
+        """q を部分文字列として含むキーを返す"""
+        if not q:
+            return []
+        found = []
+        pos = self.haystack.find(q)
+        while pos != -1:
+            i = bisect.bisect_right(self.offsets, pos) - 1
+            found.append(self.keys[i])
+            # 同じキー内の2回目以降の出現は飛ばして次のキーから探す
+            pos = self.haystack.find(q, self.offsets[i] + len(self.keys[i]) + 1)
+        return found
+
+    def resolve(self, names: list[str], team: str | None, year: int | None) -> list[tuple[str, float, str]]:
+        """選手名（部分一致）のリストをまとめてwRAAに解決する。返り値: 入力順の (正式名, wRAA, ソース)
+
+        優先順位は 実績あり > チーム一致 > 年度一致 > 新しい年度 > 完全一致。
+        実績が無ければ Marcel予測からの推定値、どちらも無ければ 0.0。
+        """
+        with stage_timer("lookup"):
+            return self._resolve(names, team, year)
+
+    def _resolve(self, names: list[str], team: str | None, year: int | None) -> list[tuple[str, float, str]]:
+        results = [(n, 0.0, "データなし") for n in names]
+        qi_parts, row_parts, exact_parts = [], [], []
+        for qi, name in enumerate(names):
+            q = fuzzy_key(normalize_name(name))
+            keys = self.match_keys(q)
+            count_search("wraa", hit=bool(keys))
+            for key in keys:
+                start, stop = self.ranges[key]
+                qi_parts.append(np.full(stop - start, qi))
+                row_parts.append(np.arange(start, stop))
+                exact_parts.append(np.full(stop - start, key == q))
+        if not row_parts:
+            return results
+
+        qi = np.concatenate(qi_parts)
+        rows = np.concatenate(row_parts)
+        exact = np.concatenate(exact_parts)
+        has_actual = ~np.isnan(self.wraa[rows])
+        if team:
+            t = normalize_name(team)
+            team_ok = np.fromiter((t in s for s in self.team[rows]), dtype=bool, count=len(rows))
+        else:
+            team_ok = np.zeros(len(rows), dtype=bool)
+        year_ok = self.year[rows] == year if year is not None else np.zeros(len(rows), dtype=bool)
+        year_desc = np.nan_to_num(self.year[rows], nan=-1.0)
+
+        # np.lexsort は最後のキーが第1ソートキー
+        order = np.lexsort((
+            self.order[rows], ~exact, -year_desc, ~year_ok, ~team_ok, ~has_actual, qi,
+        ))
+        _, first = np.unique(qi[order], return_index=True)
+        for i in order[first]:
+            r = rows[i]
+            if has_actual[i]:
+                results[qi[i]] = (self.player[r], float(self.wraa[r]), f"{int(self.year[r])}実績")
+            elif not np.isnan(self.marcel_wraa[r]):
+                results[qi[i]] = (self.player[r], float(self.marcel_wraa[r]), "Marcel予測から推定")
+        return results
+
+
+# ============================================================
+# 年度別の予測スナップショット（遅延読み込み + LRU）
+# ============================================================
+
+
+_SEASON_GROUP_LABEL = {
+    "hitter": "打者",
+    "pitcher": "投手",
+    "foreign_hitter": "外国人打者",
+    "foreign_pitcher": "外国人投手",
+}
+
+
+class ProjectionSnapshot:
+    """1予測対象年分の予測テーブル一式と、そこから作る検索用インデックス。
+
+    what-if 用の選手別ドロー（SeasonDraws）はメモリを食うので初回利用時に作る。
+    """
+
+    def __init__(self, target_year: int):
+        self.target_year = target_year
+        self.loaded_at = time.time()
+        self.marcel_hitters = _load_csv(f"marcel_hitters_{target_year}.csv")
+        self.marcel_pitchers = _load_csv(f"marcel_pitchers_{target_year}.csv")
+        self.ml_hitters = _load_csv(f"ml_hitters_{target_year}.csv")
+        self.ml_pitchers = _load_csv(f"ml_pitchers_{target_year}.csv")
+        self.bayes_hitters = _load_csv(f"bayes_hitters_{target_year}.csv")
+        self.bayes_pitchers = _load_csv(f"bayes_pitchers_{target_year}.csv")
+        self.foreign_hitters = _load_csv(f"foreign_hitters_{target_year}.csv")
+        self.foreign_pitchers = _load_csv(f"foreign_pitchers_{target_year}.csv")
+        self.team_sim = _load_json(f"team_sim_{target_year}.json")
+        self.wraa_lookup = WraaLookup(_build_wraa_table(sabermetrics, self.marcel_hitters))
+        self._season: tuple[SeasonDraws, dict, list] | None = None
+        self._season_lock = threading.Lock()
+        self._memory_bytes: int | None = None
+
+    @property
+    def empty(self) -> bool:
+        return self.marcel_hitters.empty and self.marcel_pitchers.empty and not self.team_sim
+
+    def tables(self) -> dict[str, pd.DataFrame]:
+        return {
+            name: getattr(self, name)
+            for name in ("marcel_hitters", "marcel_pitchers", "ml_hitters", "ml_pitchers",
+                         "bayes_hitters", "bayes_pitchers", "foreign_hitters", "foreign_pitchers")
+        }
+
+    def data_mtime(self) -> float:
+        """この年度の予測ファイルのうち最も新しい更新時刻（ファイルが無ければ 0）"""
+        paths = PROJ_DIR.glob(f"*_{self.target_year}.*")
+        return max((p.stat().st_mtime for p in paths), default=0.0)
+
+    def memory_bytes(self) -> int:
+        """予測テーブル + wRAA参照テーブル（+ 構築済みならドロー行列）のメモリ使用量"""
+        if self._memory_bytes is None:
+            frames = list(self.tables().values()) + [self.wraa_lookup.table]
+            self._memory_bytes = int(sum(df.memory_usage(deep=True).sum() for df in frames))
+        total = self._memory_bytes
+        if self._season is not None:
+            total += sum(m.nbytes for m in self._season[0].contrib.values())
+        return total
+
+    @property
+    def season_ready(self) -> bool:
+        """season() が構築済み（またはベイズ予測が無く None を返すだけ）か"""
+        return self._season is not None or self.bayes_hitters.empty or self.bayes_pitchers.empty
+
+    def season(self) -> tuple[SeasonDraws, dict, list] | None:
+        """(選手別ドロー, 変更前の確率, 選手名インデックス) を返す（初回のみ構築）
+
+        初回はドロー行列の構築で時間がかかるので、イベントループ上では season_ready を見て
+        未構築ならスレッドプールで呼ぶ。
+        """
+        if self._season is not None:
+            return self._season
+        if self.bayes_hitters.empty or self.bayes_pitchers.empty:
+            return None
+        with self._season_lock:
+            if self._season is not None:
+                return self._season
+            with stage_timer("load"):
+                draws = SeasonDraws(
+                    self.bayes_hitters, self.bayes_pitchers,
+                    self.foreign_hitters, self.foreign_pitchers,
+                    park_factors=load_park_factors(max_year=self.target_year - 1),
+                )
+                # (fuzzy選手名, group, 行番号) — what-if の選手名解決用
+                players = [
+                    (fuzzy_key(name), group, i)
+                    for group in SeasonDraws.GROUPS
+                    for i, name in enumerate(draws.names[group])
+                ]
+                self._season = (draws, compute_probabilities(draws.wins()), players)
+        return self._season
+
+
+class ProjectionRegistry:
+    """予測対象年 → ProjectionSnapshot のレジストリ。
+
+    初回アクセス時にその年のCSVを読み込み、直近 max_years 年分だけをメモリに残す
+    （古いものから破棄）。過去シーズンのアーカイブを全部起動時に読む必要はない。
+    ハンドラからは aget() を使う（読み込みはスレッドプールで行い、同じ年度への同時アクセスは1回の読み込みを待つ）。
+    """
+
+    def __init__(self, max_years: int):
+        self.max_years = max_years
+        self._snapshots: OrderedDict[int, ProjectionSnapshot] = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: dict[int, asyncio.Future] = {}
+
+    def available_years(self) -> list[int]:
+        """data/projections に予測CSVがある予測対象年"""
+        years = set()
+        for p in PROJ_DIR.glob("*_hitters_*.csv"):
+            suffix = p.stem.rsplit("_", 1)[-1]
+            if suffix.isdigit():
+                years.add(int(suffix))
+        for p in PROJ_DIR.glob("team_sim_*.json"):
+            suffix = p.stem.rsplit("_", 1)[-1]
+            if suffix.isdigit():
+                years.add(int(suffix))
+        return sorted(years)
+
+    def loaded_years(self) -> list[int]:
+        return list(self._snapshots)
+
+    def lookup(self, target_year: int) -> ProjectionSnapshot | None:
+        """読み込み済みのスナップショット（LRU の順序も更新）。未読み込みなら None"""
+        with self._lock:
+            snap = self._snapshots.get(target_year)
+            count_search("snapshot", hit=snap is not None)
+            if snap is not None:
+                self._snapshots.move_to_end(target_year)
+            return snap
+
+    def load(self, target_year: int) -> ProjectionSnapshot:
+        """CSVを読み込んで登録する（同期。イベントループ上では呼ばない）。データが無ければ KeyError"""
+        with stage_timer("load"):
+            snap = ProjectionSnapshot(target_year)
+        if snap.empty:
+            raise KeyError(target_year)
+        with self._lock:
+            self._snapshots[target_year] = snap
+            self._snapshots.move_to_end(target_year)
+            while len(self._snapshots) > self.max_years:
+                self._snapshots.popitem(last=False)
+        return snap
+
+    def get(self, target_year: int) -> ProjectionSnapshot:
+        snap = self.lookup(target_year)
+        return snap if snap is not None else self.load(target_year)
+
+    async def aget(self, target_year: int) -> ProjectionSnapshot:
+        """get() のイベントループ版。未読み込みの年度はスレッドプールで読み込む"""
+        snap = self.lookup(target_year)
+        if snap is not None:
+            return snap
+        future = self._loading.get(target_year)
+        if future is None:
+            future = asyncio.ensure_future(run_in_threadpool(self.load, target_year))
+            self._loading[target_year] = future
+            future.add_done_callback(lambda _: self._loading.pop(target_year, None))
+        # 待っているリクエストが切断されても読み込み自体は止めない
+        return await asyncio.shield(future)
+
+    def collect_metrics(self) -> list:
+        """/internal/metrics 用: 読み込み済み年度ごとのスナップショット経過時間・データ鮮度・サイズ"""
+        now = time.time()
+        snaps = list(self._snapshots.values())
+        return [
+            ("npb_api_snapshot_loaded_age_seconds", "Seconds since the projection snapshot was loaded.",
+             "gauge", [({"target_year": s.target_year}, f"{now - s.loaded_at:.1f}") for s in snaps]),
+            ("npb_api_snapshot_data_age_seconds", "Seconds since the newest projection file was written.",
+             "gauge", [({"target_year": s.target_year}, f"{now - s.data_mtime():.1f}") for s in snaps]),
+            ("npb_api_snapshot_rows", "Rows per projection table.",
+             "gauge", [({"target_year": s.target_year, "table": name}, len(df))
+                       for s in snaps for name, df in s.tables().items()]),
+            ("npb_api_snapshot_bytes", "Approximate memory held by the projection snapshot.",
+             "gauge", [({"target_year": s.target_year}, s.memory_bytes()) for s in snaps]),
+            ("npb_api_snapshot_cached_years", "Number of target years held in memory.",
+             "gauge", [({}, len(snaps))]),
+        ]
+
+
+# メモリに保持する年度数（RPi5 4GB を想定した既定値）
+API_MAX_CACHED_YEARS = int(os.environ.get("NPB_API_MAX_CACHED_YEARS", 4))
+
+registry = ProjectionRegistry(API_MAX_CACHED_YEARS)
+registry.get(TARGET_YEAR)   # 最新年度は起動時に読み込んでおく
+metrics.collectors.append(registry.collect_metrics)
+
+
+async def _snapshot(target_year: int) -> ProjectionSnapshot:
+    try:
+        return await registry.aget(target_year)
+    except KeyError:
+        raise HTTPException(404, f"{target_year}年の予測データがありません")
+
+
+def _target_year_query():
+    return Query(
+        default=TARGET_YEAR, ge=DATA_START_YEAR + 1, le=TARGET_YEAR,
+        description=f"予測対象年（省略で{TARGET_YEAR}年、過去年度はアーカイブ済みの予測）",
+    )
 
 
 # ============================================================
 # エンドポイント
 # ============================================================
+# ハンドラはメモリ上のDataFrameを読むだけなので async def でイベントループ上で処理し、
+# スレッドプールへの受け渡しを省く（未読み込みの年度の読み込みとドロー行列の構築だけスレッドプールで行う）。NPBJSONResponse を直接返して
+# FastAPI の jsonable_encoder による再帰変換もスキップする。
 
 
 @app.get("/")
-def root():
+async def root():
     return {
         "name": "NPB Prediction API",
         "version": "0.1.0",
@@ -133,8 +608,11 @@ def root():
             "/rankings/pitchers",
             "/pythagorean",
             "/simulate/team/{team}",
+            "/simulate/season/{team}",
             "/metrics",
         ],
+        "予測対象年": registry.available_years(),
+        "既定の予測対象年": TARGET_YEAR,
     }
 
 
@@ -143,13 +621,15 @@ def root():
     summary="打者の2026年成績予測",
     description="選手名（部分一致可）を指定して、Marcel法とMLによる2026年シーズン予測を取得します。",
 )
-def predict_hitter(
+async def predict_hitter(
     name: str = PathParam(description="選手名（部分一致OK）", examples=["牧", "近藤", "岡本"]),
+    target_year: int = _target_year_query(),
 ):
     """打者の2026年成績予測（Marcel法 + ML + ベイズ）"""
-    marcel = _search_player(marcel_hitters, name)
-    ml = _search_player(ml_hitters, name)
-    bayes = _search_player(bayes_hitters, name) if not bayes_hitters.empty else pd.DataFrame()
+    snap = await _snapshot(target_year)
+    marcel = _search_player(snap.marcel_hitters, name)
+    ml = _search_player(snap.ml_hitters, name)
+    bayes = _search_player(snap.bayes_hitters, name)
 
     if marcel.empty and ml.empty and bayes.empty:
         raise HTTPException(404, f"選手が見つかりません: {name}")
@@ -168,7 +648,7 @@ def predict_hitter(
                 "打点": round(row["RBI"], 1),
             },
         }
-        ml_match = ml[ml["player"] == row["player"]]
+        ml_match = ml[ml["player"] == row["player"]] if not ml.empty else ml
         if not ml_match.empty:
             entry["ML予測"] = {"OPS": round(ml_match.iloc[0]["pred_OPS"], 3)}
         bayes_match = bayes[bayes["player"] == row["player"]] if not bayes.empty else pd.DataFrame()
@@ -185,7 +665,7 @@ def predict_hitter(
                 entry["ベイズ予測"]["Stan補正"] = round(b["stan_delta"], 5)
         results.append(entry)
 
-    return {"検索": name, "件数": len(results), "予測": results}
+    return NPBJSONResponse({"検索": name, "予測対象年": target_year, "件数": len(results), "予測": results})
 
 
 @app.get(
@@ -193,13 +673,15 @@ def predict_hitter(
     summary="投手の2026年成績予測",
     description="選手名（部分一致可）を指定して、Marcel法とMLによる2026年シーズン予測を取得します。",
 )
-def predict_pitcher(
+async def predict_pitcher(
     name: str = PathParam(description="選手名（部分一致OK）", examples=["今永", "山本", "佐々木"]),
+    target_year: int = _target_year_query(),
 ):
     """投手の2026年成績予測（Marcel法 + ML + ベイズ）"""
-    marcel = _search_player(marcel_pitchers, name)
-    ml = _search_player(ml_pitchers, name)
-    bayes = _search_player(bayes_pitchers, name) if not bayes_pitchers.empty else pd.DataFrame()
+    snap = await _snapshot(target_year)
+    marcel = _search_player(snap.marcel_pitchers, name)
+    ml = _search_player(snap.ml_pitchers, name)
+    bayes = _search_player(snap.bayes_pitchers, name)
 
     if marcel.empty and ml.empty and bayes.empty:
         raise HTTPException(404, f"選手が見つかりません: {name}")
@@ -218,7 +700,7 @@ def predict_pitcher(
                 "投球回": round(row["IP"], 1),
             },
         }
-        ml_match = ml[ml["player"] == row["player"]]
+        ml_match = ml[ml["player"] == row["player"]] if not ml.empty else ml
         if not ml_match.empty:
             entry["ML予測"] = {"防御率": round(ml_match.iloc[0]["pred_ERA"], 2)}
         bayes_match = bayes[bayes["player"] == row["player"]] if not bayes.empty else pd.DataFrame()
@@ -235,7 +717,7 @@ def predict_pitcher(
                 entry["ベイズ予測"]["Stan補正"] = round(b["stan_delta"], 4)
         results.append(entry)
 
-    return {"検索": name, "件数": len(results), "予測": results}
+    return NPBJSONResponse({"検索": name, "予測対象年": target_year, "件数": len(results), "予測": results})
 
 
 @app.get(
@@ -243,15 +725,15 @@ def predict_pitcher(
     summary="チームのピタゴラス勝率",
     description="得点・失点から理論上の勝率を推定します（NPB最適指数 k=1.72）。実際の勝数との差も表示。",
 )
-def predict_team(
+async def predict_team(
     name: TeamName = PathParam(description="チーム名"),
-    year: int = Query(default=2025, ge=2015, le=2025, description="対象年度（2015〜2025）"),
+    year: int = Query(default=DATA_END_YEAR, ge=DATA_START_YEAR, le=DATA_END_YEAR, description=f"対象年度（{DATA_START_YEAR}〜{DATA_END_YEAR}）"),
 ):
     """チームのピタゴラス勝率予測"""
     if pythagorean.empty:
         raise HTTPException(503, "ピタゴラス勝率データが読み込まれていません")
 
-    q = _norm(name.value)
+    q = normalize_name(name.value)
     mask = pythagorean["team"].str.contains(q, na=False) & (pythagorean["year"] == year)
     matched = pythagorean[mask]
 
@@ -274,7 +756,7 @@ def predict_team(
             "失点": int(row["RA"]),
         })
 
-    return {"検索": name.value, "年度": year, "件数": len(results), "チーム": results}
+    return NPBJSONResponse({"検索": name.value, "年度": year, "件数": len(results), "チーム": results})
 
 
 @app.get(
@@ -282,9 +764,9 @@ def predict_team(
     summary="セイバーメトリクス（wOBA / wRC+ / wRAA）",
     description="NPBリーグ環境にスケーリングしたwOBA・wRC+・wRAAを取得します。wRC+はリーグ平均=100。",
 )
-def get_sabermetrics(
+async def get_sabermetrics(
     name: str = PathParam(description="選手名（部分一致OK）", examples=["近藤", "牧", "オースティン"]),
-    year: int | None = Query(default=None, ge=2015, le=2025, description="対象年度（省略で全年度）"),
+    year: int | None = Query(default=None, ge=DATA_START_YEAR, le=DATA_END_YEAR, description="対象年度（省略で全年度）"),
 ):
     """選手のwOBA/wRC+/wRAA"""
     if sabermetrics.empty:
@@ -312,7 +794,7 @@ def get_sabermetrics(
             "長打率": round(row["SLG"], 3),
         })
 
-    return {"検索": name, "件数": len(results), "成績": results}
+    return NPBJSONResponse({"検索": name, "件数": len(results), "成績": results})
 
 
 @app.get(
@@ -320,11 +802,13 @@ def get_sabermetrics(
     summary="打者ランキング（Marcel法 2026予測）",
     description="Marcel法による2026年打者予測のランキング。ソート項目（OPS/打率/本塁打/打点）と表示人数を指定可能。",
 )
-def rankings_hitters(
+async def rankings_hitters(
     top: int = Query(default=20, ge=1, le=100, description="表示人数（1〜100）", examples=[10, 20, 50]),
     sort_by: str = Query(default="OPS", enum=["OPS", "AVG", "HR", "RBI"], description="ソート項目"),
+    target_year: int = _target_year_query(),
 ):
     """打者ランキング（Marcel法 2026予測）"""
+    marcel_hitters = (await _snapshot(target_year)).marcel_hitters
     if marcel_hitters.empty:
         raise HTTPException(503, "Marcel打者データが読み込まれていません")
 
@@ -342,7 +826,7 @@ def rankings_hitters(
             "打席数": round(row["PA"], 0),
         })
 
-    return {"ソート": sort_by, "件数": len(results), "ランキング": results}
+    return NPBJSONResponse({"ソート": sort_by, "予測対象年": target_year, "件数": len(results), "ランキング": results})
 
 
 @app.get(
@@ -350,11 +834,13 @@ def rankings_hitters(
     summary="投手ランキング（Marcel法 2026予測）",
     description="Marcel法による2026年投手予測のランキング。規定投球回（50IP以上）の投手が対象。ソート項目（防御率/WHIP/奪三振/勝利）を指定可能。",
 )
-def rankings_pitchers(
+async def rankings_pitchers(
     top: int = Query(default=20, ge=1, le=100, description="表示人数（1〜100）", examples=[10, 20, 50]),
     sort_by: str = Query(default="ERA", enum=["ERA", "WHIP", "SO", "W"], description="ソート項目（ERA/WHIPは昇順）"),
+    target_year: int = _target_year_query(),
 ):
     """投手ランキング（Marcel法 2026予測）"""
+    marcel_pitchers = (await _snapshot(target_year)).marcel_pitchers
     if marcel_pitchers.empty:
         raise HTTPException(503, "Marcel投手データが読み込まれていません")
 
@@ -376,7 +862,7 @@ def rankings_pitchers(
             "投球回": round(row["IP"], 1),
         })
 
-    return {"ソート": sort_by, "件数": len(results), "ランキング": results}
+    return NPBJSONResponse({"ソート": sort_by, "予測対象年": target_year, "件数": len(results), "ランキング": results})
 
 
 # ============================================================
@@ -391,32 +877,15 @@ def _pythagorean_wpct(rs: float, ra: float, k: float = 1.72) -> float:
     return rs**k / (rs**k + ra**k)
 
 
-def _get_player_wraa(name: str, team: str | None, year: int | None) -> tuple[str, float, str]:
-    """選手のwRAAを取得。返り値: (正式名, wRAA, ソース)"""
-    matched = _search_player(sabermetrics, name)
-    if team:
-        team_match = matched[matched["team"].str.contains(_norm(team), na=False)]
-        if not team_match.empty:
-            matched = team_match
-    if year is not None:
-        year_match = matched[matched["year"] == year]
-        if not year_match.empty:
-            matched = year_match
-    if not matched.empty:
-        row = matched.sort_values("year", ascending=False).iloc[0]
-        return row["player"], float(row["wRAA"]), f"{int(row['year'])}実績"
-    # sabermetricsに無い場合 → marcel予測からwRAA簡易推定
-    marcel_match = _search_player(marcel_hitters, name)
-    if not marcel_match.empty:
-        row = marcel_match.iloc[0]
-        pa = float(row["PA"])
-        ops = float(row["OPS"])
-        # 簡易推定: wRAA ≈ (OPS - リーグ平均OPS) × PA / 補正係数
-        # NPBリーグ平均OPS ≈ .700、係数は経験的に3.2程度
-        league_avg_ops = 0.700
-        wraa_est = (ops - league_avg_ops) * pa / 3.2
-        return row["player"], round(wraa_est, 1), "Marcel予測から推定"
-    return name, 0.0, "データなし"
+# /simulate/team, /simulate/season の add/remove で一度に受け付ける選手数の上限
+MAX_SIMULATE_PLAYERS = 100
+
+
+def _split_names(csv: str | None) -> list[str]:
+    """カンマ区切りの選手名リストを分解（空要素は除く）"""
+    if not csv:
+        return []
+    return [n.strip() for n in csv.split(",") if n.strip()]
 
 
 @app.get(
@@ -425,22 +894,24 @@ def _get_player_wraa(name: str, team: str | None, year: int | None) -> tuple[str
     description=(
         "選手を入れ替えて勝数の変化をシミュレーションします。\n\n"
         "指定チーム・年度の実績データをベースに、除外選手のwRAA分を得点から引き、"
-        "追加選手のwRAA分を得点に足して、ピタゴラス勝率を再計算します。\n\n"
+        "追加選手のwRAA分を得点に足して、ピタゴラス勝率を再計算します。"
+        "add/remove は合計100人まで指定できます。\n\n"
         "**例**: `/simulate/team/DeNA?year=2025&add=近藤,牧&remove=宮﨑,佐野`"
     ),
 )
-def simulate_team(
+async def simulate_team(
     team: TeamName = PathParam(description="対象チーム"),
-    year: int = Query(default=2025, ge=2015, le=2025, description="ベースとなる年度"),
+    year: int = Query(default=DATA_END_YEAR, ge=DATA_START_YEAR, le=DATA_END_YEAR, description="ベースとなる年度"),
     add: str | None = Query(default=None, description="追加する選手名（カンマ区切り、部分一致）", examples=["近藤,牧"]),
     remove: str | None = Query(default=None, description="除外する選手名（カンマ区切り、部分一致）", examples=["宮﨑,佐野"]),
+    target_year: int = _target_year_query(),  # 実績の無い選手のMarcel推定に使う
 ):
     """チーム編成シミュレーション（選手入替 → ピタゴラス勝率再計算）"""
     if pythagorean.empty or sabermetrics.empty:
         raise HTTPException(503, "必要なデータが読み込まれていません")
 
     # ベースとなるチームデータ取得
-    q = _norm(team.value)
+    q = normalize_name(team.value)
     mask = pythagorean["team"].str.contains(q, na=False) & (pythagorean["year"] == year)
     team_data = pythagorean[mask]
     if team_data.empty:
@@ -453,35 +924,25 @@ def simulate_team(
     orig_wpct = _pythagorean_wpct(rs, ra)
     orig_wins = orig_wpct * games
 
-    # 除外選手
-    removed = []
-    rs_adj = rs
-    if remove:
-        for name in remove.split(","):
-            name = name.strip()
-            if not name:
-                continue
-            player_name, wraa, source = _get_player_wraa(name, team.value, year)
-            removed.append({"選手名": player_name, "wRAA": round(wraa, 1), "ソース": source})
-            rs_adj -= wraa  # wRAAを得点から引く
-
-    # 追加選手
-    added = []
-    if add:
-        for name in add.split(","):
-            name = name.strip()
-            if not name:
-                continue
-            player_name, wraa, source = _get_player_wraa(name, None, year)
-            added.append({"選手名": player_name, "wRAA": round(wraa, 1), "ソース": source})
-            rs_adj += wraa  # wRAAを得点に足す
+    remove_names = _split_names(remove)
+    add_names = _split_names(add)
+    if len(remove_names) + len(add_names) > MAX_SIMULATE_PLAYERS:
+        raise HTTPException(400, f"入替選手は合計{MAX_SIMULATE_PLAYERS}人までです")
+
+    # 除外選手: wRAAを得点から引く / 追加選手: wRAAを得点に足す
+    wraa_lookup = (await _snapshot(target_year)).wraa_lookup
+    removed_wraa = wraa_lookup.resolve(remove_names, team.value, year)
+    added_wraa = wraa_lookup.resolve(add_names, None, year)
+    rs_adj = rs - sum(w for _, w, _ in removed_wraa) + sum(w for _, w, _ in added_wraa)
+    removed = [{"選手名": p, "wRAA": round(w, 1), "ソース": src} for p, w, src in removed_wraa]
+    added = [{"選手名": p, "wRAA": round(w, 1), "ソース": src} for p, w, src in added_wraa]
 
     # シミュレーション結果
     new_wpct = _pythagorean_wpct(rs_adj, ra)
     new_wins = new_wpct * games
     win_diff = new_wins - orig_wins
 
-    return {
+    return NPBJSONResponse({
         "チーム": row["team"],
         "ベース年度": year,
         "現状": {
@@ -499,7 +960,7 @@ def simulate_team(
             "ピタゴラス期待勝数": round(new_wins, 1),
             "勝数変化": f"{win_diff:+.1f}",
         },
-    }
+    })
 
 
 @app.get(
@@ -507,8 +968,8 @@ def simulate_team(
     summary="全チームのピタゴラス勝率（指定年）",
     description="得失点から推定した理論上の勝率で全12球団を順位付け。NPB最適指数 k=1.72 を使用。実際の勝数との差（＝運の要素）も表示。",
 )
-def pythagorean_all(
-    year: int = Query(default=2025, ge=2015, le=2025, description="対象年度（2015〜2025）", examples=[2025, 2024, 2023]),
+async def pythagorean_all(
+    year: int = Query(default=DATA_END_YEAR, ge=DATA_START_YEAR, le=DATA_END_YEAR, description=f"対象年度（{DATA_START_YEAR}〜{DATA_END_YEAR}）", examples=[2025, 2024, 2023]),
 ):
     """全チームのピタゴラス勝率（指定年）"""
     if pythagorean.empty:
@@ -532,7 +993,7 @@ def pythagorean_all(
             "差（実際-期待）": round(row["diff_W_npb"], 1),
         })
 
-    return {"年度": year, "件数": len(results), "順位表": results}
+    return NPBJSONResponse({"年度": year, "件数": len(results), "順位表": results})
 
 
 @app.get(
@@ -540,12 +1001,14 @@ def pythagorean_all(
     summary="外国人選手のベイズ予測",
     description="NPB初年度の外国人選手を前リーグ成績からStan v2モデルで予測。80%/95%信頼区間付き。",
 )
-def predict_foreign(
+async def predict_foreign(
     name: str = PathParam(description="選手名（部分一致OK）", examples=["サノー", "ダルベック", "アブレウ"]),
+    target_year: int = _target_year_query(),
 ):
     """外国人選手のベイズ予測（前リーグ成績 × Stan v2）"""
-    fh = _search_player(foreign_hitters, name) if not foreign_hitters.empty else pd.DataFrame()
-    fp = _search_player(foreign_pitchers, name) if not foreign_pitchers.empty else pd.DataFrame()
+    snap = await _snapshot(target_year)
+    fh = _search_player(snap.foreign_hitters, name)
+    fp = _search_player(snap.foreign_pitchers, name)
 
     if fh.empty and fp.empty:
         raise HTTPException(404, f"外国人選手が見つかりません: {name}")
@@ -586,7 +1049,7 @@ def predict_foreign(
             entry["前リーグ成績"] = {"防御率": round(row["prev_ERA"], 2)}
         results.append(entry)
 
-    return {"検索": name, "件数": len(results), "予測": results}
+    return NPBJSONResponse({"検索": name, "予測対象年": target_year, "件数": len(results), "予測": results})
 
 
 @app.get(
@@ -599,32 +1062,151 @@ def predict_foreign(
         "P(最下位) = 6位になった割合"
     ),
 )
-def standings_simulation(
+async def standings_simulation(
     league: str | None = Query(default=None, enum=["CL", "PL"], description="リーグ（省略で両リーグ）"),
+    target_year: int = _target_year_query(),
 ):
     """モンテカルロ順位シミュレーション"""
+    team_sim = (await _snapshot(target_year)).team_sim
     if not team_sim:
         raise HTTPException(503, "チームシミュレーション結果がありません（bayes_projection → team_simulation 実行後に利用可能）")
 
+    results = [
+        {"チーム": team_name, **_sim_summary(v)}
+        for team_name, v in team_sim.items()
+        if not league or v.get("league") == league
+    ]
+    results.sort(key=lambda x: (-1 if x["リーグ"] == "CL" else 1, -x["勝利数中央値"]))
+    return NPBJSONResponse({"予測対象年": target_year, "件数": len(results), "順位予測": results})
+
+
+def _sim_summary(v: dict) -> dict:
+    """compute_probabilities の1チーム分を表示用に整形"""
+    lo80, hi80 = v["wins_80ci"]
+    lo95, hi95 = v["wins_95ci"]
+    return {
+        "リーグ": v["league"],
+        "P(優勝)": f"{v['p_pennant']:.1%}",
+        "P(CS)": f"{v['p_cs']:.1%}",
+        "P(最下位)": f"{v['p_last']:.1%}",
+        "勝利数中央値": v["median_wins"],
+        "80%CI": [lo80, hi80],
+        "95%CI": [lo95, hi95],
+    }
+
+
+# --- ロースター what-if（選手別ドローを保持して影響チームだけ再集計） ---
+
+def _find_season_player(players: list, draws: SeasonDraws, name: str,
+                        on_team: str | None = None,
+                        off_team: str | None = None) -> tuple[str, int] | None:
+    """選手名（部分一致、完全一致を優先）から (group, 行番号) を返す。
+
+    on_team を指定するとそのチーム所属の選手だけ、off_team を指定すると
+    そのチーム以外の選手だけを候補にする。
+    """
+    q = fuzzy_key(normalize_name(name))
+    if not q:
+        return None
+    with stage_timer("lookup"):
+        hit = None
+        for key, group, i in players:
+            team = draws.teams[group][i]
+            if (on_team and team != on_team) or (off_team and team == off_team):
+                continue
+            if key == q:
+                hit = (group, i)
+                break
+            if hit is None and q in key:
+                hit = (group, i)
+    count_search("season", hit=hit is not None)
+    return hit
+
+
+@app.get(
+    "/simulate/season/{team}",
+    summary="ロースター what-if 順位シミュレーション",
+    description=(
+        "モンテカルロ順位シミュレーションの選手別ドローをメモリに保持し、"
+        "選手の移籍・除外を反映した P(優勝)/P(CS)/勝利数CI を返します。\n\n"
+        "追加選手は元チームから指定チームへ移籍、除外選手は指定チームから外れます"
+        "（チームのPA/IPは再正規化）。乱数は引き直さないため、変更前後の差はロースター変更の効果のみ。\n\n"
+        "**例**: `/simulate/season/DeNA?add=近藤,モイネロ&remove=佐野`"
+    ),
+)
+async def simulate_season(
+    team: TeamName = PathParam(description="対象チーム"),
+    add: str | None = Query(default=None, description="追加する選手名（カンマ区切り、部分一致）", examples=["近藤,モイネロ"]),
+    remove: str | None = Query(default=None, description="除外する選手名（カンマ区切り、部分一致）", examples=["佐野"]),
+    target_year: int = _target_year_query(),
+):
+    """ロースター what-if 順位シミュレーション（選手ドローの入替 → 影響チームのみ再集計）"""
+    snap = await _snapshot(target_year)
+    season = snap.season() if snap.season_ready else await run_in_threadpool(snap.season)
+    if season is None:
+        raise HTTPException(503, "ベイズ予測データが読み込まれていません")
+    season_draws, season_base, season_players = season
+
+    remove_names = _split_names(remove)
+    add_names = _split_names(add)
+    if len(remove_names) + len(add_names) > MAX_SIMULATE_PLAYERS:
+        raise HTTPException(400, f"入替選手は合計{MAX_SIMULATE_PLAYERS}人までです")
+
+    moves: dict[tuple[str, int], str | None] = {}
+    removed, added, not_found = [], [], []
+    for name in remove_names:
+        hit = _find_season_player(season_players, season_draws, name, on_team=team.value)
+        if hit is None:
+            not_found.append(name)
+            continue
+        moves[hit] = None
+        removed.append({"選手名": season_draws.names[hit[0]][hit[1]], "種別": _SEASON_GROUP_LABEL[hit[0]]})
+    for name in add_names:
+        hit = _find_season_player(season_players, season_draws, name, off_team=team.value)
+        if hit is None:
+            not_found.append(name)
+            continue
+        moves[hit] = team.value
+        added.append({
+            "選手名": season_draws.names[hit[0]][hit[1]],
+            "元チーム": season_draws.teams[hit[0]][hit[1]],
+            "種別": _SEASON_GROUP_LABEL[hit[0]],
+        })
+
+    if moves:
+        with stage_timer("simulation"):
+            after = compute_probabilities(season_draws.wins(moves))
+    else:
+        after = season_base
+    affected = {team.value} | {season_draws.teams[g][i] for g, i in moves}
+    leagues = {season_base[t]["league"] for t in affected if t in season_base}
+
     results = []
-    for team_name, v in team_sim.items():
-        if league and v.get("league") != league:
+    for team_name, v in after.items():
+        if v["league"] not in leagues:
             continue
-        lo80, hi80 = v["wins_80ci"]
-        lo95, hi95 = v["wins_95ci"]
+        before = season_base[team_name]
         results.append({
             "チーム": team_name,
-            "リーグ": v["league"],
-            "P(優勝)": f"{v['p_pennant']:.1%}",
-            "P(CS)": f"{v['p_cs']:.1%}",
-            "P(最下位)": f"{v['p_last']:.1%}",
-            "勝利数中央値": v["median_wins"],
-            "80%CI": [lo80, hi80],
-            "95%CI": [lo95, hi95],
+            **_sim_summary(v),
+            "勝数変化": f"{v['median_wins'] - before['median_wins']:+.1f}",
+            "変更前": {
+                "P(優勝)": f"{before['p_pennant']:.1%}",
+                "P(CS)": f"{before['p_cs']:.1%}",
+                "勝利数中央値": before["median_wins"],
+            },
         })
-
     results.sort(key=lambda x: (-1 if x["リーグ"] == "CL" else 1, -x["勝利数中央値"]))
-    return {"件数": len(results), "順位予測": results}
+
+    return NPBJSONResponse({
+        "チーム": team.value,
+        "予測対象年": target_year,
+        "除外選手": removed,
+        "追加選手": added,
+        "見つからない選手": not_found,
+        "シミュレーション回数": season_draws.n_sim,
+        "順位予測": results,
+    })
 
 
 @app.get(
@@ -637,8 +1219,14 @@ def standings_simulation(
         "値が小さいほど精度が高い。Marcel法より低い値のモデルが有効と判断。"
     ),
 )
-def get_metrics():
+async def get_metrics():
     """モデル精度推移（年次メトリクス）"""
     if not all_metrics:
         raise HTTPException(503, "メトリクスデータがありません（annual_update 実行後に利用可能）")
-    return {"件数": len(all_metrics), "メトリクス": all_metrics}
+    return NPBJSONResponse({"件数": len(all_metrics), "メトリクス": all_metrics})
+
+
+@app.get("/internal/metrics", include_in_schema=False, response_class=PlainTextResponse)
+async def internal_metrics():
+    """運用向けメトリクス（Prometheus テキスト形式）。集計はワーカープロセス単位"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,224 @@
+"""
+API計測（Prometheus テキスト形式）
+
+api.py のリクエストごとのレイテンシ、処理段階（検索・組み立て・シリアライズ等）の
+所要時間、検索インデックスのヒット/ミス件数をプロセス内に集計し、
+/internal/metrics で Prometheus のテキスト形式として返す。
+
+リクエスト側の処理は perf_counter と dict の加算だけで、文字列の組み立ては
+スクレイプされたときにしか行わない。uvicorn を複数ワーカーで動かす場合、
+値はワーカー（プロセス）ごとの集計になる。
+
+使い方（api.py 内）:
+  with stage_timer("lookup"):
+      df = ...
+  count_search("player", hit=not df.empty)
+"""
+
+import bisect
+import time
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute
+
+# レイテンシのヒストグラム境界（秒）
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# 1リクエスト内の段階別所要時間（秒）。MetricsMiddleware がリクエストごとに dict をセットする
+_stages: ContextVar[dict | None] = ContextVar("npb_api_stages", default=None)
+
+
+class Histogram:
+    """累積しない素朴なバケット数 + 合計 + 件数（出力時に累積に直す）"""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsStore:
+    """プロセス内のメトリクス集計"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.requests: dict[tuple[str, str], Histogram] = {}        # (method, route)
+        self.responses: dict[tuple[str, str, int], int] = {}        # (method, route, status)
+        self.stages: dict[tuple[str, str], Histogram] = {}          # (route, stage)
+        self.searches: dict[tuple[str, str], int] = {}              # (index, hit|miss)
+        self.collectors: list = []   # スクレイプ時に呼ぶ関数（(name, help, type, [(labels, value)]) を返す）
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float,
+                        stages: dict[str, float]) -> None:
+        hist = self.requests.get((method, route))
+        if hist is None:
+            hist = self.requests[(method, route)] = Histogram()
+        hist.observe(seconds)
+        key = (method, route, status)
+        self.responses[key] = self.responses.get(key, 0) + 1
+
+        # ハンドラ時間のうち明示的に計測した段階以外を「組み立て（assembly）」とみなす
+        handler = stages.pop("handler", None)
+        if handler is not None:
+            measured = sum(v for k, v in stages.items() if k != "compression")
+            stages["assembly"] = max(handler - measured, 0.0)
+        for stage, value in stages.items():
+            hist = self.stages.get((route, stage))
+            if hist is None:
+                hist = self.stages[(route, stage)] = Histogram()
+            hist.observe(value)
+
+    def count_search(self, index: str, hit: bool) -> None:
+        key = (index, "hit" if hit else "miss")
+        self.searches[key] = self.searches.get(key, 0) + 1
+
+    def render(self) -> str:
+        lines: list[str] = []
+
+        def header(name: str, help_text: str, kind: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name: str, labels: str, hist: Histogram) -> None:
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, hist.counts):
+                cumulative += n
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+            lines.append(f"{name}_sum{{{labels}}} {hist.sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+        header("npb_api_uptime_seconds", "Seconds since the API process started.", "gauge")
+        lines.append(f"npb_api_uptime_seconds {time.time() - self.started_at:.1f}")
+
+        header("npb_api_request_duration_seconds", "Request latency per route.", "histogram")
+        for (method, route), hist in sorted(self.requests.items()):
+            histogram("npb_api_request_duration_seconds",
+                      f'method="{method}",route="{_escape(route)}"', hist)
+
+        header("npb_api_responses_total", "Responses per route and status code.", "counter")
+        for (method, route, status), n in sorted(self.responses.items()):
+            lines.append(
+                f'npb_api_responses_total{{method="{method}",route="{_escape(route)}",'
+                f'status="{status}"}} {n}'
+            )
+
+        header("npb_api_stage_duration_seconds",
+               "Time spent per request stage (lookup, load, simulation, assembly, serialization, "
+               "compression).", "histogram")
+        for (route, stage), hist in sorted(self.stages.items()):
+            histogram("npb_api_stage_duration_seconds",
+                      f'route="{_escape(route)}",stage="{stage}"', hist)
+
+        header("npb_api_search_total", "Search index lookups by result.", "counter")
+        for (index, result), n in sorted(self.searches.items()):
+            lines.append(f'npb_api_search_total{{index="{index}",result="{result}"}} {n}')
+
+        for collect in self.collectors:
+            for name, help_text, kind, samples in collect():
+                header(name, help_text, kind)
+                for labels, value in samples:
+                    label_str = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+                    lines.append(f"{name}{{{label_str}}} {value}" if label_str else f"{name} {value}")
+
+        lines.append("")
+        return "\n".join(lines)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = MetricsStore()
+
+
+def add_stage(stage: str, seconds: float) -> None:
+    """現在のリクエストの段階時間に加算する（計測中のリクエストが無ければ何もしない）"""
+    stages = _stages.get()
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+class stage_timer:
+    """with ブロックの所要時間を現在のリクエストの段階時間に加算する"""
+
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        add_stage(self.stage, time.perf_counter() - self.t0)
+        return False
+
+
+def count_search(index: str, hit: bool) -> None:
+    metrics.count_search(index, hit)
+
+
+class TimedRoute(APIRoute):
+    """エンドポイント処理（引数の検証 → ハンドラ → レスポンス生成）を "handler" として計測するルート。
+
+    handler から lookup/load/simulation/serialization を引いた残りが assembly になる。
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            t0 = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                add_stage("handler", time.perf_counter() - t0)
+
+        return timed_handler
+
+
+class MetricsMiddleware:
+    """リクエスト全体のレイテンシと段階時間を記録するASGIミドルウェア。
+
+    レイテンシは最後のボディ送信まで（圧縮を含む）。ルートはパステンプレート
+    （/predict/hitter/{name} 等）で集計し、どのルートにも一致しないものは
+    "unmatched" にまとめてラベルの種類が増えないようにする。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stages: dict[str, float] = {}
+        token = _stages.set(stages)
+        status = 500
+        t0 = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            _stages.reset(token)
+            route = scope.get("route")
+            metrics.observe_request(
+                scope["method"], getattr(route, "path", "unmatched"), status, elapsed, stages,
+            )
@@ -26,7 +26,6 @@ Data sources:
 """
 
 import json
-import time
 
 import numpy as np
 import pandas as pd
@@ -37,7 +36,11 @@ from config import (
     BAYES_DIR, DATA_END_YEAR, PROJECTIONS_DIR, TARGET_YEAR,
 )
 from marcel_projection import load_birthdays, calc_age
-from roster_current import get_all_roster_names, get_team_for_player
+from player_registry import with_player_ids
+from roster_current import map_teams
+from raw_store import read_raw
+from step_timer import StepTimer
+from table_store import load_table, save_table
 
 DATA_DIR = Path(__file__).parent / "data"
 RAW_DIR = DATA_DIR / "raw"
@@ -50,14 +53,6 @@ MIN_PA_HITTER = 30
 MIN_IP_PITCHER = 10
 
 
-def _log_elapsed(label: str, start: float, budget_min: int = 180):
-    elapsed_min = (time.time() - start) / 60
-    print(f"  [{label}] elapsed: {elapsed_min:.1f} min / {budget_min} min budget")
-    if elapsed_min > budget_min * 0.8:
-        print(f"  WARNING: {label} used {elapsed_min:.0f}/{budget_min} min "
-              f"({elapsed_min / budget_min * 100:.0f}%) -- timeout risk!")
-
-
 # ── Posterior Store ──────────────────────────────────────────────────────────
 
 class PosteriorStore:
@@ -94,68 +89,53 @@ class PosteriorStore:
 
 # ── Data loaders ─────────────────────────────────────────────────────────────
 
-def _norm_name(name: str) -> str:
-    return str(name).replace("\u3000", " ").strip()
-
-
-def _parse_ip(ip_val) -> float:
-    try:
-        s = str(ip_val)
-        if "." in s:
-            parts = s.split(".")
-            return int(parts[0]) + int(parts[1]) / 3.0
-        return float(s)
-    except (ValueError, IndexError):
-        return 0.0
-
-
 def load_sabermetrics() -> pd.DataFrame:
     path = OUT_DIR / f"npb_sabermetrics_2015_{DATA_END_YEAR}.csv"
     if not path.exists():
         return pd.DataFrame()
-    df = pd.read_csv(path)
-    df["player_norm"] = df["player"].apply(_norm_name)
-    return df
+    return with_player_ids(load_table(path))
 
 
 def load_raw_pitchers() -> pd.DataFrame:
-    path = RAW_DIR / f"npb_pitchers_2015_{DATA_END_YEAR}.csv"
-    if not path.exists():
-        return pd.DataFrame()
-    df = pd.read_csv(path)
-    for col in ["ERA", "WHIP", "IP", "ER", "HA", "SO", "BB", "HBP", "HRA", "BF"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-    df["IP_num"] = df["IP"].apply(_parse_ip)
-    return df
+    """投手成績（投球回の小数 IP_num は読み込み時に付いている: table_store.typed）"""
+    return read_raw("pitchers")
 
 
 def load_marcel_hitters() -> pd.DataFrame:
     path = OUT_DIR / f"marcel_hitters_{TARGET_YEAR}.csv"
     if not path.exists():
         return pd.DataFrame()
-    return pd.read_csv(path, encoding="utf-8-sig")
+    return with_player_ids(load_table(path))
 
 
 def load_marcel_pitchers() -> pd.DataFrame:
     path = OUT_DIR / f"marcel_pitchers_{TARGET_YEAR}.csv"
     if not path.exists():
         return pd.DataFrame()
-    return pd.read_csv(path, encoding="utf-8-sig")
+    return with_player_ids(load_table(path))
 
 
 def load_ml_hitters() -> pd.DataFrame:
     path = OUT_DIR / f"ml_hitters_{TARGET_YEAR}.csv"
     if not path.exists():
         return pd.DataFrame()
-    return pd.read_csv(path, encoding="utf-8-sig")
+    return with_player_ids(load_table(path))
 
 
 def load_ml_pitchers() -> pd.DataFrame:
     path = OUT_DIR / f"ml_pitchers_{TARGET_YEAR}.csv"
     if not path.exists():
         return pd.DataFrame()
-    return pd.read_csv(path, encoding="utf-8-sig")
+    return with_player_ids(load_table(path))
+
+
+def _by_player_id(df: pd.DataFrame, column: str | None = None) -> dict:
+    """player_id → 行の dict（column を指定すればその値）。同じ選手が複数行あれば最初の行"""
+    if len(df) == 0 or "player_id" not in df.columns:
+        return {}
+    first = df.dropna(subset=["player_id"]).drop_duplicates("player_id")
+    values = first[column].astype(float) if column else first.to_dict("records")
+    return dict(zip(first["player_id"].astype(int), values))
 
 
 # ── Feature extraction ───────────────────────────────────────────────────────
@@ -170,9 +150,6 @@ def extract_hitter_features(saber_df: pd.DataFrame, target_year: int) -> pd.Data
     prev = saber_df[saber_df["year"] == prev_year].copy()
     prev = prev[prev["PA"] >= MIN_PA_HITTER]
 
-    # 選手名正規化（全角スペース→半角）でMarcelとのマッチ率を上げる
-    prev["player_join"] = prev["player"].apply(_norm_name)
-
     # K%, BB%
     prev["K_pct"] = prev["SO"] / prev["PA"]
     prev["BB_pct"] = prev["BB"] / prev["PA"]
@@ -183,10 +160,8 @@ def extract_hitter_features(saber_df: pd.DataFrame, target_year: int) -> pd.Data
 
     # age_from_peak
     ages = []
-    for _, row in prev.iterrows():
-        bday = birthdays.get(row["player"])
-        if bday is None:
-            bday = birthdays.get(row["player_join"])
+    for player_id in prev["player_id"]:
+        bday = birthdays.get(player_id)
         if bday is not None:
             age = calc_age(bday, target_year)
             ages.append(age - PEAK_AGE if not np.isnan(age) else np.nan)
@@ -199,7 +174,7 @@ def extract_hitter_features(saber_df: pd.DataFrame, target_year: int) -> pd.Data
         col_mean = prev[col].mean()
         prev[col] = prev[col].fillna(col_mean if not pd.isna(col_mean) else 0.0)
 
-    return prev[["player", "player_join", "K_pct", "BB_pct", "BABIP", "age_from_peak"]].copy()
+    return prev[["player", "player_id", "K_pct", "BB_pct", "BABIP", "age_from_peak"]].copy()
 
 
 def extract_pitcher_features(pitchers_df: pd.DataFrame, target_year: int) -> pd.DataFrame:
@@ -213,19 +188,14 @@ def extract_pitcher_features(pitchers_df: pd.DataFrame, target_year: int) -> pd.
     prev = prev[prev["IP_num"] >= MIN_IP_PITCHER]
     prev = prev[prev["BF"] > 0]
 
-    # 選手名正規化
-    prev["player_join"] = prev["player"].apply(_norm_name)
-
     prev["K_pct"] = prev["SO"] / prev["BF"]
     prev["BB_pct"] = prev["BB"] / prev["BF"]
     prev["K_per_9"] = prev["SO"] * 9.0 / prev["IP_num"].clip(lower=0.1)
     prev["BB_per_9"] = prev["BB"] * 9.0 / prev["IP_num"].clip(lower=0.1)
 
     ages = []
-    for _, row in prev.iterrows():
-        bday = birthdays.get(row["player"])
-        if bday is None:
-            bday = birthdays.get(row["player_join"])
+    for player_id in prev["player_id"]:
+        bday = birthdays.get(player_id)
         if bday is not None:
             age = calc_age(bday, target_year)
             ages.append(age - PEAK_AGE if not np.isnan(age) else np.nan)
@@ -237,7 +207,7 @@ def extract_pitcher_features(pitchers_df: pd.DataFrame, target_year: int) -> pd.
         col_mean = prev[col].mean()
         prev[col] = prev[col].fillna(col_mean if not pd.isna(col_mean) else 0.0)
 
-    return prev[["player", "player_join", "K_pct", "BB_pct", "K_per_9", "BB_per_9", "age_from_peak"]].copy()
+    return prev[["player", "player_id", "K_pct", "BB_pct", "K_per_9", "BB_per_9", "age_from_peak"]].copy()
 
 
 # ── Stan correction ──────────────────────────────────────────────────────────
@@ -325,8 +295,8 @@ def predict_hitters(store: PosteriorStore) -> pd.DataFrame:
         return pd.DataFrame()
 
     saber_df = load_sabermetrics()
-    features_df = extract_hitter_features(saber_df, TARGET_YEAR)
-    ml_df = load_ml_hitters()
+    features_by_id = _by_player_id(extract_hitter_features(saber_df, TARGET_YEAR))
+    ml_preds = _by_player_id(load_ml_hitters(), "pred_OPS")
     model_params = store.jpn_hitter()
 
     # Marcel OPS → wOBA近似（逆変換）: wOBA ≈ 0.310 + (OPS - 0.690) / 2.33
@@ -343,12 +313,9 @@ def predict_hitters(store: PosteriorStore) -> pd.DataFrame:
         # Marcel OPS → wOBA
         marcel_woba = ops_to_woba_approx(marcel_ops)
 
-        # 特徴量取得（全角/半角スペース両方で検索）
-        player_norm = _norm_name(player)
-        feat_row = features_df[features_df["player"] == player]
-        if len(feat_row) == 0:
-            feat_row = features_df[features_df["player_join"] == player_norm]
-        if len(feat_row) == 0:
+        # 特徴量取得（player_id で引く）
+        feat = features_by_id.get(row["player_id"])
+        if feat is None:
             # 特徴量なし → Stan補正なし、Marcel値をそのまま使用
             results.append({
                 "player": player,
@@ -367,7 +334,6 @@ def predict_hitters(store: PosteriorStore) -> pd.DataFrame:
             })
             continue
 
-        feat = feat_row.iloc[0]
         features = {
             "K_pct": feat["K_pct"],
             "BB_pct": feat["BB_pct"],
@@ -385,15 +351,8 @@ def predict_hitters(store: PosteriorStore) -> pd.DataFrame:
         ops_ci95_lo = woba_to_ops_approx(ci95_lo)
         ops_ci95_hi = woba_to_ops_approx(ci95_hi)
 
-        # ML予測取得（名前正規化してマッチ）
-        ml_ops = None
-        if len(ml_df) > 0:
-            ml_row = ml_df[ml_df["player"] == player]
-            if len(ml_row) == 0 and "player" in ml_df.columns:
-                ml_df_norm = ml_df["player"].apply(_norm_name)
-                ml_row = ml_df[ml_df_norm == player_norm]
-            if len(ml_row) > 0:
-                ml_ops = float(ml_row.iloc[0]["pred_OPS"])
+        # ML予測取得（player_id でマッチ）
+        ml_ops = ml_preds.get(row["player_id"])
 
         # BMA重み選択（PA >= 200: regular, それ以外: bench）
         category = "jpn_regular" if marcel_pa >= 200 else "jpn_bench"
@@ -429,8 +388,8 @@ def predict_pitchers(store: PosteriorStore) -> pd.DataFrame:
         return pd.DataFrame()
 
     pitchers_df = load_raw_pitchers()
-    features_df = extract_pitcher_features(pitchers_df, TARGET_YEAR)
-    ml_df = load_ml_pitchers()
+    features_by_id = _by_player_id(extract_pitcher_features(pitchers_df, TARGET_YEAR))
+    ml_preds = _by_player_id(load_ml_pitchers(), "pred_ERA")
     model_params = store.jpn_pitcher()
 
     results = []
@@ -440,11 +399,8 @@ def predict_pitchers(store: PosteriorStore) -> pd.DataFrame:
         marcel_era = row["ERA"]
         marcel_ip = row.get("IP", 0)
 
-        player_norm = _norm_name(player)
-        feat_row = features_df[features_df["player"] == player]
-        if len(feat_row) == 0:
-            feat_row = features_df[features_df["player_join"] == player_norm]
-        if len(feat_row) == 0:
+        feat = features_by_id.get(row["player_id"])
+        if feat is None:
             results.append({
                 "player": player,
                 "team": team,
@@ -461,7 +417,6 @@ def predict_pitchers(store: PosteriorStore) -> pd.DataFrame:
             })
             continue
 
-        feat = feat_row.iloc[0]
         features = {
             "K_pct": feat["K_pct"],
             "BB_pct": feat["BB_pct"],
@@ -480,15 +435,8 @@ def predict_pitchers(store: PosteriorStore) -> pd.DataFrame:
         ci80_lo = max(0.0, ci80_lo)
         ci95_lo = max(0.0, ci95_lo)
 
-        # ML予測取得（名前正規化してマッチ）
-        ml_era = None
-        if len(ml_df) > 0:
-            ml_row = ml_df[ml_df["player"] == player]
-            if len(ml_row) == 0 and "player" in ml_df.columns:
-                ml_df_norm = ml_df["player"].apply(_norm_name)
-                ml_row = ml_df[ml_df_norm == player_norm]
-            if len(ml_row) > 0:
-                ml_era = float(ml_row.iloc[0]["pred_ERA"])
+        # ML予測取得（player_id でマッチ）
+        ml_era = ml_preds.get(row["player_id"])
 
         # BMA重み選択（IP >= 50: regular, それ以外: bench）
         ip_num = float(marcel_ip) if not pd.isna(marcel_ip) else 0
@@ -744,17 +692,12 @@ def _filter_roster(df: pd.DataFrame) -> pd.DataFrame:
     """NPB公式ロースターに在籍する選手のみ残し、チーム名を公式に合わせる。"""
     if df.empty or "player" not in df.columns:
         return df
-    roster_names = get_all_roster_names()
-    # 全角/半角スペース除去で比較
-    def _fuzzy(s: str) -> str:
-        return s.replace(" ", "").replace("\u3000", "")
-    mask = df["player"].apply(lambda p: _fuzzy(p) in roster_names)
-    filtered = df[mask].copy()
+    # スペース除去 + 異体字統一で照合（roster_current.map_teams）
+    roster_team = map_teams(df["player"])
+    on_roster = roster_team.notna()
+    filtered = df[on_roster].copy()
     # チーム名を公式ロースターに合わせる（移籍反映）
-    for idx, row in filtered.iterrows():
-        new_team = get_team_for_player(row["player"])
-        if new_team:
-            filtered.at[idx, "team"] = new_team
+    filtered["team"] = roster_team[on_roster]
     removed = len(df) - len(filtered)
     if removed > 0:
         print(f"  Roster filter: {len(df)} → {len(filtered)} ({removed} removed)")
@@ -764,7 +707,7 @@ def _filter_roster(df: pd.DataFrame) -> pd.DataFrame:
 # ── Main ─────────────────────────────────────────────────────────────────────
 
 def main():
-    t0 = time.time()
+    timer = StepTimer("bayes_projection")
     print("=" * 60)
     print(f"ベイズ予測 (target: {TARGET_YEAR})")
     print("=" * 60)
@@ -789,9 +732,9 @@ def main():
 
         # 保存
         out_path = OUT_DIR / f"bayes_hitters_{TARGET_YEAR}.csv"
-        hitters.to_csv(out_path, index=False, encoding="utf-8-sig")
+        save_table(hitters, out_path)
         print(f"\nSaved: {out_path}")
-    _log_elapsed("hitter_bayes", t0)
+    timer.mark("hitter_bayes")
 
     # 投手
     print(f"\n--- 投手ベイズ予測 ---")
@@ -809,9 +752,9 @@ def main():
         print(top[cols].to_string(index=False))
 
         out_path = OUT_DIR / f"bayes_pitchers_{TARGET_YEAR}.csv"
-        pitchers.to_csv(out_path, index=False, encoding="utf-8-sig")
+        save_table(pitchers, out_path)
         print(f"\nSaved: {out_path}")
-    _log_elapsed("pitcher_bayes", t0)
+    timer.mark("pitcher_bayes")
 
     # 外国人打者
     print(f"\n--- 外国人打者ベイズ予測 ---")
@@ -824,9 +767,9 @@ def main():
                          "bayes_wOBA", "bayes_OPS", "method"]].to_string(index=False))
 
         out_path = OUT_DIR / f"foreign_hitters_{TARGET_YEAR}.csv"
-        foreign_h.to_csv(out_path, index=False, encoding="utf-8-sig")
+        save_table(foreign_h, out_path)
         print(f"\nSaved: {out_path}")
-    _log_elapsed("foreign_hitter_bayes", t0)
+    timer.mark("foreign_hitter_bayes")
 
     # 外国人投手
     print(f"\n--- 外国人投手ベイズ予測 ---")
@@ -839,9 +782,9 @@ def main():
                          "bayes_ERA", "method"]].to_string(index=False))
 
         out_path = OUT_DIR / f"foreign_pitchers_{TARGET_YEAR}.csv"
-        foreign_p.to_csv(out_path, index=False, encoding="utf-8-sig")
+        save_table(foreign_p, out_path)
         print(f"\nSaved: {out_path}")
-    _log_elapsed("foreign_pitcher_bayes", t0)
+    timer.mark("foreign_pitcher_bayes")
 
     # サマリー
     print(f"\n{'=' * 60}")
@@ -863,7 +806,7 @@ def main():
         print(f"外国人打者: {len(foreign_h)} players, mean bayes_OPS={foreign_h['bayes_OPS'].mean():.3f}")
     if len(foreign_p) > 0:
         print(f"外国人投手: {len(foreign_p)} players, mean bayes_ERA={foreign_p['bayes_ERA'].mean():.2f}")
-    _log_elapsed("bayes_projection_total", t0)
+    timer.finish()
 
 
 if __name__ == "__main__":
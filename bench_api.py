@@ -0,0 +1,182 @@
+"""
+API負荷テスト（requests/sec 計測）
+
+起動中の uvicorn に対してキープアライブ接続を複数本張り、指定秒数のあいだ
+主要エンドポイントを巡回して req/s とレイテンシ分位点を出力する。
+サーバのワーカー数を渡すと、ワーカーあたりの req/s も表示する。
+
+Usage:
+  uvicorn api:app --port 8000 --workers 2 &
+  python bench_api.py --url http://127.0.0.1:8000 --workers 2 --duration 10
+
+  # 旧実装（jsonable_encoder + 標準JSONResponse）と NPBJSONResponse の
+  # シリアライズ時間をプロセス内で比較
+  python bench_api.py --compare-serializers
+
+同じ引数で変更前後のサーバに当てれば、ワーカーあたりの req/s の改善幅が分かる。
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import quote, urlsplit
+
+DEFAULT_PATHS = [
+    "/predict/hitter/牧",
+    "/predict/pitcher/山本",
+    "/predict/foreign/サノー",
+    "/sabermetrics/近藤",
+    "/rankings/hitters?top=50",
+    "/rankings/pitchers?top=50",
+    "/pythagorean?year=2025",
+    "/standings/simulation",
+    "/simulate/team/DeNA?add=近藤,牧&remove=佐野",
+]
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    """HTTP/1.1 レスポンスを1件読み切り、ステータスコードを返す"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    length = 0
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value.strip())
+        elif name == "transfer-encoding" and "chunked" in value.lower():
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status
+
+
+async def _client(host: str, port: int, paths: list[str], deadline: float,
+                  accept_encoding: str, latencies: list[float], errors: list[int]) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    requests = [
+        (
+            f"GET {quote(p, safe='/?=&,')} HTTP/1.1\r\nHost: {host}\r\n"
+            f"Accept-Encoding: {accept_encoding}\r\nConnection: keep-alive\r\n\r\n"
+        ).encode("ascii")
+        for p in paths
+    ]
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            writer.write(requests[i % len(requests)])
+            await writer.drain()
+            status = await _read_response(reader)
+            latencies.append(time.perf_counter() - t0)
+            if status >= 400:
+                errors.append(status)
+            i += 1
+    finally:
+        writer.close()
+
+
+async def run_http(url: str, paths: list[str], duration: float, concurrency: int,
+                   accept_encoding: str) -> tuple[list[float], list[int]]:
+    parts = urlsplit(url)
+    host = parts.hostname or "127.0.0.1"
+    port = parts.port or 80
+    latencies: list[float] = []
+    errors: list[int] = []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*[
+        _client(host, port, paths, deadline, accept_encoding, latencies, errors)
+        for _ in range(concurrency)
+    ])
+    return latencies, errors
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def compare_serializers(repeat: int = 200) -> None:
+    """代表的なレスポンスで 旧パス（jsonable_encoder + JSONResponse）と NPBJSONResponse を比較"""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from fastapi.testclient import TestClient
+
+    import api
+
+    client = TestClient(api.app)
+    print(f"{'path':42s}  {'bytes':>7s}  {'old µs':>8s}  {'new µs':>8s}  speedup")
+    for path in DEFAULT_PATHS:
+        resp = client.get(path, headers={"Accept-Encoding": "identity"})
+        if resp.status_code != 200:
+            print(f"{path:42s}  skipped ({resp.status_code})")
+            continue
+        payload = resp.json()
+
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            JSONResponse(jsonable_encoder(payload))
+        old_us = (time.perf_counter() - t0) / repeat * 1e6
+
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            body = api.NPBJSONResponse(payload).body
+        new_us = (time.perf_counter() - t0) / repeat * 1e6
+
+        print(f"{path:42s}  {len(body):7d}  {old_us:8.1f}  {new_us:8.1f}  {old_us / new_us:5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NPB予測API 負荷テスト")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--duration", type=float, default=10.0, help="計測秒数")
+    parser.add_argument("--concurrency", type=int, default=32, help="同時接続数")
+    parser.add_argument("--workers", type=int, default=1, help="サーバ側 uvicorn ワーカー数")
+    parser.add_argument("--accept-encoding", default="identity",
+                        help="送信する Accept-Encoding（例: 'br, gzip'）")
+    parser.add_argument("--path", action="append", dest="paths",
+                        help="計測対象パス（複数指定可、省略で主要エンドポイント一式）")
+    parser.add_argument("--compare-serializers", action="store_true",
+                        help="HTTPを使わずシリアライズ時間だけをプロセス内で比較")
+    args = parser.parse_args()
+
+    if args.compare_serializers:
+        compare_serializers()
+        return
+
+    paths = args.paths or DEFAULT_PATHS
+    print(f"{args.url}  concurrency={args.concurrency}  duration={args.duration:.0f}s"
+          f"  workers={args.workers}  Accept-Encoding={args.accept_encoding!r}")
+    latencies, errors = asyncio.run(run_http(
+        args.url, paths, args.duration, args.concurrency, args.accept_encoding,
+    ))
+    if not latencies:
+        print("レスポンスなし")
+        return
+
+    rps = len(latencies) / args.duration
+    print(f"requests:      {len(latencies):,}  (errors: {len(errors)})")
+    print(f"req/s:         {rps:,.0f}")
+    print(f"req/s/worker:  {rps / args.workers:,.0f}")
+    print(f"latency ms:    p50={_percentile(latencies, 50) * 1e3:.2f}"
+          f"  p95={_percentile(latencies, 95) * 1e3:.2f}"
+          f"  p99={_percentile(latencies, 99) * 1e3:.2f}"
+          f"  mean={statistics.mean(latencies) * 1e3:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+HTMLテーブル抽出のベンチマーク（pd.read_html 版と html_tables 版の比較）
+
+保存したページ（フィクスチャ）を種類ごとに旧実装（read_html + 列名整形）と現在の
+パース関数（fetch_npb_data.parse_stats / fetch_npb_detailed.parse_team_batting /
+fetch_rosters.parse_team_roster）で読み、1ページあたりの時間と結果が一致するかを表示する。
+結果の比較は raw_store に書く形（CSV の行）で行う。
+
+フィクスチャ（--fixtures、既定 ~/.cache/npb-prediction/fixtures/html）が無ければ作る:
+  - HTTPキャッシュ（http_cache.py）に取得済みのページがあればそれを保存する
+  - 無い種類は data/raw の成績から各サイトと同じ表の形のページを生成する（replay.py の生成関数）
+
+Usage:
+  python bench_html_tables.py                   # 比較（フィクスチャが無ければ作る）
+  python bench_html_tables.py --refresh         # フィクスチャを作り直す
+  python bench_html_tables.py --repeat 5
+"""
+
+import argparse
+import io
+import shutil
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from config import DEFAULT_CACHE_DIR
+from fetch_npb_data import HITTER_COLS, PITCHER_COLS, parse_stats
+from fetch_npb_detailed import COL_NAMES, COL_NAMES_2025, parse_team_batting
+from fetch_rosters import parse_team_roster
+from http_cache import default_cache, season_of
+from raw_store import read_raw
+from replay import batting_page, roster_page, stats_page
+from table_store import ip_outs
+
+FIXTURE_DIR = DEFAULT_CACHE_DIR / "fixtures" / "html"
+
+# 種類 → HTTPキャッシュの URL に含まれる文字列
+KINDS = {
+    "hitter": "stats/hitter-all/",
+    "pitcher": "stats/pitcher-all/",
+    "batting_detailed": "/stats/idb1_",
+    "roster": "/player/",
+}
+
+
+# ---------------------------------------------------------------------------
+# 旧実装（pd.read_html）
+# ---------------------------------------------------------------------------
+
+def _read_html_stats(content: bytes, year: int, stat_type: str) -> pd.DataFrame | None:
+    df = max(pd.read_html(io.BytesIO(content), encoding="utf-8"), key=len)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = [col[0] for col in df.columns]
+    df.columns = [str(c).replace(" ", "").replace("　", "") for c in df.columns]
+    df = df.rename(columns=HITTER_COLS if stat_type == "hitter" else PITCHER_COLS)
+    if "rank" in df.columns:
+        df = df.drop(columns=["rank"])
+    df["year"] = year
+    df = df.dropna(subset=["player"])
+    df = df[df["player"].astype(str).str.match(r"^(?!\d+$).+")]
+    if "IP" in df.columns:
+        df = df.assign(IP_outs=ip_outs(df["IP"]))
+    return df
+
+
+def _read_html_batting(content: bytes, year: int, team: str) -> pd.DataFrame | None:
+    df = pd.read_html(io.BytesIO(content), encoding="utf-8")[0]
+    if len(df) < 3:
+        return None
+    df = df.iloc[2:].reset_index(drop=True)
+    if len(df.columns) == len(COL_NAMES):
+        df.columns = COL_NAMES
+        df = df.drop(columns=["flag"])
+    elif len(df.columns) == len(COL_NAMES_2025):
+        df.columns = COL_NAMES_2025
+    else:
+        return None
+    df["player"] = df["player"].astype(str).str.replace("　", " ").str.strip()
+    for col in df.columns:
+        if col != "player":
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    df = df.dropna(subset=["player", "PA"])
+    df = df[df["PA"] > 0]
+    df["team"] = team
+    df["year"] = year
+    return df
+
+
+def _read_html_roster(content: bytes) -> list[str]:
+    df = pd.read_html(io.BytesIO(content), flavor="lxml", encoding="utf-8")[0]
+    name_col = next((c for c in df.columns if "選手" in str(c) or "名前" in str(c)), None)
+    if name_col is None:
+        return []
+    names = df[name_col].dropna().astype(str).tolist()
+    return [n.strip() for n in names if n.strip() and n != "選手名"]
+
+
+def _parsers(kind: str, year: int, team: str):
+    """(旧実装, 現在の実装)"""
+    if kind in ("hitter", "pitcher"):
+        return (lambda c: _read_html_stats(c, year, kind),
+                lambda c: parse_stats(c, year, kind))
+    if kind == "batting_detailed":
+        return (lambda c: _read_html_batting(c, year, team),
+                lambda c: parse_team_batting(c, year, team))
+    return _read_html_roster, lambda c: parse_team_roster(c)
+
+
+def _as_csv(result) -> str:
+    if isinstance(result, list):
+        return "\n".join(result)
+    if result is None:
+        return ""
+    return result.to_csv(index=False)
+
+
+# ---------------------------------------------------------------------------
+# フィクスチャ
+# ---------------------------------------------------------------------------
+
+def save_fixtures(out_dir: Path) -> dict[str, str]:
+    """フィクスチャを作る。種類 → 出どころ（"cache" / "generated"）"""
+    shutil.rmtree(out_dir, ignore_errors=True)
+    sources = {}
+
+    cache = default_cache()
+    entries = cache.entries() if cache else []
+    for kind, marker in KINDS.items():
+        pages = [e for e in entries if marker in e["url"]]
+        saved = 0
+        for meta in pages:
+            loaded = cache.load(meta["url"])
+            if loaded is None:
+                continue
+            year = season_of(meta["url"]) or 0
+            name = meta["url"].rstrip("/").rsplit("/", 1)[-1].replace(".html", "")
+            path = out_dir / kind / f"{year}_{name}.html"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(loaded[1])
+            saved += 1
+        if saved:
+            sources[kind] = "cache"
+
+    def write(kind: str, name: str, content: bytes) -> None:
+        path = out_dir / kind / f"{name}.html"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+
+    if "hitter" not in sources or "pitcher" not in sources:
+        for kind, table, col_map in (("hitter", "hitters", HITTER_COLS), ("pitcher", "pitchers", PITCHER_COLS)):
+            if kind in sources:
+                continue
+            df = read_raw(table, as_stored=True)
+            for year, part in df.groupby("year"):
+                write(kind, f"{year}_all", stats_page(part, col_map))
+            sources[kind] = "generated"
+    if "batting_detailed" not in sources:
+        df = read_raw("batting_detailed", as_stored=True)
+        for (year, team), part in df.groupby(["year", "team"]):
+            write("batting_detailed", f"{year}_{team}", batting_page(part, int(year)))
+        sources["batting_detailed"] = "generated"
+    if "roster" not in sources:
+        df = read_raw("rosters", as_stored=True)
+        for (year, team), part in df.groupby(["year", "team"]):
+            write("roster", f"{year}_{team}", roster_page(part["player"].astype(str).tolist()))
+        sources["roster"] = "generated"
+    return sources
+
+
+# ---------------------------------------------------------------------------
+# 計測
+# ---------------------------------------------------------------------------
+
+def bench_kind(kind: str, paths: list[Path], repeat: int) -> dict:
+    pages = []
+    for path in paths:
+        year, _, team = path.stem.partition("_")
+        pages.append((path.read_bytes(), int(year), team))
+    old_sec = new_sec = 0.0
+    same = 0
+    for content, year, team in pages:
+        old, new = _parsers(kind, year, team)
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            old_result = old(content)
+        t1 = time.perf_counter()
+        for _ in range(repeat):
+            new_result = new(content)
+        t2 = time.perf_counter()
+        old_sec += t1 - t0
+        new_sec += t2 - t1
+        same += _as_csv(old_result) == _as_csv(new_result)
+    n = len(pages) * repeat
+    return {
+        "kind": kind,
+        "pages": len(pages),
+        "read_html_ms": old_sec / n * 1e3,
+        "lxml_ms": new_sec / n * 1e3,
+        "speedup": old_sec / new_sec if new_sec else float("nan"),
+        "identical": same,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="read_html と html_tables のパース速度・結果の比較")
+    parser.add_argument("--fixtures", type=Path, default=FIXTURE_DIR, help="フィクスチャのディレクトリ")
+    parser.add_argument("--refresh", action="store_true", help="フィクスチャを作り直す")
+    parser.add_argument("--repeat", type=int, default=3, help="1ページあたりの繰り返し回数")
+    args = parser.parse_args()
+
+    if args.refresh or not any(args.fixtures.glob("*/*.html")):
+        sources = save_fixtures(args.fixtures)
+        print(f"フィクスチャ作成: {args.fixtures}  " + ", ".join(f"{k}={v}" for k, v in sources.items()))
+
+    print(f"{'kind':<18}{'pages':>6}{'read_html':>12}{'lxml':>10}{'speedup':>9}{'identical':>11}")
+    total_old = total_new = 0.0
+    for kind in KINDS:
+        paths = sorted((args.fixtures / kind).glob("*.html"))
+        if not paths:
+            continue
+        r = bench_kind(kind, paths, args.repeat)
+        total_old += r["read_html_ms"] * r["pages"]
+        total_new += r["lxml_ms"] * r["pages"]
+        print(f"{kind:<18}{r['pages']:>6}{r['read_html_ms']:>10.2f}ms{r['lxml_ms']:>8.2f}ms"
+              f"{r['speedup']:>8.1f}x{r['identical']:>7}/{r['pages']}")
+    if total_new:
+        print(f"全ページ合計: read_html {total_old / 1e3:.2f}s → lxml {total_new / 1e3:.2f}s"
+              f"（{total_old / total_new:.1f}x）")
+
+
+if __name__ == "__main__":
+    main()
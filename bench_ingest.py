@@ -0,0 +1,131 @@
+"""
+1シーズン分の取り込み（取得 → パース → raw_store への保存）の処理時間を計測する
+
+replay.ReplayServer で記録済みのアーカイブ（fixture_archive.py）を再生し、取得スクリプトの
+関数をそのまま順に動かす。保存先は一時ディレクトリの RawStore なので data/raw は変えない。
+遅延・ゆらぎ・エラーを注入すれば、レート制限や再試行を含めた取り込み時間の変化も見られる。
+
+  stage              内容
+  hitters/pitchers   fetch_npb_data.fetch_all
+  batting_detailed   fetch_npb_detailed.fetch_all_batting
+  rosters            fetch_rosters.fetch_all_rosters
+  standings          pythagorean.fetch_all_standings
+  games              fetch_npb_games.fetch_years（Source 1 が無ければ Source 2）
+
+Usage:
+  python bench_ingest.py                          # アーカイブが空なら data/raw から作る
+  python bench_ingest.py --season 2024 --latency recorded
+  python bench_ingest.py --latency 0.2 --jitter 0.1 --error-rate 0.05 --error-status 0
+  python bench_ingest.py --no-throttle            # レート制限なし（パース・保存だけの時間の目安）
+"""
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+
+from config import DATA_END_YEAR
+from fetch_engine import FetchEngine
+from fixture_archive import FixtureArchive
+from raw_store import RawStore, save_raw
+from replay import REPLAY_ARCHIVE_DIR, ReplayServer, synthesize_archive
+
+
+def _stages(season: int, engine: FetchEngine, store: RawStore) -> list[tuple[str, callable]]:
+    """(stage 名, 実行して保存した行数を返す関数)"""
+    from fetch_npb_data import fetch_all
+    from fetch_npb_detailed import fetch_all_batting
+    from fetch_npb_games import fetch_years
+    from fetch_rosters import fetch_all_rosters
+    from pythagorean import fetch_all_standings
+
+    def saved(table, df):
+        if df.empty:
+            return 0
+        save_raw(table, df, store=store)
+        return len(df)
+
+    def games():
+        fetch_years([season], engine, store)
+        return len(store.read("games", [season]))
+
+    return [
+        ("hitters", lambda: saved("hitters", fetch_all("hitter", [season], engine))),
+        ("pitchers", lambda: saved("pitchers", fetch_all("pitcher", [season], engine))),
+        ("batting_detailed", lambda: saved("batting_detailed", fetch_all_batting(engine, [season]))),
+        ("rosters", lambda: saved("rosters", fetch_all_rosters([season], engine))),
+        ("standings", lambda: saved("standings", fetch_all_standings([season], engine))),
+        ("games", games),
+    ]
+
+
+def run_bench(archive: FixtureArchive, season: int, latency: float | None, jitter: float,
+              error_rate: float, error_status: int, throttle: bool = True,
+              verbose: bool = False) -> tuple[list[dict], FetchEngine, ReplayServer]:
+    with ReplayServer(archive, latency, jitter, error_rate, error_status) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        hosts = archive.hosts()
+        rates = None if throttle else {host: (1000.0, 100) for host in hosts}
+        engine = FetchEngine(rates=rates, redirect=server.redirect(hosts), progress=False,
+                             cache=False, recorder=False)
+        # 空のストアに従来のCSVを取り込まないよう legacy_dir も一時ディレクトリにする
+        store = RawStore(f"{tmp}/store")
+
+        results = []
+        for name, stage in _stages(season, engine, store):
+            requests_before = server.hits
+            misses_before = len(server.misses)
+            out = io.StringIO()
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(out) if not verbose else contextlib.nullcontext():
+                rows = stage()
+            results.append({
+                "stage": name,
+                "requests": server.hits - requests_before,
+                "misses": len(server.misses) - misses_before,
+                "sec": time.perf_counter() - t0,
+                "rows": rows,
+            })
+        engine.close()
+    return results, engine, server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="記録した応答を再生して1シーズン分の取り込み時間を計測")
+    parser.add_argument("--archive", default=str(REPLAY_ARCHIVE_DIR), help="アーカイブのディレクトリ")
+    parser.add_argument("--season", type=int, default=DATA_END_YEAR)
+    parser.add_argument("--synthesize", action="store_true",
+                        help="data/raw からこの年度のページを作ってから計測（アーカイブが空なら常に作る）")
+    parser.add_argument("--latency", default="0", help="応答までの秒数（recorded なら記録した応答時間）")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503, help="返すエラー（0 は接続を切る）")
+    parser.add_argument("--no-throttle", action="store_true", help="ホスト別のレート制限を外す")
+    parser.add_argument("--verbose", action="store_true", help="取得スクリプトの出力も表示")
+    args = parser.parse_args()
+
+    archive = FixtureArchive(args.archive)
+    if args.synthesize or not archive.entries():
+        n = synthesize_archive(archive, args.season)
+        print(f"{args.season}年のページ {n}件を data/raw から作成: {args.archive}")
+
+    latency = None if args.latency == "recorded" else float(args.latency)
+    results, engine, server = run_bench(archive, args.season, latency, args.jitter, args.error_rate,
+                                        args.error_status, throttle=not args.no_throttle,
+                                        verbose=args.verbose)
+
+    print(f"\n=== {args.season}年 取り込み（latency={args.latency} jitter={args.jitter} "
+          f"error_rate={args.error_rate}） ===")
+    print(f"{'stage':<18}{'req':>6}{'miss':>6}{'sec':>9}{'rows':>8}")
+    for r in results:
+        print(f"{r['stage']:<18}{r['requests']:>6}{r['misses']:>6}{r['sec']:>9.2f}{r['rows']:>8}")
+    total = sum(r["sec"] for r in results)
+    print(f"{'合計':<16}{server.hits:>6}{len(server.misses):>6}{total:>9.2f}"
+          f"{sum(r['rows'] for r in results):>8}")
+    print(f"\n注入したエラー: {server.errors}件\n")
+    print(engine.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+表の読み込みのベンチマーク（CSV 版と table_store の型付き Parquet 版の比較）
+
+data/raw と data/projections のCSVごとに、
+  csv       pd.read_csv + 数値列の pd.to_numeric（これまでの load_hitters / load_pitchers 等と同じ処理）
+  parquet   table_store.load_table（隣の Parquet から。無ければ先に作る）
+  category  load_table(categories=True)（team / player 等を category 型のまま）
+の1回あたりの時間と、読み込んだ DataFrame のメモリ（memory_usage(deep=True)）、ファイルサイズを表示する。
+identical は csv と parquet の結果が完全に一致するか（列の型も含む）。
+
+Usage:
+  python bench_storage.py
+  python bench_storage.py --repeat 10
+  python bench_storage.py --pattern "npb_*"
+"""
+
+import argparse
+import statistics
+import time
+
+import pandas as pd
+
+from table_store import HAS_PYARROW, TABLE_DIRS, load_table, parquet_path, read_csv
+
+
+def _time(fn, repeat: int) -> tuple[float, pd.DataFrame]:
+    """中央値（ミリ秒）と最後の結果"""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        df = fn()
+        times.append((time.perf_counter() - t0) * 1e3)
+    return statistics.median(times), df
+
+
+def _mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def bench_table(path, repeat: int) -> dict:
+    load_table(path)   # Parquet が無い・古ければ作る
+    csv_ms, csv_df = _time(lambda: read_csv(path), repeat)
+    pq_ms, pq_df = _time(lambda: load_table(path), repeat)
+    cat_ms, cat_df = _time(lambda: load_table(path, categories=True), repeat)
+    try:
+        pd.testing.assert_frame_equal(csv_df, pq_df)
+        identical = True
+    except AssertionError:
+        identical = False
+    return {
+        "table": path.name,
+        "rows": len(csv_df),
+        "csv_ms": csv_ms,
+        "parquet_ms": pq_ms,
+        "category_ms": cat_ms,
+        "csv_mb": _mb(csv_df),
+        "category_mb": _mb(cat_df),
+        "csv_kb": path.stat().st_size / 1e3,
+        "parquet_kb": parquet_path(path).stat().st_size / 1e3,
+        "identical": identical,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV と型付き Parquet の読み込み時間・メモリの比較")
+    parser.add_argument("--repeat", type=int, default=5, help="1表あたりの繰り返し回数")
+    parser.add_argument("--pattern", default="*", help="対象のファイル名（glob、拡張子なし）")
+    args = parser.parse_args()
+
+    if not HAS_PYARROW:
+        print("pyarrow が無いため比較できません")
+        return
+
+    paths = sorted(p for d in TABLE_DIRS if d.exists() for p in d.glob(f"{args.pattern}.csv"))
+    print(f"{'table':<38}{'rows':>6}{'csv':>9}{'parquet':>10}{'category':>10}"
+          f"{'MB(str)':>9}{'MB(cat)':>9}{'KB csv':>9}{'KB pq':>8}  identical")
+    results = []
+    for path in paths:
+        r = bench_table(path, args.repeat)
+        results.append(r)
+        print(f"{r['table']:<38}{r['rows']:>6}{r['csv_ms']:>7.1f}ms{r['parquet_ms']:>8.1f}ms"
+              f"{r['category_ms']:>8.1f}ms{r['csv_mb']:>9.2f}{r['category_mb']:>9.2f}"
+              f"{r['csv_kb']:>9.0f}{r['parquet_kb']:>8.0f}  {r['identical']}")
+
+    if results:
+        csv_total = sum(r["csv_ms"] for r in results)
+        pq_total = sum(r["parquet_ms"] for r in results)
+        print(f"\n合計 {len(results)}表: csv {csv_total:.0f}ms → parquet {pq_total:.0f}ms"
+              f"（{csv_total / pq_total:.1f}x）  メモリ {sum(r['csv_mb'] for r in results):.1f}MB → "
+              f"{sum(r['category_mb'] for r in results):.1f}MB（category）  "
+              f"一致 {sum(r['identical'] for r in results)}/{len(results)}")
+
+
+if __name__ == "__main__":
+    main()
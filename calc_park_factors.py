@@ -13,12 +13,24 @@ fetch_npb_games.py で取得した試合別スコアから計算する
   data/projections/npb_park_factors.csv
     columns: year, team, stadium, home_G, home_RS, home_RA,
              away_G, away_RS, away_RA, PF, PF_5yr, renovation_year
+
+PF / PF_5yr はチーム×年度のホーム/アウェイ別得失点の集計（data/raw/store/park_totals.csv）から
+計算する。シーズン中は fetch_npb_games.py --incremental が新しい試合だけを update_park_factors に
+渡し、集計に足してから PF を計算し直す（試合データ全体は読み直さない）。集計には元にした
+試合パーティション（raw_store の games）のハッシュを持たせ、ストアと食い違う年度だけ読み直す。
+
+使い方:
+    python calc_park_factors.py    # 全試合から集計を作り直して計算
 """
 
 from pathlib import Path
 
 import pandas as pd
 
+from config import RAW_STORE_DIR
+from raw_store import RawStore
+from table_store import load_table, save_table
+
 DATA_DIR = Path(__file__).parent / "data"
 RAW_DIR = DATA_DIR / "raw"
 PROJ_DIR = DATA_DIR / "projections"
@@ -31,6 +43,10 @@ TEAMS = [
 
 MIN_GAMES = 30   # 最低試合数（これ未満の年度は NaN）
 
+# チーム×年度のホーム/アウェイ別得失点の集計（games_hash = 集計元の試合パーティションのハッシュ）
+PARK_TOTALS_PATH = RAW_STORE_DIR / "park_totals.csv"
+TOTAL_COLS = ["home_G", "home_RS", "home_RA", "away_G", "away_RS", "away_RA"]
+
 # 大規模改修年リスト（この年以降のデータのみ PF_5yr 計算に使う）
 # 複数回改修がある場合はリストで管理し、対象年以前の最新改修年が使われる
 # 参考: 各改修の詳細は npb-park-factors.md 参照
@@ -58,8 +74,7 @@ def load_games(years: list[int]) -> pd.DataFrame:
         if not path.exists():
             print(f"  [警告] {path.name} が見つかりません（{year}年はスキップ）")
             continue
-        df = pd.read_csv(path)
-        frames.append(df)
+        frames.append(load_table(path))
 
     if not frames:
         raise FileNotFoundError(
@@ -69,33 +84,63 @@ def load_games(years: list[int]) -> pd.DataFrame:
     return pd.concat(frames, ignore_index=True)
 
 
-def calc_team_pf(games: pd.DataFrame, team: str, year: int) -> dict | None:
+def team_totals(games: pd.DataFrame) -> pd.DataFrame:
+    """試合データからチーム×年度のホーム/アウェイ別 試合数・得点・失点を集計する"""
+    if games.empty:
+        return pd.DataFrame(columns=["year", "team", "stadium"] + TOTAL_COLS)
+    home = games.groupby(["year", "home_team"]).agg(
+        home_G=("home_score", "size"), home_RS=("home_score", "sum"), home_RA=("away_score", "sum"))
+    away = games.groupby(["year", "away_team"]).agg(
+        away_G=("away_score", "size"), away_RS=("away_score", "sum"), away_RA=("home_score", "sum"))
+    home.index.names = away.index.names = ["year", "team"]
+    totals = home.join(away, how="outer").fillna(0).astype("int64").reset_index()
+    if "stadium" in games.columns:
+        stadium = games.groupby(["year", "home_team"])["stadium"].agg(lambda s: s.mode()[0])
+        stadium.index.names = ["year", "team"]
+        totals = totals.merge(stadium.reset_index(), on=["year", "team"], how="left")
+    else:
+        totals["stadium"] = ""
+    totals["stadium"] = totals["stadium"].fillna("")
+    return totals[["year", "team", "stadium"] + TOTAL_COLS]
+
+
+def add_games(totals: pd.DataFrame, games: pd.DataFrame) -> pd.DataFrame:
+    """集計に新しい試合だけを足す（計算量は新しい試合数に比例）"""
+    delta = team_totals(games)
+    if delta.empty:
+        return totals
+    merged = totals.merge(delta, on=["year", "team"], how="outer", suffixes=("", "_new"))
+    for col in TOTAL_COLS:
+        merged[col] = merged[col].fillna(0).astype("int64") + merged[col + "_new"].fillna(0).astype("int64")
+    # 球場は既存の集計を優先（新しいチーム×年度だけ新しい試合から）
+    merged["stadium"] = merged["stadium"].where(merged["stadium"].fillna("") != "", merged["stadium_new"])
+    merged["stadium"] = merged["stadium"].fillna("")
+    return merged[totals.columns].sort_values(["year", "team"], ignore_index=True)
+
+
+def calc_team_pf(totals: pd.DataFrame, team: str, year: int) -> dict | None:
     """1チーム・1年のパークファクターを計算"""
-    yr = games[games["year"] == year]
-
-    home = yr[yr["home_team"] == team]
-    away = yr[yr["away_team"] == team]
+    row = totals[(totals["year"] == year) & (totals["team"] == team)]
+    if row.empty:
+        return None
+    r = row.iloc[0]
 
-    home_G = len(home)
-    away_G = len(away)
+    home_G = int(r["home_G"])
+    away_G = int(r["away_G"])
 
     if home_G < MIN_GAMES or away_G < MIN_GAMES:
         return None
 
-    home_RS = home["home_score"].sum()
-    home_RA = home["away_score"].sum()
-    away_RS = away["away_score"].sum()
-    away_RA = away["home_score"].sum()
+    home_RS, home_RA = int(r["home_RS"]), int(r["home_RA"])
+    away_RS, away_RA = int(r["away_RS"]), int(r["away_RA"])
 
     if away_G == 0 or (away_RS + away_RA) == 0:
         return None
 
     pf = ((home_RS + home_RA) / home_G) / ((away_RS + away_RA) / away_G)
 
-    stadium = home["stadium"].mode()[0] if "stadium" in home.columns and len(home) > 0 else ""
-
     return {
-        "year": year, "team": team, "stadium": stadium,
+        "year": year, "team": team, "stadium": r["stadium"],
         "home_G": home_G, "home_RS": home_RS, "home_RA": home_RA,
         "away_G": away_G, "away_RS": away_RS, "away_RA": away_RA,
         "PF": round(pf, 3),
@@ -103,7 +148,7 @@ def calc_team_pf(games: pd.DataFrame, team: str, year: int) -> dict | None:
 
 
 def calc_multiyear_pf(
-    games: pd.DataFrame, team: str, year: int, window: int = 5
+    totals: pd.DataFrame, team: str, year: int, window: int = 5
 ) -> float | None:
     """複数年平均パークファクター（改修年以降のデータのみ使用）
 
@@ -111,14 +156,14 @@ def calc_multiyear_pf(
     例: ソフトバンク 2017年・5年平均 → 2015-2017の3年分（2013-2014は除外）
     """
     reno = get_renovation_break(team, year)
-    data_start = reno if reno else games["year"].min()
+    data_start = reno if reno else totals["year"].min()
     years = list(range(max(year - window + 1, data_start), year + 1))
 
     total_home_RS = total_home_RA = total_home_G = 0
     total_away_RS = total_away_RA = total_away_G = 0
 
     for y in years:
-        res = calc_team_pf(games, team, y)
+        res = calc_team_pf(totals, team, y)
         if res is None:
             continue
         total_home_RS += res["home_RS"]
@@ -138,6 +183,73 @@ def calc_multiyear_pf(
     )
 
 
+def park_factors(totals: pd.DataFrame) -> pd.DataFrame:
+    """集計から全チーム×全年度の PF / PF_5yr を計算する（試合数によらずチーム×年度の数に比例）"""
+    records = []
+    for year in sorted(totals["year"].unique()):
+        for team in TEAMS:
+            row = calc_team_pf(totals, team, year)
+            if not row:
+                continue
+
+            row["PF_5yr"] = calc_multiyear_pf(totals, team, year, window=5)
+
+            reno = get_renovation_break(team, year)
+            row["renovation_year"] = reno if reno else ""
+
+            records.append(row)
+    return pd.DataFrame(records)
+
+
+def load_totals() -> tuple[pd.DataFrame, dict[int, str]]:
+    """保存した集計と、年度ごとの集計元パーティションのハッシュ"""
+    if not PARK_TOTALS_PATH.exists():
+        return team_totals(pd.DataFrame()), {}
+    df = pd.read_csv(PARK_TOTALS_PATH, keep_default_na=False)
+    hashes = dict(zip(df["year"].astype(int), df["games_hash"].astype(str)))
+    return df.drop(columns=["games_hash"]), hashes
+
+
+def save_totals(totals: pd.DataFrame, hashes: dict[int, str]) -> None:
+    out = totals.copy()
+    out["games_hash"] = out["year"].map(hashes).fillna("")
+    PARK_TOTALS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    out.to_csv(PARK_TOTALS_PATH, index=False, encoding="utf-8-sig")
+
+
+def update_park_factors(new_games: pd.DataFrame, previous_hashes: dict[int, str],
+                        store: RawStore | None = None) -> pd.DataFrame:
+    """新しい試合を集計に足して PF / PF_5yr を計算し直し、npb_park_factors.csv を書き出す
+
+    new_games はストアに upsert 済みの新しい試合、previous_hashes は upsert 前の
+    store.partition_hashes("games")。集計元のハッシュが upsert 前のパーティションと一致する年度は
+    new_games を足すだけで済ませ、一致しない年度（集計が古い・無い）はその年度の試合だけ読み直す。
+    """
+    store = store or RawStore()
+    totals, hashes = load_totals()
+    current = store.partition_hashes("games")
+    new_years = set(new_games["year"].astype(int)) if not new_games.empty else set()
+
+    for year, digest in sorted(current.items()):
+        if hashes.get(year) == digest:
+            continue
+        if year in new_years and hashes.get(year) == previous_hashes.get(year):
+            totals = add_games(totals, new_games[new_games["year"] == year])
+            print(f"  [{year}] 集計に {int((new_games['year'] == year).sum())} 試合を追加")
+        else:
+            totals = pd.concat([totals[totals["year"] != year], team_totals(store.read("games", [year]))],
+                               ignore_index=True).sort_values(["year", "team"], ignore_index=True)
+            print(f"  [{year}] 集計を試合パーティションから作り直し")
+        hashes[year] = digest
+
+    save_totals(totals, hashes)
+    df = park_factors(totals)
+    out = PROJ_DIR / "npb_park_factors.csv"
+    save_table(df, out)
+    print(f"  保存: {out}")
+    return df
+
+
 def main():
     available_years = sorted(
         int(p.stem.replace("npb_games_", ""))
@@ -151,29 +263,15 @@ def main():
     games = load_games(available_years)
     print(f"総試合数: {len(games)}")
 
-    latest_year = max(available_years)
-    records = []
+    # 集計を作り直して保存（ストアに試合パーティションがあれば、そのハッシュを集計元として記録）
+    totals = team_totals(games)
+    save_totals(totals, RawStore().partition_hashes("games"))
 
-    for year in available_years:
-        for team in TEAMS:
-            row = calc_team_pf(games, team, year)
-            if not row:
-                continue
-
-            pf_5yr = calc_multiyear_pf(games, team, year, window=5)
-            row["PF_5yr"] = pf_5yr
-
-            reno = get_renovation_break(team, year)
-            row["renovation_year"] = reno if reno else ""
-
-            records.append(row)
-
-    if not records:
+    df = park_factors(totals)
+    if df.empty:
         print("パークファクターを計算できませんでした（試合データ不足の可能性）")
         return
 
-    df = pd.DataFrame(records)
-
     # 球場別・年度推移サマリー（改修年に * マーク）
     print("\n=== 球場別 年度推移 ===")
     for team in TEAMS:
@@ -190,7 +288,7 @@ def main():
             print(f"  {int(r['year']):>4}  {r['PF']:.3f}  {pf5:>7}{mark}")
 
     out = PROJ_DIR / "npb_park_factors.csv"
-    df.to_csv(out, index=False, encoding="utf-8-sig")
+    save_table(df, out)
     print(f"\n保存: {out}")
 
 
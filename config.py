@@ -23,3 +23,9 @@ from pathlib import Path
 _BASE_DIR = Path(__file__).parent
 BAYES_DIR = _BASE_DIR / "data" / "bayes"
 PROJECTIONS_DIR = _BASE_DIR / "data" / "projections"
+RAW_STORE_DIR = _BASE_DIR / "data" / "raw" / "store"
+DASHBOARD_BUNDLE_DIR = _BASE_DIR / "data" / "dashboard"
+STATIC_SITE_DIR = _BASE_DIR / "site"
+
+# ダウンロード・HTTP キャッシュ・フィクスチャの置き場所（ユーザーのホーム以下、リポジトリの外）
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "npb-prediction"
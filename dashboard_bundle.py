@@ -0,0 +1,319 @@
+"""
+ダッシュボード用の前計算バンドル
+
+streamlit_app.load_all が毎セッション行っていた変換（ロースターでの絞り込み・
+チーム名の付け替え、wOBA回帰/FIP定数による指標追加、ベイズ予測のマージ）を
+パイプラインの最後に1回だけ実行し、テーブルごとの Arrow IPC ファイル +
+manifest.json として data/dashboard/ に書き出す。
+
+ダッシュボードは manifest の年度が config と一致し、入力のハッシュも変わって
+いなければバンドルをメモリマップで読み、変換なしで描画する
+（無い・古い場合は従来どおりCSVから組み立てる）。
+
+Usage:
+  python dashboard_bundle.py            # バンドルを生成
+  python dashboard_bundle.py --check    # 入力CSV・ロースターがバンドル生成後に変わっていないか確認
+"""
+
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import DASHBOARD_BUNDLE_DIR, DATA_END_YEAR, TARGET_YEAR
+from data_source import DataSource, LocalDirSource
+from player_names import normalize_name
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+# バンドルに入れるテーブル → 元CSV（リポジトリ相対パス）
+TABLE_SOURCES = {
+    "marcel_hitters": f"data/projections/marcel_hitters_{TARGET_YEAR}.csv",
+    "marcel_pitchers": f"data/projections/marcel_pitchers_{TARGET_YEAR}.csv",
+    "sabermetrics": f"data/projections/npb_sabermetrics_2015_{DATA_END_YEAR}.csv",
+    "pitcher_history": f"data/raw/npb_pitchers_2015_{DATA_END_YEAR}.csv",
+    "pythagorean": f"data/projections/pythagorean_2015_{DATA_END_YEAR}.csv",
+    "marcel_team_historical": "data/projections/marcel_team_historical.csv",
+    # Bayesian projections
+    "bayes_hitters": f"data/projections/bayes_hitters_{TARGET_YEAR}.csv",
+    "bayes_pitchers": f"data/projections/bayes_pitchers_{TARGET_YEAR}.csv",
+    # Foreign player projections
+    "foreign_hitters": f"data/projections/foreign_hitters_{TARGET_YEAR}.csv",
+    "foreign_pitchers": f"data/projections/foreign_pitchers_{TARGET_YEAR}.csv",
+    # Team simulation
+    "team_sim": f"data/projections/team_sim_{TARGET_YEAR}.csv",
+}
+
+# バンドルの内容を決める入力（元CSV + ロースター定義）。manifest に SHA-1 を記録する
+BUNDLE_INPUTS = list(TABLE_SOURCES.values()) + ["roster_current.py"]
+
+# テーブル以外にバンドルへ持たせるスカラー値（manifest の scalars に入る）
+SCALAR_KEYS = ("_lg_woba",)
+
+
+def read_table(source: DataSource, path: str) -> pd.DataFrame:
+    """CSVを読み、player/team 列の全角スペースを正規化する"""
+    df = source.read_csv(path)
+    if "player" in df.columns:
+        df["player"] = df["player"].apply(normalize_name)
+    if "team" in df.columns:
+        df["team"] = df["team"].apply(normalize_name)
+    return df
+
+
+def build_tables(load=None) -> dict:
+    """元CSVからダッシュボード用テーブル一式を組み立てる。
+
+    load はパス → DataFrame の関数（省略時はローカルの data/ から読む）。
+    """
+    from roster_current import map_teams
+
+    if load is None:
+        source = DataSource([LocalDirSource(Path(__file__).parent)])
+        load = lambda path: read_table(source, path)  # noqa: E731
+    result = {key: load(path) for key, path in TABLE_SOURCES.items()}
+
+    # NPB公式ロースターに在籍する選手のみ残し、チーム名も公式に合わせる
+    for key in ("marcel_hitters", "marcel_pitchers"):
+        df = result[key]
+        if df.empty or "player" not in df.columns:
+            continue
+        roster_team = map_teams(df["player"])
+        on_roster = roster_team.notna()
+        # ロースターにいる選手だけ残し、チーム名を公式ロースターに合わせる（移籍反映）
+        df = df[on_roster].copy()
+        df["team"] = roster_team[on_roster]
+        result[key] = df
+
+    _enrich_projections(result)
+    _merge_bayes_projections(result)
+    return result
+
+
+def _enrich_projections(data: dict) -> None:
+    """打者にwOBA/wRC+/wRAA、投手にFIP/K%/BB%/K-BB%を追加"""
+    mh = data["marcel_hitters"]
+    mp = data["marcel_pitchers"]
+    saber = data.get("sabermetrics", pd.DataFrame())
+
+    # --- 打者: wOBA, wRC+, wRAA ---
+    if not mh.empty and not saber.empty:
+        df_fit = saber[saber["PA"] >= 100].dropna(subset=["wOBA", "OBP", "SLG"])
+        if len(df_fit) >= 10:
+            X = np.column_stack([df_fit["OBP"].values, df_fit["SLG"].values, np.ones(len(df_fit))])
+            coeffs, _, _, _ = np.linalg.lstsq(X, df_fit["wOBA"].values, rcond=None)
+            a_obp, b_slg, intercept_w = coeffs
+
+            recent_s = saber[saber["year"] >= 2022]
+            lg_woba = recent_s[recent_s["PA"] >= 50]["wOBA"].mean()
+            woba_scale = 1.15
+
+            mh["wOBA"] = (a_obp * mh["OBP"] + b_slg * mh["SLG"] + intercept_w).round(3)
+            mh["wRAA"] = ((mh["wOBA"] - lg_woba) / woba_scale * mh["PA"]).round(1)
+            lg_r_per_pa = lg_woba / woba_scale
+            mh["wRC+"] = (((mh["wOBA"] - lg_woba) / woba_scale + lg_r_per_pa) / lg_r_per_pa * 100).round(0).astype(int)
+
+            data["_lg_woba"] = lg_woba
+
+    # --- 投手: FIP, K%, BB%, K-BB% ---
+    if not mp.empty and mp["IP"].sum() > 0:
+        has_fip_cols = all(c in mp.columns for c in ["BB", "HBP", "HRA", "BF"])
+        if has_fip_cols:
+            ip_safe = mp["IP"].replace(0, np.nan)
+            bf_safe = mp["BF"].replace(0, np.nan)
+            mp["K_pct"] = (mp["SO"] / bf_safe * 100).round(1)
+            mp["BB_pct"] = (mp["BB"] / bf_safe * 100).round(1)
+            mp["K_BB_pct"] = (mp["K_pct"] - mp["BB_pct"]).round(1)
+            mp["K9"] = (mp["SO"] * 9 / ip_safe).round(2)
+            mp["BB9"] = (mp["BB"] * 9 / ip_safe).round(2)
+            mp["HR9"] = (mp["HRA"] * 9 / ip_safe).round(2)
+
+            lg_ip = mp["IP"].sum()
+            lg_era = (mp["ERA"] * mp["IP"]).sum() / lg_ip
+            lg_hra = mp["HRA"].sum()
+            lg_bb = mp["BB"].sum()
+            lg_hbp = mp["HBP"].sum()
+            lg_so = mp["SO"].sum()
+            fip_c = lg_era - (13 * lg_hra + 3 * (lg_bb + lg_hbp) - 2 * lg_so) / lg_ip
+            mp["FIP"] = ((13 * mp["HRA"] + 3 * (mp["BB"] + mp["HBP"]) - 2 * mp["SO"]) / mp["IP"] + fip_c).round(2)
+
+
+
+def _merge_bayes_projections(data: dict) -> None:
+    """ベイズCSVからbayes_OPS/ERA + CIカラムをMarcelデータにマージ"""
+    bh = data.get("bayes_hitters", pd.DataFrame())
+    bp = data.get("bayes_pitchers", pd.DataFrame())
+    mh = data["marcel_hitters"]
+    mp = data["marcel_pitchers"]
+
+    if not bh.empty and not mh.empty and "player" in bh.columns:
+        # player以外でMarcel側と重複しないカラムだけマージ
+        merge_cols = ["player"] + [
+            c for c in bh.columns
+            if c != "player" and c not in mh.columns
+        ]
+        bayes_cols = bh[merge_cols].drop_duplicates("player")
+        data["marcel_hitters"] = mh.merge(bayes_cols, on="player", how="left")
+
+    if not bp.empty and not mp.empty and "player" in bp.columns:
+        merge_cols = ["player"] + [
+            c for c in bp.columns
+            if c != "player" and c not in mp.columns
+        ]
+        bayes_cols = bp[merge_cols].drop_duplicates("player")
+        data["marcel_pitchers"] = mp.merge(bayes_cols, on="player", how="left")
+
+
+
+# --- バンドルの書き出し / 読み込み ---
+
+
+def _file_sha1(path: Path) -> str | None:
+    try:
+        return hashlib.sha1(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def write_bundle(data: dict, out_dir: Path = DASHBOARD_BUNDLE_DIR) -> dict:
+    """テーブルごとに Arrow IPC（非圧縮、メモリマップ可）で書き、manifest を返す"""
+    if not HAS_PYARROW:
+        raise RuntimeError("pyarrow が必要です: pip install pyarrow")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    base = Path(__file__).parent
+
+    tables = {}
+    for key in TABLE_SOURCES:
+        df = data.get(key, pd.DataFrame())
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        filename = f"{key}.arrow"
+        tmp = out_dir / (filename + ".tmp")
+        with pa.OSFile(str(tmp), "wb") as sink, pa_ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        tmp.replace(out_dir / filename)
+        tables[key] = {"file": filename, "rows": len(df), "columns": list(df.columns)}
+
+    scalars = {}
+    for key in SCALAR_KEYS:
+        if key in data:
+            scalars[key] = float(data[key])
+
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "target_year": TARGET_YEAR,
+        "data_end_year": DATA_END_YEAR,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "tables": tables,
+        "scalars": scalars,
+        "inputs": {path: _file_sha1(base / path) for path in BUNDLE_INPUTS},
+    }
+    (out_dir / MANIFEST_NAME).write_text(
+        json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8",
+    )
+    return manifest
+
+
+def read_manifest(bundle_dir: Path = DASHBOARD_BUNDLE_DIR) -> dict | None:
+    try:
+        return json.loads((Path(bundle_dir) / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def load_bundle(bundle_dir: Path = DASHBOARD_BUNDLE_DIR) -> dict | None:
+    """バンドルをメモリマップで読み、load_all と同じ形の dict を返す。
+
+    バンドルが無い・形式や年度が現在の config と合わない・入力CSVやロースターが
+    生成後に変わっている・pyarrow が無い場合は None（呼び出し側はCSVから組み立てる）。
+    """
+    if not HAS_PYARROW:
+        return None
+    manifest = read_manifest(bundle_dir)
+    if (
+        manifest is None
+        or manifest.get("format_version") != BUNDLE_FORMAT_VERSION
+        or manifest.get("target_year") != TARGET_YEAR
+        or manifest.get("data_end_year") != DATA_END_YEAR
+        or set(manifest.get("tables", {})) != set(TABLE_SOURCES)
+        or _stale_inputs(manifest)
+    ):
+        return None
+
+    result = {}
+    try:
+        for key, info in manifest["tables"].items():
+            with pa.memory_map(str(Path(bundle_dir) / info["file"]), "r") as source:
+                result[key] = pa_ipc.open_file(source).read_all().to_pandas()
+    except (OSError, pa.ArrowInvalid):
+        return None
+    result.update(manifest.get("scalars", {}))
+    return result
+
+
+def _stale_inputs(manifest: dict) -> list[str]:
+    """manifest 記録時から内容が変わった入力ファイル（合計数MBのハッシュで数ms）"""
+    base = Path(__file__).parent
+    recorded = manifest.get("inputs", {})
+    return [path for path in BUNDLE_INPUTS if recorded.get(path) != _file_sha1(base / path)]
+
+
+def memory_report(data: dict) -> pd.DataFrame:
+    """テーブルごとの行数・列数・メモリ使用量（文字列を含む deep 計測、MB）"""
+    rows = []
+    for key, df in data.items():
+        if isinstance(df, pd.DataFrame):
+            rows.append({
+                "table": key,
+                "rows": len(df),
+                "columns": df.shape[1],
+                "MB": round(df.memory_usage(deep=True).sum() / 1e6, 2),
+            })
+    report = pd.DataFrame(rows, columns=["table", "rows", "columns", "MB"])
+    return report.sort_values("MB", ascending=False).reset_index(drop=True)
+
+
+def check_bundle(bundle_dir: Path = DASHBOARD_BUNDLE_DIR) -> list[str]:
+    """バンドル生成後に内容が変わった入力のパスを返す（バンドルが無ければ全部）"""
+    manifest = read_manifest(bundle_dir)
+    if manifest is None:
+        return list(BUNDLE_INPUTS)
+    return _stale_inputs(manifest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ダッシュボード用の前計算バンドルを生成")
+    parser.add_argument("--out", default=str(DASHBOARD_BUNDLE_DIR), help="出力ディレクトリ")
+    parser.add_argument("--check", action="store_true",
+                        help="入力がバンドル生成後に変わっていないか確認（変わっていれば終了コード1）")
+    args = parser.parse_args()
+
+    if args.check:
+        stale = check_bundle(Path(args.out))
+        for path in stale:
+            print(f"  changed: {path}")
+        print("バンドルは最新です" if not stale else f"バンドルが古くなっています（{len(stale)}ファイル）")
+        raise SystemExit(1 if stale else 0)
+
+    t0 = time.perf_counter()
+    data = build_tables()
+    manifest = write_bundle(data, Path(args.out))
+    for key, info in manifest["tables"].items():
+        print(f"  {key:24s} {info['rows']:6d} rows  {len(info['columns']):3d} cols")
+    print(f"バンドル書き出し完了: {args.out}  ({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+ダッシュボードの各ページが表示するデータの組み立て（Streamlit 非依存）
+
+streamlit_app.py のページと static_export.py の静的書き出しの両方から使う。
+ここでは表示用の DataFrame / dict を作るだけで、HTML・翻訳・キャッシュは呼び出し側で扱う。
+共有データモデル（load_all の結果）の DataFrame は書き換えず、必要ならコピーしてから列を足す。
+"""
+
+import numpy as np
+import pandas as pd
+
+from player_names import fuzzy_key
+
+CENTRAL_TEAMS = ["DeNA", "巨人", "阪神", "広島", "中日", "ヤクルト"]
+PACIFIC_TEAMS = ["ソフトバンク", "日本ハム", "楽天", "ロッテ", "オリックス", "西武"]
+TEAMS = CENTRAL_TEAMS + PACIFIC_TEAMS
+
+NPB_TEAM_COLORS = {
+    "DeNA": "#0055A5",
+    "巨人": "#F97709",
+    "阪神": "#FFE201",
+    "広島": "#EE1C25",
+    "中日": "#00468B",
+    "ヤクルト": "#006AB6",
+    "ソフトバンク": "#F5C70E",
+    "日本ハム": "#004B97",
+    "楽天": "#860029",
+    "ロッテ": "#000000",
+    "オリックス": "#C4A400",
+    "西武": "#102A6F",
+}
+
+NPB_TEAM_GLOW = {
+    "DeNA": "#00aaff",
+    "巨人": "#ff9933",
+    "阪神": "#ffe44d",
+    "広島": "#ff4444",
+    "中日": "#4488ff",
+    "ヤクルト": "#44aaff",
+    "ソフトバンク": "#ffdd33",
+    "日本ハム": "#4488ff",
+    "楽天": "#cc3366",
+    "ロッテ": "#888888",
+    "オリックス": "#ddcc33",
+    "西武": "#4466cc",
+}
+
+
+# --- 選手指標の補完 ---
+
+
+def ensure_hitter_saber(mh: pd.DataFrame, data: dict) -> pd.DataFrame:
+    """wOBA/wRC+/wRAA列がなければ計算して追加"""
+    if "wOBA" in mh.columns:
+        return mh
+    saber = data.get("sabermetrics", pd.DataFrame())
+    if saber.empty:
+        return mh
+    df_fit = saber[saber["PA"] >= 100].dropna(subset=["wOBA", "OBP", "SLG"])
+    if len(df_fit) < 10:
+        return mh
+    X = np.column_stack([df_fit["OBP"].values, df_fit["SLG"].values, np.ones(len(df_fit))])
+    coeffs, _, _, _ = np.linalg.lstsq(X, df_fit["wOBA"].values, rcond=None)
+    a, b, c = coeffs
+    recent_s = saber[saber["year"] >= 2022]
+    lg_woba = recent_s[recent_s["PA"] >= 50]["wOBA"].mean()
+    ws = 1.15
+    mh = mh.copy()  # 共有データは書き換えない
+    mh["wOBA"] = (a * mh["OBP"] + b * mh["SLG"] + c).round(3)
+    mh["wRAA"] = ((mh["wOBA"] - lg_woba) / ws * mh["PA"]).round(1)
+    lg_r = lg_woba / ws
+    mh["wRC+"] = (((mh["wOBA"] - lg_woba) / ws + lg_r) / lg_r * 100).round(0).astype(int)
+    return mh
+
+
+def ensure_pitcher_saber(mp: pd.DataFrame) -> pd.DataFrame:
+    """FIP/K%/BB%/K-BB%/K9/BB9/HR9列がなければ計算して追加"""
+    if "FIP" in mp.columns:
+        return mp
+    if not all(c in mp.columns for c in ["BB", "HBP", "HRA", "BF"]):
+        return mp
+    mp = mp.copy()  # 共有データは書き換えない
+    ip_safe = mp["IP"].replace(0, np.nan)
+    bf_safe = mp["BF"].replace(0, np.nan)
+    mp["K_pct"] = (mp["SO"] / bf_safe * 100).round(1)
+    mp["BB_pct"] = (mp["BB"] / bf_safe * 100).round(1)
+    mp["K_BB_pct"] = (mp["K_pct"] - mp["BB_pct"]).round(1)
+    mp["K9"] = (mp["SO"] * 9 / ip_safe).round(2)
+    mp["BB9"] = (mp["BB"] * 9 / ip_safe).round(2)
+    mp["HR9"] = (mp["HRA"] * 9 / ip_safe).round(2)
+    lg_ip = mp["IP"].sum()
+    if lg_ip > 0:
+        lg_era = (mp["ERA"] * mp["IP"]).sum() / lg_ip
+        fip_c = lg_era - (13 * mp["HRA"].sum() + 3 * (mp["BB"].sum() + mp["HBP"].sum()) - 2 * mp["SO"].sum()) / lg_ip
+        mp["FIP"] = ((13 * mp["HRA"] + 3 * (mp["BB"] + mp["HBP"]) - 2 * mp["SO"]) / mp["IP"] + fip_c).round(2)
+    return mp
+
+
+# --- ロースター ---
+
+
+def is_foreign_player(name: str) -> bool:
+    """カタカナ文字が名前の半分超 → 外国人選手と判定"""
+    cleaned = name.replace("\u3000", "").replace(" ", "")
+    if not cleaned:
+        return False
+    katakana = sum(1 for c in cleaned if "\u30A0" <= c <= "\u30FF")
+    return katakana / len(cleaned) > 0.5
+
+
+def get_missing_players(data: dict) -> dict:
+    """ロースター登録済みだがMarcel予測対象外の選手をチーム別に返す。
+    返り値: {team: [{"name": str, "kind": "foreign"|"rookie"}, ...]}
+    """
+    from roster_current import ROSTER_CURRENT
+
+    mh = data["marcel_hitters"]
+    mp = data["marcel_pitchers"]
+    if mh.empty or mp.empty:
+        return {}
+    calculated = (
+        set(mh["player"].apply(fuzzy_key))
+        | set(mp["player"].apply(fuzzy_key))
+    )
+
+    result = {}
+    for team, players in ROSTER_CURRENT.items():
+        missing = []
+        for p in players:
+            if fuzzy_key(p) not in calculated:
+                kind = "foreign" if is_foreign_player(p) else "rookie"
+                display = p.replace("\u3000", " ").strip()
+                missing.append({"name": display, "kind": kind})
+        result[team] = missing
+    return result
+
+
+# --- 順位予測 ---
+
+
+def pythagorean_wpct(rs, ra, k: float = 1.72) -> np.ndarray:
+    """ピタゴラス勝率（配列で一括計算。RA=0 のチームは 1.0）"""
+    rs = np.asarray(rs, dtype=float)
+    ra = np.asarray(ra, dtype=float)
+    rs_k, ra_k = rs**k, ra**k
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(ra == 0, 1.0, rs_k / (rs_k + ra_k))
+
+
+def build_2026_standings(data: dict, park_factors: dict[str, float],
+                         missing_all: dict | None = None) -> pd.DataFrame:
+    """2026年の予測順位表。
+
+    RS推定: wOBA = a×OBP + b×SLG の回帰 → wRAA → リーグ平均+wRAA合計
+    RA推定: (ERA - lgERA) × IP/9 → リーグ平均+超過失点合計
+    両方を歴史的リーグ平均にスケーリングして絶対水準を揃える。
+    park_factors はチーム → PF_5yr（最新年）。
+    """
+    mh = data["marcel_hitters"]
+    mp = data["marcel_pitchers"]
+    saber = data["sabermetrics"]
+    pyth = data["pythagorean"]
+    if mh.empty or mp.empty or saber.empty or pyth.empty:
+        return pd.DataFrame()
+
+    # 歴史的リーグ平均得点・失点（1チームあたり）
+    recent_p = pyth[pyth["year"] >= 2022]
+    lg_avg_rs = recent_p.groupby("year")["RS"].mean().mean()
+    lg_avg_ra = recent_p.groupby("year")["RA"].mean().mean()
+
+    # Marcel投手全体の加重平均ERA（リーグ基準ERA）
+    lg_era = (mp["ERA"] * mp["IP"]).sum() / mp["IP"].sum() if mp["IP"].sum() > 0 else 3.5
+
+    # --- lg_woba ---
+    recent_s = saber[saber["year"] >= 2022]
+    if not recent_s.empty and "wOBA" in saber.columns:
+        lg_woba = recent_s[recent_s["PA"] >= 50]["wOBA"].mean()
+    else:
+        lg_woba = 0.310
+
+    # --- 選手ごとのwOBA・wRAA推定 ---
+    mh = mh.copy()
+    if "wOBA" in mh.columns and "wRAA" in mh.columns:
+        mh["wOBA_est"] = mh["wOBA"]
+        mh["wRAA_est"] = mh["wRAA"]
+    else:
+        # フォールバック: 回帰係数を計算
+        df_fit = saber[saber["PA"] >= 100].dropna(subset=["wOBA", "OBP", "SLG"])
+        X = np.column_stack([df_fit["OBP"].values, df_fit["SLG"].values, np.ones(len(df_fit))])
+        coeffs, _, _, _ = np.linalg.lstsq(X, df_fit["wOBA"].values, rcond=None)
+        a_obp, b_slg, intercept_w = coeffs
+        woba_scale = 1.15
+        mh["wOBA_est"] = a_obp * mh["OBP"] + b_slg * mh["SLG"] + intercept_w
+        mh["wRAA_est"] = (mh["wOBA_est"] - lg_woba) / woba_scale * mh["PA"]
+
+    mp = mp.copy()
+    mp["era_above_avg"] = mp["ERA"] - lg_era  # 正=平均より悪い（失点多い）
+
+    # --- チームごとにRS/RA算出 ---
+    # ※ ロースター登録済みだがMarcel対象外の選手（新人・新外国人等）は
+    #    wRAA=0（リーグ平均貢献）として扱う。
+    if missing_all is None:
+        missing_all = get_missing_players(data)
+    teams = pd.Index(TEAMS)
+    wraa = mh.groupby("team")["wRAA_est"].sum().reindex(teams, fill_value=0.0).to_numpy()
+    era_runs = (
+        (mp["era_above_avg"] * mp["IP"] / 9.0).groupby(mp["team"]).sum()
+        .reindex(teams, fill_value=0.0).to_numpy()
+    )
+    # パークファクター補正: RS/RA を (PF + 1) / 2 で割る（PF が無い・0以下のチームは補正しない）
+    pf = np.asarray(teams.map(park_factors), dtype=float)
+    pf_factor = np.where(pf > 0, (pf + 1.0) / 2.0, 1.0)
+
+    df = pd.DataFrame({
+        "league": np.where(teams.isin(CENTRAL_TEAMS), "CL", "PL"),
+        "team": TEAMS,
+        "rs_raw": (lg_avg_rs + wraa) / pf_factor,
+        "ra_raw": (lg_avg_ra + era_runs) / pf_factor,
+        "missing_count": [len(missing_all.get(team, [])) for team in TEAMS],
+    })
+
+    # スケーリング: 全12チーム平均をリーグ平均RS/RAに合わせる（選択バイアス除去）
+    rs_scale = lg_avg_rs / df["rs_raw"].mean()
+    ra_scale = lg_avg_ra / df["ra_raw"].mean()
+    df["pred_RS"] = df["rs_raw"] * rs_scale
+    df["pred_RA"] = df["ra_raw"] * ra_scale
+
+    df["pred_WPCT"] = pythagorean_wpct(df["pred_RS"], df["pred_RA"], k=1.72)
+    df["pred_W"] = df["pred_WPCT"] * 143
+    df["pred_L"] = 143 - df["pred_W"]
+
+    return df[["league", "team", "pred_RS", "pred_RA", "pred_WPCT",
+               "pred_W", "pred_L", "missing_count"]]
+
+
+# --- ランキング ---
+
+# 並べ替えの選択肢: (翻訳キー, 列名)。列が無い場合は選択肢から外す
+HITTER_SORT_OPTIONS = [
+    ("sort_ops", "OPS"), ("sort_avg", "AVG"), ("sort_hr", "HR"), ("sort_rbi", "RBI"),
+    ("sort_woba", "wOBA"), ("sort_wrcplus", "wRC+"), ("sort_bayes_ops", "bayes_OPS"),
+]
+PITCHER_SORT_OPTIONS = [
+    ("sort_era", "ERA"), ("sort_whip", "WHIP"), ("sort_so", "SO"), ("sort_w", "W"),
+    ("sort_fip", "FIP"), ("sort_k_pct", "K_pct"), ("sort_bb_pct", "BB_pct"),
+    ("sort_k_bb_pct", "K_BB_pct"), ("sort_k9", "K9"), ("sort_bb9", "BB9"), ("sort_hr9", "HR9"),
+    ("sort_bayes_era", "bayes_ERA"),
+]
+# 値の書式（display_format の書式指定）
+HITTER_RANK_FORMATS = {"OPS": ".3f", "AVG": ".3f", "HR": ".0f", "RBI": ".0f", "wOBA": ".3f",
+                       "wRC+": ".0f", "bayes_OPS": ".3f"}
+PITCHER_RANK_FORMATS = {"ERA": ".2f", "WHIP": ".2f", "SO": ".0f", "W": ".0f",
+                        "FIP": ".2f", "K_pct": ".1f", "BB_pct": ".1f", "K_BB_pct": ".1f",
+                        "K9": ".2f", "BB9": ".2f", "HR9": ".2f", "bayes_ERA": ".2f"}
+# 小さいほど良い投手指標（昇順に並べる）
+PITCHER_ASCENDING = ("ERA", "WHIP", "FIP", "BB_pct", "BB9", "HR9", "bayes_ERA")
+
+
+def sort_options(df: pd.DataFrame, options: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    """df に列がある並べ替えの選択肢だけを返す"""
+    return [(key, col) for key, col in options if col in df.columns]
+
+
+def hitter_ranking(mh: pd.DataFrame, sort_by: str, top_n: int) -> pd.DataFrame:
+    """打者ランキング（200打席以上、sort_by の降順で上位 top_n 人）"""
+    return mh[mh["PA"] >= 200].sort_values(sort_by, ascending=False).head(top_n).reset_index(drop=True)
+
+
+def pitcher_ranking(mp: pd.DataFrame, sort_by: str, top_n: int, relievers: bool = False) -> pd.DataFrame:
+    """投手ランキング（先発: 100投球回以上 / relievers=True: 20〜99投球回）"""
+    if relievers:
+        qualified = mp[(mp["IP"] >= 20) & (mp["IP"] < 100)]
+    else:
+        qualified = mp[mp["IP"] >= 100]
+    return (qualified.sort_values(sort_by, ascending=sort_by in PITCHER_ASCENDING)
+            .head(top_n).reset_index(drop=True))
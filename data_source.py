@@ -0,0 +1,210 @@
+"""
+ダッシュボード用データソース（ローカル優先 + リモートミラー + ディスクキャッシュ）
+
+リポジトリ相対パス（"data/projections/marcel_hitters_2026.csv" 等）を
+次の順に探して DataFrame として返す:
+
+  1. ローカルの data/ ディレクトリ（NPB_DATA_DIR で変更可）
+  2. リモートミラー（NPB_DATA_MIRROR、既定は GitHub raw。空文字で無効）
+     - 取得したファイルはディスクキャッシュに保存し、ETag / Last-Modified による
+       条件付きリクエストで再検証する（304 ならキャッシュをそのまま使う）
+     - ネットワークに出られない場合は最後に取得したキャッシュを使う
+
+ローカルのCSVは table_store.load_table で読む（CSVの隣の型付き Parquet が新しければそちらを使う）。
+リモートから取得したCSVはバージョン（ETag 等）ごとに Parquet に変換してディスクキャッシュに置き、
+2回目以降は Parquet から読む（pyarrow 必須、無い環境では毎回CSVを読む）。どちらも数値列の変換は
+table_store.typed と同じ。
+
+環境変数:
+  NPB_DATA_DIR            ローカルデータのルート（既定: リポジトリ直下）
+  NPB_DATA_MIRROR         リモートミラーのベースURL（空文字でリモート無効）
+  NPB_DATA_CACHE_DIR      ディスクキャッシュの場所（既定: ~/.cache/npb-prediction）
+  NPB_DATA_REVALIDATE_SEC リモートの再検証間隔（秒、既定 3600）
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from config import DEFAULT_CACHE_DIR
+from table_store import HAS_PYARROW, load_table, typed
+
+DEFAULT_MIRROR = "https://raw.githubusercontent.com/yasumorishima/npb-prediction/main/"
+
+logger = logging.getLogger(__name__)
+
+
+class LocalDirSource:
+    """ローカルディレクトリからファイルを探すソース"""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def locate(self, path: str) -> tuple[Path, str] | None:
+        """(ファイルパス, バージョン文字列) を返す。無ければ None"""
+        p = self.root / path
+        try:
+            st = p.stat()
+        except OSError:
+            return None
+        return p, f"local:{st.st_mtime_ns}:{st.st_size}"
+
+
+class HTTPMirrorSource:
+    """HTTPミラーから取得してディスクにキャッシュするソース。
+
+    キャッシュ済みファイルは revalidate_after 秒以内なら通信せずに使い、
+    それ以降は If-None-Match / If-Modified-Since 付きで再検証する。
+    """
+
+    def __init__(self, base_url: str, cache_dir: str | Path,
+                 revalidate_after: float = 3600, timeout: float = 10):
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        self.cache_dir = Path(cache_dir) / "mirror"
+        self.revalidate_after = revalidate_after
+        self.timeout = timeout
+
+    def _paths(self, path: str) -> tuple[Path, Path]:
+        key = hashlib.sha1((self.base_url + path).encode("utf-8")).hexdigest()[:16]
+        name = f"{key}-{Path(path).name}"
+        return self.cache_dir / name, self.cache_dir / (name + ".meta.json")
+
+    def locate(self, path: str) -> tuple[Path, str] | None:
+        body_path, meta_path = self._paths(path)
+        meta = {}
+        if body_path.exists() and meta_path.exists():
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                meta = {}
+        if meta and time.time() - meta.get("checked_at", 0) < self.revalidate_after:
+            return body_path, meta["version"]
+
+        try:
+            import requests
+
+            headers = {}
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+            resp = requests.get(self.base_url + path, headers=headers, timeout=self.timeout)
+        except Exception:
+            # オフライン: 古くてもキャッシュがあれば使う
+            return (body_path, meta["version"]) if meta else None
+
+        if resp.status_code == 304 and meta:
+            meta["checked_at"] = time.time()
+            self._write_meta(meta_path, meta)
+            return body_path, meta["version"]
+        if resp.status_code != 200:
+            return (body_path, meta["version"]) if meta else None
+
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        version = "remote:" + (etag or last_modified or hashlib.sha1(resp.content).hexdigest())
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = body_path.with_suffix(body_path.suffix + ".tmp")
+            tmp.write_bytes(resp.content)
+            tmp.replace(body_path)
+        except OSError:
+            return None
+        self._write_meta(meta_path, {
+            "url": self.base_url + path,
+            "etag": etag,
+            "last_modified": last_modified,
+            "version": version,
+            "checked_at": time.time(),
+        })
+        return body_path, version
+
+    @staticmethod
+    def _write_meta(meta_path: Path, meta: dict) -> None:
+        try:
+            meta_path.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        except OSError:
+            pass
+
+
+class DataSource:
+    """ソースを順に試して最初に見つかったファイルを DataFrame で返す"""
+
+    def __init__(self, sources: list, cache_dir: str | Path | None = None):
+        self.sources = sources
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
+    def locate(self, path: str) -> tuple[Path, str] | None:
+        for source in self.sources:
+            found = source.locate(path)
+            if found is not None:
+                return found
+        return None
+
+    def _parquet_path(self, path: str, version: str) -> Path | None:
+        if self.cache_dir is None or not HAS_PYARROW:
+            return None
+        path_key = hashlib.sha1(path.encode("utf-8")).hexdigest()[:8]
+        version_key = hashlib.sha1(version.encode("utf-8")).hexdigest()[:12]
+        return self.cache_dir / "parquet" / f"{Path(path).stem}-{path_key}-{version_key}.parquet"
+
+    def read_csv(self, path: str) -> pd.DataFrame:
+        """CSV（UTF-8 BOM付き）を読む。どのソースにも無い・読めない場合は空の DataFrame
+
+        見つかったファイルが読めなければ（壊れたローカルファイル等）警告を出して次のソースを試す。
+        """
+        for source in self.sources:
+            found = source.locate(path)
+            if found is None:
+                continue
+            try:
+                return self._read(path, *found)
+            except Exception as e:
+                logger.warning("%s を読めませんでした（%s）: %s", path, found[1], e)
+        return pd.DataFrame()
+
+    def _read(self, path: str, file_path: Path, version: str) -> pd.DataFrame:
+        """見つかったファイルを読む（読めなければ例外）"""
+        if version.startswith("local:"):
+            return load_table(file_path)
+
+        parquet = self._parquet_path(path, version)
+        if parquet is not None and parquet.exists():
+            try:
+                return pd.read_parquet(parquet)
+            except Exception:
+                pass
+
+        df = typed(pd.read_csv(file_path, encoding="utf-8-sig"), Path(path).name)
+
+        if parquet is not None:
+            try:
+                parquet.parent.mkdir(parents=True, exist_ok=True)
+                # 同じファイルの古いバージョンを掃除してから書く
+                prefix = parquet.name.rsplit("-", 1)[0]
+                for old in parquet.parent.glob(f"{prefix}-*.parquet"):
+                    old.unlink(missing_ok=True)
+                tmp = parquet.with_suffix(".tmp")
+                df.to_parquet(tmp, index=False)
+                tmp.replace(parquet)
+            except Exception:
+                pass
+        return df
+
+
+def default_source() -> DataSource:
+    """環境変数から ローカル → リモートミラー の DataSource を作る"""
+    local_dir = os.environ.get("NPB_DATA_DIR", str(Path(__file__).parent))
+    mirror = os.environ.get("NPB_DATA_MIRROR", DEFAULT_MIRROR)
+    cache_dir = os.environ.get("NPB_DATA_CACHE_DIR", str(DEFAULT_CACHE_DIR))
+    revalidate = float(os.environ.get("NPB_DATA_REVALIDATE_SEC", 3600))
+
+    sources: list = [LocalDirSource(local_dir)]
+    if mirror:
+        sources.append(HTTPMirrorSource(mirror, cache_dir, revalidate_after=revalidate))
+    return DataSource(sources, cache_dir=cache_dir)
@@ -0,0 +1,110 @@
+"""
+Streamlit表示用の列単位フォーマッタ
+
+DataFrame の数値列を表示用文字列に変換する処理と、ランキングカードのHTML生成を
+まとめたもの。行ごとの .apply(lambda) や iterrows（1行ごとに Series を作る）を
+使わず、列を一度だけ Python の float リストに取り出して書式化する。
+
+numpy の文字列関数（np.char.mod / 整数演算での組み立て）も試したが、
+数百行の表では tolist() + % 書式より遅く、丸めも f-string と一致しなかったため採用していない。
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _floats(col) -> list[float]:
+    return np.asarray(col, dtype=float).tolist()
+
+
+def fixed(col, decimals: int, suffix: str = "") -> list[str]:
+    """f"{x:.{decimals}f}{suffix}" と同じ文字列のリスト"""
+    pattern = f"%.{decimals}f" + suffix.replace("%", "%%")
+    return [pattern % v for v in _floats(col)]
+
+
+def signed(col, decimals: int) -> list[str]:
+    """f"{x:+.{decimals}f}" と同じ文字列のリスト"""
+    pattern = f"%+.{decimals}f"
+    return [pattern % v for v in _floats(col)]
+
+
+def percent(col, decimals: int = 1) -> list[str]:
+    """0.283 → "28.3%\""""
+    return fixed(np.asarray(col, dtype=float) * 100, decimals, "%")
+
+
+def batting_rate(col) -> list[str]:
+    """打率表記: 0.2876 → ".287"（小数第4位以下は切り捨て）"""
+    thousandths = np.trunc(np.asarray(col, dtype=float) * 1000).astype(np.int64)
+    return ["." + "%03d" % v for v in thousandths.tolist()]
+
+
+def data_years_notes(col) -> np.ndarray:
+    """data_years（NPBデータ年数）→ 表の注記"""
+    years = np.asarray(col, dtype=float).astype(np.int64)
+    return np.select([years == 1, years == 2], ["⚠️直近1年のみ", "📊直近2年のみ"], "")
+
+
+def _formatter(spec: str):
+    if spec == "avg":
+        return batting_rate
+    if spec == "pct":
+        return percent
+    if spec.startswith("+."):
+        return lambda col: signed(col, int(spec[2:-1]))
+    if spec.startswith("."):
+        return lambda col: fixed(col, int(spec[1:-1]))
+    raise ValueError(f"unknown format spec: {spec}")
+
+
+def format_table(df: pd.DataFrame, formats: dict[str, str]) -> pd.DataFrame:
+    """formats（列名 → ".3f" / ".0f" / "+.1f" / "pct" / "avg"）に従って列を文字列化したコピーを返す。
+
+    formats に無い列はそのまま残す。
+    """
+    out = df.copy()
+    for col, spec in formats.items():
+        if col in out.columns:
+            out[col] = _formatter(spec)(out[col])
+    return out
+
+
+# --- ランキングカード ---
+
+_RANK_MEDAL = {1: "👑", 2: "🥈", 3: "🥉"}
+_RANK_BORDER = {1: "#ffd700", 2: "#c0c0c0", 3: "#cd7f32"}
+
+
+def leaderboard_cards_html(df: pd.DataFrame, stat_key: str, fmt: str,
+                           badges: dict[int, str] | None = None) -> str:
+    """ランキング表（順位順に並んだ df）からカードHTMLをまとめて生成する。
+
+    fmt は値の書式（".3f" 等）、badges は data_years → バッジHTML（1年・2年のみのデータ）。
+    """
+    n = len(df)
+    if n == 0:
+        return ""
+    badges = badges or {}
+    values = _formatter(fmt)(df[stat_key])
+    if "data_years" in df.columns:
+        years = np.asarray(df["data_years"], dtype=float).astype(np.int64).tolist()
+    else:
+        years = [3] * n
+    players = df["player"].tolist()
+    teams = df["team"].tolist()
+
+    cards = []
+    for rank, player, team, value, dy in zip(range(1, n + 1), players, teams, values, years):
+        cards.append(f"""
+    <div style="overflow-x:auto;-webkit-overflow-scrolling:touch;">
+      <div style="display:flex;align-items:center;gap:8px;padding:8px 12px;margin:4px 0;
+                  background:#0d0d24;border:1px solid {_RANK_BORDER.get(rank, "#333")}88;border-radius:8px;
+                  font-family:'Segoe UI',sans-serif;min-width:max-content;">
+        <span style="min-width:24px;font-size:16px;text-align:center;">{_RANK_MEDAL.get(rank) or rank}</span>
+        <span style="flex:1;color:#e0e0e0;font-weight:bold;white-space:nowrap;">{player}{badges.get(dy, "")}</span>
+        <span style="color:#888;font-size:12px;white-space:nowrap;">{team}</span>
+        <span style="min-width:50px;text-align:right;color:#00e5ff;font-size:16px;font-weight:bold;">{value}</span>
+      </div>
+    </div>""")
+    return "".join(cards)
@@ -0,0 +1,432 @@
+"""
+スクレイパー共通の並行取得エンジン
+
+fetch_npb_data / fetch_npb_detailed / fetch_npb_games / fetch_rosters はこれまで
+1ページずつ取得して time.sleep(0.5〜1.5) を挟んでいた。このモジュールは
+URLの一覧をまとめて受け取り、
+
+  - ホストごとのトークンバケットでリクエスト間隔を守る（既定は従来の sleep 間隔相当）
+  - ホストをまたいでは並行に取得する（npb.jp と baseball-data.com を同時に進める）
+  - ホストごとの requests.Session でコネクションを使い回す
+  - 通信エラー・429/5xx は指数バックオフ（+ ゆらぎ、Retry-After があれば従う）で再試行する
+  - 進捗（n/全件）とホスト別の件数・時間・レイテンシを表示する
+  - http_cache.HTTPCache があれば、終了したシーズンのページは通信せずキャッシュから返し、
+    それ以外は条件付きリクエスト（304 ならキャッシュの本文）で取得する
+
+ところまでを受け持つ。ページの解釈（read_html 等）は各スクリプト側で行う。
+
+HTTP 通信自体は requests（各スクリプトが既に使っているもの）をスレッドで呼び、
+待ち合わせ・レート制御を asyncio で行う。新しい依存は増やしていない。
+
+ローカルのスタブサーバーに向けて動かせるよう、ホスト単位の付け替えができる:
+  NPB_FETCH_REDIRECT="baseball-data.com=http://127.0.0.1:8000,npb.jp=http://127.0.0.1:8000"
+付け替えてもレート制限・集計は元のホスト名で行う。
+
+NPB_FETCH_RECORD（ディレクトリ）を設定すると、取得した応答を fixture_archive.FixtureArchive に
+記録する（replay.py でオフライン再生する）。
+
+Usage:
+  python fetch_engine.py --stub 40       # ローカルのスタブサーバーに 40 件取得して集計を表示
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from fixture_archive import FixtureArchive
+from http_cache import HTTPCache, default_cache
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; research-bot/1.0)"}
+
+# ホストごとの (1秒あたりのリクエスト数, バースト)。従来の sleep 間隔に合わせている
+HOST_RATES = {
+    "baseball-data.com": (1.0, 1),   # 旧: 1.0〜1.5秒 sleep
+    "npb.jp": (2.0, 1),              # 旧: 0.5〜1.0秒 sleep
+}
+DEFAULT_RATE = (1.0, 1)
+
+MAX_CONCURRENCY = 8          # 全体の同時リクエスト数
+PER_HOST_CONCURRENCY = 2     # ホストごとの同時リクエスト数（コネクションプールの大きさ）
+RETRIES = 3
+BACKOFF_SEC = 1.0
+TIMEOUT_SEC = 15
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _parse_redirect(spec: str) -> dict[str, str]:
+    """"host=base,host=base" → {host: base}"""
+    mapping = {}
+    for item in spec.split(","):
+        if "=" in item:
+            host, base = item.split("=", 1)
+            mapping[host.strip()] = base.strip().rstrip("/")
+    return mapping
+
+
+def _meta_headers(meta: dict) -> dict[str, str]:
+    """HTTP キャッシュのメタ情報 → 記録用のヘッダー"""
+    return {"ETag": meta.get("etag"), "Last-Modified": meta.get("last_modified")}
+
+
+class TokenBucket:
+    """1ホスト分のトークンバケット（rate 件/秒、最大 burst 件まで貯まる）"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """トークンを1つ取る。待った秒数を返す"""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+class FetchResult:
+    """1 URL の取得結果（失敗時は status=None / error にメッセージ）
+
+    cached はキャッシュから返したとき "hit"（通信なし）/ "304"（再検証で変更なし）。
+    """
+
+    def __init__(self, url: str, status: int | None = None, content: bytes = b"",
+                 headers: dict | None = None, elapsed: float = 0.0, attempts: int = 0,
+                 error: str | None = None, cached: str | None = None):
+        self.url = url
+        self.status = status
+        self.content = content
+        self.headers = headers or {}
+        self.elapsed = elapsed
+        self.attempts = attempts
+        self.error = error
+        self.cached = cached
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.content.decode(encoding, errors="replace")
+
+    def __repr__(self) -> str:
+        return f"FetchResult({self.url!r}, status={self.status}, bytes={len(self.content)})"
+
+
+class HostStats:
+    """ホスト別の集計"""
+
+    def __init__(self):
+        self.requests = 0
+        self.cache_hits = 0
+        self.not_modified = 0
+        self.retries = 0
+        self.errors = 0
+        self.bytes = 0
+        self.wait = 0.0
+        self.latencies: list[float] = []
+        self.first = None
+        self.last = None
+
+
+class FetchEngine:
+    """URL の一覧を並行・レート制限付きで取得する。
+
+    engine = FetchEngine()
+    results = engine.run(urls)      # urls と同じ順の FetchResult のリスト
+    print(engine.report())
+
+    cache を省略すると http_cache.default_cache()（NPB_HTTP_CACHE_DIR）を使う。
+    キャッシュを使わない場合は cache=False。recorder を省略すると NPB_FETCH_RECORD が
+    設定されていればそのディレクトリに応答を記録する（記録しない場合は recorder=False）。
+    """
+
+    def __init__(self, rates: dict[str, tuple[float, int]] | None = None,
+                 max_concurrency: int = MAX_CONCURRENCY,
+                 per_host_concurrency: int = PER_HOST_CONCURRENCY,
+                 retries: int = RETRIES, backoff: float = BACKOFF_SEC,
+                 timeout: float = TIMEOUT_SEC, headers: dict | None = None,
+                 redirect: dict[str, str] | None = None, progress: bool = True,
+                 cache: HTTPCache | None | bool = None,
+                 recorder: FixtureArchive | None | bool = None):
+        self.rates = {**HOST_RATES, **(rates or {})}
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.headers = {**DEFAULT_HEADERS, **(headers or {})}
+        if redirect is None:
+            redirect = _parse_redirect(os.environ.get("NPB_FETCH_REDIRECT", ""))
+        self.redirect = redirect
+        self.progress = progress
+        if cache is None:
+            cache = default_cache()
+        self.cache = cache or None
+        if recorder is None and os.environ.get("NPB_FETCH_RECORD"):
+            recorder = FixtureArchive(os.environ["NPB_FETCH_RECORD"])
+        self.recorder = recorder or None
+        self.stats: dict[str, HostStats] = {}
+        self._sessions: dict[str, requests.Session] = {}
+        self._session_lock = threading.Lock()
+
+    # --- ホスト単位の資源 ---
+
+    def _session(self, host: str) -> requests.Session:
+        with self._session_lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.headers.update(self.headers)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.per_host_concurrency)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def _target(self, url: str) -> tuple[str, str]:
+        """(集計・レート制限に使うホスト名, 実際に取得するURL)"""
+        parts = urlsplit(url)
+        host = parts.hostname or ""
+        base = self.redirect.get(host)
+        if base is None:
+            return host, url
+        b = urlsplit(base)
+        return host, urlunsplit((b.scheme, b.netloc, b.path + parts.path, parts.query, ""))
+
+    def close(self) -> None:
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+
+    # --- 取得 ---
+
+    def _retry_delay(self, attempt: int, resp: requests.Response | None) -> float:
+        if resp is not None and resp.headers.get("Retry-After", "").isdigit():
+            return float(resp.headers["Retry-After"])
+        return self.backoff * (2 ** attempt) * (0.5 + random.random())
+
+    async def _fetch_one(self, url: str, bucket: TokenBucket, host_sem: asyncio.Semaphore,
+                         global_sem: asyncio.Semaphore) -> FetchResult:
+        host, target = self._target(url)
+        stats = self.stats.setdefault(host, HostStats())
+        session = self._session(host)
+
+        cached = self.cache.load(url) if self.cache else None
+        if cached is not None and self.cache.is_final(url):
+            stats.cache_hits += 1
+            self._record(url, 200, _meta_headers(cached[0]), cached[1], 0.0)
+            return FetchResult(url, 200, cached[1], {}, 0.0, 0, cached="hit")
+        headers = HTTPCache.conditional_headers(cached[0]) if cached else {}
+
+        error = None
+        for attempt in range(self.retries + 1):
+            async with host_sem, global_sem:
+                stats.wait += await bucket.acquire()
+                t0 = time.monotonic()
+                stats.first = stats.first or t0
+                stats.requests += 1
+                resp = None
+                try:
+                    resp = await asyncio.to_thread(session.get, target, headers=headers,
+                                                  timeout=self.timeout)
+                except requests.RequestException as e:
+                    error = f"{type(e).__name__}: {e}"
+                elapsed = time.monotonic() - t0
+                stats.latencies.append(elapsed)
+                stats.last = time.monotonic()
+
+            if resp is not None and resp.status_code == 304 and cached is not None:
+                stats.not_modified += 1
+                self.cache.touch(url, cached[0])
+                self._record(url, 200, _meta_headers(cached[0]), cached[1], elapsed)
+                return FetchResult(url, 200, cached[1], dict(resp.headers), elapsed, attempt + 1,
+                                   cached="304")
+            if resp is not None and resp.status_code not in RETRY_STATUSES:
+                stats.bytes += len(resp.content)
+                if self.cache and resp.status_code == 200:
+                    self.cache.store(url, resp.content, resp.headers)
+                self._record(url, resp.status_code, resp.headers, resp.content, elapsed)
+                return FetchResult(url, resp.status_code, resp.content, dict(resp.headers),
+                                   elapsed, attempt + 1)
+            if resp is not None:
+                error = f"HTTP {resp.status_code}"
+            if attempt < self.retries:
+                stats.retries += 1
+                await asyncio.sleep(self._retry_delay(attempt, resp))
+
+        stats.errors += 1
+        status = resp.status_code if resp is not None else None
+        return FetchResult(url, status, b"", {}, 0.0, self.retries + 1, error)
+
+    def _record(self, url: str, status: int, headers, body: bytes, elapsed: float) -> None:
+        if self.recorder is None:
+            return
+        self.recorder.record(url, status, headers, body, elapsed)
+
+    async def fetch_all(self, urls: list[str]) -> list[FetchResult]:
+        """urls をまとめて取得し、同じ順で結果を返す"""
+        global_sem = asyncio.Semaphore(self.max_concurrency)
+        buckets: dict[str, TokenBucket] = {}
+        host_sems: dict[str, asyncio.Semaphore] = {}
+        for url in urls:
+            host = self._target(url)[0]
+            if host not in buckets:
+                rate, burst = self.rates.get(host, DEFAULT_RATE)
+                buckets[host] = TokenBucket(rate, burst)
+                host_sems[host] = asyncio.Semaphore(self.per_host_concurrency)
+
+        total = len(urls)
+        done = 0
+
+        async def task(url: str) -> FetchResult:
+            nonlocal done
+            host = self._target(url)[0]
+            result = await self._fetch_one(url, buckets[host], host_sems[host], global_sem)
+            done += 1
+            if self.progress:
+                status = result.cached or (result.status if result.error is None else result.error)
+                print(f"  [{done}/{total}] {status} {url} ({result.elapsed:.2f}s)", flush=True)
+            return result
+
+        return list(await asyncio.gather(*(task(u) for u in urls)))
+
+    def run(self, urls: list[str]) -> list[FetchResult]:
+        """fetch_all の同期版（スクリプトの main から呼ぶ）"""
+        return asyncio.run(self.fetch_all(list(urls)))
+
+    def report(self) -> str:
+        """ホスト別の件数・キャッシュ・再試行・エラー・転送量・レイテンシ・実効レート"""
+        lines = [f"{'host':24s} {'req':>5s} {'hit':>5s} {'304':>5s} {'retry':>5s} {'err':>4s} {'KB':>8s} "
+                 f"{'p50':>6s} {'max':>6s} {'wait':>6s} {'req/s':>6s}"]
+        for host, s in sorted(self.stats.items()):
+            lat = sorted(s.latencies) or [0.0]
+            span = (s.last - s.first) if s.first and s.last and s.last > s.first else 0.0
+            rate = s.requests / span if span else 0.0
+            lines.append(f"{host:24s} {s.requests:5d} {s.cache_hits:5d} {s.not_modified:5d} "
+                         f"{s.retries:5d} {s.errors:4d} "
+                         f"{s.bytes / 1024:8.0f} {lat[len(lat) // 2]:6.2f} {lat[-1]:6.2f} "
+                         f"{s.wait:6.1f} {rate:6.2f}")
+        return "\n".join(lines)
+
+
+# --- ローカルスタブ（動作確認用） ---
+
+
+class StubServer:
+    """ローカルで動く HTTP スタブ。どのパスにも body を返す（latency 秒待ってから）。
+
+    error_rate の割合で error_status（既定 503、0 なら応答せずに接続を切る）を返す（再試行の確認用）。
+    ETag を付け、If-None-Match が一致すれば 304 を返す（キャッシュの確認用）。with 文で起動・停止する。
+    返す内容は respond、待ち時間は delay を上書きすると変えられる（replay.ReplayServer）。
+    """
+
+    def __init__(self, body: bytes = b"<html><table><tr><td>ok</td></tr></table></html>",
+                 latency: float = 0.05, error_rate: float = 0.0, port: int = 0,
+                 error_status: int = 503):
+        self.body = body
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hits = 0
+        self.errors = 0
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub.hits += 1
+                time.sleep(stub.delay(self.path))
+                if random.random() < stub.error_rate:
+                    stub.errors += 1
+                    if not stub.error_status:
+                        self.close_connection = True
+                        return
+                    self.send_response(stub.error_status)
+                    if stub.error_status == 429:
+                        self.send_header("Retry-After", "1")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                status, headers, body = stub.respond(self.path, self.headers)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def delay(self, path: str) -> float:
+        return self.latency
+
+    def respond(self, path: str, headers) -> tuple[int, dict[str, str], bytes]:
+        """(ステータス, ヘッダー, 本文)"""
+        if headers.get("If-None-Match") == self.etag:
+            return 304, {}, b""
+        return 200, {"ETag": self.etag, "Content-Type": "text/html; charset=utf-8"}, self.body
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="取得エンジンをローカルのスタブサーバーで動かす")
+    parser.add_argument("--stub", type=int, default=40, help="取得する件数（2ホストに半分ずつ）")
+    parser.add_argument("--latency", type=float, default=0.2, help="スタブの応答時間（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="スタブが 503 を返す割合")
+    parser.add_argument("--rate", type=float, default=5.0, help="ホストごとの req/s")
+    args = parser.parse_args()
+
+    with StubServer(latency=args.latency, error_rate=args.error_rate) as stub:
+        hosts = ["baseball-data.com", "npb.jp"]
+        urls = [f"https://{hosts[i % 2]}/page/{i}.html" for i in range(args.stub)]
+        engine = FetchEngine(rates={h: (args.rate, 1) for h in hosts}, backoff=0.1,
+                             redirect={h: stub.url for h in hosts}, progress=False, cache=False)
+        t0 = time.perf_counter()
+        results = engine.run(urls)
+        wall = time.perf_counter() - t0
+        engine.close()
+
+    ok = sum(r.ok for r in results)
+    serial = args.stub * (args.latency + 1 / args.rate)
+    print(engine.report())
+    print(f"\n{ok}/{len(results)} ok  stub hits={stub.hits}  wall {wall:.1f}s "
+          f"(1件ずつ sleep する場合の目安 {serial:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,30 @@
 """
 NPB成績データ取得スクリプト
 データソース: プロ野球データFreak (baseball-data.com)
-pandas.read_html() でテーブルを直接取得
+fetch_engine.FetchEngine で全年度のページをまとめて取得し、html_tables で成績テーブルを読む
+
+取得結果は raw_store の年度別パーティションに upsert し（変わった年度だけ書き換え）、
+従来の npb_*_2015_{DATA_END_YEAR}.csv もストアから書き出す。
+
+  python fetch_npb_data.py               # 全年度
+  python fetch_npb_data.py --since 2025  # 2025年以降だけ取得して更新（シーズン中の更新用）
 
 取得データ:
 - 打者成績 (2015-2025): 打率,試合,打席,打数,安打,HR,打点,盗塁,四球,死球,三振,犠打,併殺,出塁率,長打率,OPS,RC27,XR27
 - 投手成績 (2015-2025): 防御率,試合,勝,敗,S,H,勝率,打者,投球回,被安打,被HR,四球,死球,奪三振,失点,自責,WHIP,DIPS
+  （投球回は表記どおりの IP に加えて、アウト数の整数 IP_outs も保存する）
 """
 
-import pandas as pd
-import time
+import argparse
 from pathlib import Path
-from config import DATA_END_YEAR, YEARS
+
+import pandas as pd
+
+from config import YEARS
+from fetch_engine import FetchEngine
+from html_tables import header_count, largest_table, table_frame, table_rows
+from raw_store import save_raw
+from table_store import ip_outs
 
 DATA_DIR = Path(__file__).parent / "data" / "raw"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -44,16 +57,6 @@ def build_url(year: int, stat_type: str) -> str:
     return f"{BASE_URL}/{yy}/{path}"
 
 
-def clean_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """MultiIndexカラムをフラット化し、空白を除去"""
-    if isinstance(df.columns, pd.MultiIndex):
-        # MultiIndexの場合、最初のレベルを使う
-        df.columns = [col[0] for col in df.columns]
-    # カラム名から全角・半角スペースを除去
-    df.columns = [str(c).replace(" ", "").replace("　", "") for c in df.columns]
-    return df
-
-
 # カラム名の正規化マッピング（打者）
 HITTER_COLS = {
     "順位": "rank", "選手名": "player", "チーム": "team",
@@ -75,30 +78,28 @@ PITCHER_COLS = {
 }
 
 
-def fetch_stats(year: int, stat_type: str) -> pd.DataFrame | None:
-    """指定年度の成績テーブルを取得"""
-    url = build_url(year, stat_type)
-    print(f"  Fetching: {url}")
-
+def parse_stats(content: bytes, year: int, stat_type: str) -> pd.DataFrame | None:
+    """取得したページ（HTMLのバイト列）から成績テーブルを読む"""
     try:
-        tables = pd.read_html(url, encoding="utf-8")
+        # 最大行数のテーブルを選択
+        table = largest_table(content)
     except Exception as e:
         print(f"  ERROR: {e}")
         return None
 
-    if not tables:
+    if table is None:
         print(f"  No tables found")
         return None
 
-    # 最大行数のテーブルを選択
-    df = max(tables, key=len)
-
-    # カラム整形
-    df = clean_columns(df)
-
-    # 英語カラム名に変換
+    # 見出しが複数行なら最初の行を使い、全角・半角スペースを除去して英語カラム名に変換
+    rows = table_rows(table)
+    n_header = max(header_count(table), 1)
+    if len(rows) <= n_header:
+        print("  No rows found")
+        return None
     col_map = HITTER_COLS if stat_type == "hitter" else PITCHER_COLS
-    df = df.rename(columns=col_map)
+    columns = [col_map.get(c, c) for c in (h.replace(" ", "").replace("　", "") for h in rows[0])]
+    df = table_frame(rows[n_header:], columns)
 
     # rank列削除
     if "rank" in df.columns:
@@ -112,19 +113,36 @@ def fetch_stats(year: int, stat_type: str) -> pd.DataFrame | None:
         df = df.dropna(subset=["player"])
         df = df[df["player"].astype(str).str.match(r"^(?!\d+$).+")]
 
-    print(f"  -> {len(df)} rows")
+    # 投球回（123.1 = 123回1/3）はアウト数の整数でも持つ（後段は文字列を解析し直さない）
+    if "IP" in df.columns:
+        df = df.assign(IP_outs=ip_outs(df["IP"]))
+
     return df
 
 
-def fetch_all(stat_type: str) -> pd.DataFrame:
-    """全年度のデータを結合"""
+def fetch_stats(year: int, stat_type: str, engine: FetchEngine | None = None) -> pd.DataFrame | None:
+    """指定年度の成績テーブルを取得"""
+    df = fetch_all(stat_type, [year], engine)
+    return df if len(df) > 0 else None
+
+
+def fetch_all(stat_type: str, years: list[int] | None = None,
+              engine: FetchEngine | None = None) -> pd.DataFrame:
+    """全年度のデータを結合（ページの取得は engine でまとめて行う）"""
+    years = list(years or YEARS)
+    engine = engine or FetchEngine()
+    results = engine.run([build_url(year, stat_type) for year in years])
+
     all_dfs = []
-    for year in YEARS:
-        print(f"[{year}] {stat_type}")
-        df = fetch_stats(year, stat_type)
+    for year, result in zip(years, results):
+        print(f"[{year}] {stat_type}: {result.url}")
+        if not result.ok:
+            print(f"  ERROR: {result.error or f'HTTP {result.status}'}")
+            continue
+        df = parse_stats(result.content, year, stat_type)
         if df is not None and len(df) > 0:
+            print(f"  -> {len(df)} rows")
             all_dfs.append(df)
-        time.sleep(1)  # 礼儀正しく
 
     if not all_dfs:
         print(f"No data fetched for {stat_type}")
@@ -139,23 +157,26 @@ def main():
     print("NPB成績データ取得 (baseball-data.com)")
     print("=" * 60)
 
+    parser = argparse.ArgumentParser(description="baseball-data.com から打者・投手成績を取得")
+    parser.add_argument("--since", type=int, default=YEARS[0], help="この年度以降だけ取得する")
+    args = parser.parse_args()
+    years = [y for y in YEARS if y >= args.since]
+
+    engine = FetchEngine()
+
     # 打者成績
     print("\n--- 打者成績 ---")
-    df_hitters = fetch_all("hitter")
+    df_hitters = fetch_all("hitter", years, engine=engine)
     if len(df_hitters) > 0:
-        out_path = DATA_DIR / f"npb_hitters_2015_{DATA_END_YEAR}.csv"
-        df_hitters.to_csv(out_path, index=False, encoding="utf-8-sig")
-        print(f"\nSaved: {out_path} ({len(df_hitters)} rows)")
+        save_raw("hitters", df_hitters)
         print(f"Columns: {list(df_hitters.columns)}")
         print(f"Years: {sorted(df_hitters['year'].unique())}")
 
     # 投手成績
     print("\n--- 投手成績 ---")
-    df_pitchers = fetch_all("pitcher")
+    df_pitchers = fetch_all("pitcher", years, engine=engine)
     if len(df_pitchers) > 0:
-        out_path = DATA_DIR / f"npb_pitchers_2015_{DATA_END_YEAR}.csv"
-        df_pitchers.to_csv(out_path, index=False, encoding="utf-8-sig")
-        print(f"\nSaved: {out_path} ({len(df_pitchers)} rows)")
+        save_raw("pitchers", df_pitchers)
         print(f"Columns: {list(df_pitchers.columns)}")
         print(f"Years: {sorted(df_pitchers['year'].unique())}")
 
@@ -166,6 +187,7 @@ def main():
         print(f"  Hitters: {len(df_hitters)} rows, {df_hitters['year'].nunique()} years")
     if len(df_pitchers) > 0:
         print(f"  Pitchers: {len(df_pitchers)} rows, {df_pitchers['year'].nunique()} years")
+    print(engine.report())
 
 
 if __name__ == "__main__":
@@ -3,15 +3,23 @@ NPB公式サイトから詳細打撃成績を取得
 データソース: npb.jp/bis/{year}/stats/
 
 baseball-data.comにはない二塁打(2B)・三塁打(3B)・犠飛(SF)を取得し、
-wOBA/wRC+算出に使う。
+wOBA/wRC+算出に使う。ページは fetch_engine.FetchEngine で全年度×12球団をまとめて取得する。
+
+取得結果は raw_store の年度別パーティションに upsert し、従来の
+npb_batting_detailed_2015_{DATA_END_YEAR}.csv もストアから書き出す（--since で対象年度を絞れる）。
 
 取得カラム: G,PA,AB,R,H,2B,3B,HR,TB,RBI,SB,CS,SH,SF,BB,IBB,HBP,SO,GDP,AVG,SLG,OBP
 """
 
-import pandas as pd
-import time
+import argparse
 from pathlib import Path
+
+import pandas as pd
+
 from config import DATA_END_YEAR, YEARS
+from fetch_engine import FetchEngine
+from html_tables import find_tables, table_frame, table_rows
+from raw_store import save_raw
 
 DATA_DIR = Path(__file__).parent / "data" / "raw"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -43,15 +51,17 @@ COL_NAMES = [
 ]
 
 
-def fetch_team_batting(year: int, team_name: str, team_code: str) -> pd.DataFrame | None:
-    """1チーム・1年度の打撃成績を取得"""
+def team_batting_url(year: int, team_name: str, team_code: str) -> str:
     # オリックスの年度別コード対応
     if team_name == "オリックス":
         team_code = ORIX_CODE_BY_YEAR.get(year, team_code)
-    url = f"https://npb.jp/bis/{year}/stats/idb1_{team_code}.html"
+    return f"https://npb.jp/bis/{year}/stats/idb1_{team_code}.html"
+
 
+def parse_team_batting(content: bytes, year: int, team_name: str) -> pd.DataFrame | None:
+    """1チーム・1年度の打撃成績ページ（HTMLのバイト列）を読む"""
     try:
-        tables = pd.read_html(url, encoding="utf-8")
+        tables = find_tables(content)
     except Exception as e:
         print(f"  ERROR {team_name} {year}: {e}")
         return None
@@ -59,29 +69,30 @@ def fetch_team_batting(year: int, team_name: str, team_code: str) -> pd.DataFram
     if not tables:
         return None
 
-    df = tables[0]
-
     # ヘッダー行（row 0=注釈, row 1=カラム名）を除去してデータ行のみ
-    if len(df) < 3:
+    rows = table_rows(tables[0])
+    if len(rows) < 3:
         return None
 
-    df = df.iloc[2:].reset_index(drop=True)
-
     # カラム名を設定（2025年はflag列なしの23カラム）
-    if len(df.columns) == len(COL_NAMES):
-        df.columns = COL_NAMES
-        df = df.drop(columns=["flag"])
-    elif len(df.columns) == len(COL_NAMES_2025):
-        df.columns = COL_NAMES_2025
+    width = max(len(r) for r in rows)
+    if width == len(COL_NAMES):
+        columns = COL_NAMES
+    elif width == len(COL_NAMES_2025):
+        columns = COL_NAMES_2025
     else:
-        print(f"  WARNING {team_name} {year}: expected {len(COL_NAMES)} or {len(COL_NAMES_2025)} cols, got {len(df.columns)}")
+        print(f"  WARNING {team_name} {year}: expected {len(COL_NAMES)} or {len(COL_NAMES_2025)} cols, got {width}")
         return None
 
+    df = table_frame(rows[2:], columns)
+    if "flag" in df.columns:
+        df = df.drop(columns=["flag"])
+
     # 選手名クリーニング（全角スペース→半角）
     df["player"] = df["player"].astype(str).str.replace("　", " ").str.strip()
 
-    # 数値カラムに変換
-    num_cols = [c for c in df.columns if c not in ("player",)]
+    # 数値カラムに変換（数値以外が混ざって文字列になった列だけ）
+    num_cols = [c for c in df.columns if c != "player" and not pd.api.types.is_numeric_dtype(df[c])]
     for col in num_cols:
         df[col] = pd.to_numeric(df[col], errors="coerce")
 
@@ -95,18 +106,33 @@ def fetch_team_batting(year: int, team_name: str, team_code: str) -> pd.DataFram
     return df
 
 
-def fetch_all_batting() -> pd.DataFrame:
+def fetch_team_batting(year: int, team_name: str, team_code: str,
+                       engine: FetchEngine | None = None) -> pd.DataFrame | None:
+    """1チーム・1年度の打撃成績を取得"""
+    engine = engine or FetchEngine(progress=False)
+    result = engine.run([team_batting_url(year, team_name, team_code)])[0]
+    if not result.ok:
+        print(f"  ERROR {team_name} {year}: {result.error or f'HTTP {result.status}'}")
+        return None
+    return parse_team_batting(result.content, year, team_name)
+
+
+def fetch_all_batting(engine: FetchEngine | None = None, years: list[int] | None = None) -> pd.DataFrame:
     """全12チーム×全年度の打撃成績を取得"""
-    all_dfs = []
+    engine = engine or FetchEngine()
+    pages = [(year, team_name, team_code) for year in (years or YEARS)
+             for team_name, team_code in TEAM_CODES.items()]
+    results = engine.run([team_batting_url(*page) for page in pages])
 
-    for year in YEARS:
-        print(f"\n[{year}]")
-        for team_name, team_code in TEAM_CODES.items():
-            df = fetch_team_batting(year, team_name, team_code)
-            if df is not None and len(df) > 0:
-                all_dfs.append(df)
-                print(f"  {team_name}: {len(df)} players")
-            time.sleep(0.5)  # 礼儀正しく
+    all_dfs = []
+    for (year, team_name, _), result in zip(pages, results):
+        if not result.ok:
+            print(f"  ERROR {team_name} {year}: {result.error or f'HTTP {result.status}'}")
+            continue
+        df = parse_team_batting(result.content, year, team_name)
+        if df is not None and len(df) > 0:
+            all_dfs.append(df)
+            print(f"  [{year}] {team_name}: {len(df)} players")
 
     if not all_dfs:
         print("No data fetched")
@@ -121,11 +147,15 @@ def main():
     print("NPB詳細打撃成績取得 (npb.jp)")
     print("=" * 60)
 
-    df = fetch_all_batting()
+    parser = argparse.ArgumentParser(description="npb.jp から詳細打撃成績を取得")
+    parser.add_argument("--since", type=int, default=YEARS[0], help="この年度以降だけ取得する")
+    args = parser.parse_args()
+
+    engine = FetchEngine()
+    df = fetch_all_batting(engine, [y for y in YEARS if y >= args.since])
+    print(engine.report())
     if len(df) > 0:
-        out_path = DATA_DIR / f"npb_batting_detailed_2015_{DATA_END_YEAR}.csv"
-        df.to_csv(out_path, index=False, encoding="utf-8-sig")
-        print(f"\nSaved: {out_path}")
+        save_raw("batting_detailed", df)
         print(f"  Rows: {len(df)}")
         print(f"  Years: {sorted(df['year'].unique())}")
         print(f"  Columns: {list(df.columns)}")
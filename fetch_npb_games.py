@@ -6,29 +6,40 @@ NPB 試合別スコアデータ取得スクリプト
 1. baseball-data.com  /{yy}/score/{team_code}/
 2. npb.jp             /games/{year}/schedule_{month:02d}_detail.html
 
-出力: data/raw/npb_games_{year}.csv
+出力: data/raw/npb_games_{year}.csv（raw_store の games パーティションから書き出す）
   columns: year, date, home_team, away_team, home_score, away_score
 
+ページは fetch_engine.FetchEngine で取得する。全年度の Source 1 をまとめて取得し、
+試合数が足りない年度だけ Source 2 をまとめて取得する。
+
+シーズン中の日次更新（--incremental）は、ストアにある最後の試合日の月から当月までの
+npb.jp スケジュールページだけを取得し、保存済みでない試合をその年度のパーティションに追加して、
+calc_park_factors.update_park_factors で PF / PF_5yr を新しい試合の分だけ更新する。
+
 使い方:
     python fetch_npb_games.py              # config.py の YEARS 全年度
     NPB_DATA_END_YEAR=2024 python fetch_npb_games.py
+    python fetch_npb_games.py --incremental             # 今年の新しい試合だけ追加 + PF 更新
+    python fetch_npb_games.py --incremental --year 2025
 """
 
+import argparse
+import io
 import re
-import time
+from datetime import date
 from pathlib import Path
 
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
 
+from calc_park_factors import update_park_factors
 from config import DATA_END_YEAR, YEARS
+from fetch_engine import FetchEngine, FetchResult
+from raw_store import RAW_TABLES, RawStore, save_raw
 
 DATA_DIR = Path(__file__).parent / "data" / "raw"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; research-bot/1.0)"}
-
 # baseball-data.com チームコード（スコアページ用）
 BD_TEAM_CODES = {
     "阪神": "t", "DeNA": "yb", "巨人": "g",
@@ -78,20 +89,23 @@ def get_home_stadium(team: str, year: int) -> str:
 # URL: https://baseball-data.com/{yy}/score/{team_code}/
 # ==========================================================================
 
-def fetch_games_baseball_data(year: int) -> pd.DataFrame:
-    """baseball-data.com のスコアページから試合結果を取得"""
+def baseball_data_urls(year: int) -> list[str]:
     yy = str(year)[2:]
+    return [f"https://baseball-data.com/{yy}/score/{team_code}/" for team_code in BD_TEAM_CODES.values()]
+
+
+def parse_games_baseball_data(year: int, results: list[FetchResult]) -> pd.DataFrame:
+    """baseball-data.com のスコアページ（baseball_data_urls の順の取得結果）から試合結果を読む"""
     records = []
 
-    for team_name, team_code in BD_TEAM_CODES.items():
-        url = f"https://baseball-data.com/{yy}/score/{team_code}/"
+    for team_name, result in zip(BD_TEAM_CODES, results):
+        url = result.url
         try:
-            resp = requests.get(url, headers=HEADERS, timeout=15)
-            if resp.status_code != 200:
-                print(f"  [{team_name}] HTTP {resp.status_code}: {url}")
+            if not result.ok:
+                print(f"  [{team_name}] {result.error or f'HTTP {result.status}'}: {url}")
                 continue
 
-            tables = pd.read_html(resp.text, flavor="lxml")
+            tables = pd.read_html(io.StringIO(result.text()), flavor="lxml")
             if not tables:
                 print(f"  [{team_name}] テーブルなし: {url}")
                 continue
@@ -162,14 +176,18 @@ def fetch_games_baseball_data(year: int) -> pd.DataFrame:
                             "stadium": get_home_stadium(team_name, year),
                         })
 
-            time.sleep(1.5)
-
         except Exception as e:
             print(f"  [{team_name}] エラー: {e}")
 
     return pd.DataFrame(records)
 
 
+def fetch_games_baseball_data(year: int, engine: FetchEngine | None = None) -> pd.DataFrame:
+    """baseball-data.com のスコアページから試合結果を取得"""
+    engine = engine or FetchEngine()
+    return parse_games_baseball_data(year, engine.run(baseball_data_urls(year)))
+
+
 # ==========================================================================
 # Source 2: npb.jp スケジュール詳細ページ
 # URL: https://npb.jp/games/{year}/schedule_{month:02d}_detail.html
@@ -177,22 +195,26 @@ def fetch_games_baseball_data(year: int) -> pd.DataFrame:
 #       div.score2=アウェイ得点, div.team2=アウェイ
 # ==========================================================================
 
-def fetch_games_npb_jp(year: int) -> pd.DataFrame:
-    """npb.jp のスケジュール詳細ページから試合結果を取得"""
+NPB_JP_MONTHS = range(3, 12)   # 3月〜11月
+
+
+def npb_jp_urls(year: int, months=NPB_JP_MONTHS) -> list[str]:
+    return [f"https://npb.jp/games/{year}/schedule_{month:02d}_detail.html" for month in months]
+
+
+def parse_games_npb_jp(year: int, results: list[FetchResult], months=NPB_JP_MONTHS) -> pd.DataFrame:
+    """npb.jp のスケジュール詳細ページ（npb_jp_urls の順の取得結果）から試合結果を読む"""
     records = []
 
-    for month in range(3, 12):   # 3月〜11月
-        url = f"https://npb.jp/games/{year}/schedule_{month:02d}_detail.html"
+    for month, result in zip(months, results):
         try:
-            resp = requests.get(url, headers=HEADERS, timeout=15)
-            if resp.status_code == 404:
+            if result.status == 404:
                 continue
-            if resp.status_code != 200:
-                print(f"  [npb.jp month={month}] HTTP {resp.status_code}")
+            if not result.ok:
+                print(f"  [npb.jp month={month}] {result.error or f'HTTP {result.status}'}")
                 continue
 
-            resp.encoding = "utf-8"
-            soup = BeautifulSoup(resp.text, "html.parser")
+            soup = BeautifulSoup(result.text("utf-8"), "html.parser")
 
             # id="date{MMDD}" を持つ tr が各試合に対応
             date_rows = [t for t in soup.find_all("tr") if t.get("id", "").startswith("date") and len(t.get("id", "")) == 8]
@@ -230,63 +252,157 @@ def fetch_games_npb_jp(year: int) -> pd.DataFrame:
                     "stadium": get_home_stadium(home_team, year),
                 })
 
-            time.sleep(1.0)
-
         except Exception as e:
             print(f"  [npb.jp month={month}] エラー: {e}")
 
     return pd.DataFrame(records)
 
 
+def fetch_games_npb_jp(year: int, engine: FetchEngine | None = None) -> pd.DataFrame:
+    """npb.jp のスケジュール詳細ページから試合結果を取得"""
+    engine = engine or FetchEngine()
+    return parse_games_npb_jp(year, engine.run(npb_jp_urls(year)))
+
+
 # ==========================================================================
 # メイン: 両ソースを試行して結果を保存
 # ==========================================================================
 
-def fetch_year(year: int) -> bool:
-    """1年分の試合データを取得。成功したら True を返す"""
+MIN_GAMES = 100   # 最低100試合取れれば成功とみなす
+
+
+def _save_year(year: int, df: pd.DataFrame, df2: pd.DataFrame | None,
+               store: RawStore | None = None) -> bool:
+    """Source 1 / Source 2 の結果から1年分を保存。十分な試合数が取れたら True"""
     out_path = DATA_DIR / f"npb_games_{year}.csv"
 
-    print(f"\n=== {year}年 試合データ取得 ===")
-
-    # Source 1: baseball-data.com
-    print("[Source 1] baseball-data.com ...")
-    df = fetch_games_baseball_data(year)
-    if len(df) >= 100:   # 最低100試合取れれば成功とみなす
-        # 重複除去（同一試合を双方チームで取得する可能性）
-        df = df.drop_duplicates(subset=["date", "home_team", "away_team"]).reset_index(drop=True)
-        df.to_csv(out_path, index=False, encoding="utf-8-sig")
-        print(f"  -> {len(df)} 試合取得 → {out_path.name}")
-        return True
-
-    print(f"  -> {len(df)} 試合のみ（不足）。Source 2 を試行...")
-
-    # Source 2: npb.jp
-    print("[Source 2] npb.jp ...")
-    df2 = fetch_games_npb_jp(year)
-    if len(df2) >= 100:
-        df2 = df2.drop_duplicates(subset=["date", "home_team", "away_team"]).reset_index(drop=True)
-        df2.to_csv(out_path, index=False, encoding="utf-8-sig")
-        print(f"  -> {len(df2)} 試合取得 → {out_path.name}")
-        return True
+    for label, games in (("Source 1", df), ("Source 2", df2)):
+        if games is not None and len(games) >= MIN_GAMES:
+            # 重複除去（同一試合を双方チームで取得する可能性）
+            games = games.drop_duplicates(subset=["date", "home_team", "away_team"]).reset_index(drop=True)
+            save_raw("games", games, store=store)
+            print(f"  [{year}] {label}: {len(games)} 試合取得 → {out_path.name}")
+            return True
 
     # 両ソース失敗
     combined = pd.concat([df, df2], ignore_index=True).drop_duplicates(
         subset=["date", "home_team", "away_team"]
     )
-    print(f"  -> 両ソースとも不足 ({len(combined)} 試合)。URL構造を確認してください。")
+    print(f"  [{year}] 両ソースとも不足 ({len(combined)} 試合)。URL構造を確認してください。")
     if len(combined) > 0:
-        combined.to_csv(out_path, index=False, encoding="utf-8-sig")
+        save_raw("games", combined, store=store)
         print(f"  -> 部分データを保存: {out_path.name}")
     return False
 
 
-def main():
-    success_years = []
-    fail_years = []
+def fetch_years(years: list[int], engine: FetchEngine | None = None,
+                store: RawStore | None = None) -> dict[int, bool]:
+    """複数年度の試合データを取得。{年度: 成功したか} を返す
+
+    Source 1（baseball-data.com）を全年度まとめて取得し、試合数が足りない年度だけ
+    Source 2（npb.jp）をまとめて取得する。
+    """
+    engine = engine or FetchEngine()
+    years = list(years)
+
+    print(f"\n=== [Source 1] baseball-data.com {years[0]}〜{years[-1]} ===")
+    n = len(BD_TEAM_CODES)
+    results = engine.run([url for year in years for url in baseball_data_urls(year)])
+    source1 = {year: parse_games_baseball_data(year, results[i * n:(i + 1) * n])
+               for i, year in enumerate(years)}
+
+    short = [year for year in years if len(source1[year]) < MIN_GAMES]
+    for year in short:
+        print(f"  [{year}] {len(source1[year])} 試合のみ（不足）。Source 2 を試行...")
+    source2 = {}
+    if short:
+        print(f"\n=== [Source 2] npb.jp {short} ===")
+        n = len(NPB_JP_MONTHS)
+        results = engine.run([url for year in short for url in npb_jp_urls(year)])
+        source2 = {year: parse_games_npb_jp(year, results[i * n:(i + 1) * n])
+                   for i, year in enumerate(short)}
+
+    return {year: _save_year(year, source1[year], source2.get(year), store) for year in years}
+
 
-    for year in YEARS:
-        ok = fetch_year(year)
-        (success_years if ok else fail_years).append(year)
+def fetch_year(year: int, engine: FetchEngine | None = None) -> bool:
+    """1年分の試合データを取得。成功したら True を返す"""
+    return fetch_years([year], engine)[year]
+
+
+# ==========================================================================
+# シーズン中の差分取得
+# ==========================================================================
+
+def incremental_months(year: int, last_date: str | None, today: date | None = None) -> list[int]:
+    """差分取得で読む月: 最後の試合日の月（無ければ開幕月）から当月（過去の年度は11月）まで"""
+    today = today or date.today()
+    start = int(last_date.split("/")[1]) if last_date else NPB_JP_MONTHS[0]
+    end = min(today.month, NPB_JP_MONTHS[-1]) if year == today.year else NPB_JP_MONTHS[-1]
+    return [m for m in NPB_JP_MONTHS if start <= m <= end]
+
+
+def fetch_new_games(year: int, engine: FetchEngine | None = None,
+                    store: RawStore | None = None) -> pd.DataFrame:
+    """ストアにある最後の試合日以降の試合のうち、まだ保存していないものを返す
+
+    最後の試合日そのものも読み直す（取得時点で終わっていなかった試合を拾うため）。
+    """
+    engine = engine or FetchEngine()
+    store = store or RawStore()
+    stored = store.read("games", [year])
+    last_date = stored["date"].max() if not stored.empty else None
+    months = incremental_months(year, last_date)
+    if not months:
+        return pd.DataFrame()
+
+    print(f"=== [npb.jp] {year} 差分取得: 最終試合日 {last_date or 'なし'} → {months[0]}〜{months[-1]}月 ===")
+    games = parse_games_npb_jp(year, engine.run(npb_jp_urls(year, months)), months)
+    if games.empty:
+        return games
+    if last_date:
+        games = games[games["date"] >= last_date]
+    key = RAW_TABLES["games"]["key"]
+    games = games.drop_duplicates(subset=key)
+    if not stored.empty:
+        seen = set(map(tuple, stored[key].astype(str).itertuples(index=False)))
+        games = games[[k not in seen for k in map(tuple, games[key].astype(str).itertuples(index=False))]]
+    return games.reset_index(drop=True)
+
+
+def ingest_new_games(year: int, engine: FetchEngine | None = None,
+                     store: RawStore | None = None) -> pd.DataFrame:
+    """新しい試合をその年度のパーティションに追加し、パークファクターを更新する"""
+    store = store or RawStore()
+    if not store.years("games"):
+        store.import_legacy(tables=["games"])
+    previous = store.partition_hashes("games")
+    new_games = fetch_new_games(year, engine, store)
+    if new_games.empty:
+        print(f"  [{year}] 新しい試合なし")
+        return new_games
+    print(f"  [{year}] 新しい試合: {len(new_games)} （{new_games['date'].min()}〜{new_games['date'].max()}）")
+    save_raw("games", new_games, replace=False, store=store)
+    update_park_factors(new_games, previous, store)
+    return new_games
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NPB 試合別スコアの取得")
+    parser.add_argument("--incremental", action="store_true",
+                        help="最後に保存した試合日以降だけ取得してパークファクターを更新")
+    parser.add_argument("--year", type=int, default=date.today().year, help="--incremental の対象年度")
+    args = parser.parse_args()
+
+    engine = FetchEngine()
+    if args.incremental:
+        ingest_new_games(args.year, engine)
+        print(engine.report())
+        return
+
+    status = fetch_years(YEARS, engine)
+    success_years = [year for year, ok in status.items() if ok]
+    fail_years = [year for year, ok in status.items() if not ok]
 
     print(f"\n=== 完了 ===")
     print(f"成功: {success_years}")
@@ -294,6 +410,7 @@ def main():
     if fail_years:
         print("※ 失敗した年度はURL構造の変更またはデータなしの可能性があります")
         print("  baseball-data.com のスコアページURLを手動確認してください")
+    print(engine.report())
 
 
 if __name__ == "__main__":
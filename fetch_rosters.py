@@ -6,15 +6,21 @@
   columns: year, team, player
 
 Marcel予測フィルタ用: target_yearの選手名鑑に存在しない選手は予測から除外する
+ページは fetch_engine.FetchEngine で全年度×12球団をまとめて取得する。
+取得結果は raw_store の年度別パーティションに upsert し、従来の CSV もストアから書き出す
+（--since で対象年度を絞れる）。
 """
 
-import io
+import argparse
 import os
-import time
-import pandas as pd
-import urllib.request
 from pathlib import Path
 
+import pandas as pd
+
+from fetch_engine import FetchEngine
+from html_tables import find_tables, header_count, table_rows
+from raw_store import save_raw
+
 DATA_DIR = Path(__file__).parent / "data" / "raw"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -37,30 +43,32 @@ START_YEAR = 2018
 END_YEAR = int(os.environ.get("NPB_DATA_END_YEAR", 2025))
 
 
-def fetch_team_roster(year: int, team: str, code: str) -> list[str]:
-    """指定年・チームの選手名一覧を返す"""
+def roster_url(year: int, code: str) -> str:
     yy = str(year)[2:]
-    url = f"https://baseball-data.com/{yy}/player/{code}/"
-    req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+    return f"https://baseball-data.com/{yy}/player/{code}/"
+
+
+def parse_team_roster(content: bytes, url: str = "") -> list[str]:
+    """選手名鑑ページ（HTMLのバイト列）から選手名一覧を返す"""
     try:
-        with urllib.request.urlopen(req, timeout=15) as res:
-            raw = res.read()
-        tables = pd.read_html(io.BytesIO(raw), flavor="lxml", encoding="utf-8")
+        tables = find_tables(content)
         if not tables:
             print(f"  ⚠ テーブルなし: {url}")
             return []
         # 最初のテーブルに選手名カラムがある
-        df = tables[0]
+        rows = table_rows(tables[0])
+        n_header = max(header_count(tables[0]), 1)
+        header = rows[0] if rows else []
         # 「選手名」カラムを探す
         name_col = None
-        for col in df.columns:
-            if "選手" in str(col) or "名前" in str(col):
-                name_col = col
+        for i, col in enumerate(header):
+            if "選手" in col or "名前" in col:
+                name_col = i
                 break
         if name_col is None:
-            print(f"  ⚠ 選手名カラム不明: {df.columns.tolist()}")
+            print(f"  ⚠ 選手名カラム不明: {header}")
             return []
-        names = df[name_col].dropna().astype(str).tolist()
+        names = [r[name_col] for r in rows[n_header:] if name_col < len(r)]
         # 空白・ヘッダ行などを除去
         names = [n.strip() for n in names if n.strip() and n != "選手名"]
         return names
@@ -69,26 +77,48 @@ def fetch_team_roster(year: int, team: str, code: str) -> list[str]:
         return []
 
 
-def main():
+def fetch_team_roster(year: int, team: str, code: str, engine: FetchEngine | None = None) -> list[str]:
+    """指定年・チームの選手名一覧を返す"""
+    engine = engine or FetchEngine(progress=False)
+    result = engine.run([roster_url(year, code)])[0]
+    if not result.ok:
+        print(f"  ❌ {result.url} → {result.error or f'HTTP {result.status}'}")
+        return []
+    return parse_team_roster(result.content, result.url)
+
+
+def fetch_all_rosters(years: list[int], engine: FetchEngine | None = None) -> pd.DataFrame:
+    """指定年度×12球団の選手名鑑（year, team, player）"""
+    engine = engine or FetchEngine()
+    pages = [(year, team, code) for year in years for team, code in TEAM_CODES.items()]
+    results = engine.run([roster_url(year, code) for year, _, code in pages])
+
     rows = []
-    total = (END_YEAR - START_YEAR + 1) * len(TEAM_CODES)
-    done = 0
-
-    for year in range(START_YEAR, END_YEAR + 1):
-        print(f"\n=== {year}年 ===")
-        for team, code in TEAM_CODES.items():
-            names = fetch_team_roster(year, team, code)
-            for name in names:
-                rows.append({"year": year, "team": team, "player": name})
-            print(f"  {team}: {len(names)}人")
-            done += 1
-            if done < total:
-                time.sleep(1.0)  # サーバー負荷軽減
-
-    df = pd.DataFrame(rows)
-    out_path = DATA_DIR / f"npb_rosters_{START_YEAR}_{END_YEAR}.csv"
-    df.to_csv(out_path, index=False, encoding="utf-8-sig")
-    print(f"\n✅ 保存完了: {out_path} ({len(df)}行)")
+    for (year, team, _), result in zip(pages, results):
+        if team == next(iter(TEAM_CODES)):
+            print(f"\n=== {year}年 ===")
+        if result.ok:
+            names = parse_team_roster(result.content, result.url)
+        else:
+            print(f"  ❌ {result.url} → {result.error or f'HTTP {result.status}'}")
+            names = []
+        for name in names:
+            rows.append({"year": year, "team": team, "player": name})
+        print(f"  {team}: {len(names)}人")
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="baseball-data.com から年別の選手名鑑を取得")
+    parser.add_argument("--since", type=int, default=START_YEAR, help="この年度以降だけ取得する")
+    args = parser.parse_args()
+
+    engine = FetchEngine()
+    df = fetch_all_rosters(list(range(max(START_YEAR, args.since), END_YEAR + 1)), engine)
+    if len(df) > 0:
+        save_raw("rosters", df, end_year=END_YEAR)
+        print(f"\n✅ 保存完了 ({len(df)}行)")
+    print(engine.report())
 
 
 if __name__ == "__main__":
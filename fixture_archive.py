@@ -0,0 +1,81 @@
+"""
+スクレイパーの応答を保存するフィクスチャアーカイブ（記録・再生用）
+
+fetch_engine.FetchEngine は NPB_FETCH_RECORD（アーカイブのディレクトリ）が設定されていると、
+取得した応答（ステータス・主なヘッダー・本文・応答時間）をここに記録する。HTTP キャッシュから
+返したページも 200 として記録するので、キャッシュが温まっていれば通信せずに作れる。
+記録したアーカイブは replay.ReplayServer でローカルに再生し、オフラインで取得スクリプトを動かす。
+
+保存形式（http_cache と同じく本文は内容で名前を付ける）:
+  index/<URL の sha1>.json                  URL・ステータス・ヘッダー・本文の sha256・応答時間
+  bodies/<sha256 の先頭2文字>/<sha256>.gz   本文（gzip 圧縮）
+
+同じ URL をもう一度記録すると上書きする（最後に記録した応答を再生する）。
+"""
+
+import gzip
+import hashlib
+import json
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+# 再生時に返すヘッダー（それ以外は記録しない）
+RECORDED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+class FixtureArchive:
+    """URL → 記録した応答"""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def _index_path(self, url: str) -> Path:
+        return self.root / "index" / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _body_path(self, digest: str) -> Path:
+        return self.root / "bodies" / digest[:2] / (digest + ".gz")
+
+    def record(self, url: str, status: int, headers, body: bytes, elapsed: float = 0.0) -> None:
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._body_path(digest)
+        if not path.exists():
+            _write_atomic(path, gzip.compress(body, mtime=0))
+        entry = {
+            "url": url,
+            "status": status,
+            "headers": {k: headers[k] for k in RECORDED_HEADERS if headers.get(k)},
+            "sha256": digest,
+            "size": len(body),
+            "elapsed": round(elapsed, 4),
+            "recorded_at": time.time(),
+        }
+        _write_atomic(self._index_path(url), json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+
+    def lookup(self, url: str) -> dict | None:
+        try:
+            return json.loads(self._index_path(url).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def body(self, entry: dict) -> bytes:
+        return gzip.decompress(self._body_path(entry["sha256"]).read_bytes())
+
+    def entries(self) -> list[dict]:
+        out = []
+        for path in sorted((self.root / "index").glob("*.json")):
+            try:
+                out.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue
+        return out
+
+    def hosts(self) -> list[str]:
+        return sorted({urlsplit(e["url"]).hostname or "" for e in self.entries()})
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
@@ -7,6 +7,8 @@ import pandas as pd
 import sys
 sys.path.insert(0, ".")
 from marcel_projection import marcel_hitter, marcel_pitcher
+from raw_store import read_raw
+from table_store import load_table, save_table
 
 CENTRAL_TEAMS = {"巨人", "阪神", "広島", "DeNA", "ヤクルト", "中日"}
 PACIFIC_TEAMS = {"ソフトバンク", "オリックス", "西武", "ロッテ", "日本ハム", "楽天"}
@@ -36,24 +38,24 @@ def build_team_projections(target_year, df_h, df_p, df_pyth, df_saber, df_roster
     # Marcel は前年チームを使うため、シーズン前移籍が反映されない問題を修正
     # 同一選手の重複（シーズン途中移籍）は最後のチームを採用
     actual_h = (df_h[df_h["year"] == target_year]
-                .drop_duplicates(subset="player", keep="last")
-                .set_index("player")["team"])
+                .drop_duplicates(subset="player_id", keep="last")
+                .set_index("player_id")["team"])
     actual_p = (df_p[df_p["year"] == target_year]
-                .drop_duplicates(subset="player", keep="last")
-                .set_index("player")["team"])
+                .drop_duplicates(subset="player_id", keep="last")
+                .set_index("player_id")["team"])
     mh = mh.copy()
     mp = mp.copy()
-    mh["team"] = mh["player"].map(actual_h).fillna(mh["team"])
-    mp["team"] = mp["player"].map(actual_p).fillna(mp["team"])
+    mh["team"] = mh["player_id"].map(actual_h).fillna(mh["team"])
+    mp["team"] = mp["player_id"].map(actual_p).fillna(mp["team"])
 
     # 選手名鑑フィルタ: target_year の NPB 登録選手のみ残す
     # 退団・MLB移籍・引退選手を Marcel 予測から除外する
     if df_roster is not None:
-        roster_names = set(df_roster[df_roster["year"] == target_year]["player"])
-        if roster_names:
+        roster_ids = set(df_roster[df_roster["year"] == target_year]["player_id"])
+        if roster_ids:
             before_h, before_p = len(mh), len(mp)
-            mh = mh[mh["player"].isin(roster_names)].copy()
-            mp = mp[mp["player"].isin(roster_names)].copy()
+            mh = mh[mh["player_id"].isin(roster_ids)].copy()
+            mp = mp[mp["player_id"].isin(roster_ids)].copy()
             removed_h = before_h - len(mh)
             removed_p = before_p - len(mp)
             if removed_h + removed_p > 0:
@@ -113,13 +115,13 @@ def build_team_projections(target_year, df_h, df_p, df_pyth, df_saber, df_roster
 
 
 def main():
-    df_h = pd.read_csv("data/raw/npb_hitters_2015_2025.csv")
-    df_p = pd.read_csv("data/raw/npb_pitchers_2015_2025.csv")
-    df_pyth = pd.read_csv("data/projections/pythagorean_2015_2025.csv")
-    df_saber = pd.read_csv("data/projections/npb_sabermetrics_2015_2025.csv")
+    df_h = read_raw("hitters")
+    df_p = read_raw("pitchers")
+    df_pyth = load_table("data/projections/pythagorean_2015_2025.csv")
+    df_saber = load_table("data/projections/npb_sabermetrics_2015_2025.csv")
 
-    roster_path = "data/raw/npb_rosters_2018_2025.csv"
-    df_roster = pd.read_csv(roster_path) if pd.io.common.file_exists(roster_path) else None
+    df_roster = read_raw("rosters")
+    df_roster = df_roster if not df_roster.empty else None
     if df_roster is not None:
         print(f"選手名鑑ロード完了: {len(df_roster)}行 ({df_roster['year'].min()}-{df_roster['year'].max()}年)")
 
@@ -136,7 +138,7 @@ def main():
 
     result = pd.concat(all_rows, ignore_index=True)
     out_path = "data/projections/marcel_team_historical.csv"
-    result.to_csv(out_path, index=False)
+    save_table(result, out_path)
     print(f"\n保存完了: {out_path}  ({len(result)}行)")
     print(result[result["team"].isin(["ヤクルト", "オリックス"])].to_string())
 
@@ -0,0 +1,157 @@
+"""
+スクレイパー用の HTML テーブル抽出（lxml 直読み）
+
+pd.read_html はページ内の全テーブルを DataFrame にしてから列名を整形するため、
+全年度×12球団のページを読む取得スクリプトではパースが取得後の処理の大半を占める。
+ここでは成績テーブル1つだけを lxml で行×セルの文字列に読み、既存の列名マッピング
+（fetch_npb_data.HITTER_COLS 等）で英語列名にしてから、列ごとに型を付けて
+DataFrame にする（そのまま raw_store.save_raw に渡せる）。
+
+セル文字列の空白処理・colspan/rowspan の展開・列の型推定（全セルが数値なら数値列、
+1つでも数値でなければ文字列列、カンマ区切りの桁も数値として読む）は read_html に合わせてあり、
+取得スクリプトの出力（raw_store のパーティション）は read_html 版と同じになる。
+
+  python bench_html_tables.py     # read_html との速度・結果の比較
+"""
+
+import csv
+import io
+import re
+
+import pandas as pd
+from lxml import etree
+
+# read_html（pandas.io.html._remove_whitespace）と同じ空白の詰め方
+_RE_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+
+# table_frame で read_csv に渡すときのセル区切り（セル文字列には出ない制御文字）
+_SEP = "\x1f"
+
+_PARSER = etree.HTMLParser(encoding="utf-8")
+
+# セル・行の区切りと colspan/rowspan の印（ページ本文に出ない私用領域の文字）
+_CELL, _ROW, _SPAN = "\ue000", "\ue001", "\ue002"
+_RE_CELL_EDGE = re.compile(rf"\s+(?=[{_CELL}{_ROW}{_SPAN}])|(?<=[{_CELL}{_ROW}{_SPAN}])\s+")
+
+# <table> 直下（thead/tbody/tfoot 直下を含む）の行のセル文字列を区切り文字付きの1つの文字列にする。
+# 入れ子のテーブルの行は含めない（read_html と同じ）。セルごとに Python の要素オブジェクトを
+# 作らないので、要素を1つずつたどるより1桁速い
+_ROWS_XSLT = etree.XSLT(etree.XML(f"""\
+<xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+  <xsl:output method="text" encoding="utf-8"/>
+  <xsl:template match="/*">
+    <xsl:for-each select="tr|thead/tr|tbody/tr|tfoot/tr">
+      <xsl:for-each select="td|th">
+        <xsl:if test="@colspan or @rowspan">
+          <xsl:text>{_SPAN}</xsl:text><xsl:value-of select="@colspan"/>
+          <xsl:text>,</xsl:text><xsl:value-of select="@rowspan"/><xsl:text>{_SPAN}</xsl:text>
+        </xsl:if>
+        <xsl:value-of select="."/><xsl:text>{_CELL}</xsl:text>
+      </xsl:for-each>
+      <xsl:text>{_ROW}</xsl:text>
+    </xsl:for-each>
+  </xsl:template>
+</xsl:stylesheet>""".encode("utf-8")))
+
+
+def parse_html(content: bytes):
+    """ページ（HTMLのバイト列）を lxml のツリーにする"""
+    return etree.fromstring(content, _PARSER)
+
+
+def _rows(table) -> list:
+    return table.xpath("./tr|./thead/tr|./tbody/tr|./tfoot/tr")
+
+
+def table_rows(table) -> list[list[str]]:
+    """<table> の行をセル文字列のリストにする（colspan/rowspan は read_html と同様に展開）"""
+    text = str(_ROWS_XSLT(table))
+    # セルごとの strip と空白の詰め方は read_html と同じ（区切り文字は空白ではないので境界は保たれる）
+    text = _RE_WHITESPACE.sub(" ", _RE_CELL_EDGE.sub("", text.lstrip()))
+    rows = [row.split(_CELL)[:-1] for row in text.split(_ROW)[:-1]]
+    if _SPAN in text:
+        rows = _expand_spans(rows)
+    return [row for row in rows if row]
+
+
+def _expand_spans(rows: list[list[str]]) -> list[list[str]]:
+    out = []
+    pending: dict[int, tuple[str, int]] = {}   # 列位置 → (文字列, 残り行数)
+
+    def fill(row: list[str], col: int) -> int:
+        while col in pending:
+            text, left = pending.pop(col)
+            row.append(text)
+            if left > 1:
+                pending[col] = (text, left - 1)
+            col += 1
+        return col
+
+    for cells in rows:
+        row: list[str] = []
+        col = 0
+        for cell in cells:
+            col = fill(row, col)
+            colspan = rowspan = 1
+            if cell.startswith(_SPAN):
+                spans, _, cell = cell[1:].partition(_SPAN)
+                colspan_text, _, rowspan_text = spans.partition(",")
+                colspan, rowspan = _span(colspan_text), _span(rowspan_text)
+            for _ in range(colspan):
+                row.append(cell)
+                if rowspan > 1:
+                    pending[col] = (cell, rowspan - 1)
+                col += 1
+        fill(row, col)
+        out.append(row)
+    return out
+
+
+def _span(text: str) -> int:
+    try:
+        return max(int(text), 1)
+    except ValueError:
+        return 1
+
+
+def header_count(table) -> int:
+    """見出し行の数（<thead> の行、無ければ先頭から続く <th> だけの行）"""
+    thead = table.find("thead")
+    if thead is not None:
+        return len(thead.findall("tr"))
+    count = 0
+    for tr in _rows(table):
+        cells = [c for c in tr if c.tag in ("td", "th")]
+        if not cells or any(c.tag != "th" for c in cells):
+            break
+        count += 1
+    return count
+
+
+def find_tables(content: bytes) -> list:
+    """ページ内の <table> 要素（入れ子のテーブルも含む）"""
+    return parse_html(content).findall(".//table")
+
+
+def largest_table(content: bytes):
+    """行数が最大のテーブル（read_html の max(tables, key=len) 相当）。無ければ None"""
+    tables = find_tables(content)
+    if not tables:
+        return None
+    return max(tables, key=lambda t: len(_rows(t)) - header_count(t))
+
+
+def table_frame(rows: list[list[str]], columns: list[str], typed: bool = True) -> pd.DataFrame:
+    """行のリストを列名付きの DataFrame にする（行の長さは列数に揃える）
+
+    typed=True なら列ごとに read_html と同じ規則で型を付ける（全セルが数値なら数値列、
+    カンマ区切りの桁も数値、pandas 既定の欠損文字列は NaN）。型付けは read_csv の C パーサに
+    まとめて任せるので、列ごとに Python で変換するより速い。
+    """
+    width = len(columns)
+    lines = [_SEP.join((r + [""] * (width - len(r)))[:width]) for r in rows]
+    return pd.read_csv(
+        io.StringIO("\n".join(lines) + "\n"), sep=_SEP, header=None, names=columns,
+        quoting=csv.QUOTE_NONE, thousands=",", skip_blank_lines=False,
+        dtype=None if typed else str, keep_default_na=typed, index_col=False,
+    )
@@ -0,0 +1,173 @@
+"""
+スクレイパー用の HTTP レスポンスキャッシュ（内容アドレス + 条件付きリクエスト）
+
+fetch_engine.FetchEngine が取得したページを保存し、次回以降の取得で使う:
+
+  - 終了したシーズン（URL の年度 < FINAL_BEFORE、既定は config.DATA_END_YEAR）のページは
+    キャッシュがあれば通信しない（2015〜前年の成績は変わらない）
+  - それ以外（当年・年度を含まないURL）は If-None-Match / If-Modified-Since 付きで再検証し、
+    304 ならキャッシュの本文を使う
+
+保存形式（NPB_HTTP_CACHE_DIR、既定 ~/.cache/npb-prediction/http）:
+  objects/<sha256 の先頭2文字>/<sha256>.gz   本文（gzip 圧縮、本文の sha256 で名前を付ける）
+  index/<URL の sha1>.json                   URL → 本文の sha256・ETag・Last-Modified・取得時刻
+
+本文は内容で名前を付けるので、同じ内容のページ（再検証で 200 が返ったが中身は同じ等）は
+1つしか保存しない。
+
+Usage:
+  python http_cache.py            # キャッシュの件数・サイズ（確定シーズン / 再検証対象）を表示
+  python http_cache.py --clear    # キャッシュを削除
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+
+from config import DATA_END_YEAR, DEFAULT_CACHE_DIR
+
+# URL 中の年度: npb.jp/bis/2024/... , npb.jp/games/2024/... , baseball-data.com/24/...
+_YEAR_4 = re.compile(r"/(20\d{2})/")
+_YEAR_2 = re.compile(r"baseball-data\.com/(\d{2})/")
+
+
+def season_of(url: str) -> int | None:
+    """URL が指すシーズン（年度を含まない当年ページ等は None）"""
+    m = _YEAR_4.search(url)
+    if m:
+        return int(m.group(1))
+    m = _YEAR_2.search(url)
+    if m:
+        return 2000 + int(m.group(1))
+    return None
+
+
+class HTTPCache:
+    """URL → 本文 + 検証用ヘッダーのディスクキャッシュ"""
+
+    def __init__(self, root: str | Path, final_before: int = DATA_END_YEAR):
+        self.root = Path(root)
+        self.final_before = final_before
+
+    def _index_path(self, url: str) -> Path:
+        return self.root / "index" / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / (digest + ".gz")
+
+    def is_final(self, url: str) -> bool:
+        """終了したシーズンのページか（キャッシュがあれば再取得しない）"""
+        season = season_of(url)
+        return season is not None and season < self.final_before
+
+    def load(self, url: str) -> tuple[dict, bytes] | None:
+        """(メタ情報, 本文)。無い・壊れている場合は None"""
+        try:
+            meta = json.loads(self._index_path(url).read_text(encoding="utf-8"))
+            body = gzip.decompress(self._object_path(meta["sha256"]).read_bytes())
+        except (OSError, ValueError, KeyError, EOFError):
+            return None
+        if hashlib.sha256(body).hexdigest() != meta["sha256"]:
+            return None
+        return meta, body
+
+    @staticmethod
+    def conditional_headers(meta: dict) -> dict[str, str]:
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def store(self, url: str, body: bytes, headers) -> dict:
+        """200 の応答を保存してメタ情報を返す"""
+        digest = hashlib.sha256(body).hexdigest()
+        obj = self._object_path(digest)
+        if not obj.exists():
+            _write_atomic(obj, gzip.compress(body, mtime=0))
+        now = time.time()
+        meta = {
+            "url": url,
+            "sha256": digest,
+            "size": len(body),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": now,
+            "checked_at": now,
+        }
+        self._write_meta(url, meta)
+        return meta
+
+    def touch(self, url: str, meta: dict) -> None:
+        """304（変更なし）だったときに確認時刻だけ更新する"""
+        meta["checked_at"] = time.time()
+        self._write_meta(url, meta)
+
+    def _write_meta(self, url: str, meta: dict) -> None:
+        _write_atomic(self._index_path(url), json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+    def entries(self) -> list[dict]:
+        out = []
+        for path in sorted((self.root / "index").glob("*.json")):
+            try:
+                out.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue
+        return out
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+    except OSError:
+        pass   # キャッシュに書けなくても取得自体は続ける
+
+
+def default_cache() -> HTTPCache | None:
+    """環境変数からキャッシュを作る（NPB_HTTP_CACHE_DIR="" で無効）"""
+    root = os.environ.get("NPB_HTTP_CACHE_DIR", str(DEFAULT_CACHE_DIR / "http"))
+    if not root:
+        return None
+    final_before = int(os.environ.get("NPB_HTTP_CACHE_FINAL_BEFORE", DATA_END_YEAR))
+    return HTTPCache(root, final_before=final_before)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="スクレイパー用 HTTP キャッシュの確認・削除")
+    parser.add_argument("--clear", action="store_true", help="キャッシュを削除")
+    args = parser.parse_args()
+
+    cache = default_cache()
+    if cache is None:
+        print("NPB_HTTP_CACHE_DIR が空のためキャッシュは無効です")
+        return
+    if args.clear:
+        cache.clear()
+        print(f"削除しました: {cache.root}")
+        return
+
+    entries = cache.entries()
+    final = [e for e in entries if cache.is_final(e["url"])]
+    objects = list((cache.root / "objects").glob("*/*.gz"))
+    stored_kb = sum(p.stat().st_size for p in objects) / 1024
+    raw_kb = sum(e.get("size", 0) for e in entries) / 1024
+    print(f"{cache.root}")
+    print(f"  URL {len(entries)}件（確定シーズン {len(final)} / 再検証対象 {len(entries) - len(final)}）")
+    print(f"  本文 {len(objects)}件  {stored_kb:.0f}KB（展開時 {raw_kb:.0f}KB）")
+
+
+if __name__ == "__main__":
+    main()
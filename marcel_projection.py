@@ -14,6 +14,9 @@ import numpy as np
 from pathlib import Path
 from datetime import date
 from config import DATA_END_YEAR, TARGET_YEAR
+from player_registry import default_registry
+from raw_store import read_raw
+from table_store import add_innings, save_table
 
 DATA_DIR = Path(__file__).parent / "data"
 RAW_DIR = DATA_DIR / "raw"
@@ -33,14 +36,8 @@ AGE_FACTOR = 0.003  # OPS等の割合指標に対する1歳あたりの変化
 
 
 def load_birthdays() -> dict:
-    """生年月日データを読み込み、選手名→生年月日の辞書を返す"""
-    path = RAW_DIR / "npb_player_birthdays.csv"
-    if not path.exists():
-        return {}
-    df = pd.read_csv(path)
-    df["birthday"] = pd.to_datetime(df["birthday"], errors="coerce")
-    df = df.dropna(subset=["birthday"])
-    return dict(zip(df["player"], df["birthday"]))
+    """player_id → 生年月日の辞書を返す（選手IDレジストリの birthday 列）"""
+    return default_registry().birthdays()
 
 
 def calc_age(birthday, target_year: int) -> float:
@@ -62,19 +59,13 @@ def age_adjustment(age: float, peak: int = PEAK_AGE, factor: float = AGE_FACTOR)
 
 
 def load_hitters() -> pd.DataFrame:
-    df = pd.read_csv(RAW_DIR / f"npb_hitters_2015_{DATA_END_YEAR}.csv")
-    for col in ["AVG", "OBP", "SLG", "OPS", "PA", "G", "HR", "RBI", "SB", "BB", "SO", "H", "RC27", "XR27"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-    return df
+    """打者成績（数値列は読み込み時に変換済み: table_store.NUMERIC_COLUMNS）"""
+    return read_raw("hitters")
 
 
 def load_pitchers() -> pd.DataFrame:
-    df = pd.read_csv(RAW_DIR / f"npb_pitchers_2015_{DATA_END_YEAR}.csv")
-    for col in ["ERA", "WHIP", "DIPS", "IP", "ER", "HA", "W", "L", "SV", "SO", "BB", "HBP", "HRA", "BF", "G"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-    return df
+    """投手成績（数値列は変換済み、投球回は IP_outs / IP_num 付き: table_store.typed）"""
+    return read_raw("pitchers")
 
 
 def calc_league_avg(df: pd.DataFrame, year: int, rate_cols: list, weight_col: str) -> dict:
@@ -99,6 +90,10 @@ def marcel_hitter(df: pd.DataFrame, target_year: int) -> pd.DataFrame:
     # 生年月日データの読み込み
     birthdays = load_birthdays()
 
+    # 選手IDが無ければ付ける（read_raw 以外で読んだデータ）
+    if "player_id" not in df.columns:
+        df = default_registry().stamp(df)
+
     # 過去3年のデータ
     years = [target_year - 1, target_year - 2, target_year - 3]
     available_years = sorted(df["year"].unique())
@@ -119,11 +114,10 @@ def marcel_hitter(df: pd.DataFrame, target_year: int) -> pd.DataFrame:
 
     # 対象選手: 過去3年のいずれかにデータがある選手
     past_data = df[df["year"].isin(years)]
-    players = past_data["player"].unique()
 
     results = []
-    for player in players:
-        player_data = past_data[past_data["player"] == player]
+    for player_id, player_data in past_data.groupby("player_id", sort=False):
+        player = player_data.iloc[-1]["player"]  # 最新の表記
 
         # 加重平均の計算
         total_weight = 0
@@ -190,13 +184,14 @@ def marcel_hitter(df: pd.DataFrame, target_year: int) -> pd.DataFrame:
             proj[col] = proj_rate * proj_pa  # レート→カウント変換
 
         # 年齢調整
-        birthday = birthdays.get(player)
+        birthday = birthdays.get(player_id)
         age = calc_age(birthday, target_year) if birthday is not None else np.nan
         adj = age_adjustment(age)
         for col in rate_cols:
             proj[col] += adj  # ピーク前: +, ピーク後: -
 
         proj["player"] = player
+        proj["player_id"] = player_id
         proj["team"] = player_data.iloc[-1]["team"]  # 最新チーム
         proj["PA"] = round(proj_pa)
         proj["target_year"] = target_year
@@ -231,9 +226,9 @@ def marcel_pitcher(df: pd.DataFrame, target_year: int) -> pd.DataFrame:
     rate_cols = ["ERA", "WHIP"]
     count_cols = ["W", "L", "SV", "SO", "BB", "HBP", "HRA", "BF"]
 
-    # IP列を数値化（"123.1" → 123.333...）
-    df = df.copy()
-    df["IP_num"] = df["IP"].apply(lambda x: _parse_ip(x))
+    # 投球回の小数（"123.1" → 123.333...）は読み込み時に IP_num として付いている
+    df = df.copy() if "player_id" in df.columns else default_registry().stamp(df)
+    df = add_innings(df)
 
     lg_avgs = {}
     for y in years:
@@ -248,11 +243,10 @@ def marcel_pitcher(df: pd.DataFrame, target_year: int) -> pd.DataFrame:
                     lg_avgs[y][f"{col}_rate"] = season[col].sum() / total_ip
 
     past_data = df[df["year"].isin(years)]
-    players = past_data["player"].unique()
 
     results = []
-    for player in players:
-        player_data = past_data[past_data["player"] == player]
+    for player_id, player_data in past_data.groupby("player_id", sort=False):
+        player = player_data.iloc[-1]["player"]  # 最新の表記
 
         total_weight = 0
         weighted_ip = 0
@@ -313,13 +307,14 @@ def marcel_pitcher(df: pd.DataFrame, target_year: int) -> pd.DataFrame:
             proj[col] = proj_rate * avg_ip
 
         # 年齢調整（投手: ERA/WHIPは低い方が良いので符号を逆に）
-        birthday = birthdays.get(player)
+        birthday = birthdays.get(player_id)
         age = calc_age(birthday, target_year) if birthday is not None else np.nan
         adj = age_adjustment(age)
         proj["ERA"] -= adj * (proj["ERA"] / 0.300)  # ERA scale adjustment
         proj["WHIP"] -= adj * (proj["WHIP"] / 0.300)  # WHIP scale adjustment
 
         proj["player"] = player
+        proj["player_id"] = player_id
         proj["team"] = player_data.iloc[-1]["team"]
         proj["IP"] = round(avg_ip, 1)
         proj["target_year"] = target_year
@@ -338,22 +333,8 @@ def marcel_pitcher(df: pd.DataFrame, target_year: int) -> pd.DataFrame:
     return result_df
 
 
-def _parse_ip(ip_val) -> float:
-    """投球回を数値に変換: "123.1" → 123.333..."""
-    try:
-        s = str(ip_val)
-        if "." in s:
-            parts = s.split(".")
-            whole = int(parts[0])
-            frac = int(parts[1])  # 0, 1, 2 (= 0/3, 1/3, 2/3)
-            return whole + frac / 3.0
-        return float(s)
-    except (ValueError, IndexError):
-        return 0.0
-
-
 def evaluate_marcel(df_actual: pd.DataFrame, df_proj: pd.DataFrame,
-                    cols: list, merge_on: str = "player") -> pd.DataFrame:
+                    cols: list, merge_on: str = "player_id") -> pd.DataFrame:
     """予測 vs 実績の比較"""
     merged = df_actual.merge(df_proj, on=merge_on, suffixes=("_actual", "_proj"))
     eval_results = {}
@@ -390,7 +371,7 @@ def main():
         print(top[["player", "team", "PA", "AVG", "OBP", "SLG", "OPS", "HR", "RBI"]].to_string(index=False))
 
         out_path = OUT_DIR / f"marcel_hitters_{target}.csv"
-        proj_h.to_csv(out_path, index=False, encoding="utf-8-sig")
+        save_table(proj_h, out_path)
         print(f"\nSaved: {out_path}")
 
     print(f"\n--- 投手予測 (target: {target}) ---")
@@ -402,7 +383,7 @@ def main():
         print(top[["player", "team", "IP", "ERA", "WHIP", "W", "SO"]].to_string(index=False))
 
         out_path = OUT_DIR / f"marcel_pitchers_{target}.csv"
-        proj_p.to_csv(out_path, index=False, encoding="utf-8-sig")
+        save_table(proj_p, out_path)
         print(f"\nSaved: {out_path}")
 
     # 予測精度評価: 直近2年を予測して実績と比較
@@ -10,8 +10,6 @@ Data sources:
 - 日本野球機構 NPB (https://npb.jp) — wOBA/wRC+算出用の詳細打撃成績
 """
 
-import time
-
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -19,6 +17,10 @@ from sklearn.model_selection import KFold
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 from marcel_projection import load_birthdays, calc_age
 from config import DATA_END_YEAR, TARGET_YEAR
+from player_registry import with_player_ids
+from raw_store import read_raw
+from step_timer import StepTimer
+from table_store import load_table, save_table
 import json
 import joblib
 from datetime import datetime
@@ -53,56 +55,28 @@ MODELS_DIR.mkdir(parents=True, exist_ok=True)
 METRICS_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def _log_elapsed(label: str, start: float, budget_min: int = 180):
-    elapsed_min = (time.time() - start) / 60
-    print(f"  [{label}] elapsed: {elapsed_min:.1f} min / {budget_min} min budget")
-    if elapsed_min > budget_min * 0.8:
-        print(f"  WARNING: {label} used {elapsed_min:.0f}/{budget_min} min "
-              f"({elapsed_min / budget_min * 100:.0f}%) -- timeout risk!")
-
-
-def _norm_name(name: str) -> str:
-    """選手名を正規化（全角スペース→半角スペース）"""
-    return str(name).replace("\u3000", " ").strip()
-
-
 def load_sabermetrics() -> pd.DataFrame:
     """wOBA/wRC+データをロード（npb.jpベース）"""
     path = OUT_DIR / f"npb_sabermetrics_2015_{DATA_END_YEAR}.csv"
     if not path.exists():
         return pd.DataFrame()
-    df = pd.read_csv(path)
-    df["player_norm"] = df["player"].apply(_norm_name)
-    return df
+    return with_player_ids(load_table(path))
 
 
 def load_hitters() -> pd.DataFrame:
-    df = pd.read_csv(RAW_DIR / f"npb_hitters_2015_{DATA_END_YEAR}.csv")
-    for col in ["AVG", "OBP", "SLG", "OPS", "PA", "G", "HR", "RBI", "SB", "BB", "SO", "H", "RC27", "XR27"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-    return df
+    """打者成績（数値列は読み込み時に変換済み: table_store.NUMERIC_COLUMNS）"""
+    return read_raw("hitters")
 
 
 def load_pitchers() -> pd.DataFrame:
-    df = pd.read_csv(RAW_DIR / f"npb_pitchers_2015_{DATA_END_YEAR}.csv")
-    for col in ["ERA", "WHIP", "DIPS", "IP", "ER", "HA", "W", "L", "SV", "SO", "BB", "HBP", "HRA", "BF", "G"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-    # 投球回を数値化
-    df["IP_num"] = df["IP"].apply(_parse_ip)
-    return df
-
-
-def _parse_ip(ip_val) -> float:
-    try:
-        s = str(ip_val)
-        if "." in s:
-            parts = s.split(".")
-            return int(parts[0]) + int(parts[1]) / 3.0
-        return float(s)
-    except (ValueError, IndexError):
-        return 0.0
+    """投手成績（数値列は変換済み、投球回は IP_outs / IP_num 付き: table_store.typed）"""
+    return read_raw("pitchers")
+
+
+def _season_rows(df: pd.DataFrame) -> dict:
+    """(player_id, year) → その年度の最初の行（選手・年度ごとの引き当てを整数キーの辞書で行う）"""
+    first = df.drop_duplicates(["player_id", "year"])
+    return dict(zip(zip(first["player_id"], first["year"]), first.to_dict("records")))
 
 
 # ==============================
@@ -115,8 +89,10 @@ def build_hitter_features(df: pd.DataFrame) -> pd.DataFrame:
     wOBA/wRC+も特徴量に追加（npb.jpのセイバーメトリクスデータと結合）。
     """
     birthdays = load_birthdays()
+    seasons = _season_rows(df)
     saber = load_sabermetrics()
     has_saber = len(saber) > 0
+    saber_rows = _season_rows(saber) if has_saber else {}
     years = sorted(df["year"].unique())
     rows = []
 
@@ -129,10 +105,11 @@ def build_hitter_features(df: pd.DataFrame) -> pd.DataFrame:
 
         for _, tgt_row in target_df.iterrows():
             player = tgt_row["player"]
+            player_id = tgt_row["player_id"]
             if tgt_row["PA"] < 100:  # 最低打席数
                 continue
 
-            feat = {"player": player, "team": tgt_row["team"],
+            feat = {"player": player, "player_id": player_id, "team": tgt_row["team"],
                     "target_year": target_year, "target_OPS": tgt_row["OPS"],
                     "target_AVG": tgt_row["AVG"], "target_SLG": tgt_row["SLG"],
                     "target_OBP": tgt_row["OBP"]}
@@ -143,8 +120,8 @@ def build_hitter_features(df: pd.DataFrame) -> pd.DataFrame:
             count_cols = ["HR", "RBI", "SB", "BB", "SO", "H"]
 
             for offset, yr in enumerate([y1, y2, y3], start=1):
-                pdata = df[(df["player"] == player) & (df["year"] == yr)]
-                if len(pdata) == 0:
+                row = seasons.get((player_id, yr))
+                if row is None:
                     # 不在年は0/NaN
                     feat[f"PA_{offset}"] = 0
                     feat[f"G_{offset}"] = 0
@@ -155,7 +132,6 @@ def build_hitter_features(df: pd.DataFrame) -> pd.DataFrame:
                     feat[f"present_{offset}"] = 0
                 else:
                     has_any = True
-                    row = pdata.iloc[0]
                     pa = row["PA"]
                     feat[f"PA_{offset}"] = pa
                     feat[f"G_{offset}"] = row["G"]
@@ -170,12 +146,11 @@ def build_hitter_features(df: pd.DataFrame) -> pd.DataFrame:
 
             # wOBA/wRC+特徴量（npb.jpセイバーメトリクスデータから）
             if has_saber:
-                player_norm = _norm_name(player)
                 for offset, yr in enumerate([y1, y2, y3], start=1):
-                    sdata = saber[(saber["player_norm"] == player_norm) & (saber["year"] == yr)]
-                    if len(sdata) > 0:
-                        feat[f"wOBA_{offset}"] = sdata.iloc[0]["wOBA"]
-                        feat[f"wRC+_{offset}"] = sdata.iloc[0]["wRC+"]
+                    srow = saber_rows.get((player_id, yr))
+                    if srow is not None:
+                        feat[f"wOBA_{offset}"] = srow["wOBA"]
+                        feat[f"wRC+_{offset}"] = srow["wRC+"]
                     else:
                         feat[f"wOBA_{offset}"] = np.nan
                         feat[f"wRC+_{offset}"] = np.nan
@@ -203,7 +178,7 @@ def build_hitter_features(df: pd.DataFrame) -> pd.DataFrame:
                 feat["OPS_trend"] = 0
 
             # 年齢
-            birthday = birthdays.get(player)
+            birthday = birthdays.get(player_id)
             feat["age"] = calc_age(birthday, target_year) if birthday is not None else np.nan
 
             rows.append(feat)
@@ -216,6 +191,7 @@ def build_hitter_features(df: pd.DataFrame) -> pd.DataFrame:
 # ==============================
 def build_pitcher_features(df: pd.DataFrame) -> pd.DataFrame:
     birthdays = load_birthdays()
+    seasons = _season_rows(df)
     years = sorted(df["year"].unique())
     rows = []
 
@@ -225,10 +201,11 @@ def build_pitcher_features(df: pd.DataFrame) -> pd.DataFrame:
 
         for _, tgt_row in target_df.iterrows():
             player = tgt_row["player"]
+            player_id = tgt_row["player_id"]
             if tgt_row["IP_num"] < 30:
                 continue
 
-            feat = {"player": player, "team": tgt_row["team"],
+            feat = {"player": player, "player_id": player_id, "team": tgt_row["team"],
                     "target_year": target_year, "target_ERA": tgt_row["ERA"],
                     "target_WHIP": tgt_row["WHIP"]}
 
@@ -236,8 +213,8 @@ def build_pitcher_features(df: pd.DataFrame) -> pd.DataFrame:
             rate_cols = ["ERA", "WHIP"]
 
             for offset, yr in enumerate([y1, y2, y3], start=1):
-                pdata = df[(df["player"] == player) & (df["year"] == yr)]
-                if len(pdata) == 0:
+                row = seasons.get((player_id, yr))
+                if row is None:
                     feat[f"IP_{offset}"] = 0
                     feat[f"G_{offset}"] = 0
                     for col in rate_cols:
@@ -248,7 +225,6 @@ def build_pitcher_features(df: pd.DataFrame) -> pd.DataFrame:
                     feat[f"present_{offset}"] = 0
                 else:
                     has_any = True
-                    row = pdata.iloc[0]
                     ip = row["IP_num"]
                     feat[f"IP_{offset}"] = ip
                     feat[f"G_{offset}"] = row["G"]
@@ -275,7 +251,7 @@ def build_pitcher_features(df: pd.DataFrame) -> pd.DataFrame:
                 feat["ERA_trend"] = 0
 
             # 年齢
-            birthday = birthdays.get(player)
+            birthday = birthdays.get(player_id)
             feat["age"] = calc_age(birthday, target_year) if birthday is not None else np.nan
 
             rows.append(feat)
@@ -402,12 +378,12 @@ def compare_with_marcel(ml_results: dict, feat_test: pd.DataFrame,
                         marcel_path: str, marcel_col: str,
                         min_threshold: dict):
     """Marcel法との精度比較"""
-    marcel_df = pd.read_csv(marcel_path)
+    marcel_df = with_player_ids(load_table(marcel_path))
 
     # テストデータとMarcel予測をマージ
-    test_players = feat_test[["player", f"target_{target_col.replace('target_', '')}"]].copy()
-    test_players.columns = ["player", f"actual"]
-    merged = test_players.merge(marcel_df[["player", marcel_col]], on="player", how="inner")
+    test_players = feat_test[["player_id", f"target_{target_col.replace('target_', '')}"]].copy()
+    test_players.columns = ["player_id", f"actual"]
+    merged = test_players.merge(marcel_df[["player_id", marcel_col]], on="player_id", how="inner")
 
     if len(merged) == 0:
         print(f"\nMarcel比較: マージできる選手がいません")
@@ -418,7 +394,7 @@ def compare_with_marcel(ml_results: dict, feat_test: pd.DataFrame,
     print(f"Marcel:    MAE={marcel_mae:.4f}")
 
     # ML側も同じ選手に絞って比較
-    common_idx = feat_test["player"].isin(merged["player"])
+    common_idx = feat_test["player_id"].isin(merged["player_id"])
     for name, res in ml_results.items():
         if "pred" in res:
             pred_common = res["pred"][common_idx.values]
@@ -429,7 +405,7 @@ def compare_with_marcel(ml_results: dict, feat_test: pd.DataFrame,
 
 
 def main():
-    t0 = time.time()
+    timer = StepTimer("ml_projection")
     print("=" * 60)
     print("XGBoost/LightGBM NPB成績予測")
     print("=" * 60)
@@ -456,7 +432,7 @@ def main():
 
     h_results, X_test_h, y_test_h, feat_test_h = train_and_evaluate(
         feat_h, "target_OPS", "打者 OPS")
-    _log_elapsed("hitter_train", t0)
+    timer.mark("hitter_train")
 
     # metrics 初期化（打者）
     metrics = {
@@ -472,15 +448,15 @@ def main():
     df_h_marcel = marcel_load_h()
     proj_h_2025 = marcel_hitter(df_h_marcel, DATA_END_YEAR)
     if len(proj_h_2025) > 0:
-        test_players = feat_test_h[["player", "target_OPS"]].copy()
-        merged = test_players.merge(proj_h_2025[["player", "OPS"]], on="player", how="inner")
+        test_players = feat_test_h[["player_id", "target_OPS"]].copy()
+        merged = test_players.merge(proj_h_2025[["player_id", "OPS"]], on="player_id", how="inner")
         if len(merged) > 0:
             marcel_mae = mean_absolute_error(merged["target_OPS"], merged["OPS"])
             metrics["hitter"]["marcel"] = round(marcel_mae, 4)
             print(f"\n--- Marcel法との直接比較（共通 {len(merged)} 選手、PA>=100）---")
             print(f"Marcel:    MAE={marcel_mae:.4f}")
-            common_players = set(merged["player"])
-            common_mask = feat_test_h["player"].isin(common_players)
+            common_players = set(merged["player_id"])
+            common_mask = feat_test_h["player_id"].isin(common_players)
             for name, res in h_results.items():
                 if "pred" in res:
                     pred = res["pred"][common_mask.values]
@@ -496,7 +472,7 @@ def main():
 
     p_results, X_test_p, y_test_p, feat_test_p = train_and_evaluate(
         feat_p, "target_ERA", "投手 ERA")
-    _log_elapsed("pitcher_train", t0)
+    timer.mark("pitcher_train")
 
     metrics["pitcher"] = {k: round(v["mae"], 4) for k, v in p_results.items() if "mae" in v}
 
@@ -505,15 +481,15 @@ def main():
     df_p_marcel = marcel_load_p()
     proj_p_2025 = marcel_pitcher(df_p_marcel, DATA_END_YEAR)
     if len(proj_p_2025) > 0:
-        test_players_p = feat_test_p[["player", "target_ERA"]].copy()
-        merged_p = test_players_p.merge(proj_p_2025[["player", "ERA"]], on="player", how="inner")
+        test_players_p = feat_test_p[["player_id", "target_ERA"]].copy()
+        merged_p = test_players_p.merge(proj_p_2025[["player_id", "ERA"]], on="player_id", how="inner")
         if len(merged_p) > 0:
             marcel_mae_p = mean_absolute_error(merged_p["target_ERA"], merged_p["ERA"])
             metrics["pitcher"]["marcel"] = round(marcel_mae_p, 4)
             print(f"\n--- Marcel法との直接比較（共通 {len(merged_p)} 選手、IP>=30）---")
             print(f"Marcel:    MAE={marcel_mae_p:.4f}")
-            common_players_p = set(merged_p["player"])
-            common_mask_p = feat_test_p["player"].isin(common_players_p)
+            common_players_p = set(merged_p["player_id"])
+            common_mask_p = feat_test_p["player_id"].isin(common_players_p)
             for name, res in p_results.items():
                 if "pred" in res:
                     pred = res["pred"][common_mask_p.values]
@@ -545,7 +521,7 @@ def main():
             print(out.to_string(index=False))
 
             out_path = OUT_DIR / f"ml_hitters_{TARGET_YEAR}.csv"
-            feat_h_2026[["player", "team", "pred_OPS"]].to_csv(out_path, index=False, encoding="utf-8-sig")
+            save_table(feat_h_2026[["player", "team", "pred_OPS"]], out_path)
             print(f"Saved: {out_path}")
             for model_name, res in h_results.items():
                 if "model" in res:
@@ -570,7 +546,7 @@ def main():
             print(out.to_string(index=False))
 
             out_path = OUT_DIR / f"ml_pitchers_{TARGET_YEAR}.csv"
-            feat_p_2026[["player", "team", "pred_ERA"]].to_csv(out_path, index=False, encoding="utf-8-sig")
+            save_table(feat_p_2026[["player", "team", "pred_ERA"]], out_path)
             print(f"Saved: {out_path}")
             for model_name, res in p_results.items():
                 if "model" in res:
@@ -578,7 +554,7 @@ def main():
                     joblib.dump(res["model"], pkl_path)
                     print(f"Saved model: {pkl_path}")
 
-    _log_elapsed("predictions", t0)
+    timer.mark("predictions")
 
     metrics_path = METRICS_DIR / f"metrics_{TARGET_YEAR}.json"
     with open(metrics_path, "w", encoding="utf-8") as f:
@@ -586,7 +562,7 @@ def main():
     print(f"\nSaved metrics: {metrics_path}")
     print(json.dumps(metrics, ensure_ascii=False, indent=2))
 
-    _log_elapsed("ml_projection_total", t0)
+    timer.finish()
 
     if HAS_WANDB:
         log_dict = {}
@@ -615,24 +591,27 @@ def main():
 def build_hitter_features_for_prediction(df: pd.DataFrame, target_year: int) -> pd.DataFrame:
     """予測用: ターゲット年のデータなしで特徴量を構築"""
     birthdays = load_birthdays()
+    seasons = _season_rows(df)
     saber = load_sabermetrics()
     has_saber = len(saber) > 0
+    saber_rows = _season_rows(saber) if has_saber else {}
     y1, y2, y3 = target_year - 1, target_year - 2, target_year - 3
     rate_cols = ["AVG", "OBP", "SLG", "OPS", "RC27", "XR27"]
     count_cols = ["HR", "RBI", "SB", "BB", "SO", "H"]
 
     # 過去3年にいた全選手
     past = df[df["year"].isin([y1, y2, y3])]
-    players = past["player"].unique()
+    # 選手IDごとに最新の表記
+    players = past.groupby("player_id", sort=False)["player"].last()
     rows = []
 
-    for player in players:
-        feat = {"player": player, "target_year": target_year}
+    for player_id, player in players.items():
+        feat = {"player": player, "player_id": player_id, "target_year": target_year}
         has_any = False
 
         for offset, yr in enumerate([y1, y2, y3], start=1):
-            pdata = df[(df["player"] == player) & (df["year"] == yr)]
-            if len(pdata) == 0:
+            row = seasons.get((player_id, yr))
+            if row is None:
                 feat[f"PA_{offset}"] = 0
                 feat[f"G_{offset}"] = 0
                 for col in rate_cols:
@@ -642,7 +621,6 @@ def build_hitter_features_for_prediction(df: pd.DataFrame, target_year: int) ->
                 feat[f"present_{offset}"] = 0
             else:
                 has_any = True
-                row = pdata.iloc[0]
                 pa = row["PA"]
                 feat[f"PA_{offset}"] = pa
                 feat[f"G_{offset}"] = row["G"]
@@ -658,12 +636,11 @@ def build_hitter_features_for_prediction(df: pd.DataFrame, target_year: int) ->
 
         # wOBA/wRC+特徴量
         if has_saber:
-            player_norm = _norm_name(player)
             for offset, yr in enumerate([y1, y2, y3], start=1):
-                sdata = saber[(saber["player_norm"] == player_norm) & (saber["year"] == yr)]
-                if len(sdata) > 0:
-                    feat[f"wOBA_{offset}"] = sdata.iloc[0]["wOBA"]
-                    feat[f"wRC+_{offset}"] = sdata.iloc[0]["wRC+"]
+                srow = saber_rows.get((player_id, yr))
+                if srow is not None:
+                    feat[f"wOBA_{offset}"] = srow["wOBA"]
+                    feat[f"wRC+_{offset}"] = srow["wRC+"]
                 else:
                     feat[f"wOBA_{offset}"] = np.nan
                     feat[f"wRC+_{offset}"] = np.nan
@@ -677,7 +654,7 @@ def build_hitter_features_for_prediction(df: pd.DataFrame, target_year: int) ->
         feat["years_present"] = feat["present_1"] + feat["present_2"] + feat["present_3"]
         feat["OPS_trend"] = (feat["OPS_1"] - feat["OPS_2"]) if not np.isnan(feat.get("OPS_1", np.nan)) and not np.isnan(feat.get("OPS_2", np.nan)) else 0
 
-        birthday = birthdays.get(player)
+        birthday = birthdays.get(player_id)
         feat["age"] = calc_age(birthday, target_year) if birthday is not None else np.nan
 
         if "team" not in feat:
@@ -689,20 +666,22 @@ def build_hitter_features_for_prediction(df: pd.DataFrame, target_year: int) ->
 
 def build_pitcher_features_for_prediction(df: pd.DataFrame, target_year: int) -> pd.DataFrame:
     birthdays = load_birthdays()
+    seasons = _season_rows(df)
     y1, y2, y3 = target_year - 1, target_year - 2, target_year - 3
     rate_cols = ["ERA", "WHIP"]
 
     past = df[df["year"].isin([y1, y2, y3])]
-    players = past["player"].unique()
+    # 選手IDごとに最新の表記
+    players = past.groupby("player_id", sort=False)["player"].last()
     rows = []
 
-    for player in players:
-        feat = {"player": player, "target_year": target_year}
+    for player_id, player in players.items():
+        feat = {"player": player, "player_id": player_id, "target_year": target_year}
         has_any = False
 
         for offset, yr in enumerate([y1, y2, y3], start=1):
-            pdata = df[(df["player"] == player) & (df["year"] == yr)]
-            if len(pdata) == 0:
+            row = seasons.get((player_id, yr))
+            if row is None:
                 feat[f"IP_{offset}"] = 0
                 feat[f"G_{offset}"] = 0
                 for col in rate_cols:
@@ -713,7 +692,6 @@ def build_pitcher_features_for_prediction(df: pd.DataFrame, target_year: int) ->
                 feat[f"present_{offset}"] = 0
             else:
                 has_any = True
-                row = pdata.iloc[0]
                 ip = row["IP_num"]
                 feat[f"IP_{offset}"] = ip
                 feat[f"G_{offset}"] = row["G"]
@@ -733,7 +711,7 @@ def build_pitcher_features_for_prediction(df: pd.DataFrame, target_year: int) ->
         feat["years_present"] = feat["present_1"] + feat["present_2"] + feat["present_3"]
         feat["ERA_trend"] = (feat["ERA_1"] - feat["ERA_2"]) if not np.isnan(feat.get("ERA_1", np.nan)) and not np.isnan(feat.get("ERA_2", np.nan)) else 0
 
-        birthday = birthdays.get(player)
+        birthday = birthdays.get(player_id)
         feat["age"] = calc_age(birthday, target_year) if birthday is not None else np.nan
 
         if "team" not in feat:
@@ -0,0 +1,423 @@
+"""
+データ更新パイプラインの実行（入出力のハッシュで変わった段階だけ実行、独立な段階は並行）
+
+これまでは取得 → セイバー → ピタゴラス → パークファクター → Marcel → ML → ベイズ → チームシミュレーション
+→ 過去年の予測 → ダッシュボードバンドル の各スクリプトを決まった順に全部実行していた。ここでは
+段階ごとに入力ファイル・出力ファイルを宣言し、
+
+  - 依存関係は「ある段階の入力を別の段階が出力する」ことから決める（同じファイルを出力する段階は宣言順に直列）
+  - 入力（データ・スクリプトと、そこから import するリポジトリ内のモジュール・対象年度）の SHA-1 が
+    前回の実行と同じで、出力も前回書いたままなら実行しない
+  - 依存の終わった段階から並行に実行する（例: パークファクターと Marcel は同時に走る）
+  - 最後に段階ごとの所要時間（スクリプト内の StepTimer の区切りを含む）を表示する
+
+前回の入出力のハッシュは data/pipeline_state.json に保存する（data/ と一緒にコミットされるので、
+CI の新しいチェックアウトでも変わっていない段階は実行しない）。取得（fetch_*・順位表）はネットワーク上の
+データが入力なので --fetch を付けたときだけ実行し、付けなければ出力済みのCSVを入力として扱う。
+
+各スクリプトは単独でも従来どおり動く。スクリプト内の区切り（step_timer.StepTimer、
+これまでの _log_elapsed）はパイプラインから実行したときランナーに渡され、レポートに含まれる。
+
+Usage:
+  python pipeline.py                    # 入力が変わった段階だけ実行
+  python pipeline.py --fetch            # 取得から実行
+  python pipeline.py --dry-run          # 実行する段階と理由を表示するだけ
+  python pipeline.py marcel ml --force  # 指定した段階を入力にかかわらず実行（それ以外は変わっていれば実行）
+  python pipeline.py --jobs 1           # 直列に実行
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from config import DATA_END_YEAR, TARGET_YEAR
+from step_timer import BUDGET_MIN, STEPS_ENV
+
+ROOT = Path(__file__).parent
+STATE_PATH = ROOT / "data" / "pipeline_state.json"
+STATE_VERSION = 1
+
+_E, _T = DATA_END_YEAR, TARGET_YEAR
+HITTERS = f"data/raw/npb_hitters_2015_{_E}.csv"
+PITCHERS = f"data/raw/npb_pitchers_2015_{_E}.csv"
+DETAILED = f"data/raw/npb_batting_detailed_2015_{_E}.csv"
+ROSTERS = f"data/raw/npb_rosters_2018_{_E}.csv"
+STANDINGS = f"data/raw/npb_standings_2015_{_E}.csv"
+GAMES = "data/raw/npb_games_*.csv"
+PLAYER_IDS = "data/raw/npb_player_ids.csv"
+STORE_MANIFEST = "data/raw/store/manifest.json"
+SABERMETRICS = f"data/projections/npb_sabermetrics_2015_{_E}.csv"
+PYTHAGOREAN = f"data/projections/pythagorean_2015_{_E}.csv"
+PARK_FACTORS = "data/projections/npb_park_factors.csv"
+MARCEL = [f"data/projections/marcel_hitters_{_T}.csv", f"data/projections/marcel_pitchers_{_T}.csv"]
+ML = [f"data/projections/ml_hitters_{_T}.csv", f"data/projections/ml_pitchers_{_T}.csv"]
+BAYES = [f"data/projections/bayes_hitters_{_T}.csv", f"data/projections/bayes_pitchers_{_T}.csv"]
+FOREIGN = [f"data/projections/foreign_hitters_{_T}.csv", f"data/projections/foreign_pitchers_{_T}.csv"]
+
+
+class Stage:
+    """パイプラインの1段階（スクリプト1本）
+
+    inputs / outputs はリポジトリ相対のパス（glob 可）。スクリプトとそこから import する
+    リポジトリ内のモジュールは自動で入力に加わる。network=True の段階（取得）は --fetch のときだけ実行する。
+    """
+
+    def __init__(self, name: str, script: str, inputs: list[str] | None = None,
+                 outputs: list[str] | None = None, args: list[str] | None = None,
+                 network: bool = False):
+        self.name = name
+        self.script = script
+        self.inputs = list(inputs or [])
+        self.outputs = list(outputs or [])
+        self.args = list(args or [])
+        self.network = network
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name})"
+
+
+STAGES = [
+    Stage("fetch_stats", "fetch_npb_data.py",
+          outputs=[HITTERS, PITCHERS, PLAYER_IDS, STORE_MANIFEST], network=True),
+    Stage("fetch_detailed", "fetch_npb_detailed.py",
+          outputs=[DETAILED, PLAYER_IDS, STORE_MANIFEST], network=True),
+    Stage("fetch_rosters", "fetch_rosters.py",
+          outputs=[ROSTERS, PLAYER_IDS, STORE_MANIFEST], network=True),
+    Stage("fetch_games", "fetch_npb_games.py", args=["--incremental"],
+          outputs=[GAMES, STORE_MANIFEST], network=True),
+    Stage("sabermetrics", "sabermetrics.py",
+          inputs=[DETAILED, PLAYER_IDS], outputs=[SABERMETRICS]),
+    # 順位表の取得（ストアに無い年度だけ）とピタゴラス勝率の計算
+    Stage("pythagorean", "pythagorean.py",
+          outputs=[STANDINGS, STORE_MANIFEST, PYTHAGOREAN], network=True),
+    Stage("park_factors", "calc_park_factors.py",
+          inputs=[GAMES], outputs=[PARK_FACTORS, "data/raw/store/park_totals.csv"]),
+    Stage("marcel", "marcel_projection.py",
+          inputs=[HITTERS, PITCHERS, PLAYER_IDS], outputs=MARCEL),
+    Stage("ml", "ml_projection.py",
+          inputs=[HITTERS, PITCHERS, SABERMETRICS, PLAYER_IDS],
+          outputs=ML + [f"data/metrics/metrics_{_T}.json", f"data/models/*_{_T}.pkl"]),
+    Stage("bayes", "bayes_projection.py",
+          inputs=[PITCHERS, SABERMETRICS, PLAYER_IDS, "data/bayes/posteriors.json",
+                  "data/foreign/foreign_players_master.csv", "data/foreign/foreign_prev_stats.csv"]
+          + MARCEL + ML,
+          outputs=BAYES + FOREIGN),
+    Stage("team_simulation", "team_simulation.py",
+          inputs=BAYES + FOREIGN + [PARK_FACTORS],
+          outputs=[f"data/projections/team_sim_{_T}.csv", f"data/projections/team_sim_{_T}.json"]),
+    Stage("historical", "generate_historical_projections.py",
+          inputs=[HITTERS, PITCHERS, ROSTERS, PLAYER_IDS, PYTHAGOREAN, SABERMETRICS],
+          outputs=["data/projections/marcel_team_historical.csv"]),
+    Stage("dashboard_bundle", "dashboard_bundle.py",
+          inputs=MARCEL + BAYES + FOREIGN + [SABERMETRICS, PITCHERS, PYTHAGOREAN,
+                                             "data/projections/marcel_team_historical.csv",
+                                             f"data/projections/team_sim_{_T}.csv", "roster_current.py"],
+          outputs=["data/dashboard/manifest.json", "data/dashboard/*.arrow"]),
+]
+
+
+# ---------------------------------------------------------------------------
+# 入出力のハッシュ
+# ---------------------------------------------------------------------------
+
+def _expand(patterns: list[str]) -> list[str]:
+    """glob を展開したリポジトリ相対パス（無いファイルはパターンのまま残す）"""
+    paths = []
+    for pattern in patterns:
+        if any(ch in pattern for ch in "*?["):
+            paths += sorted(p.relative_to(ROOT).as_posix() for p in ROOT.glob(pattern))
+        else:
+            paths.append(pattern)
+    return sorted(set(paths))
+
+
+def _file_hash(path: str) -> str | None:
+    try:
+        return hashlib.sha1((ROOT / path).read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def local_modules(script: str) -> list[str]:
+    """スクリプトと、そこから（再帰的に）import するリポジトリ直下のモジュール"""
+    seen: list[str] = []
+    todo = [script]
+    while todo:
+        path = todo.pop()
+        if path in seen:
+            continue
+        seen.append(path)
+        try:
+            tree = ast.parse((ROOT / path).read_text(encoding="utf-8"))
+        except (OSError, SyntaxError):
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [a.name for a in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                module = name.split(".")[0] + ".py"
+                if (ROOT / module).exists():
+                    todo.append(module)
+    return sorted(seen)
+
+
+def input_hashes(stage: Stage) -> dict[str, str | None]:
+    """{入力のパス: SHA-1}（スクリプト・モジュールと対象年度を含む）"""
+    hashes = {path: _file_hash(path) for path in _expand(stage.inputs) + local_modules(stage.script)}
+    hashes["env:DATA_END_YEAR"] = str(DATA_END_YEAR)
+    hashes["args"] = " ".join(stage.args)
+    return hashes
+
+
+def output_hashes(stage: Stage) -> dict[str, str | None]:
+    return {path: _file_hash(path) for path in _expand(stage.outputs)}
+
+
+def load_state(path: Path = STATE_PATH) -> dict:
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"version": STATE_VERSION, "stages": {}}
+    return state if state.get("version") == STATE_VERSION else {"version": STATE_VERSION, "stages": {}}
+
+
+def save_state(state: dict, path: Path = STATE_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+    tmp.replace(path)
+
+
+def stale_reasons(stage: Stage, recorded: dict | None) -> list[str]:
+    """実行が必要な理由（空なら前回から何も変わっていない）"""
+    if not recorded:
+        return ["前回の記録なし"]
+    reasons = []
+    old_inputs = recorded.get("inputs", {})
+    for path, digest in input_hashes(stage).items():
+        if old_inputs.get(path) != digest:
+            reasons.append(f"入力が変更: {path}")
+    for path in set(old_inputs) - set(input_hashes(stage)):
+        reasons.append(f"入力が削除: {path}")
+    outputs = output_hashes(stage)
+    if not outputs or any(d is None for d in outputs.values()):
+        reasons.append("出力が無い")
+    elif outputs != recorded.get("outputs"):
+        reasons.append("出力が前回の実行後に変更")
+    return reasons
+
+
+# ---------------------------------------------------------------------------
+# 依存関係と実行
+# ---------------------------------------------------------------------------
+
+def dependencies(stages: list[Stage]) -> dict[str, list[str]]:
+    """段階 → 先に終わっている必要がある段階
+
+    入力を出力する段階と、同じファイルを出力する段階（宣言順で前のもの）に依存する。
+    """
+    def overlaps(a: list[str], b: list[str]) -> bool:
+        return bool(set(_expand(a)) & set(_expand(b))) or bool(set(a) & set(b))
+
+    deps = {}
+    for i, stage in enumerate(stages):
+        deps[stage.name] = [
+            other.name for j, other in enumerate(stages)
+            if other is not stage and (overlaps(stage.inputs, other.outputs)
+                                       or (j < i and overlaps(stage.outputs, other.outputs)))
+        ]
+    return deps
+
+
+def _run_script(stage: Stage) -> dict:
+    """スクリプトを別プロセスで実行し、(終了コード, 出力, 所要時間, 区切り) を返す"""
+    with tempfile.NamedTemporaryFile(prefix=f"npb-{stage.name}-", suffix=".jsonl", delete=False) as f:
+        steps_path = f.name
+    env = {**os.environ, STEPS_ENV: steps_path, "PYTHONUNBUFFERED": "1"}
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, stage.script, *stage.args], cwd=ROOT, env=env,
+                          capture_output=True, text=True, encoding="utf-8", errors="replace")
+    sec = time.perf_counter() - t0
+    steps = []
+    try:
+        for line in Path(steps_path).read_text(encoding="utf-8").splitlines():
+            steps += json.loads(line)["steps"]
+    except (OSError, ValueError):
+        pass
+    Path(steps_path).unlink(missing_ok=True)
+    return {"returncode": proc.returncode, "output": proc.stdout + proc.stderr, "sec": sec, "steps": steps}
+
+
+class PipelineRunner:
+    """依存の終わった段階から並行に実行し、段階ごとの結果を集める"""
+
+    def __init__(self, stages: list[Stage] = STAGES, fetch: bool = False, force: set[str] | None = None,
+                 only: set[str] | None = None, jobs: int = 4, state_path: Path = STATE_PATH,
+                 quiet: bool = False):
+        self.stages = stages
+        self.fetch = fetch
+        self.force = force or set()
+        self.only = only
+        self.jobs = max(1, jobs)
+        self.state_path = state_path
+        self.quiet = quiet
+        self.deps = dependencies(stages)
+        self.results: dict[str, dict] = {}
+
+    def selected(self, stage: Stage) -> bool:
+        if self.only is not None and stage.name not in self.only:
+            return False
+        return self.fetch or not stage.network
+
+    def plan(self) -> dict[str, list[str]]:
+        """実行せずに、段階 → 実行する理由（空なら省略、None なら対象外）
+
+        run() と同じ判定を今の入出力に対して行う。上流の段階が実行されて出力が変われば、
+        ここで省略と出た段階も run() では実行される。
+        """
+        state = load_state(self.state_path)["stages"]
+        will_run: dict[str, list[str] | None] = {}
+        for stage in self.stages:
+            if not self.selected(stage):
+                will_run[stage.name] = None
+                continue
+            will_run[stage.name] = self._reasons(stage, state.get(stage.name))
+        return will_run
+
+    def run(self) -> bool:
+        state = load_state(self.state_path)
+        started = time.perf_counter()
+        pending = [s for s in self.stages]
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or running:
+                for stage in list(pending):
+                    status = self._ready(stage)
+                    if status == "wait":
+                        continue
+                    pending.remove(stage)
+                    if status != "ready":
+                        self.results[stage.name] = {"status": status, "sec": 0.0, "steps": []}
+                        continue
+                    reasons = self._reasons(stage, state["stages"].get(stage.name))
+                    if not reasons:
+                        self.results[stage.name] = {"status": "skipped", "sec": 0.0, "steps": []}
+                        continue
+                    if not self.quiet:
+                        print(f"▶ {stage.name}: {reasons[0]}" + (f" ほか{len(reasons) - 1}件" if len(reasons) > 1 else ""),
+                              flush=True)
+                    future = pool.submit(_run_script, stage)
+                    running[future] = (stage, time.perf_counter() - started)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, start = running.pop(future)
+                    result = future.result()
+                    result["start"] = start
+                    result["status"] = "ok" if result["returncode"] == 0 else "failed"
+                    self.results[stage.name] = result
+                    if not self.quiet:
+                        print(f"\n{'=' * 20} {stage.name} ({result['sec']:.1f}s, {result['status']}) {'=' * 20}")
+                        print(result["output"].rstrip(), flush=True)
+                    if result["status"] == "ok":
+                        # 出力を書いた後の入力で記録する（実行中に入力が変わっていれば次回もう一度実行される）
+                        state["stages"][stage.name] = {
+                            "inputs": input_hashes(stage),
+                            "outputs": output_hashes(stage),
+                        }
+                        save_state(state, self.state_path)
+        self.wall = time.perf_counter() - started
+        return all(r["status"] not in ("failed", "blocked") for r in self.results.values())
+
+    def _ready(self, stage: Stage) -> str:
+        if not self.selected(stage):
+            return "external"
+        for dep in self.deps[stage.name]:
+            result = self.results.get(dep)
+            if result is None:
+                return "wait"
+            if result["status"] in ("failed", "blocked"):
+                return "blocked"
+        return "ready"
+
+    def _reasons(self, stage: Stage, recorded: dict | None) -> list[str]:
+        if stage.name in self.force:
+            return ["--force"]
+        if stage.network:
+            return ["取得（--fetch）"]
+        return stale_reasons(stage, recorded)
+
+    def report(self) -> str:
+        """段階ごとの所要時間の表"""
+        lines = [f"{'stage':<18}{'status':<10}{'start':>8}{'sec':>9}"]
+        for stage in self.stages:
+            r = self.results.get(stage.name, {"status": "-", "sec": 0.0, "steps": []})
+            start = f"{r['start']:.1f}" if "start" in r else ""
+            sec = f"{r['sec']:.1f}" if r["status"] in ("ok", "failed") else ""
+            lines.append(f"{stage.name:<18}{r['status']:<10}{start:>8}{sec:>9}")
+            for label, step_sec in r.get("steps", []):
+                lines.append(f"  {label:<26}{step_sec:>17.1f}")
+        serial = sum(r["sec"] for r in self.results.values())
+        counts = {s: sum(r["status"] == s for r in self.results.values())
+                  for s in ("ok", "skipped", "failed", "blocked")}
+        lines.append(f"\n経過 {self.wall:.1f}s（各段階の合計 {serial:.1f}s）  "
+                     + "  ".join(f"{k} {v}" for k, v in counts.items() if v))
+        if self.wall / 60 > BUDGET_MIN * 0.8:
+            lines.append(f"WARNING: {self.wall / 60:.0f}/{BUDGET_MIN} min -- timeout risk!")
+        return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="入力の変わった段階だけを依存順・並行に実行")
+    parser.add_argument("stages", nargs="*", help="実行対象の段階（省略時は全段階）")
+    parser.add_argument("--fetch", action="store_true", help="取得（fetch_*・順位表）も実行する")
+    parser.add_argument("--force", action="store_true", help="対象の段階を入力にかかわらず実行する")
+    parser.add_argument("--jobs", type=int, default=4, help="同時に実行する段階の数")
+    parser.add_argument("--dry-run", action="store_true", help="実行する段階と理由を表示するだけ")
+    args = parser.parse_args()
+
+    names = [s.name for s in STAGES]
+    unknown = [s for s in args.stages if s not in names]
+    if unknown:
+        parser.error(f"未知の段階: {', '.join(unknown)}（{', '.join(names)}）")
+    only = set(args.stages) or None
+    force = (set(args.stages) or set(names)) if args.force else set()
+    fetch = args.fetch or any(s.network for s in STAGES if s.name in args.stages)
+    runner = PipelineRunner(fetch=fetch, force=force, only=only, jobs=args.jobs)
+
+    if args.dry_run:
+        plan = runner.plan()
+        for name, reasons in plan.items():
+            if reasons is None:
+                print(f"  {name:<18} 対象外")
+            elif not reasons:
+                upstream = [d for d in runner.deps[name] if plan.get(d)]
+                print(f"  {name:<18} スキップ（変更なし）"
+                      + (f" ※{', '.join(upstream)} の出力が変われば実行" if upstream else ""))
+            else:
+                print(f"  {name:<18} 実行: " + "; ".join(reasons[:3])
+                      + (f" ほか{len(reasons) - 3}件" if len(reasons) > 3 else ""))
+        return
+
+    ok = runner.run()
+    print("\n=== パイプライン 段階別の所要時間 ===")
+    print(runner.report())
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+選手名の正規化と検索インデックス
+
+正規化ルール（異体字の統一・スペースの扱い）はこれまで sabermetrics / roster_current /
+dashboard_bundle（旧 streamlit_app）/ api にそれぞれコピーされていたものを1か所にまとめたもの。
+
+  normalize_name("木浪　聖也")        → "木浪 聖也"   （表示用: 全角スペース→半角、前後空白除去）
+  normalize_player_name("*髙橋 宏斗") → "高橋 宏斗"   （取り込み用: 先頭の * 除去 + 異体字統一）
+  fuzzy_key("髙橋　宏斗")             → "高橋宏斗"     （照合用: スペース除去 + 異体字統一）
+  player_key("+若林　晃弘")           → "若林晃弘"     （選手IDの名寄せ用: 照合キー + NFKC + npb.jp の先頭の印 * / + を除去）
+  search_key("ﾓｲﾈﾛ")                  → "もいねろ"     （検索用: 照合キー + 全角/半角・カタカナ/ひらがな・大小文字を畳む）
+
+PlayerSearchIndex は選手名の一覧から検索キーを前計算し、
+  - 前方一致: ソート済みキーの二分探索
+  - 部分一致: 文字 1-gram / 2-gram の転置リストの積集合 → 候補だけ文字列照合
+  - 誤字許容: 共通文字数で候補を絞ってから、キーの部分文字列との編集距離で順位付け
+で引く。数百〜千人規模なら候補の提示（suggest）は 1 ミリ秒未満で返る。
+
+読み（かな・ローマ字）は pykakasi があれば漢字名から生成して検索キーに加える
+（"まき" や "maki" で 牧 秀悟 が引ける）。無い環境ではカナ表記の名前だけが
+ひらがな・カタカナどちらでも引ける。
+"""
+
+import bisect
+import unicodedata
+
+try:
+    import pykakasi
+    HAS_PYKAKASI = True
+except ImportError:
+    HAS_PYKAKASI = False
+
+# 異体字統一マップ
+VARIANT_MAP = str.maketrans("﨑髙濵澤邊齋齊國島嶋櫻", "崎高浜沢辺斎斉国島島桜")
+
+# カタカナ → ひらがな（ァ..ヶ を 0x60 ずらす）
+_KANA_FOLD = {c: c - 0x60 for c in range(ord("ァ"), ord("ヶ") + 1)}
+
+
+def normalize_name(name: str) -> str:
+    """全角スペース→半角、前後空白除去"""
+    return str(name).replace("\u3000", " ").strip()
+
+
+def normalize_player_name(name: str) -> str:
+    """全角スペース→半角、先頭の * を除去、異体字を統一"""
+    return normalize_name(name).lstrip("*").strip().translate(VARIANT_MAP)
+
+
+def fuzzy_key(name: str) -> str:
+    """スペース除去（全角・半角両方） + 異体字を統一"""
+    return str(name).replace("\u3000", "").replace(" ", "").strip().translate(VARIANT_MAP)
+
+
+def player_key(name: str) -> str:
+    """選手IDの名寄せキー（player_registry.py）。照合キーを NFKC で畳み（互換漢字・全角英字）、先頭の * / + を除く"""
+    return unicodedata.normalize("NFKC", fuzzy_key(name)).lstrip("*+")
+
+
+def search_key(name: str) -> str:
+    """照合キーに加えて 全角/半角・カタカナ/ひらがな・大文字/小文字 の違いを無視するキー"""
+    return unicodedata.normalize("NFKC", fuzzy_key(name)).translate(_KANA_FOLD).lower()
+
+
+_kakasi = None
+
+
+def reading_keys(name: str) -> list[str]:
+    """名前の読み（ひらがな・ヘボン式ローマ字）の検索キー。pykakasi が無ければ空"""
+    global _kakasi
+    if not HAS_PYKAKASI:
+        return []
+    if _kakasi is None:
+        _kakasi = pykakasi.kakasi()
+    parts = _kakasi.convert(fuzzy_key(name))
+    keys = {search_key("".join(p["hira"] for p in parts)),
+            search_key("".join(p["hepburn"] for p in parts))}
+    return sorted(k for k in keys if k)
+
+
+def _grams(key: str) -> set[str]:
+    """1文字と隣接2文字の集合（短い名前・1文字クエリにも使えるよう 1-gram も持つ）"""
+    return set(key) | {key[i:i + 2] for i in range(len(key) - 1)}
+
+
+def _substring_distance(query: str, key: str, limit: int) -> int:
+    """query と key の部分文字列との最小編集距離（limit を超えたら limit + 1）"""
+    prev = [0] * (len(key) + 1)   # key 側の先頭はどこから始めてもよい
+    for i, qc in enumerate(query, 1):
+        cur = [i] + [0] * len(key)
+        for j, kc in enumerate(key, 1):
+            cur[j] = min(prev[j - 1] + (qc != kc), prev[j] + 1, cur[j - 1] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return min(min(prev), limit + 1)   # key 側の末尾もどこで終わってもよい
+
+
+class PlayerSearchIndex:
+    """選手名の検索インデックス（名前の一覧から作り、以後は読み取り専用）
+
+    names は表示用の選手名（重複可、最初の出現順を保つ）。
+    readings に {選手名: [読み, ...]} を渡すと、その読みでも引ける。
+    """
+
+    def __init__(self, names, readings: dict[str, list[str]] | None = None):
+        self.names: list[str] = list(dict.fromkeys(str(n) for n in names))
+        keys_per_name: list[list[str]] = []
+        for name in self.names:
+            keys = [search_key(name)]
+            extra = readings.get(name, []) if readings else reading_keys(name)
+            keys += [search_key(r) for r in extra if search_key(r) not in keys]
+            keys_per_name.append([k for k in keys if k])
+        self.keys = keys_per_name
+
+        # 前方一致用: (キー, 名前番号) をキー順に並べたもの
+        pairs = sorted((k, i) for i, keys in enumerate(keys_per_name) for k in keys)
+        self._sorted_keys = [k for k, _ in pairs]
+        self._sorted_ids = [i for _, i in pairs]
+
+        # 部分一致・誤字許容用: n-gram → 名前番号の集合
+        postings: dict[str, set[int]] = {}
+        for i, keys in enumerate(keys_per_name):
+            for k in keys:
+                for g in _grams(k):
+                    postings.setdefault(g, set()).add(i)
+        self._postings = {g: frozenset(ids) for g, ids in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _prefix_ids(self, q: str) -> set[int]:
+        lo = bisect.bisect_left(self._sorted_keys, q)
+        hi = bisect.bisect_left(self._sorted_keys, q + "\U0010ffff")
+        return set(self._sorted_ids[lo:hi])
+
+    def _substring_ids(self, q: str) -> set[int]:
+        grams = [q[i:i + 2] for i in range(len(q) - 1)] or [q]
+        lists = sorted((self._postings.get(g, frozenset()) for g in set(grams)), key=len)
+        ids = set(lists[0]).intersection(*lists[1:])
+        return {i for i in ids if any(q in k for k in self.keys[i])}
+
+    def matches(self, query: str) -> list[str]:
+        """名前（または読み）に query を含む選手名（元の出現順）"""
+        q = search_key(query)
+        if not q:
+            return []
+        return [self.names[i] for i in sorted(self._substring_ids(q))]
+
+    def suggest(self, query: str, limit: int = 8, typos: bool = True) -> list[str]:
+        """入力途中の query に対する候補を良い順に返す。
+
+        完全一致 → 前方一致 → 部分一致 → 誤字許容（編集距離順、先頭の文字が合うものを優先）。
+        同順位は短い名前・元の順。
+        typos=True なら、一致が limit 件に満たないとき誤字許容の候補で埋める
+        （4文字以下は1文字、それより長ければ2文字までの違いを許す）。
+        """
+        q = search_key(query)
+        if not q or limit <= 0:
+            return []
+
+        ranked: dict[int, tuple] = {}
+        for i in self._prefix_ids(q):
+            exact = q in self.keys[i]
+            ranked[i] = (0 if exact else 1, 0, 0, len(self.keys[i][0]), i)
+        for i in self._substring_ids(q):
+            ranked.setdefault(i, (2, 0, 0, len(self.keys[i][0]), i))
+
+        if typos and len(ranked) < limit and len(q) >= 2:
+            max_typos = 1 if len(q) <= 4 else 2
+            # 編集距離 d 以内なら query の文字のうち少なくとも len(set(q)) - d 種類は共有している
+            shared: dict[int, int] = {}
+            for c in set(q):
+                for i in self._postings.get(c, ()):
+                    shared[i] = shared.get(i, 0) + 1
+            need = len(set(q)) - max_typos
+            for i, n in shared.items():
+                if n < need or i in ranked:
+                    continue
+                d = min(_substring_distance(q, k, max_typos) for k in self.keys[i])
+                if d <= max_typos:
+                    head = 0 if any(k[0] == q[0] for k in self.keys[i]) else 1
+                    ranked[i] = (3, d, head, len(self.keys[i][0]), i)
+
+        best = sorted(ranked.values())[:limit]
+        return [self.names[r[-1]] for r in best]
+
+    def filter(self, df, query: str, column: str = "player"):
+        """df から query に一致する選手の行だけを返す（行の順序は df のまま）"""
+        names = self.matches(query)
+        if not names:
+            return df.iloc[0:0]
+        return df[df[column].isin(names)]
@@ -0,0 +1,477 @@
+"""
+選手IDレジストリ（選手名の名寄せを1か所で行い、安定した整数IDを振る）
+
+これまでは各段階が選手名の文字列で結合しており、全角/半角スペース・異体字（﨑/崎）・
+npb.jp の先頭の印（*/+）の違いで結合が漏れ、正規化の文字列処理も段階ごとに繰り返していた。
+ここでは名鑑・生年月日・選手プロフィール・成績の選手名を player_names.player_key で名寄せし、
+キーごとに整数IDを振って data/raw/npb_player_ids.csv に保存する。
+
+  player_id   安定した整数ID（一度振ったIDは変えない。新しい選手は末尾に追加）
+  key         名寄せキー（player_key）
+  player      表示名（最も新しい年度の表記）
+  birthday    生年月日（npb_player_birthdays.csv、無ければ選手プロフィール）
+  first_year / last_year  成績・名鑑に現れた最初と最後の年度（--build 時点。取り込みで追加した選手は追加時の年度）
+  teams       同名の別人がいるキーだけ、選手プロフィールに現れた年度と球団（"2024:巨人"、| 区切り）
+
+取り込み（raw_store.save_raw）は player 列のある行に player_id を付けて保存し、
+read_raw も player_id が無い・欠けている行に付けて返す。以降の結合は player_id の整数で行う。
+
+同じキーでも生年月日が異なる選手（同姓同名・同名の外国人選手）は別の行・別のIDにする。
+キーの最初の行（IDが最も小さい行）を代表とし、行ごとの選手の決め方は
+  1. 生年月日がある行（生年月日ファイル・選手プロフィール）はその生年月日の選手
+  2. 年度と球団がある行（成績・名鑑）は teams に同じ年度・球団がある選手、
+     無ければ同じ球団に最も近い年度でいた選手（1人に絞れるときだけ。年度の無い予測結果は球団だけ）
+  3. それ以外は代表の選手
+
+Usage:
+  python player_registry.py           # 件数・未登録の選手名・同名の別人
+  python player_registry.py --build   # data/raw の全データから作成（既存のIDは保つ）
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from player_names import player_key
+
+RAW_DIR = Path(__file__).parent / "data" / "raw"
+PLAYER_IDS_NAME = "npb_player_ids.csv"
+COLUMNS = ["player_id", "key", "player", "birthday", "first_year", "last_year", "teams"]
+
+# 名寄せの入力（ファイル名のパターン → 選手名の列）
+SOURCES = {
+    "npb_rosters_*.csv": "player",
+    "npb_hitters_*.csv": "player",
+    "npb_pitchers_*.csv": "player",
+    "npb_batting_detailed_*.csv": "player",
+    "npb_players_profile_*.csv": "選手名",
+}
+BIRTHDAYS_NAME = "npb_player_birthdays.csv"
+
+
+class _Entry:
+    """名寄せキーが同じ選手の1人分（ID・生年月日・選手プロフィールに現れた年度と球団）"""
+
+    __slots__ = ("pid", "birthday", "teams")
+
+    def __init__(self, pid: int, birthday: str | None, teams: frozenset):
+        self.pid = pid
+        self.birthday = birthday
+        self.teams = teams
+
+
+class PlayerRegistry:
+    """選手名 → player_id
+
+    registry = PlayerRegistry.load()
+    df = registry.stamp(df)          # player 列の隣に player_id 列を付ける
+    registry.save()                  # 新しい選手を登録したら保存
+    """
+
+    def __init__(self, table: pd.DataFrame | None = None, path: Path | None = None):
+        self.path = path
+        table = table if table is not None else pd.DataFrame(columns=COLUMNS)
+        if "teams" not in table.columns:
+            table = table.assign(teams=pd.NA)
+        self.table = table.reset_index(drop=True)
+        self._ids: dict[str, int] = {}                  # 名寄せキー → 代表のID
+        self._entries: dict[str, list[_Entry]] = {}     # 名寄せキー → 同じキーの選手（IDの順）
+        self._max_id = 0
+        for row in self.table.sort_values("player_id").itertuples(index=False):
+            self._add_entry(row.key, int(row.player_id), row.birthday, _parse_teams(row.teams))
+        self._by_name: dict[str, int] = {}   # 元の表記 → 代表のID（名寄せは表記ごとに1回だけ）
+        self._new: list[dict] = []
+        self.dirty = False
+
+    @classmethod
+    def load(cls, raw_dir: Path = RAW_DIR) -> "PlayerRegistry":
+        """raw_dir のレジストリを読む。無ければ raw_dir のデータから作って保存する"""
+        path = Path(raw_dir) / PLAYER_IDS_NAME
+        if not path.exists():
+            registry = build_registry(raw_dir)
+            registry.save()
+            return registry
+        table = pd.read_csv(path, encoding="utf-8-sig",
+                            dtype={"key": str, "player": str, "birthday": str, "teams": str})
+        return cls(table, path)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def _add_entry(self, key: str, pid: int, birthday, teams: frozenset) -> None:
+        self._ids.setdefault(key, pid)
+        self._max_id = max(self._max_id, pid)
+        self._entries.setdefault(key, []).append(_Entry(pid, birthday if isinstance(birthday, str) else None, teams))
+
+    def homonyms(self) -> dict[str, list[int]]:
+        """同名の別人がいる名寄せキー → IDの一覧"""
+        return {key: [e.pid for e in entries] for key, entries in self._entries.items() if len(entries) > 1}
+
+    def lookup(self, name, birthday: str | None = None, year: int | None = None,
+               team: str | None = None) -> int | None:
+        """登録済みの選手名のID（未登録なら None）
+
+        birthday・year/team があれば同名の別人を見分ける（モジュールの説明の 1〜3）。
+        生年月日が登録済みのどの選手とも違えば None（別人として register で新しいIDを振る）。
+        """
+        if birthday is None and team is None:
+            pid = self._by_name.get(name)
+            if pid is None:
+                pid = self._ids.get(player_key(name))
+                if pid is not None:
+                    self._by_name[name] = pid
+            return pid
+        entries = self._entries.get(player_key(name))
+        if not entries:
+            return None
+        if birthday is not None:
+            for entry in entries:
+                if entry.birthday == birthday:
+                    return entry.pid
+            unknown = [e.pid for e in entries if e.birthday is None]
+            return unknown[0] if unknown else None
+        if len(entries) == 1:
+            return entries[0].pid
+        candidates = [e.pid for e in entries if (year, team) in e.teams]
+        if not candidates:
+            # 年度が無い表（予測結果）は球団だけで見分ける
+            gaps = {e.pid: min(abs(y - year) if year is not None else 0 for y, t in e.teams if t == team)
+                    for e in entries if any(t == team for _, t in e.teams)}
+            if gaps:
+                nearest = min(gaps.values())
+                candidates = [pid for pid, gap in gaps.items() if gap == nearest]
+        if len(candidates) == 1:
+            return candidates[0]
+        # 見分けられなければ代表（候補に代表がいなければ候補の先頭）
+        primary = entries[0].pid
+        return primary if not candidates or primary in candidates else candidates[0]
+
+    def register(self, name, year: int | None = None, birthday: str | None = None,
+                 team: str | None = None) -> int:
+        """選手名のID（未登録なら新しいIDを振る。生年月日が違えば同名の別人として振る）"""
+        pid = self.lookup(name, birthday, year, team)
+        if pid is not None:
+            return pid
+        key = player_key(name)
+        if not key:
+            raise ValueError(f"選手名が空です: {name!r}")
+        pid = self.next_id()
+        teams = frozenset([(year, team)]) if year is not None and team is not None else frozenset()
+        self._add_entry(key, pid, birthday, teams)
+        if self._ids[key] == pid:
+            self._by_name[name] = pid
+        self._new.append({"player_id": pid, "key": key, "player": _display(name), "birthday": birthday,
+                          "first_year": year, "last_year": year, "teams": _format_teams(teams)})
+        self.dirty = True
+        return pid
+
+    def next_id(self) -> int:
+        return self._max_id + 1
+
+    def ids(self, names: pd.Series, add: bool = True, years: pd.Series | None = None,
+            teams: pd.Series | None = None, birthdays: pd.Series | None = None) -> pd.Series:
+        """選手名の列 → player_id の列（名寄せは異なる表記ごとに1回）
+
+        add=False なら未登録の選手は欠損（Int64）。birthdays・teams（と years）があれば、
+        同名の別人がいる選手名と生年月日のある行は行ごとに見分ける。
+        """
+        codes, uniques = pd.factorize(names, sort=False)
+        first_year = None
+        if years is not None and add:
+            first_year = pd.Series(np.asarray(years)).groupby(codes).min()
+        out = np.empty(len(uniques), dtype=np.int64)
+        missing = np.zeros(len(uniques), dtype=bool)
+        for i, name in enumerate(uniques):
+            pid = self.lookup(name)
+            if pid is None and add and player_key(name):
+                year = first_year.get(i) if first_year is not None else None
+                pid = self.register(name, None if pd.isna(year) else int(year))
+            if pid is None:
+                missing[i] = True
+                pid = 0
+            out[i] = pid
+        # factorize は欠損の名前を -1 にする
+        take = np.maximum(codes, 0)
+        values = out[take] if len(uniques) else np.zeros(len(codes), dtype=np.int64)
+        na = (codes < 0) | (missing[take] if len(uniques) else True)
+        if birthdays is not None or teams is not None:
+            self._resolve_rows(names, values, na, add, years, teams, birthdays)
+        if np.any(na):
+            return pd.Series(values, index=names.index, dtype="Int64").mask(na)
+        return pd.Series(values, index=names.index, dtype="int64")
+
+    def _resolve_rows(self, names, values, na, add, years, teams, birthdays) -> None:
+        """同名の別人がいる選手名・生年月日のある行の ID を行ごとに決め直す（values・na を書き換える）"""
+        n = len(names)
+        bdays = pd.Series(np.asarray(birthdays), dtype=object) if birthdays is not None else pd.Series([None] * n)
+        bdays = pd.to_datetime(bdays, errors="coerce").dt.strftime("%Y-%m-%d")
+        yrs = pd.Series(np.asarray(years) if years is not None else [None] * n)
+        tms = pd.Series(np.asarray(teams) if teams is not None else [None] * n, dtype=object)
+        for i, name in enumerate(np.asarray(names, dtype=object)):
+            if not isinstance(name, str) or not player_key(name):
+                continue
+            bday = bdays.iat[i] if isinstance(bdays.iat[i], str) else None
+            if bday is None and len(self._entries.get(player_key(name), ())) < 2:
+                continue
+            year = None if pd.isna(yrs.iat[i]) else int(yrs.iat[i])
+            team = tms.iat[i] if isinstance(tms.iat[i], str) else None
+            pid = self.lookup(name, bday, year, team)
+            if pid is None and add:
+                pid = self.register(name, year, bday, team)
+            elif pid is not None and add and bday is not None:
+                # 生年月日が未登録の選手に付ける（同じ取り込みの別の生年月日は別人として振る）
+                self._fill_birthday(name, pid, bday)
+            if pid is not None:
+                values[i], na[i] = pid, False
+
+    def _fill_birthday(self, name, pid: int, birthday: str) -> None:
+        entry = next(e for e in self._entries[player_key(name)] if e.pid == pid)
+        if entry.birthday is not None:
+            return
+        entry.birthday = birthday
+        for row in self._new:
+            if row["player_id"] == pid:
+                row["birthday"] = birthday
+                break
+        else:
+            self.table.loc[self.table["player_id"] == pid, "birthday"] = birthday
+        self.dirty = True
+
+    def stamp(self, df: pd.DataFrame, column: str = "player", add: bool = True) -> pd.DataFrame:
+        """df の column（選手名）の隣に player_id 列を付けた DataFrame を返す
+
+        team・birthday 列があれば同名の別人を見分けるのに使う。
+        """
+        years = df["year"] if "year" in df.columns else None
+        pids = self.ids(df[column], add=add, years=years,
+                        teams=df["team"] if "team" in df.columns else None,
+                        birthdays=df["birthday"] if "birthday" in df.columns else None)
+        df = df.drop(columns=["player_id"], errors="ignore")
+        df.insert(df.columns.get_loc(column) + 1, "player_id", pids)
+        return df
+
+    def frame(self) -> pd.DataFrame:
+        """レジストリ全体（登録済み + 今回追加分）"""
+        if not self._new:
+            return self.table
+        return pd.concat([self.table, pd.DataFrame(self._new, columns=COLUMNS)], ignore_index=True)
+
+    def birthdays(self) -> dict[int, pd.Timestamp]:
+        """player_id → 生年月日"""
+        df = self.frame()
+        bday = pd.to_datetime(df["birthday"], errors="coerce")
+        known = bday.notna()
+        return dict(zip(df.loc[known, "player_id"].astype(int), bday[known]))
+
+    def names(self) -> dict[int, str]:
+        """player_id → 表示名"""
+        df = self.frame()
+        return dict(zip(df["player_id"].astype(int), df["player"]))
+
+    def save(self, path: Path | None = None) -> Path:
+        path = Path(path or self.path or RAW_DIR / PLAYER_IDS_NAME)
+        df = self.frame()
+        for col in ("first_year", "last_year"):
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        df[COLUMNS].to_csv(tmp, index=False, encoding="utf-8-sig")
+        tmp.replace(path)
+        self.table = df.reset_index(drop=True)
+        self._new = []
+        self.path = path
+        self.dirty = False
+        return path
+
+
+_default: PlayerRegistry | None = None
+
+
+def default_registry() -> PlayerRegistry:
+    """data/raw のレジストリ（プロセス内で1回だけ読む）"""
+    global _default
+    if _default is None:
+        _default = PlayerRegistry.load()
+    return _default
+
+
+def with_player_ids(df: pd.DataFrame, column: str = "player") -> pd.DataFrame:
+    """予測結果など raw_store を通らない表に player_id を付ける（既にあればそのまま）
+
+    レジストリは更新しないので、未登録の選手の player_id は欠損になる。
+    """
+    if df.empty or column not in df.columns or "player_id" in df.columns:
+        return df
+    return default_registry().stamp(df, column, add=False)
+
+
+def _display(name) -> str:
+    """表示名（全角スペース区切り・先頭の印なし、成績CSVの表記に合わせる）"""
+    return str(name).strip().lstrip("*+").replace(" ", "　")
+
+
+def _parse_teams(value) -> frozenset:
+    """teams 列（"2024:巨人|2025:巨人"）→ {(年度, 球団)}"""
+    if not isinstance(value, str) or not value:
+        return frozenset()
+    return frozenset((int(y), t) for y, t in (item.split(":", 1) for item in value.split("|")))
+
+
+def _format_teams(teams) -> str | None:
+    return "|".join(f"{y}:{t}" for y, t in sorted(teams)) or None
+
+
+def _source_names(raw_dir: Path) -> pd.DataFrame:
+    """名寄せの入力（name, year）。year が無い入力（生年月日）は含めない"""
+    frames = []
+    for pattern, column in SOURCES.items():
+        for path in sorted(Path(raw_dir).glob(pattern)):
+            df = pd.read_csv(path, encoding="utf-8-sig", usecols=lambda c: c in (column, "year"))
+            if "year" not in df.columns:
+                # 選手プロフィールはファイル名の年度
+                df["year"] = int(path.stem.rsplit("_", 1)[-1])
+            frames.append(df.rename(columns={column: "name"})[["name", "year"]])
+    if not frames:
+        return pd.DataFrame(columns=["name", "year"])
+    names = pd.concat(frames, ignore_index=True).dropna(subset=["name"])
+    names["name"] = names["name"].astype(str)
+    return names
+
+
+def _profiles(raw_dir: Path) -> pd.DataFrame:
+    """選手プロフィールの (key, name, birthday, team, year)。生年月日の無い行は除く"""
+    frames = []
+    for path in sorted(Path(raw_dir).glob("npb_players_profile_*.csv")):
+        df = pd.read_csv(path, encoding="utf-8-sig", usecols=lambda c: c in ("選手名", "生年月日", "team"))
+        if "team" not in df.columns:
+            df["team"] = None
+        frames.append(pd.DataFrame({
+            "name": df["選手名"].astype(str),
+            "birthday": pd.to_datetime(df["生年月日"], format="%Y/%m/%d", errors="coerce").dt.strftime("%Y-%m-%d"),
+            "team": df["team"],
+            "year": int(path.stem.rsplit("_", 1)[-1]),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=["key", "name", "birthday", "team", "year"])
+    df = pd.concat(frames, ignore_index=True).dropna(subset=["birthday"])
+    df.insert(0, "key", df["name"].map(player_key))
+    return df[df["key"] != ""]
+
+
+def _birthdays(raw_dir: Path) -> dict[str, str]:
+    """名寄せキー → 代表の生年月日（YYYY-MM-DD）。生年月日ファイルを優先し、無ければ選手プロフィール"""
+    profiles = _profiles(raw_dir)
+    out: dict[str, str] = dict(zip(profiles["key"], profiles["birthday"]))
+    path = Path(raw_dir) / BIRTHDAYS_NAME
+    if path.exists():
+        df = pd.read_csv(path, encoding="utf-8-sig")
+        bday = pd.to_datetime(df["birthday"], errors="coerce").dt.strftime("%Y-%m-%d")
+        out.update((player_key(n), b) for n, b in zip(df["player"], bday) if isinstance(b, str))
+    return out
+
+
+def build_registry(raw_dir: Path = RAW_DIR) -> PlayerRegistry:
+    """raw_dir の全データからレジストリを作る（既存のレジストリがあればそのIDを保つ）
+
+    新しい選手のIDは (最初に現れた年度, 名寄せキー) の順に振るので、同じデータからは同じIDになる。
+    生年月日ファイルにしか無い選手（年度不明）は最後に振る。選手プロフィールに代表と生年月日の
+    異なる同名の選手がいれば、別の行として (名寄せキー, 生年月日) ごとにIDを振る。
+    """
+    raw_dir = Path(raw_dir)
+    path = raw_dir / PLAYER_IDS_NAME
+    if path.exists():
+        old = pd.read_csv(path, encoding="utf-8-sig",
+                          dtype={"key": str, "player": str, "birthday": str, "teams": str})
+        if "teams" not in old.columns:
+            old["teams"] = pd.NA
+    else:
+        old = pd.DataFrame(columns=COLUMNS)
+
+    names = _source_names(raw_dir)
+    birthdays = _birthdays(raw_dir)
+    names["key"] = names["name"].map(player_key)
+    names = names[names["key"] != ""].sort_values("year", kind="stable")
+    # 表示名は最も新しい年度の表記（生年月日ファイルにしか無い選手はそのファイルの表記）
+    seen = names.groupby("key").agg(first_year=("year", "min"), last_year=("year", "max"),
+                                    player=("name", "last"))
+    bday_path = raw_dir / BIRTHDAYS_NAME
+    if bday_path.exists():
+        only_bday = pd.read_csv(bday_path, encoding="utf-8-sig")["player"].astype(str)
+        only_bday = pd.DataFrame({"player": only_bday.values}, index=only_bday.map(player_key).values)
+        only_bday = only_bday[~only_bday.index.duplicated() & ~only_bday.index.isin(seen.index)]
+        seen = pd.concat([seen, only_bday])
+    seen.index.name = "key"
+    seen = seen.reset_index()
+    seen["player"] = seen["player"].map(_display)
+    seen["birthday"] = seen["key"].map(birthdays)
+
+    # 同名の別人（選手プロフィールの生年月日が代表と異なる選手）
+    profiles = _profiles(raw_dir)
+    others = profiles[profiles["birthday"] != profiles["key"].map(birthdays)]
+    others = (others.sort_values("year", kind="stable")
+              .groupby(["key", "birthday"], as_index=False)
+              .agg(first_year=("year", "min"), last_year=("year", "max"), player=("name", "last")))
+    others["player"] = others["player"].map(_display)
+
+    # 代表は名寄せキー、同名の別人は (名寄せキー, 生年月日) で既存のIDを引き継ぐ
+    old = old.sort_values("player_id", kind="stable")
+    old_primary = ~old["key"].duplicated()
+    primary_ids = dict(zip(old.loc[old_primary, "key"], old.loc[old_primary, "player_id"].astype(int)))
+    other_ids = dict(zip(zip(old.loc[~old_primary, "key"], old.loc[~old_primary, "birthday"]),
+                         old.loc[~old_primary, "player_id"].astype(int)))
+    seen["player_id"] = seen["key"].map(primary_ids)
+    others["player_id"] = [other_ids.get(k) for k in zip(others["key"], others["birthday"])]
+
+    rows = pd.concat([seen, others], ignore_index=True)
+    new = rows["player_id"].isna()
+    order = rows[new].sort_values(["first_year", "key", "birthday"], na_position="last").index
+    start = int(old["player_id"].max()) + 1 if len(old) else 1
+    rows.loc[order, "player_id"] = range(start, start + len(order))
+    rows["player_id"] = rows["player_id"].astype(int)
+
+    # 同名の別人がいるキーは、選手プロフィールの年度・球団で見分けられるようにする
+    homonym = rows["key"].duplicated(keep=False)
+    stints = (profiles.dropna(subset=["team"]).groupby(["key", "birthday"])
+              .apply(lambda g: _format_teams(zip(g["year"], g["team"])), include_groups=False))
+    rows["teams"] = [stints.get((k, b)) if h else None
+                     for k, b, h in zip(rows["key"], rows["birthday"], homonym)]
+
+    # 既存の行（今回の入力に無い選手も残す）を今回の集計で更新
+    kept = old[~old["player_id"].isin(rows["player_id"])]
+    table = pd.concat([kept[COLUMNS], rows[COLUMNS]], ignore_index=True).sort_values("player_id", ignore_index=True)
+    table["player_id"] = table["player_id"].astype(int)
+    return PlayerRegistry(table, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="選手IDレジストリの作成・確認")
+    parser.add_argument("--build", action="store_true", help="data/raw の全データから作成（既存のIDは保つ）")
+    args = parser.parse_args()
+
+    if args.build:
+        registry = build_registry()
+        path = registry.save()
+        print(f"Saved: {path}")
+    registry = PlayerRegistry.load()
+    table = registry.frame()
+    print(f"{len(table)} players (birthday {table['birthday'].notna().sum()})")
+
+    names = _source_names(RAW_DIR)["name"].drop_duplicates()
+    unknown = [n for n in names if registry.lookup(n) is None]
+    print(f"表記 {len(names)}種類 → ID {names.map(registry.lookup).nunique()}件、未登録 {len(unknown)}件")
+    for name in unknown[:20]:
+        print(f"  {name}")
+
+    homonyms = registry.homonyms()
+    print(f"同名の別人 {len(homonyms)}件")
+    by_id = table.set_index("player_id")
+    for key, pids in homonyms.items():
+        people = ", ".join(f"{pid}({by_id.at[pid, 'birthday']} {by_id.at[pid, 'teams']})" for pid in pids)
+        print(f"  {key}: {people}")
+
+
+if __name__ == "__main__":
+    main()
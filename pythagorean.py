@@ -6,13 +6,18 @@
 - NPB最適指数: k = 1.72（先行研究より）
 
 データソース: プロ野球データFreak (baseball-data.com)
+（順位表ページは fetch_engine.FetchEngine でまとめて取得、終了シーズンは HTTP キャッシュから）
 """
 
+import io
+
 import pandas as pd
 import numpy as np
 from pathlib import Path
-import time
 from config import DATA_END_YEAR, YEARS
+from fetch_engine import FetchEngine
+from raw_store import RawStore, save_raw
+from table_store import save_table
 
 DATA_DIR = Path(__file__).parent / "data"
 RAW_DIR = DATA_DIR / "raw"
@@ -56,13 +61,10 @@ def build_standings_url(year: int) -> str:
         return f"{BASE_URL}/{yy}/team/standings.html"
 
 
-def fetch_standings(year: int) -> pd.DataFrame | None:
-    """指定年度の順位表（セ+パ）を取得"""
-    url = build_standings_url(year)
-    print(f"  Fetching: {url}")
-
+def parse_standings(content: bytes, year: int) -> pd.DataFrame | None:
+    """順位表ページ（HTMLのバイト列）からセ+パの順位表を読む"""
     try:
-        tables = pd.read_html(url, encoding="utf-8")
+        tables = pd.read_html(io.BytesIO(content), encoding="utf-8")
     except Exception as e:
         print(f"  ERROR: {e}")
         return None
@@ -100,15 +102,27 @@ def fetch_standings(year: int) -> pd.DataFrame | None:
     return df
 
 
-def fetch_all_standings() -> pd.DataFrame:
+def fetch_standings(year: int, engine: FetchEngine | None = None) -> pd.DataFrame | None:
+    """指定年度の順位表（セ+パ）を取得"""
+    df = fetch_all_standings([year], engine)
+    return df if len(df) > 0 else None
+
+
+def fetch_all_standings(years: list[int] | None = None, engine: FetchEngine | None = None) -> pd.DataFrame:
     """全年度の順位表を結合"""
+    years = list(years or YEARS)
+    engine = engine or FetchEngine()
+    results = engine.run([build_standings_url(year) for year in years])
+
     all_dfs = []
-    for year in YEARS:
-        print(f"[{year}] standings")
-        df = fetch_standings(year)
+    for year, result in zip(years, results):
+        print(f"[{year}] standings: {result.url}")
+        if not result.ok:
+            print(f"  ERROR: {result.error or f'HTTP {result.status}'}")
+            continue
+        df = parse_standings(result.content, year)
         if df is not None and len(df) > 0:
             all_dfs.append(df)
-        time.sleep(1)
 
     if not all_dfs:
         return pd.DataFrame()
@@ -165,17 +179,21 @@ def main():
     print("ピタゴラス勝率 NPBチーム勝率予測")
     print("=" * 60)
 
-    # データ取得
-    csv_path = RAW_DIR / f"npb_standings_2015_{DATA_END_YEAR}.csv"
-    if csv_path.exists():
-        print(f"\nLoading cached: {csv_path}")
-        df = pd.read_csv(csv_path)
-    else:
-        print("\nFetching standings data...")
-        df = fetch_all_standings()
-        if len(df) > 0:
-            df.to_csv(csv_path, index=False, encoding="utf-8-sig")
-            print(f"\nSaved: {csv_path} ({len(df)} rows)")
+    # データ取得: ストアに無い年度（DATA_END_YEAR が進んだときの新しいシーズン等）だけ取得して追加する
+    store = RawStore()
+    csv_path = store.legacy_path("standings")
+    if not store.years("standings") and csv_path.exists():
+        print(f"\nImporting cached: {csv_path}")
+        store.import_legacy(tables=["standings"])
+    missing = [y for y in YEARS if y not in store.years("standings")]
+    if missing:
+        print(f"\nFetching standings data: {', '.join(map(str, missing))}")
+        fetched = fetch_all_standings(missing)
+        if len(fetched) > 0:
+            save_raw("standings", fetched, store=store)
+    print(f"\nLoading stored: {store.root / 'standings'}")
+    df = store.read_typed("standings")
+    df = df[df["year"].isin(YEARS)] if len(df) > 0 else df
 
     if len(df) == 0:
         print("No data available")
@@ -214,7 +232,7 @@ def main():
 
     # CSV出力
     out_path = OUT_DIR / f"pythagorean_2015_{DATA_END_YEAR}.csv"
-    result.to_csv(out_path, index=False, encoding="utf-8-sig")
+    save_table(result, out_path)
     print(f"\nSaved: {out_path}")
 
 
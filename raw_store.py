@@ -0,0 +1,377 @@
+"""
+スクレイプ結果の年度別パーティション保存（upsert + 行ハッシュの manifest）
+
+取得スクリプトはこれまで npb_hitters_2015_{DATA_END_YEAR}.csv のような全年度1ファイルを
+毎回書き直していた（年が変わるとファイル名も変わる）。ここでは
+
+  data/raw/store/<テーブル>/<年度>.csv         1テーブル×1年度のパーティション（UTF-8 BOM付きCSV）
+  data/raw/store/<テーブル>/<年度>.rows.json   キー → 行ハッシュ（CSVの1行の sha1 先頭16桁）
+  data/raw/store/manifest.json                 パーティションごとの行数・列・ハッシュ・更新時刻
+
+に保存し、upsert で変わった行だけを反映する。変更の無いパーティションはファイルごと
+書き換えないので、シーズン中の更新では当年のパーティションだけが変わり、後段は
+manifest のハッシュでどのパーティションが変わったかを判定できる。
+
+upsert は既存の行をCSVの行単位で保持したまま、キーが一致する行を差し替え・新しいキーを末尾に足す
+（replace=True なら渡した年度の内容で置き換え、無くなった行は削除）。
+
+従来の全年度CSV（npb_hitters_2015_{DATA_END_YEAR}.csv 等）は互換のため write_legacy で
+ストアから書き出す（table_store.save_table で隣に型付き Parquet も作る）。読み込み側は read_raw を
+使うと、ストアがあればストアから、無ければ従来のCSVから、数値列を変換済みで読む。ストアから読む
+ときは全年度を結合した結果を store/<テーブル>.parquet に保存し、manifest のパーティションハッシュが
+変わらない間はそれを使う。
+
+player 列のあるテーブルは upsert 時に選手ID（player_registry.py、レジストリは legacy_dir の
+npb_player_ids.csv）を player_id 列として付ける。read_raw も player_id の無い行には付けて返す。
+
+Usage:
+  python raw_store.py              # パーティションの一覧
+  python raw_store.py --import     # 従来の全年度CSVからストアを作る
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from config import DATA_END_YEAR, RAW_STORE_DIR
+from player_registry import PlayerRegistry
+from table_store import load_table, read_parquet, save_table, typed, write_parquet
+
+# テーブル → キー列（年度内で行を特定する列）と従来ファイル名
+RAW_TABLES = {
+    "hitters": {"key": ["player", "team"], "legacy": "npb_hitters_2015_{end}.csv"},
+    "pitchers": {"key": ["player", "team"], "legacy": "npb_pitchers_2015_{end}.csv"},
+    "batting_detailed": {"key": ["player", "team"], "legacy": "npb_batting_detailed_2015_{end}.csv"},
+    "rosters": {"key": ["team", "player"], "legacy": "npb_rosters_2018_{end}.csv"},
+    "standings": {"key": ["league", "team"], "legacy": "npb_standings_2015_{end}.csv"},
+    "games": {"key": ["date", "home_team", "away_team"], "legacy": "npb_games_{year}.csv"},
+}
+
+MANIFEST_NAME = "manifest.json"
+_KEY_SEP = "\x1f"
+
+
+def _row_hash(line: str) -> str:
+    return hashlib.sha1(line.encode("utf-8")).hexdigest()[:16]
+
+
+def _render(df: pd.DataFrame, columns: list[str]) -> list[str]:
+    """DataFrame を CSV の行（ヘッダーなし）のリストにする"""
+    if df.empty:
+        return []
+    text = df.reindex(columns=columns).to_csv(index=False, header=False, lineterminator="\n")
+    return text.splitlines()
+
+
+def _header(columns: list[str]) -> str:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="").writerow(columns)
+    return buf.getvalue()
+
+
+def _keys(df: pd.DataFrame, key: list[str]) -> list[str]:
+    columns = [df[k].astype(str).tolist() for k in key]
+    return [_KEY_SEP.join(values) for values in zip(*columns)]
+
+
+class PartitionChange:
+    """1パーティション分の upsert 結果"""
+
+    def __init__(self, table: str, year: int, added: int = 0, updated: int = 0,
+                 deleted: int = 0, unchanged: int = 0, schema_changed: bool = False):
+        self.table = table
+        self.year = year
+        self.added = added
+        self.updated = updated
+        self.deleted = deleted
+        self.unchanged = unchanged
+        self.schema_changed = schema_changed
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.updated or self.deleted or self.schema_changed)
+
+    def __repr__(self) -> str:
+        return (f"{self.table}/{self.year}: +{self.added} ~{self.updated} -{self.deleted} "
+                f"={self.unchanged}{' (schema)' if self.schema_changed else ''}")
+
+
+class RawStore:
+    """年度別パーティションのストア"""
+
+    def __init__(self, root: str | Path = RAW_STORE_DIR):
+        self.root = Path(root)
+        self.legacy_dir = self.root.parent   # 従来のCSVの置き場所（既定は data/raw）
+        self._registry: PlayerRegistry | None = None
+
+    # --- パス・manifest ---
+
+    def _partition_path(self, table: str, year: int) -> Path:
+        return self.root / table / f"{year}.csv"
+
+    def _rows_path(self, table: str, year: int) -> Path:
+        return self.root / table / f"{year}.rows.json"
+
+    def manifest(self) -> dict:
+        try:
+            return json.loads((self.root / MANIFEST_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"tables": {}}
+
+    def _write_manifest(self, manifest: dict) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / MANIFEST_NAME).write_text(
+            json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True), encoding="utf-8")
+
+    def years(self, table: str) -> list[int]:
+        return sorted(int(y) for y in self.manifest()["tables"].get(table, {}))
+
+    def partition_hashes(self, table: str) -> dict[int, str]:
+        """{年度: パーティションのハッシュ}（後段が前回の値と比べて変わった年度を知るのに使う）"""
+        return {int(y): p["hash"] for y, p in self.manifest()["tables"].get(table, {}).items()}
+
+    def changed_years(self, table: str, previous: dict[int, str]) -> list[int]:
+        """previous（以前の partition_hashes）から変わった・増えた年度"""
+        return [y for y, h in self.partition_hashes(table).items() if previous.get(y) != h]
+
+    # --- 選手ID ---
+
+    def registry(self) -> PlayerRegistry:
+        """legacy_dir の選手IDレジストリ（無ければ legacy_dir のデータから作る）"""
+        if self._registry is None:
+            self._registry = PlayerRegistry.load(self.legacy_dir)
+        return self._registry
+
+    def stamp_ids(self, df: pd.DataFrame, add: bool = True) -> pd.DataFrame:
+        """player 列があれば player_id 列を付ける
+
+        add=True（取り込み時）は新しい選手を登録してレジストリを保存する。add=False（読み込み時）は
+        レジストリを書き換えず、未登録の選手の player_id は欠損にする（並行して読む段階どうしで
+        レジストリの書き込みや新しいIDの払い出しが競合しないように）。
+        """
+        if "player" not in df.columns or df.empty:
+            return df
+        if "player_id" in df.columns and df["player_id"].notna().all():
+            return df
+        registry = self.registry()
+        df = registry.stamp(df, add=add)
+        if add and registry.dirty:
+            registry.save()
+        return df
+
+    # --- 読み込み ---
+
+    def read(self, table: str, years: list[int] | None = None) -> pd.DataFrame:
+        """パーティションを年度順に結合して返す（無ければ空の DataFrame）
+
+        列が揃っていればCSVの本文をつないで1回で読む（全年度1ファイルを読んだときと同じ型推論になる）。
+        """
+        wanted = self.years(table) if years is None else [y for y in years if y in self.years(table)]
+        if not wanted:
+            return pd.DataFrame()
+        texts = [self._partition_path(table, y).read_text(encoding="utf-8-sig") for y in wanted]
+        headers = {t.split("\n", 1)[0] for t in texts}
+        if len(headers) == 1:
+            body = texts[0] + "".join(t.split("\n", 1)[1] for t in texts[1:])
+            return pd.read_csv(io.StringIO(body))
+        frames = [pd.read_csv(io.StringIO(t)) for t in texts]
+        return pd.concat(frames, ignore_index=True)
+
+    def snapshot_path(self, table: str) -> Path:
+        return self.root / f"{table}.parquet"
+
+    def read_typed(self, table: str) -> pd.DataFrame:
+        """全年度を数値列変換済みで返す（パーティションが変わっていなければ Parquet のスナップショットから）"""
+        hashes = {str(y): h for y, h in sorted(self.partition_hashes(table).items())}
+        version = hashlib.sha1(json.dumps(hashes).encode("utf-8")).hexdigest()
+        df = read_parquet(self.snapshot_path(table), source=version)
+        if df is None:
+            df = typed(self.read(table), self.legacy_path(table).name)
+            write_parquet(df, self.snapshot_path(table), version)
+        return df
+
+    def _read_lines(self, table: str, year: int) -> tuple[list[str], list[str], list[str]]:
+        """既存パーティションの (列, 行のリスト, キーのリスト)"""
+        path = self._partition_path(table, year)
+        if not path.exists():
+            return [], [], []
+        text = path.read_text(encoding="utf-8-sig")
+        header, *lines = text.splitlines()
+        df = pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False)
+        if len(df) != len(lines):   # 値に改行を含む等、行単位で扱えない場合は描き直す
+            lines = _render(pd.read_csv(io.StringIO(text)), list(df.columns))
+        return list(df.columns), lines, _keys(df, RAW_TABLES[table]["key"])
+
+    # --- 書き込み ---
+
+    def upsert(self, table: str, df: pd.DataFrame, replace: bool = False) -> list[PartitionChange]:
+        """df（year 列必須）を年度ごとのパーティションに反映する。
+
+        replace=False: キーが一致する行を差し替え、新しいキーを追加（既存の他の行は残す）
+        replace=True:  df に含まれる年度は df の内容で置き換える（無くなった行は削除）
+        """
+        if df.empty:
+            return []
+        df = self.stamp_ids(df)
+        manifest = self.manifest()
+        changes = []
+        for year, part in df.groupby("year", sort=True):
+            change = self._upsert_partition(table, int(year), part, replace, manifest)
+            changes.append(change)
+        self._write_manifest(manifest)
+        return changes
+
+    def _upsert_partition(self, table: str, year: int, part: pd.DataFrame, replace: bool,
+                          manifest: dict) -> PartitionChange:
+        key = RAW_TABLES[table]["key"]
+        part = part.drop_duplicates(subset=key, keep="last")
+        old_cols, old_lines, old_keys = self._read_lines(table, year)
+
+        if not old_cols or replace:
+            cols = list(part.columns)
+        else:
+            cols = old_cols + [c for c in part.columns if c not in old_cols]
+        schema_changed = bool(old_cols) and cols != old_cols
+        if schema_changed and not replace:
+            # 列が増えたら既存行も新しい列順で描き直す
+            old_df = pd.read_csv(self._partition_path(table, year), encoding="utf-8-sig")
+            old_lines = _render(old_df, cols)
+
+        old = dict(zip(old_keys, old_lines))
+        new = dict(zip(_keys(part, key), _render(part, cols)))
+        merged = new if replace else {**old, **new}
+
+        change = PartitionChange(table, year, schema_changed=schema_changed)
+        for k, line in merged.items():
+            if k not in old:
+                change.added += 1
+            elif _row_hash(old[k]) != _row_hash(line):
+                change.updated += 1
+            else:
+                change.unchanged += 1
+        change.deleted = sum(1 for k in old if k not in merged)
+        if old_cols and not change.changed:
+            return change
+
+        lines = list(merged.values())
+        body = "\n".join([_header(cols)] + lines) + "\n"
+        path = self._partition_path(table, year)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(body, encoding="utf-8-sig")
+        tmp.replace(path)
+        row_hashes = {k: _row_hash(line) for k, line in merged.items()}
+        self._rows_path(table, year).write_text(
+            json.dumps(row_hashes, ensure_ascii=False, indent=0), encoding="utf-8")
+
+        manifest["tables"].setdefault(table, {})[str(year)] = {
+            "rows": len(lines),
+            "columns": cols,
+            "key": key,
+            "hash": hashlib.sha1(body.encode("utf-8")).hexdigest(),
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        return change
+
+    # --- 従来の全年度CSV ---
+
+    def legacy_path(self, table: str, year: int | None = None, end_year: int = DATA_END_YEAR) -> Path:
+        return self.legacy_dir / RAW_TABLES[table]["legacy"].format(end=end_year, year=year)
+
+    def write_legacy(self, table: str, end_year: int = DATA_END_YEAR,
+                     years: list[int] | None = None) -> list[Path]:
+        """ストアの内容から従来のCSV（全年度1ファイル / games は年度ごと）を書き出す
+
+        年度ごとのファイル（games）は years を渡すとその年度だけ書き出す。
+        """
+        if "{year}" in RAW_TABLES[table]["legacy"]:
+            paths = []
+            for year in self.years(table) if years is None else years:
+                paths.append(save_table(self.read(table, [year]), self.legacy_path(table, year)))
+            return paths
+        return [save_table(self.read(table), self.legacy_path(table, end_year=end_year))]
+
+    def import_legacy(self, end_year: int = DATA_END_YEAR,
+                      tables: list[str] | None = None) -> list[PartitionChange]:
+        """従来のCSVをストアに取り込む"""
+        changes = []
+        for table in tables or list(RAW_TABLES):
+            spec = RAW_TABLES[table]
+            if "{year}" in spec["legacy"]:
+                paths = sorted(self.legacy_dir.glob(spec["legacy"].format(year="*")))
+            else:
+                paths = [self.legacy_path(table, end_year=end_year)]
+            for path in paths:
+                if path.exists():
+                    changes += self.upsert(table, pd.read_csv(path, encoding="utf-8-sig"), replace=True)
+        return changes
+
+
+def read_raw(table: str, store: RawStore | None = None, as_stored: bool = False) -> pd.DataFrame:
+    """ストアにパーティションがあればストアから、無ければ従来の全年度CSVから読む
+
+    数値列は変換済み（table_store.typed、投手成績は IP_outs / IP_num 付き）で、player_id 列を
+    付けて返す（レジストリは更新しない。選手の登録は save_raw の取り込み時だけ）。as_stored=True ならCSVに保存されているとおりの値（"-" や "0.00" を文字列のまま）で返す。
+    """
+    store = store or RawStore()
+    if store.years(table):
+        return store.stamp_ids(store.read(table) if as_stored else store.read_typed(table), add=False)
+    path = store.legacy_path(table)
+    if as_stored:
+        if not path.exists():
+            return pd.DataFrame()
+        return store.stamp_ids(pd.read_csv(path, encoding="utf-8-sig"), add=False)
+    return store.stamp_ids(load_table(path), add=False)
+
+
+def save_raw(table: str, df: pd.DataFrame, replace: bool = True, store: RawStore | None = None,
+             end_year: int = DATA_END_YEAR) -> list[PartitionChange]:
+    """取得スクリプト用: ストアに upsert し、従来のCSVも書き出して変更内容を表示する"""
+    store = store or RawStore()
+    if not store.years(table):
+        # ストアが空（初回・CI の新しいチェックアウト）なら従来のCSVを先に取り込み、
+        # --since で一部の年度だけ取得しても従来のCSVから過去の年度が消えないようにする
+        store.import_legacy(end_year=end_year, tables=[table])
+    changes = store.upsert(table, df, replace=replace)
+    for change in changes:
+        if change.changed:
+            print(f"  store: {change}")
+    unchanged = sum(not c.changed for c in changes)
+    if unchanged:
+        print(f"  store: {table} 変更なし {unchanged}年度")
+    years = None
+    if "{year}" in RAW_TABLES[table]["legacy"]:
+        # 年度ごとのファイルは変わった年度（と未作成の年度）だけ書き直す
+        changed = {c.year for c in changes if c.changed}
+        years = [y for y in store.years(table) if y in changed or not store.legacy_path(table, y).exists()]
+    for path in store.write_legacy(table, end_year=end_year, years=years):
+        print(f"  Saved: {path}")
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="年度別パーティションストアの確認・取り込み")
+    parser.add_argument("--import", dest="do_import", action="store_true",
+                        help="従来の全年度CSV（data/raw/npb_*.csv）からストアを作る")
+    args = parser.parse_args()
+
+    store = RawStore()
+    if args.do_import:
+        for change in store.import_legacy():
+            print(f"  {change}")
+
+    for table, parts in sorted(store.manifest()["tables"].items()):
+        years = sorted(int(y) for y in parts)
+        rows = sum(p["rows"] for p in parts.values())
+        print(f"{table:18s} {years[0]}-{years[-1]} ({len(years)}年度) {rows:6d} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+取得スクリプトのオフライン再生（記録した応答をローカルのスタンドインサーバーで返す）
+
+取得スクリプトは実サイトに対してしか動かせなかったため、CI やネットワークの無い環境では
+取り込みの処理時間を測ったり回帰を確かめたりできなかった。ここでは
+
+  1. 記録: NPB_FETCH_RECORD=<アーカイブ> で取得スクリプトを動かすと、FetchEngine が応答を
+     fixture_archive.FixtureArchive に保存する（HTTP キャッシュから返したページも含む）
+  2. 再生: ReplayServer がアーカイブの応答を返す（遅延・ゆらぎ・エラーの注入ができる）。
+     FetchEngine の redirect（NPB_FETCH_REDIRECT）でホストごとにこのサーバーへ向ける
+
+アーカイブに無い URL は 404 を返す。実サイトで記録できない環境向けに、data/raw の成績から
+各サイトと同じ表の形のページを作ってアーカイブに入れる --synthesize もある
+（baseball-data.com の試合スコアページは作らないので、試合は npb.jp の月別ページから取り込まれる）。
+
+Usage:
+  # 記録（HTTP キャッシュを使わずに実サイトから）
+  NPB_FETCH_RECORD=~/.cache/npb-prediction/fixtures/replay NPB_HTTP_CACHE_DIR= \
+      python fetch_npb_data.py --since 2025
+
+  python replay.py                        # アーカイブの件数（ホスト・ステータス別）
+  python replay.py --synthesize 2025      # data/raw から 2025 年分のページを作る
+  python replay.py --serve --latency 0.2 --error-rate 0.05
+      # → 表示される NPB_FETCH_REDIRECT を付けて取得スクリプトを動かす
+
+  python bench_ingest.py --season 2025    # 1シーズン分の取り込み時間の計測
+"""
+
+import argparse
+import html
+import random
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+from config import DEFAULT_CACHE_DIR
+from fetch_engine import StubServer
+from fixture_archive import FixtureArchive
+
+REPLAY_ARCHIVE_DIR = DEFAULT_CACHE_DIR / "fixtures" / "replay"
+
+
+class ReplayServer(StubServer):
+    """アーカイブの応答を返すスタブ。
+
+    latency=None なら記録した応答時間だけ待ち、数値ならその秒数 + 0〜jitter 秒待つ。
+    error_rate / error_status は StubServer と同じ（0 は接続を切る）。
+    """
+
+    def __init__(self, archive: FixtureArchive, latency: float | None = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, port: int = 0):
+        self.archive = archive
+        self.jitter = jitter
+        self.misses: list[str] = []
+        super().__init__(body=b"", latency=latency or 0.0, error_rate=error_rate, port=port,
+                         error_status=error_status)
+        self.latency = latency
+
+    def redirect(self, hosts: list[str] | None = None) -> dict[str, str]:
+        """FetchEngine の redirect（ホスト → このサーバーの /<ホスト>）"""
+        return {host: f"{self.url}/{host}" for host in (hosts or self.archive.hosts())}
+
+    def redirect_env(self, hosts: list[str] | None = None) -> str:
+        """NPB_FETCH_REDIRECT に設定する文字列"""
+        return ",".join(f"{host}={base}" for host, base in self.redirect(hosts).items())
+
+    def _entry(self, path: str) -> dict | None:
+        # /<ホスト>/<元のパス> → 記録した URL
+        host, _, rest = path.lstrip("/").partition("/")
+        for scheme in ("https", "http"):
+            entry = self.archive.lookup(f"{scheme}://{host}/{rest}")
+            if entry is not None:
+                return entry
+        return None
+
+    def delay(self, path: str) -> float:
+        if self.latency is None:
+            entry = self._entry(path)
+            return entry.get("elapsed", 0.0) if entry else 0.0
+        return self.latency + random.uniform(0.0, self.jitter)
+
+    def respond(self, path: str, headers) -> tuple[int, dict[str, str], bytes]:
+        entry = self._entry(path)
+        if entry is None:
+            self.misses.append(path)
+            return 404, {}, b""
+        etag = entry["headers"].get("ETag")
+        if etag and headers.get("If-None-Match") == etag:
+            return 304, {}, b""
+        return entry["status"], entry["headers"], self.archive.body(entry)
+
+
+# ---------------------------------------------------------------------------
+# data/raw からのページ生成（記録が無い環境用・bench_html_tables のフィクスチャにも使う）
+# ---------------------------------------------------------------------------
+
+def _page(tables: list[str]) -> bytes:
+    # 成績表の後ろにナビゲーション等の小さい表を置く（npb.jp・名鑑ページは先頭の表を読むので前には置かない）
+    nav = "<table><tr><td><a href='/'>トップ</a></td><td><a href='#'>成績</a></td></tr></table>"
+    body = "".join(tables) + nav
+    return (f"<html><head><meta charset='utf-8'><title>fixture</title></head>"
+            f"<body><div id='main'>{body}</div></body></html>").encode("utf-8")
+
+
+def _cell(value, tag: str = "td") -> str:
+    text = "" if pd.isna(value) else str(value)
+    return f"<{tag}>{html.escape(text)}</{tag}>"
+
+
+def _fmt(value) -> str:
+    if value is None or pd.isna(value):
+        return ""
+    if isinstance(value, float) and value < 1:
+        return f"{value:.3f}".lstrip("0")    # 打率等は npb.jp と同じく ".246"
+    if isinstance(value, str):
+        return value.replace(" ", "　")
+    return str(value)
+
+
+def _header_table(df: pd.DataFrame, col_map: dict, rank: bool = True) -> str:
+    inverse = {}
+    for ja, en in col_map.items():
+        inverse.setdefault(en, ja)
+    cols = [c for c in df.columns if c in inverse and c != "rank"]
+    head = ("<thead><tr>" + (_cell("順位", "th") if rank else "")
+            + "".join(_cell(inverse[c], "th") for c in cols) + "</tr></thead>")
+    body = "".join("<tr>" + (_cell(i + 1) if rank else "") + "".join(_cell(v) for v in row) + "</tr>"
+                   for i, row in enumerate(df[cols].itertuples(index=False)))
+    return f"<table class='tbl'>{head}<tbody>{body}</tbody></table>"
+
+
+def stats_page(df: pd.DataFrame, col_map: dict) -> bytes:
+    """baseball-data.com の個人成績ページ（見出しは col_map の日本語名）"""
+    return _page([_header_table(df, col_map)])
+
+
+def standings_page(df: pd.DataFrame, col_map: dict) -> bytes:
+    """baseball-data.com の順位表ページ（セ・パの2表）"""
+    return _page([_header_table(df[df["league"] == league], col_map) for league in ("CL", "PL")])
+
+
+def batting_page(df: pd.DataFrame, year: int) -> bytes:
+    """npb.jp のチーム別打撃成績ページ（注釈行 + 見出し行 + 選手行）"""
+    from fetch_npb_detailed import COL_NAMES, COL_NAMES_2025
+
+    columns = COL_NAMES if year < 2025 else COL_NAMES_2025
+    note = f"<tr><td colspan='{len(columns)}'>{year}年度 個人打撃成績</td></tr>"
+    head = "<tr>" + "".join(_cell(c) for c in columns) + "</tr>"
+    rows = []
+    for record in df.to_dict("records"):
+        cells = [_cell("") if c == "flag" else _cell(_fmt(record.get(c))) for c in columns]
+        rows.append("<tr>" + "".join(cells) + "</tr>")
+    return _page([f"<table>{note}{head}{''.join(rows)}</table>"])
+
+
+def roster_page(names: list[str]) -> bytes:
+    """baseball-data.com の選手名鑑ページ"""
+    head = "<tr>" + "".join(_cell(c, "th") for c in ("背番号", "選手名", "守備", "生年月日")) + "</tr>"
+    body = "".join(f"<tr>{_cell(i)}{_cell(n)}{_cell('投手')}{_cell('2000/01/01')}</tr>"
+                   for i, n in enumerate(names))
+    return _page([f"<table>{head}{body}</table>"])
+
+
+def schedule_page(games: pd.DataFrame) -> bytes:
+    """npb.jp の月別スケジュール詳細ページ（1試合1行、team1=ホーム）"""
+    rows = []
+    for g in games.itertuples(index=False):
+        mmdd = g.date[5:7] + g.date[8:10]
+        rows.append(f'<tr id="date{mmdd}"><td><div class="team1">{g.home_team}</div>'
+                    f'<div class="score1">{g.home_score}</div><div class="score2">{g.away_score}</div>'
+                    f'<div class="team2">{g.away_team}</div></td></tr>')
+    return _page([f"<table>{''.join(rows)}</table>"])
+
+
+def synthesize_archive(archive: FixtureArchive, season: int) -> int:
+    """data/raw の season 年度の成績から、取得スクリプトが読むページを作ってアーカイブに入れる"""
+    from fetch_npb_data import HITTER_COLS, PITCHER_COLS, build_url
+    from fetch_npb_detailed import TEAM_CODES as DETAILED_CODES, team_batting_url
+    from fetch_npb_games import NPB_JP_MONTHS, baseball_data_urls, npb_jp_urls
+    from fetch_rosters import TEAM_CODES as ROSTER_CODES, roster_url
+    from pythagorean import STANDINGS_COLS, build_standings_url
+    from raw_store import RawStore, read_raw
+
+    pages: dict[str, tuple[int, bytes]] = {}
+    html_type = {"Content-Type": "text/html; charset=utf-8"}
+
+    for stat_type, table, col_map in (("hitter", "hitters", HITTER_COLS), ("pitcher", "pitchers", PITCHER_COLS)):
+        df = read_raw(table, as_stored=True)
+        pages[build_url(season, stat_type)] = (200, stats_page(df[df["year"] == season], col_map))
+
+    detailed = read_raw("batting_detailed", as_stored=True)
+    for team, code in DETAILED_CODES.items():
+        part = detailed[(detailed["year"] == season) & (detailed["team"] == team)]
+        pages[team_batting_url(season, team, code)] = (200, batting_page(part, season))
+
+    rosters = read_raw("rosters", as_stored=True)
+    for team, code in ROSTER_CODES.items():
+        names = rosters[(rosters["year"] == season) & (rosters["team"] == team)]["player"].astype(str).tolist()
+        pages[roster_url(season, code)] = (200, roster_page(names))
+
+    standings = read_raw("standings", as_stored=True)
+    pages[build_standings_url(season)] = (200, standings_page(standings[standings["year"] == season],
+                                                              STANDINGS_COLS))
+
+    store = RawStore()
+    games = store.read("games", [season]) if season in store.years("games") else pd.DataFrame()
+    legacy = store.legacy_path("games", season)
+    if games.empty and legacy.exists():
+        games = pd.read_csv(legacy)
+    for url in baseball_data_urls(season):
+        pages[url] = (404, b"")
+    for month, url in zip(NPB_JP_MONTHS, npb_jp_urls(season)):
+        part = games[games["date"].str[5:7] == f"{month:02d}"] if not games.empty else games
+        pages[url] = (200, schedule_page(part)) if len(part) else (404, b"")
+
+    for url, (status, body) in pages.items():
+        archive.record(url, status, html_type if status == 200 else {}, body)
+    return len(pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="記録した応答のオフライン再生")
+    parser.add_argument("--archive", type=Path, default=REPLAY_ARCHIVE_DIR, help="アーカイブのディレクトリ")
+    parser.add_argument("--synthesize", type=int, metavar="SEASON", help="data/raw からこの年度のページを作る")
+    parser.add_argument("--serve", action="store_true", help="再生サーバーを起動して待つ")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency", default="0", help="応答までの秒数（recorded なら記録した応答時間）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latency に足す 0〜jitter 秒のゆらぎ")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="エラーを返す割合")
+    parser.add_argument("--error-status", type=int, default=503, help="返すエラー（0 は接続を切る）")
+    args = parser.parse_args()
+
+    archive = FixtureArchive(args.archive)
+    if args.synthesize:
+        n = synthesize_archive(archive, args.synthesize)
+        print(f"{args.synthesize}年のページ {n}件を作成: {args.archive}")
+
+    entries = archive.entries()
+    by_host = Counter((urlsplit(e["url"]).hostname, e["status"]) for e in entries)
+    size_kb = sum(e["size"] for e in entries) / 1024
+    print(f"{args.archive}: {len(entries)}件 {size_kb:.0f}KB")
+    for (host, status), n in sorted(by_host.items()):
+        print(f"  {host:24s} {status}  {n}件")
+
+    if args.serve:
+        latency = None if args.latency == "recorded" else float(args.latency)
+        with ReplayServer(archive, latency, args.jitter, args.error_rate, args.error_status,
+                          port=args.port) as server:
+            print(f'\nNPB_FETCH_REDIRECT="{server.redirect_env()}" NPB_HTTP_CACHE_DIR= python fetch_npb_data.py')
+            print("Ctrl+C で終了")
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                pass
+        print(f"requests={server.hits} errors={server.errors} misses={len(server.misses)}")
+
+
+if __name__ == "__main__":
+    main()
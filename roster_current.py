@@ -6,6 +6,13 @@ CSVの予測データとの突合用。育成選手は含めない。
 （roster_2026.py 等の年度付きファイルはバックアップとして残す）
 """
 
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from player_names import fuzzy_key
+
 # チームごとの支配下選手名（全角スペース区切りをそのまま使用）
 ROSTER_CURRENT = {
     "DeNA": [
@@ -261,23 +268,32 @@ ROSTER_CURRENT = {
 }
 
 
-_VARIANT_MAP = str.maketrans("﨑髙濵澤邊齋齊國島嶋櫻", "崎高浜沢辺斎斉国島島桜")
+# fuzzy選手名 → チーム名（import時に1回だけ作る。同名が複数チームにいる場合は先に出てくる方）
+_TEAM_BY_FUZZY: dict[str, str] = {}
+for _team, _players in ROSTER_CURRENT.items():
+    for _name in _players:
+        _TEAM_BY_FUZZY.setdefault(fuzzy_key(_name), _team)
+TEAM_BY_FUZZY = MappingProxyType(_TEAM_BY_FUZZY)
+ROSTER_FUZZY_NAMES = frozenset(_TEAM_BY_FUZZY)
+del _team, _players, _name
 
 
 def get_all_roster_names() -> set[str]:
     """全チームの支配下選手名をfuzzy形式（スペース除去＋異体字統一）で返す"""
-    names = set()
-    for team_players in ROSTER_CURRENT.values():
-        for name in team_players:
-            names.add(name.replace("\u3000", "").replace(" ", "").strip().translate(_VARIANT_MAP))
-    return names
+    return set(ROSTER_FUZZY_NAMES)
 
 
 def get_team_for_player(player_name: str) -> str | None:
     """選手名からチーム名を返す（fuzzyマッチ＋異体字統一）"""
-    fuzzy = player_name.replace("\u3000", "").replace(" ", "").strip().translate(_VARIANT_MAP)
-    for team, players in ROSTER_CURRENT.items():
-        for p in players:
-            if p.replace("\u3000", "").replace(" ", "").strip().translate(_VARIANT_MAP) == fuzzy:
-                return team
-    return None
+    return TEAM_BY_FUZZY.get(fuzzy_key(player_name))
+
+
+def map_teams(players: pd.Series) -> pd.Series:
+    """選手名の Series → 公式ロースターのチーム名の Series（ロースターにいない選手は None）。
+
+    正規化と辞書引きはユニークな選手名ごとに1回だけ行い、結果を元の並びに展開する。
+    """
+    codes, uniques = pd.factorize(players)
+    # 末尾の None は factorize の欠損コード -1 用
+    teams = np.array([TEAM_BY_FUZZY.get(fuzzy_key(p)) for p in uniques] + [None], dtype=object)
+    return pd.Series(teams[codes], index=players.index, name="team")
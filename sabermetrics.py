@@ -19,20 +19,15 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 from config import DATA_END_YEAR
+from player_names import normalize_player_name
+from raw_store import read_raw
+from table_store import save_table
 
 DATA_DIR = Path(__file__).parent / "data"
 RAW_DIR = DATA_DIR / "raw"
 OUT_DIR = DATA_DIR / "projections"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
 
-# 異体字統一マップ（streamlit_app.py の _VARIANT_MAP と同じ）
-_VARIANT_MAP = str.maketrans("﨑髙濵澤邊齋齊國島嶋櫻", "崎高浜沢辺斎斉国島島桜")
-
-
-def normalize_player_name(name: str) -> str:
-    """全角スペース→半角、先頭の * を除去、異体字を統一"""
-    return str(name).replace("\u3000", " ").strip().lstrip("*").strip().translate(_VARIANT_MAP)
-
 # --- wOBA得点価値係数（MLB標準値をベースにNPBリーグ環境でスケーリング） ---
 # MLB標準: BB=0.69, HBP=0.72, 1B=0.88, 2B=1.27, 3B=1.62, HR=2.10
 # NPBは得点環境が年度で変動するため、リーグ平均wOBAが.320になるようスケーリングする
@@ -178,7 +173,7 @@ def main():
     print("=" * 60)
 
     # 詳細打撃成績を読み込み
-    df = pd.read_csv(RAW_DIR / f"npb_batting_detailed_2015_{DATA_END_YEAR}.csv")
+    df = read_raw("batting_detailed")
     df["player"] = df["player"].apply(normalize_player_name)
     print(f"Input: {len(df)} rows, years={sorted(df['year'].unique())}")
 
@@ -193,7 +188,7 @@ def main():
 
     # 保存
     out_path = OUT_DIR / f"npb_sabermetrics_2015_{DATA_END_YEAR}.csv"
-    combined.to_csv(out_path, index=False, encoding="utf-8-sig")
+    save_table(combined, out_path)
     print(f"\nSaved: {out_path} ({len(combined)} rows)")
 
     # 直近年の規定打席以上（443PA）のwOBA/wRC+ Top10
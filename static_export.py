@@ -0,0 +1,447 @@
+"""
+ダッシュボードの静的書き出し（Streamlit 不要）
+
+ランキング・2026年予測順位・チームシミュレーション・外国人選手のページを
+言語（translations.TEXTS）ごとに HTML として、表示に使う表を言語共通の JSON として
+書き出す。出力ディレクトリはそのまま GitHub Pages / S3 / Netlify 等の静的ホスティングで配信できる。
+
+データの組み立ては dashboard_views.py をライブアプリと共有しているので、同じ入力なら
+同じ順位・数値になる。選手の出場を変えて再計算する what-if など対話的な機能は
+ライブアプリ（--app-url）へのリンクで案内する。
+
+streamlit_app の t() / team_disp() は st.session_state で言語を切り替えるため、
+Streamlit の実行環境の外では使えない。ここでは TEXTS[lang] を直接引く。
+
+出力:
+  site/index.html                 言語の選択（既定言語へのリンク）
+  site/<lang>/*.html              ページ（ja / en）
+  site/data/*.json                ページが表示している表（records 形式）
+  site/data/manifest.json         出力ファイルの一覧・sha1・入力データのハッシュ
+
+Usage:
+  python static_export.py                    # site/ に書き出す
+  python static_export.py --out public --top-n 30
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import re
+import shutil
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from config import STATIC_SITE_DIR, TARGET_YEAR
+from dashboard_bundle import build_tables, load_bundle, read_manifest, read_table
+from dashboard_views import (
+    CENTRAL_TEAMS, HITTER_RANK_FORMATS, HITTER_SORT_OPTIONS, PACIFIC_TEAMS,
+    PITCHER_RANK_FORMATS, PITCHER_SORT_OPTIONS, build_2026_standings, ensure_hitter_saber,
+    ensure_pitcher_saber, get_missing_players, hitter_ranking, pitcher_ranking, sort_options,
+)
+from data_source import default_source
+from display_format import fixed, leaderboard_cards_html, percent
+from team_simulation import load_park_factors
+from translations import TEAM_NAME_EN, TEXTS
+
+LIVE_APP_URL = "https://npb-prediction.streamlit.app/"
+DEFAULT_TOP_N = 20
+LEAGUES = [("CL", "central_league", CENTRAL_TEAMS), ("PL", "pacific_league", PACIFIC_TEAMS)]
+
+# (ファイル名, ナビゲーションの翻訳キー)
+PAGES = [
+    ("index.html", "page_top"),
+    ("standings.html", "page_standings"),
+    ("team_sim.html", "page_team_sim"),
+    ("hitter_rankings.html", "page_hitter_rank"),
+    ("pitcher_rankings.html", "page_pitcher_rank"),
+    ("foreign.html", "page_foreign"),
+]
+
+
+class Text:
+    """1言語分の翻訳（streamlit_app の t() / team_disp() の代わり）"""
+
+    def __init__(self, lang: str):
+        self.lang = lang
+        self.texts = TEXTS[lang]
+
+    def __call__(self, key: str) -> str:
+        return self.texts.get(key, TEXTS["ja"].get(key, key))
+
+    def team(self, team_ja: str) -> str:
+        return TEAM_NAME_EN.get(team_ja, team_ja) if self.lang == "en" else team_ja
+
+
+# --- データ ---
+
+
+def load_data() -> dict:
+    """ダッシュボードと同じデータモデル（前計算バンドル優先、無ければCSVから組み立て）"""
+    data = load_bundle()
+    if data is not None:
+        return data
+    source = default_source()
+    return build_tables(lambda path: read_table(source, path))
+
+
+def build_views(data: dict, top_n: int = DEFAULT_TOP_N) -> dict:
+    """ページに載せる表を言語に依存しない形で組み立てる"""
+    views = {}
+
+    mh = data.get("marcel_hitters", pd.DataFrame())
+    if not mh.empty:
+        mh = ensure_hitter_saber(mh, data)
+        views["hitter_rankings"] = {
+            col: hitter_ranking(mh, col, top_n) for _, col in sort_options(mh, HITTER_SORT_OPTIONS)
+        }
+
+    mp = data.get("marcel_pitchers", pd.DataFrame())
+    if not mp.empty:
+        mp = ensure_pitcher_saber(mp)
+        options = sort_options(mp, PITCHER_SORT_OPTIONS)
+        views["pitcher_rankings"] = {col: pitcher_ranking(mp, col, top_n) for _, col in options}
+        views["reliever_rankings"] = {
+            col: pitcher_ranking(mp, col, top_n, relievers=True) for _, col in options
+        }
+
+    missing = get_missing_players(data)
+    views["missing_players"] = missing
+    views["standings_2026"] = build_2026_standings(data, load_park_factors(), missing)
+
+    for key in ("team_sim", "foreign_hitters", "foreign_pitchers"):
+        views[key] = data.get(key, pd.DataFrame())
+    return views
+
+
+def _records(df: pd.DataFrame) -> list[dict]:
+    return json.loads(df.to_json(orient="records", force_ascii=False))
+
+
+def write_json(views: dict, out_dir: Path) -> dict[str, str]:
+    """views を data/*.json に書き出し、{ファイル名: sha1} を返す"""
+    payloads = {
+        "standings_2026.json": _records(views["standings_2026"]),
+        "missing_players.json": views["missing_players"],
+        "team_sim.json": _records(views["team_sim"]),
+        "foreign_hitters.json": _records(views["foreign_hitters"]),
+        "foreign_pitchers.json": _records(views["foreign_pitchers"]),
+    }
+    for key in ("hitter_rankings", "pitcher_rankings", "reliever_rankings"):
+        if key in views:
+            payloads[f"{key}.json"] = {col: _records(df) for col, df in views[key].items()}
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = {}
+    for name, payload in payloads.items():
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        (out_dir / name).write_bytes(body)
+        written[name] = hashlib.sha1(body).hexdigest()
+    return written
+
+
+# --- HTML ---
+
+
+_MD_LINK = re.compile(r"\[([^\]]+)\]\((https?://[^)\s]+)\)")
+_MD_BOLD = re.compile(r"\*\*(.+?)\*\*")
+
+
+def _inline(text: str) -> str:
+    """翻訳文中の **太字** と [リンク](URL) だけを HTML にする"""
+    s = html.escape(text, quote=False)
+    s = _MD_LINK.sub(r'<a href="\2">\1</a>', s)
+    return _MD_BOLD.sub(r"<b>\1</b>", s)
+
+
+def markdown_html(text: str) -> str:
+    """翻訳文（段落と "- " の箇条書きだけの Markdown）を HTML にする"""
+    blocks = []
+    for block in text.strip().split("\n\n"):
+        lines = [ln.strip() for ln in block.splitlines() if ln.strip()]
+        if lines and all(ln.startswith("- ") for ln in lines):
+            items = "".join(f"<li>{_inline(ln[2:])}</li>" for ln in lines)
+            blocks.append(f"<ul>{items}</ul>")
+        elif lines:
+            blocks.append(f"<p>{'<br>'.join(_inline(ln) for ln in lines)}</p>")
+    return "\n".join(blocks)
+
+
+def _table_html(df: pd.DataFrame) -> str:
+    """文字列化済みの df を順位付きの表にする"""
+    head = "".join(f"<th>{html.escape(str(c))}</th>" for c in df.columns)
+    rows = []
+    for rank, values in enumerate(df.itertuples(index=False), 1):
+        cells = "".join(f"<td>{html.escape(str(v))}</td>" for v in values)
+        rows.append(f"<tr><td>{rank}</td>{cells}</tr>")
+    return f'<table><thead><tr><th></th>{head}</tr></thead><tbody>{"".join(rows)}</tbody></table>'
+
+
+def _badges(tx: Text) -> dict[int, str]:
+    """data_years → バッジHTML（streamlit_app._data_years_badge と同じ見た目）"""
+    style = {1: ("#ff9944", "#2a1500"), 2: ("#ffcc44", "#2a2000")}
+    return {
+        n: (f'<span style="color:{fg};font-size:10px;background:{bg};padding:1px 5px;'
+            f'border-radius:3px;margin-left:5px;">{tx("data_years_badge").format(n=n)}</span>')
+        for n, (fg, bg) in style.items()
+    }
+
+
+def _sortable_cards(rankings: dict[str, pd.DataFrame], options: list[tuple[str, str]],
+                    formats: dict[str, str], default_fmt: str, tx: Text, group: str) -> str:
+    """並べ替えの選択肢ごとにカードを前もって描画し、select で表示を切り替える"""
+    options = [(key, col) for key, col in options if col in rankings]
+    select = "".join(f'<option value="{col}">{html.escape(tx(key))}</option>' for key, col in options)
+    badges = _badges(tx)
+    sections = []
+    for i, (_, col) in enumerate(options):
+        df = rankings[col].copy()
+        df["team"] = df["team"].map(tx.team)
+        cards = leaderboard_cards_html(df, col, formats.get(col, default_fmt), badges)
+        hidden = "" if i == 0 else " hidden"
+        sections.append(f'<div class="cards" data-group="{group}" data-sort="{col}"{hidden}>{cards}</div>')
+    return (f'<label>{html.escape(tx("sort_by"))} '
+            f'<select data-group="{group}" onchange="showSort(this)">{select}</select></label>'
+            + "".join(sections))
+
+
+def _standings_body(views: dict, tx: Text) -> str:
+    standings = views["standings_2026"]
+    if standings.empty:
+        return f"<p>{html.escape(tx('no_data'))}</p>"
+    parts = [f"<h2>{html.escape(tx('standings_2026_title'))}</h2>",
+             f"<p class='caption'>{_inline(tx('standings_2026_caption'))}</p>"]
+    for league, label_key, _ in LEAGUES:
+        lg = standings[standings["league"] == league].sort_values("pred_WPCT", ascending=False)
+        if lg.empty:
+            continue
+        table = pd.DataFrame({
+            tx("team_label"): lg["team"].map(tx.team).to_numpy(),
+            tx("wins_suffix"): fixed(lg["pred_W"], 0),
+            tx("losses_suffix"): fixed(lg["pred_L"], 0),
+            tx("wpct_prefix").strip(): fixed(lg["pred_WPCT"], 3),
+            tx("rs_label"): fixed(lg["pred_RS"], 0),
+            tx("ra_label"): fixed(lg["pred_RA"], 0),
+            "": [tx("missing_badge").format(n=int(n)) if n > 0 else ""
+                 for n in lg["missing_count"].fillna(0).tolist()],
+        })
+        parts.append(f"<h3>{html.escape(tx(label_key))}</h3>{_table_html(table)}")
+
+    missing_all = views["missing_players"]
+    sep = " / " if tx.lang == "en" else "、"
+    parts.append(f"<details><summary>{html.escape(tx('missing_expander_all'))}</summary>")
+    parts.append(markdown_html(tx("missing_expander_content")))
+    for _, label_key, teams in LEAGUES:
+        items = []
+        for team in teams:
+            missing = missing_all.get(team, [])
+            if not missing:
+                items.append(f"<li><b>{html.escape(tx.team(team))}</b>: {_inline(tx('all_projected'))}</li>")
+                continue
+            names = sep.join(
+                f"{m['name']}（{tx('foreign_player') if m['kind'] == 'foreign' else tx('rookie_no_data')}, "
+                f"{tx('wraa_zero_inline')}）"
+                for m in missing
+            )
+            items.append(f"<li><b>{html.escape(tx.team(team))}</b>: {len(missing)} — {html.escape(names)}</li>")
+        parts.append(f"<h4>{html.escape(tx(label_key))}</h4><ul>{''.join(items)}</ul>")
+    parts.append("</details>")
+    return "\n".join(parts)
+
+
+def _team_sim_body(views: dict, tx: Text, app_url: str) -> str:
+    team_sim = views["team_sim"]
+    if team_sim.empty:
+        return f"<p>{html.escape(tx('no_data'))}</p>"
+    parts = [f"<p class='caption'>{_inline(tx('team_sim_subtitle'))}</p>",
+             f"<div class='info'>{markdown_html(tx('team_sim_note'))}</div>"]
+    for league, label_key, _ in LEAGUES:
+        lg = team_sim[team_sim["league"] == league].sort_values("p_pennant", ascending=False)
+        if lg.empty:
+            continue
+        table = pd.DataFrame({
+            tx("team_label"): lg["team"].map(tx.team).to_numpy(),
+            tx("p_pennant"): percent(lg["p_pennant"]),
+            tx("p_cs"): percent(lg["p_cs"]),
+            tx("p_last"): percent(lg["p_last"]),
+            tx("median_wins"): fixed(lg["median_wins"], 1),
+            tx("mean_wins"): fixed(lg["mean_wins"], 1),
+            "80% CI": [f"{lo:.0f}–{hi:.0f}" for lo, hi in
+                       zip(lg["wins_80ci_lo"].tolist(), lg["wins_80ci_hi"].tolist())],
+        })
+        parts.append(f"<h2>{html.escape(tx(label_key))}</h2>{_table_html(table)}")
+    parts.append(f"<h3>{html.escape(tx('whatif_title'))}</h3>"
+                 f'<p><a href="{html.escape(app_url)}">{html.escape(app_url)}</a></p>')
+    parts.append(f"<details><summary>{html.escape(tx('mc_method_expander'))}</summary>"
+                 f"{markdown_html(tx('mc_method_content'))}</details>")
+    return "\n".join(parts)
+
+
+def _foreign_body(views: dict, tx: Text) -> str:
+    fh, fp = views["foreign_hitters"], views["foreign_pitchers"]
+    if fh.empty and fp.empty:
+        return f"<p>{html.escape(tx('no_data'))}</p>"
+    parts = [f"<p class='caption'>{_inline(tx('foreign_subtitle'))}</p>",
+             f"<div class='info'>{markdown_html(tx('foreign_note'))}</div>"]
+    for df, title_key, prev_col, prev_key, stat, stat_key, decimals in [
+        (fh, "foreign_hitters_title", "prev_wOBA", "prev_woba_label", "bayes_OPS", "bayes_ops_label", 3),
+        (fp, "foreign_pitchers_title", "prev_ERA", "prev_era_label", "bayes_ERA", "bayes_era_label", 2),
+    ]:
+        if df.empty:
+            continue
+        table = pd.DataFrame({
+            "": df["player"].to_numpy(),
+            tx("team_label"): df["team"].map(tx.team).to_numpy(),
+            "League": df.get("origin_league", pd.Series("", index=df.index)).fillna("").to_numpy(),
+            tx(prev_key): fixed(df.get(prev_col, pd.Series(0.0, index=df.index)).fillna(0), decimals),
+            tx(stat_key): fixed(df[stat], decimals),
+        })
+        if f"{stat}_lo80" in df.columns:
+            table["80% CI"] = [
+                "" if pd.isna(lo) else f"{lo:.{decimals}f}–{hi:.{decimals}f}"
+                for lo, hi in zip(df[f"{stat}_lo80"].tolist(), df[f"{stat}_hi80"].tolist())
+            ]
+        parts.append(f"<h2>{html.escape(tx(title_key))}</h2>{_table_html(table)}")
+    parts.append(f"<details><summary>{html.escape(tx('foreign_method_expander'))}</summary>"
+                 f"{markdown_html(tx('foreign_method_content'))}</details>")
+    return "\n".join(parts)
+
+
+def _rankings_body(views: dict, tx: Text, kind: str) -> str:
+    if kind == "hitter":
+        if "hitter_rankings" not in views:
+            return f"<p>{html.escape(tx('no_data'))}</p>"
+        return _sortable_cards(views["hitter_rankings"], HITTER_SORT_OPTIONS,
+                               HITTER_RANK_FORMATS, ".3f", tx, "hitter")
+    if "pitcher_rankings" not in views:
+        return f"<p>{html.escape(tx('no_data'))}</p>"
+    return (_sortable_cards(views["pitcher_rankings"], PITCHER_SORT_OPTIONS,
+                            PITCHER_RANK_FORMATS, ".2f", tx, "pitcher")
+            + f"<h2>{html.escape(tx('reliever_rank_title'))}</h2>"
+            + f"<p class='caption'>{_inline(tx('reliever_rank_caption'))}</p>"
+            + _sortable_cards(views["reliever_rankings"], PITCHER_SORT_OPTIONS,
+                              PITCHER_RANK_FORMATS, ".2f", tx, "reliever"))
+
+
+def _index_body(tx: Text, app_url: str) -> str:
+    links = "".join(
+        f'<li><a href="{name}">{html.escape(tx(key))}</a></li>' for name, key in PAGES[1:]
+    )
+    return (f"<p class='caption'>{_inline(tx('top_subtitle'))}</p><ul>{links}</ul>"
+            f'<p>Live app: <a href="{html.escape(app_url)}">{html.escape(app_url)}</a></p>')
+
+
+_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="{lang}">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<title>{title} | {site_title}</title>
+<style>
+body {{ background:#0a0a1a; color:#e0e0e0; font-family:'Segoe UI',sans-serif; margin:0 auto; max-width:960px; padding:0 1rem 3rem; }}
+nav {{ display:flex; flex-wrap:wrap; gap:12px; padding:12px 0; border-bottom:1px solid #222; font-size:14px; }}
+nav a {{ color:#aaa; text-decoration:none; }} nav a.active, nav a:hover {{ color:#00e5ff; }}
+nav .lang {{ margin-left:auto; }}
+a {{ color:#00e5ff; }}
+h1, h2, h3, h4 {{ color:#e0e0e0; }}
+.caption {{ color:#888; font-size:13px; }}
+.info {{ background:#0d1b2a; border-radius:6px; padding:4px 14px; font-size:14px; }}
+table {{ border-collapse:collapse; width:100%; margin:8px 0 16px; font-size:14px; display:block; overflow-x:auto; }}
+th, td {{ padding:6px 10px; border-bottom:1px solid #222; text-align:right; white-space:nowrap; }}
+th:nth-child(2), td:nth-child(2) {{ text-align:left; }}
+select {{ background:#0d0d24; color:#e0e0e0; border:1px solid #333; padding:4px; margin:8px 0; }}
+footer {{ color:#666; font-size:12px; margin-top:32px; }}
+</style>
+</head>
+<body>
+<nav>{nav}<span class="lang">{lang_links}</span></nav>
+<h1>{title}</h1>
+{body}
+<footer>{footer}</footer>
+<script>
+function showSort(sel) {{
+  document.querySelectorAll('.cards[data-group="' + sel.dataset.group + '"]').forEach(function (el) {{
+    el.hidden = el.dataset.sort !== sel.value;
+  }});
+}}
+</script>
+</body>
+</html>
+"""
+
+
+def render_page(name: str, nav_key: str, body: str, tx: Text, langs: list[str]) -> str:
+    nav = "".join(
+        f'<a href="{page}"{" class=active" if page == name else ""}>{html.escape(tx(key))}</a>'
+        for page, key in PAGES
+    )
+    lang_links = " / ".join(f'<a href="../{lang}/{name}">{lang}</a>' for lang in langs)
+    return _PAGE_TEMPLATE.format(
+        lang=tx.lang, title=html.escape(tx(nav_key)), site_title=html.escape(tx("sidebar_title")),
+        nav=nav, lang_links=lang_links, body=body,
+        footer=f"{_inline(tx('data_source'))}<br>{TARGET_YEAR} Season",
+    )
+
+
+def export_site(out_dir: Path, top_n: int = DEFAULT_TOP_N, app_url: str = LIVE_APP_URL,
+                data: dict | None = None) -> dict:
+    """静的サイトを out_dir に書き出し、manifest（出力ファイルと sha1）を返す"""
+    if data is None:
+        data = load_data()
+    views = build_views(data, top_n)
+
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    files = {f"data/{name}": sha for name, sha in write_json(views, out_dir / "data").items()}
+
+    langs = list(TEXTS)
+    for lang in langs:
+        tx = Text(lang)
+        bodies = {
+            "index.html": _index_body(tx, app_url),
+            "standings.html": _standings_body(views, tx),
+            "team_sim.html": _team_sim_body(views, tx, app_url),
+            "hitter_rankings.html": _rankings_body(views, tx, "hitter"),
+            "pitcher_rankings.html": _rankings_body(views, tx, "pitcher"),
+            "foreign.html": _foreign_body(views, tx),
+        }
+        (out_dir / lang).mkdir(parents=True, exist_ok=True)
+        for name, nav_key in PAGES:
+            body = render_page(name, nav_key, bodies[name], tx, langs).encode("utf-8")
+            (out_dir / lang / name).write_bytes(body)
+            files[f"{lang}/{name}"] = hashlib.sha1(body).hexdigest()
+
+    root = "".join(f'<li><a href="{lang}/index.html">{lang}</a></li>' for lang in langs)
+    (out_dir / "index.html").write_text(
+        f'<!DOCTYPE html><meta charset="utf-8"><meta http-equiv="refresh" content="0; url={langs[0]}/index.html">'
+        f"<ul>{root}</ul>\n", encoding="utf-8")
+
+    manifest = {
+        "target_year": TARGET_YEAR,
+        "top_n": top_n,
+        "inputs": (read_manifest() or {}).get("inputs", {}),
+        "files": files,
+    }
+    (out_dir / "data" / "manifest.json").write_text(
+        json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True), encoding="utf-8")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ダッシュボードを静的HTML/JSONとして書き出す")
+    parser.add_argument("--out", default=str(STATIC_SITE_DIR), help="出力ディレクトリ（中身は作り直す）")
+    parser.add_argument("--top-n", type=int, default=DEFAULT_TOP_N, help="ランキングの表示人数")
+    parser.add_argument("--app-url", default=LIVE_APP_URL, help="what-if 等を案内するライブアプリのURL")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    manifest = export_site(Path(args.out), top_n=args.top_n, app_url=args.app_url)
+    size_kb = sum((Path(args.out) / f).stat().st_size for f in manifest["files"]) / 1024
+    print(f"静的サイト書き出し完了: {args.out}  {len(manifest['files'])}ファイル "
+          f"{size_kb:.0f}KB  ({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+スクリプト内の段階ごとの所要時間（ml_projection / bayes_projection / team_simulation の _log_elapsed の置き換え）
+
+mark(label) で前の区切りからの秒数と開始からの累計（分）を表示し、累計が CI のタイムアウト（分）の
+8割を超えたら警告する。pipeline.py から実行されたときは finish() で区切りの一覧をランナーに渡し、
+段階別の所要時間のレポートに含める。
+"""
+
+import json
+import os
+import time
+
+# CI のジョブのタイムアウト（分）
+BUDGET_MIN = 180
+
+# 区切りを書き出すファイル（pipeline.py から実行したときだけ設定される）
+STEPS_ENV = "NPB_PIPELINE_STEPS"
+
+
+class StepTimer:
+    """スクリプト内の区切りごとの所要時間"""
+
+    def __init__(self, name: str, budget_min: int = BUDGET_MIN):
+        self.name = name
+        self.budget_min = budget_min
+        self.start = self.last = time.perf_counter()
+        self.steps: list[tuple[str, float]] = []
+
+    def mark(self, label: str) -> float:
+        """前の区切りからの秒数を記録・表示する"""
+        now = time.perf_counter()
+        sec, self.last = now - self.last, now
+        self.steps.append((label, sec))
+        self._print(label, sec, now - self.start)
+        return sec
+
+    def finish(self) -> float:
+        """合計を表示し、パイプラインから実行されていれば区切りを書き出す"""
+        total = time.perf_counter() - self.start
+        self._print(f"{self.name}_total", total, total)
+        path = os.environ.get(STEPS_ENV)
+        if path:
+            try:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"stage": self.name, "steps": self.steps}, ensure_ascii=False) + "\n")
+            except OSError:
+                pass
+        return total
+
+    def _print(self, label: str, sec: float, total: float) -> None:
+        total_min = total / 60
+        print(f"  [{label}] {sec:.1f}s (elapsed: {total_min:.1f} min / {self.budget_min} min budget)")
+        if total_min > self.budget_min * 0.8:
+            print(f"  WARNING: {label} used {total_min:.0f}/{self.budget_min} min "
+                  f"({total_min / self.budget_min * 100:.0f}%) -- timeout risk!")
@@ -8,13 +8,32 @@ Data sources:
 - 日本野球機構 NPB (https://npb.jp)
 """
 
+import functools
+import hashlib
+import json
+import os
+import time
+from types import MappingProxyType
+
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
 import streamlit as st
 import streamlit.components.v1 as components
 
-from config import DATA_END_YEAR, TARGET_YEAR
+from dashboard_bundle import build_tables, load_bundle, memory_report, read_manifest, read_table
+from dashboard_views import (
+    CENTRAL_TEAMS, HITTER_RANK_FORMATS, HITTER_SORT_OPTIONS, NPB_TEAM_COLORS, NPB_TEAM_GLOW,
+    PACIFIC_TEAMS, PITCHER_RANK_FORMATS, PITCHER_SORT_OPTIONS, TEAMS, build_2026_standings, ensure_hitter_saber, ensure_pitcher_saber,
+    get_missing_players, hitter_ranking, pitcher_ranking, sort_options,
+)
+from data_source import default_source
+from display_format import (
+    data_years_notes, fixed, format_table, leaderboard_cards_html, percent, signed,
+)
+from player_names import PlayerSearchIndex, normalize_name
+from team_simulation import LEAGUES, SeasonDraws, compute_probabilities
 from translations import TEAM_NAME_EN, TEXTS
 
 
@@ -32,39 +51,15 @@ def team_disp(team_ja: str) -> str:
     return team_ja
 
 
-BASE_URL = "https://raw.githubusercontent.com/yasumorishima/npb-prediction/main/"
-
-NPB_TEAM_COLORS = {
-    "DeNA": "#0055A5",
-    "巨人": "#F97709",
-    "阪神": "#FFE201",
-    "広島": "#EE1C25",
-    "中日": "#00468B",
-    "ヤクルト": "#006AB6",
-    "ソフトバンク": "#F5C70E",
-    "日本ハム": "#004B97",
-    "楽天": "#860029",
-    "ロッテ": "#000000",
-    "オリックス": "#C4A400",
-    "西武": "#102A6F",
-}
+def team_disp_col(teams: pd.Series) -> pd.Series:
+    """team_disp for a whole column."""
+    if st.session_state.get("lang", "日本語") == "English":
+        return teams.map(TEAM_NAME_EN).fillna(teams)
+    return teams
 
-NPB_TEAM_GLOW = {
-    "DeNA": "#00aaff",
-    "巨人": "#ff9933",
-    "阪神": "#ffe44d",
-    "広島": "#ff4444",
-    "中日": "#4488ff",
-    "ヤクルト": "#44aaff",
-    "ソフトバンク": "#ffdd33",
-    "日本ハム": "#4488ff",
-    "楽天": "#cc3366",
-    "ロッテ": "#888888",
-    "オリックス": "#ddcc33",
-    "西武": "#4466cc",
-}
 
-TEAMS = list(NPB_TEAM_COLORS.keys())
+# ローカルの data/ → リモートミラー（ディスクキャッシュ付き）の順に読む（data_source.py 参照）
+DATA_SOURCE = default_source()
 
 
 def _norm_hr(hr: float) -> float:
@@ -150,158 +145,80 @@ HITTER_AVG = {"HR": 15, "AVG": 0.260, "OBP": 0.320, "SLG": 0.400, "OPS": 0.720,
 PITCHER_AVG = {"ERA": 3.50, "WHIP": 1.30, "SO": 120, "IP": 140, "W": 9,
                "K9": 7.5, "BB9": 3.2, "HR9": 1.0, "FIP": 3.80}
 
+# チーム別選手一覧の表示書式（display_format.format_table）
+TEAM_HITTER_FORMATS = {"AVG": "avg", "HR": ".0f", "RBI": ".0f", "H": ".0f", "BB": ".0f",
+                       "SB": ".0f", "OBP": ".3f", "SLG": ".3f", "OPS": ".3f"}
+TEAM_PITCHER_FORMATS = {"ERA": ".2f", "W": ".0f", "SO": ".0f", "IP": ".0f", "WHIP": ".2f"}
+
 
 # --- データ読み込み ---
 
 
-def _norm(name: str) -> str:
-    return name.replace("\u3000", " ").strip()
+# 全セッション共有のデータモデルを何世代まで保持するか（データ更新で版が変わると新しい版を作る）
+DATA_CACHE_MAX_ENTRIES = int(os.environ.get("NPB_DASHBOARD_CACHE_ENTRIES", 2))
+# データモデル1世代あたりのメモリ上限の目安（MB）。超えたらログに警告を出す
+DATA_CACHE_MAX_MB = float(os.environ.get("NPB_DASHBOARD_MAX_MB", 256))
 
 
-@st.cache_data(ttl=3600)
 def load_csv(path: str) -> pd.DataFrame:
-    url = BASE_URL + path
-    try:
-        df = pd.read_csv(url, encoding="utf-8-sig")
-    except Exception:
-        return pd.DataFrame()
-    if "player" in df.columns:
-        df["player"] = df["player"].apply(_norm)
-    if "team" in df.columns:
-        df["team"] = df["team"].apply(_norm)
-    return df
-
-
-
-def load_all():
-    from roster_current import get_all_roster_names, get_team_for_player
-
-    result = {
-        "marcel_hitters": load_csv(f"data/projections/marcel_hitters_{TARGET_YEAR}.csv"),
-        "marcel_pitchers": load_csv(f"data/projections/marcel_pitchers_{TARGET_YEAR}.csv"),
-        "sabermetrics": load_csv(f"data/projections/npb_sabermetrics_2015_{DATA_END_YEAR}.csv"),
-        "pitcher_history": load_csv(f"data/raw/npb_pitchers_2015_{DATA_END_YEAR}.csv"),
-        "pythagorean": load_csv(f"data/projections/pythagorean_2015_{DATA_END_YEAR}.csv"),
-        "marcel_team_historical": load_csv("data/projections/marcel_team_historical.csv"),
-        # Bayesian projections
-        "bayes_hitters": load_csv(f"data/projections/bayes_hitters_{TARGET_YEAR}.csv"),
-        "bayes_pitchers": load_csv(f"data/projections/bayes_pitchers_{TARGET_YEAR}.csv"),
-        # Foreign player projections
-        "foreign_hitters": load_csv(f"data/projections/foreign_hitters_{TARGET_YEAR}.csv"),
-        "foreign_pitchers": load_csv(f"data/projections/foreign_pitchers_{TARGET_YEAR}.csv"),
-        # Team simulation
-        "team_sim": load_csv(f"data/projections/team_sim_{TARGET_YEAR}.csv"),
-    }
-
-    # NPB公式ロースターに在籍する選手のみ残し、チーム名も公式に合わせる
-    roster_names = get_all_roster_names()
-    for key in ("marcel_hitters", "marcel_pitchers"):
-        df = result[key]
-        if df.empty or "player" not in df.columns:
-            continue
-        # ロースターにいる選手だけ残す
-        df = df[df["player"].apply(_fuzzy).isin(roster_names)].copy()
-        # チーム名を公式ロースターに合わせる（移籍反映）
-        for idx, row in df.iterrows():
-            new_team = get_team_for_player(row["player"])
-            if new_team:
-                df.at[idx, "team"] = new_team
-        result[key] = df
-
-    _enrich_projections(result)
-    _merge_bayes_projections(result)
-    return result
-
-
-def _enrich_projections(data: dict) -> None:
-    """打者にwOBA/wRC+/wRAA、投手にFIP/K%/BB%/K-BB%を追加"""
-    mh = data["marcel_hitters"]
-    mp = data["marcel_pitchers"]
-    saber = data.get("sabermetrics", pd.DataFrame())
+    # 読み込み結果は _shared_data でまとめて保持するので、ここではキャッシュしない
+    # （ローカルはCSVの隣の型付き Parquet、リモートは DataSource のディスクキャッシュで2回目以降は Parquet から読む）
+    return read_table(DATA_SOURCE, path)
 
-    # --- 打者: wOBA, wRC+, wRAA ---
-    if not mh.empty and not saber.empty:
-        df_fit = saber[saber["PA"] >= 100].dropna(subset=["wOBA", "OBP", "SLG"])
-        if len(df_fit) >= 10:
-            X = np.column_stack([df_fit["OBP"].values, df_fit["SLG"].values, np.ones(len(df_fit))])
-            coeffs, _, _, _ = np.linalg.lstsq(X, df_fit["wOBA"].values, rcond=None)
-            a_obp, b_slg, intercept_w = coeffs
-
-            recent_s = saber[saber["year"] >= 2022]
-            lg_woba = recent_s[recent_s["PA"] >= 50]["wOBA"].mean()
-            woba_scale = 1.15
-
-            mh["wOBA"] = (a_obp * mh["OBP"] + b_slg * mh["SLG"] + intercept_w).round(3)
-            mh["wRAA"] = ((mh["wOBA"] - lg_woba) / woba_scale * mh["PA"]).round(1)
-            lg_r_per_pa = lg_woba / woba_scale
-            mh["wRC+"] = (((mh["wOBA"] - lg_woba) / woba_scale + lg_r_per_pa) / lg_r_per_pa * 100).round(0).astype(int)
-
-            data["_lg_woba"] = lg_woba
-
-    # --- 投手: FIP, K%, BB%, K-BB% ---
-    if not mp.empty and mp["IP"].sum() > 0:
-        has_fip_cols = all(c in mp.columns for c in ["BB", "HBP", "HRA", "BF"])
-        if has_fip_cols:
-            ip_safe = mp["IP"].replace(0, np.nan)
-            bf_safe = mp["BF"].replace(0, np.nan)
-            mp["K_pct"] = (mp["SO"] / bf_safe * 100).round(1)
-            mp["BB_pct"] = (mp["BB"] / bf_safe * 100).round(1)
-            mp["K_BB_pct"] = (mp["K_pct"] - mp["BB_pct"]).round(1)
-            mp["K9"] = (mp["SO"] * 9 / ip_safe).round(2)
-            mp["BB9"] = (mp["BB"] * 9 / ip_safe).round(2)
-            mp["HR9"] = (mp["HRA"] * 9 / ip_safe).round(2)
-
-            lg_ip = mp["IP"].sum()
-            lg_era = (mp["ERA"] * mp["IP"]).sum() / lg_ip
-            lg_hra = mp["HRA"].sum()
-            lg_bb = mp["BB"].sum()
-            lg_hbp = mp["HBP"].sum()
-            lg_so = mp["SO"].sum()
-            fip_c = lg_era - (13 * lg_hra + 3 * (lg_bb + lg_hbp) - 2 * lg_so) / lg_ip
-            mp["FIP"] = ((13 * mp["HRA"] + 3 * (mp["BB"] + mp["HBP"]) - 2 * mp["SO"]) / mp["IP"] + fip_c).round(2)
-
-
-
-def _merge_bayes_projections(data: dict) -> None:
-    """ベイズCSVからbayes_OPS/ERA + CIカラムをMarcelデータにマージ"""
-    bh = data.get("bayes_hitters", pd.DataFrame())
-    bp = data.get("bayes_pitchers", pd.DataFrame())
-    mh = data["marcel_hitters"]
-    mp = data["marcel_pitchers"]
 
-    if not bh.empty and not mh.empty and "player" in bh.columns:
-        # player以外でMarcel側と重複しないカラムだけマージ
-        merge_cols = ["player"] + [
-            c for c in bh.columns
-            if c != "player" and c not in mh.columns
-        ]
-        bayes_cols = bh[merge_cols].drop_duplicates("player")
-        data["marcel_hitters"] = mh.merge(bayes_cols, on="player", how="left")
+def _data_version() -> str:
+    """共有キャッシュのキー: バンドルの生成時刻（バンドルが無ければCSV直読み）"""
+    manifest = read_manifest()
+    return manifest.get("created_at", "csv") if manifest else "csv"
 
-    if not bp.empty and not mp.empty and "player" in bp.columns:
-        merge_cols = ["player"] + [
-            c for c in bp.columns
-            if c != "player" and c not in mp.columns
-        ]
-        bayes_cols = bp[merge_cols].drop_duplicates("player")
-        data["marcel_pitchers"] = mp.merge(bayes_cols, on="player", how="left")
 
+@st.cache_resource(max_entries=DATA_CACHE_MAX_ENTRIES, ttl=3600, show_spinner=False)
+def _shared_data(version: str) -> MappingProxyType:
+    """データモデルをプロセスで1回だけ組み立て、全セッションで読み取り専用として共有する。
 
-_VARIANT_MAP = str.maketrans("﨑髙濵澤邊齋齊國島嶋櫻", "崎高浜沢辺斎斉国島島桜")
-
+    ページ側は DataFrame を書き換えずにフィルタ・コピーしてから使うこと。
+    """
+    # パイプラインが書き出した前計算バンドルがあればそれを使う（変換済み、メモリマップで読む）
+    data = load_bundle()
+    if data is not None:
+        fingerprint = _hash_json((read_manifest() or {}).get("inputs", {}))
+    else:
+        data = build_tables(load_csv)
+        fingerprint = _frames_fingerprint(data)
+
+    report = memory_report(data)
+    total_mb = report["MB"].sum()
+    print(f"[data] version={version} tables={len(report)} total={total_mb:.1f}MB")
+    for _, r in report.iterrows():
+        print(f"[data]   {r['table']:24s} {r['rows']:6d} rows  {r['MB']:7.2f}MB")
+    if total_mb > DATA_CACHE_MAX_MB:
+        print(f"[data] WARNING: {total_mb:.1f}MB > NPB_DASHBOARD_MAX_MB={DATA_CACHE_MAX_MB:.0f}MB")
+    data["_memory_report"] = report
+    data["_fingerprint"] = fingerprint
+    return MappingProxyType(data)
+
+
+def _hash_json(obj) -> str:
+    return hashlib.sha1(json.dumps(obj, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _frames_fingerprint(data: dict) -> str:
+    """CSVから組み立てたデータモデルの内容ハッシュ（テーブルごとの行ハッシュ + スカラー値）"""
+    h = hashlib.sha1()
+    for key in sorted(data):
+        value = data[key]
+        h.update(key.encode("utf-8"))
+        if isinstance(value, pd.DataFrame):
+            h.update(json.dumps(list(map(str, value.columns)), ensure_ascii=False).encode("utf-8"))
+            h.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+        else:
+            h.update(repr(value).encode("utf-8"))
+    return h.hexdigest()
 
-def _fuzzy(s: str) -> str:
-    """スペース除去（全角・半角両方） + 異体字を統一"""
-    return s.replace(" ", "").replace("\u3000", "").translate(_VARIANT_MAP)
 
+def load_all():
+    return _shared_data(_data_version())
 
-def _is_foreign_player(name: str) -> bool:
-    """カタカナ文字が名前の半分超 → 外国人選手と判定"""
-    cleaned = name.replace("\u3000", "").replace(" ", "")
-    if not cleaned:
-        return False
-    katakana = sum(1 for c in cleaned if "\u30A0" <= c <= "\u30FF")
-    return katakana / len(cleaned) > 0.5
 
 
 def _data_years_badge(years: int) -> str:
@@ -321,65 +238,71 @@ def _data_years_badge(years: int) -> str:
     return ""
 
 
-def _get_missing_players(data: dict) -> dict:
-    """ロースター登録済みだがMarcel予測対象外の選手をチーム別に返す。
-    返り値: {team: [{"name": str, "kind": "foreign"|"rookie"}, ...]}
-    """
-    from roster_current import ROSTER_CURRENT
+@st.cache_resource(max_entries=16, ttl=3600, show_spinner=False)
+def _player_index(version: str, table: str) -> PlayerSearchIndex:
+    """テーブルの選手名の検索インデックス（データの版ごとに1回だけ作り、全セッションで共有）"""
+    df = load_all().get(table, pd.DataFrame())
+    return PlayerSearchIndex(df["player"] if "player" in df.columns else [])
 
-    mh = data["marcel_hitters"]
-    mp = data["marcel_pitchers"]
-    if mh.empty or mp.empty:
-        return {}
-    calculated = (
-        set(mh["player"].apply(_fuzzy))
-        | set(mp["player"].apply(_fuzzy))
-    )
 
-    result = {}
-    for team, players in ROSTER_CURRENT.items():
-        missing = []
-        for p in players:
-            if _fuzzy(p) not in calculated:
-                kind = "foreign" if _is_foreign_player(p) else "rookie"
-                display = p.replace("\u3000", " ").strip()
-                missing.append({"name": display, "kind": kind})
-        result[team] = missing
-    return result
+def _search(df: pd.DataFrame, name: str, table: str) -> pd.DataFrame:
+    """df（table またはそれを加工したもの）から名前の部分一致で選手の行を返す"""
+    return _player_index(_data_version(), table).filter(df, name)
+
 
+def _set_search(state_key: str, value: str) -> None:
+    st.session_state[state_key] = value
 
-def _search(df: pd.DataFrame, name: str) -> pd.DataFrame:
-    q = _fuzzy(_norm(name))
-    return df[df["player"].apply(lambda p: q in _fuzzy(p))]
 
+def _search_suggestions(name: str, table: str, state_key: str) -> None:
+    """入力途中の名前に対する候補ボタン（タップで検索欄をその選手名にする）。
 
-def _pythagorean_wpct(rs: float, ra: float, k: float = 1.72) -> float:
-    if ra == 0:
-        return 1.0
-    return rs**k / (rs**k + ra**k)
+    一致が1人に絞れているときは出さない。一致が無いときは誤字を許した候補を出す。
+    """
+    index = _player_index(_data_version(), table)
+    if len(index.matches(name)) == 1:
+        return
+    suggestions = [s for s in index.suggest(name, limit=6) if s != normalize_name(name)]
+    if not suggestions:
+        return
+    st.caption(t("search_suggestions"))
+    cols = st.columns(3)
+    for i, s in enumerate(suggestions):
+        cols[i % 3].button(s, key=f"{state_key}_sg_{s}", on_click=_set_search, args=(state_key, s))
 
 
-@st.cache_data(ttl=3600)
+@st.cache_data(ttl=3600, max_entries=1)
 def _load_park_factors() -> dict[str, float]:
     """Load PF_5yr (latest year) per team."""
-    url = BASE_URL + "data/projections/npb_park_factors.csv"
-    try:
-        pf_df = pd.read_csv(url, encoding="utf-8-sig")
-    except Exception:
+    pf_df = DATA_SOURCE.read_csv("data/projections/npb_park_factors.csv")
+    if pf_df.empty:
         return {}
     latest_year = pf_df["year"].max()
     latest = pf_df[pf_df["year"] == latest_year][["team", "PF_5yr"]].copy()
     return dict(zip(latest["team"], latest["PF_5yr"]))
 
 
-def _apply_park_factor(rs: float, ra: float, team: str,
-                       pf_map: dict[str, float]) -> tuple[float, float]:
-    """Remove park effect: divide RS/RA by (PF + 1) / 2."""
-    pf = pf_map.get(team)
-    if pf and pf > 0:
-        pf_factor = (pf + 1.0) / 2.0
-        return rs / pf_factor, ra / pf_factor
-    return rs, ra
+# what-if パネルのシミュレーション回数（確定版の team_sim は10,000回）
+WHATIF_N_SIM = 2_000
+
+
+@st.cache_resource(max_entries=DATA_CACHE_MAX_ENTRIES, ttl=3600, show_spinner=False)
+def _whatif_draws(version: str) -> tuple[SeasonDraws, dict] | None:
+    """what-if 用の選手別ドロー（回数を減らした float32 版）と変更前の確率。
+
+    乱数はデータの版ごとに1回だけ引き、全セッションで共有する（操作のたびに引き直さない）。
+    """
+    data = load_all()
+    bh = data.get("bayes_hitters", pd.DataFrame())
+    bp = data.get("bayes_pitchers", pd.DataFrame())
+    if bh.empty or bp.empty:
+        return None
+    draws = SeasonDraws(
+        bh, bp,
+        data.get("foreign_hitters", pd.DataFrame()), data.get("foreign_pitchers", pd.DataFrame()),
+        n_sim=WHATIF_N_SIM, park_factors=_load_park_factors(), dtype=np.float32,
+    )
+    return draws, compute_probabilities(draws.wins())
 
 
 # --- HTML/CSSカード描画 ---
@@ -545,65 +468,28 @@ def _safe_float(val, default: float = 0.0) -> float:
         return default
 
 
-def render_radar_chart(row: pd.Series, title: str = "", color: str = "#00e5ff") -> go.Figure:
-    """打者レーダーチャート（6軸: HR・AVG・OBP・SLG・wOBA・wRC+）+ リーグ平均"""
-    categories = [t("radar_hr"), t("radar_avg"), t("radar_obp"), t("radar_slg"), "wOBA", "wRC+"]
-    values = [
+# --- レーダーチャート ---
+
+RADAR_HEIGHT = 320
+# 描画済みレーダーチャートの figure JSON を何件まで保持するか（1件あたり数KB）
+RADAR_CACHE_SIZE = int(os.environ.get("NPB_DASHBOARD_RADAR_CACHE", 512))
+
+
+def _hitter_radar_values(row: pd.Series) -> tuple[float, ...]:
+    """打者レーダーの軸の値（6軸: HR・AVG・OBP・SLG・wOBA・wRC+、0-100）"""
+    return (
         _norm_hr(_safe_float(row["HR"])),
         _norm_avg(_safe_float(row["AVG"])),
         _norm_obp(_safe_float(row["OBP"])),
         _norm_slg(_safe_float(row["SLG"])),
         _norm_woba(_safe_float(row.get("wOBA", 0.320))),
         _norm_wrc_plus(_safe_float(row.get("wRC_plus", 100))),
-    ]
-    ha = HITTER_AVG
-    avg_values = [
-        _norm_hr(ha["HR"]), _norm_avg(ha["AVG"]), _norm_obp(ha["OBP"]),
-        _norm_slg(ha["SLG"]), _norm_woba(ha["wOBA"]), _norm_wrc_plus(ha["wRC_plus"]),
-    ]
-
-    r, g, b = int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
-
-    fig = go.Figure()
-    fig.add_trace(go.Scatterpolar(
-        r=avg_values + [avg_values[0]],
-        theta=categories + [categories[0]],
-        fill="none",
-        line=dict(color="#ffffff", width=1, dash="dash"),
-        name=t("league_average"),
-    ))
-    fig.add_trace(go.Scatterpolar(
-        r=values + [values[0]],
-        theta=categories + [categories[0]],
-        fill="toself",
-        fillcolor=f"rgba({r},{g},{b},0.15)",
-        line=dict(color=color, width=2),
-        name=title if title else str(row["player"]),
-    ))
-    layout_kwargs = dict(
-        polar=dict(
-            bgcolor="#0d0d24",
-            radialaxis=dict(visible=True, range=[0, 100], showticklabels=False, gridcolor="#333"),
-            angularaxis=dict(gridcolor="#333", linecolor="#444"),
-        ),
-        showlegend=True,
-        legend=dict(orientation="h", y=-0.05, font=dict(size=10, color="#aaa")),
-        paper_bgcolor="rgba(0,0,0,0)",
-        plot_bgcolor="rgba(0,0,0,0)",
-        font=dict(color="#e0e0e0"),
-        height=320,
-        margin=dict(l=30, r=30, t=30, b=40),
     )
-    if title:
-        layout_kwargs["title"] = dict(text=title, font=dict(size=14, color="#e0e0e0"))
-    fig.update_layout(**layout_kwargs)
-    return fig
 
 
-def render_pitcher_radar_chart(row: pd.Series, title: str = "", color: str = "#00e5ff") -> go.Figure:
-    """投手レーダーチャート（7軸: 防御率・WHIP・奪三振・K/9・BB/9・HR/9・FIP）+ リーグ平均"""
-    categories = [t("radar_era"), "WHIP", t("radar_so"), "K/9", "BB/9", "HR/9", "FIP"]
-    values = [
+def _pitcher_radar_values(row: pd.Series) -> tuple[float, ...]:
+    """投手レーダーの軸の値（7軸: 防御率・WHIP・奪三振・K/9・BB/9・HR/9・FIP、0-100）"""
+    return (
         _norm_era_r(_safe_float(row["ERA"])),
         _norm_whip_r(_safe_float(row["WHIP"])),
         _norm_so_p(_safe_float(row["SO"])),
@@ -611,14 +497,32 @@ def render_pitcher_radar_chart(row: pd.Series, title: str = "", color: str = "#0
         _norm_bb9_r(_safe_float(row.get("BB9", 3.2))),
         _norm_hr9_r(_safe_float(row.get("HR9", 1.0))),
         _norm_fip_r(_safe_float(row.get("FIP", 3.80))),
-    ]
+    )
+
+
+def _radar_axes(kind: str) -> tuple[list[str], list[float]]:
+    """(軸ラベル, リーグ平均の軸の値)"""
+    if kind == "hitter":
+        ha = HITTER_AVG
+        return (
+            [t("radar_hr"), t("radar_avg"), t("radar_obp"), t("radar_slg"), "wOBA", "wRC+"],
+            [_norm_hr(ha["HR"]), _norm_avg(ha["AVG"]), _norm_obp(ha["OBP"]),
+             _norm_slg(ha["SLG"]), _norm_woba(ha["wOBA"]), _norm_wrc_plus(ha["wRC_plus"])],
+        )
     pa = PITCHER_AVG
-    avg_values = [
-        _norm_era_r(pa["ERA"]), _norm_whip_r(pa["WHIP"]), _norm_so_p(pa["SO"]),
-        _norm_k9(pa["K9"]), _norm_bb9_r(pa["BB9"]), _norm_hr9_r(pa["HR9"]),
-        _norm_fip_r(pa["FIP"]),
-    ]
+    return (
+        [t("radar_era"), "WHIP", t("radar_so"), "K/9", "BB/9", "HR/9", "FIP"],
+        [_norm_era_r(pa["ERA"]), _norm_whip_r(pa["WHIP"]), _norm_so_p(pa["SO"]),
+         _norm_k9(pa["K9"]), _norm_bb9_r(pa["BB9"]), _norm_hr9_r(pa["HR9"]),
+         _norm_fip_r(pa["FIP"])],
+    )
+
 
+def _radar_figure(kind: str, values: tuple[float, ...], name: str, title: str = "",
+                  color: str = "#00e5ff") -> go.Figure:
+    """レーダーチャート（選手 + リーグ平均の破線）"""
+    categories, avg_values = _radar_axes(kind)
+    values = list(values)
     r, g, b = int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
 
     fig = go.Figure()
@@ -635,7 +539,7 @@ def render_pitcher_radar_chart(row: pd.Series, title: str = "", color: str = "#0
         fill="toself",
         fillcolor=f"rgba({r},{g},{b},0.15)",
         line=dict(color=color, width=2),
-        name=title if title else str(row["player"]),
+        name=name,
     ))
     layout_kwargs = dict(
         polar=dict(
@@ -648,7 +552,7 @@ def render_pitcher_radar_chart(row: pd.Series, title: str = "", color: str = "#0
         paper_bgcolor="rgba(0,0,0,0)",
         plot_bgcolor="rgba(0,0,0,0)",
         font=dict(color="#e0e0e0"),
-        height=320,
+        height=RADAR_HEIGHT,
         margin=dict(l=30, r=30, t=30, b=40),
     )
     if title:
@@ -657,12 +561,29 @@ def render_pitcher_radar_chart(row: pd.Series, title: str = "", color: str = "#0
     return fig
 
 
+@functools.lru_cache(maxsize=RADAR_CACHE_SIZE)
+def _radar_json(kind: str, player: str, lang: str, color: str, values: tuple[float, ...]) -> str:
+    """(選手, 言語, テーマ色) ごとのレーダーチャートの figure JSON。
+
+    values（軸の値）もキーに含めるので、データ更新で成績が変われば作り直される。
+    軸ラベルは t() で現在の言語から引く（lang はキーとして渡しているだけ）。
+    """
+    return pio.to_json(_radar_figure(kind, values, player, player, color), validate=False)
 
-# --- ページ実装 ---
 
+def show_radar_chart(row: pd.Series, kind: str, color: str = "#00e5ff") -> None:
+    """レーダーチャートをキャッシュ済みJSONから描画する（Python 側で毎回 Figure を組み立てない）。
+
+    描画は st.plotly_chart（Streamlit 同梱の plotly.js、外部CDNに依存しない）。kind は "hitter" / "pitcher"。
+    """
+    values = _hitter_radar_values(row) if kind == "hitter" else _pitcher_radar_values(row)
+    lang = st.session_state.get("lang", "日本語")
+    fig = pio.from_json(_radar_json(kind, str(row["player"]), lang, color, values), skip_invalid=True)
+    st.plotly_chart(fig, use_container_width=True, config={"staticPlot": True})
 
-CENTRAL_TEAMS = ["DeNA", "巨人", "阪神", "広島", "中日", "ヤクルト"]
-PACIFIC_TEAMS = ["ソフトバンク", "日本ハム", "楽天", "ロッテ", "オリックス", "西武"]
+
+
+# --- ページ実装 ---
 
 
 def page_top(data: dict):
@@ -752,11 +673,12 @@ def page_top(data: dict):
         if team_hitters.empty:
             st.info(t("no_data_pa").format(team=selected_team))
         else:
-            display_h = team_hitters[["player", "AVG", "HR", "RBI", "H", "BB", "SB", "OBP", "SLG", "OPS"]].copy()
+            display_h = format_table(
+                team_hitters[["player", "AVG", "HR", "RBI", "H", "BB", "SB", "OBP", "SLG", "OPS"]],
+                TEAM_HITTER_FORMATS,
+            )
             if "data_years" in team_hitters.columns:
-                display_h["注"] = team_hitters["data_years"].apply(
-                    lambda v: "⚠️直近1年のみ" if int(v) == 1 else ("📊直近2年のみ" if int(v) == 2 else "")
-                ).values
+                display_h["注"] = data_years_notes(team_hitters["data_years"])
             display_h.columns = (
                 [t("col_player"), t("col_avg"), t("col_hr"), t("col_rbi"), t("col_h"),
                  t("col_bb"), t("col_sb"), t("col_obp"), t("col_slg"), "OPS", "注"]
@@ -764,15 +686,6 @@ def page_top(data: dict):
                 [t("col_player"), t("col_avg"), t("col_hr"), t("col_rbi"), t("col_h"),
                  t("col_bb"), t("col_sb"), t("col_obp"), t("col_slg"), "OPS"]
             )
-            display_h["打率"] = display_h["打率"].apply(lambda x: f".{int(x*1000):03d}")
-            display_h["本塁打"] = display_h["本塁打"].apply(lambda x: f"{x:.0f}")
-            display_h["打点"] = display_h["打点"].apply(lambda x: f"{x:.0f}")
-            display_h["安打"] = display_h["安打"].apply(lambda x: f"{x:.0f}")
-            display_h["四球"] = display_h["四球"].apply(lambda x: f"{x:.0f}")
-            display_h["盗塁"] = display_h["盗塁"].apply(lambda x: f"{x:.0f}")
-            display_h["出塁率"] = display_h["出塁率"].apply(lambda x: f"{x:.3f}")
-            display_h["長打率"] = display_h["長打率"].apply(lambda x: f"{x:.3f}")
-            display_h["OPS"] = display_h["OPS"].apply(lambda x: f"{x:.3f}")
             display_h = display_h.reset_index(drop=True)
             display_h.index = display_h.index + 1
             st.dataframe(display_h, use_container_width=True, height=min(400, len(display_h) * 40 + 60))
@@ -788,21 +701,15 @@ def page_top(data: dict):
         if team_pitchers.empty:
             st.info(t("no_data_ip").format(team=selected_team))
         else:
-            display_p = team_pitchers[["player", "ERA", "W", "SO", "IP", "WHIP"]].copy()
+            display_p = format_table(team_pitchers[["player", "ERA", "W", "SO", "IP", "WHIP"]],
+                                     TEAM_PITCHER_FORMATS)
             if "data_years" in team_pitchers.columns:
-                display_p["注"] = team_pitchers["data_years"].apply(
-                    lambda v: "⚠️直近1年のみ" if int(v) == 1 else ("📊直近2年のみ" if int(v) == 2 else "")
-                ).values
+                display_p["注"] = data_years_notes(team_pitchers["data_years"])
             display_p.columns = (
                 [t("col_player"), t("col_era"), t("col_w"), t("col_so"), t("col_ip"), "WHIP", "注"]
                 if "注" in display_p.columns else
                 [t("col_player"), t("col_era"), t("col_w"), t("col_so"), t("col_ip"), "WHIP"]
             )
-            display_p["防御率"] = display_p["防御率"].apply(lambda x: f"{x:.2f}")
-            display_p["勝利"] = display_p["勝利"].apply(lambda x: f"{x:.0f}")
-            display_p["奪三振"] = display_p["奪三振"].apply(lambda x: f"{x:.0f}")
-            display_p["投球回"] = display_p["投球回"].apply(lambda x: f"{x:.0f}")
-            display_p["WHIP"] = display_p["WHIP"].apply(lambda x: f"{x:.2f}")
             display_p = display_p.reset_index(drop=True)
             display_p.index = display_p.index + 1
             st.dataframe(display_p, use_container_width=True, height=min(400, len(display_p) * 40 + 60))
@@ -812,7 +719,7 @@ def page_top(data: dict):
                 st.markdown(t("pitcher_stats_help"))
 
         # 計算対象外選手
-        missing_for_team = _get_missing_players(data).get(selected_team, [])
+        missing_for_team = _missing_players_for(_standings_inputs_key(data), data).get(selected_team, [])
         if missing_for_team:
             with st.expander(t("missing_expander_team").format(team=selected_team, n=len(missing_for_team))):
                 st.caption(t("missing_caption_team"))
@@ -834,12 +741,12 @@ def page_top(data: dict):
             st.markdown(f"<div style='text-align:center;font-size:24px;'>{medals[i]}</div>",
                         unsafe_allow_html=True)
             components.html(render_hitter_card(row, glow=glow), height=310)
-            st.plotly_chart(render_radar_chart(row, title=row["player"], color=glow), use_container_width=True, config={"staticPlot": True})
+            show_radar_chart(row, "hitter", color=glow)
 
         # TOP3 投手
         st.markdown(f"### {t('top3_pitchers')}")
         st.caption(t("top3_pitchers_caption"))
-        mp_saber = _ensure_pitcher_saber(mp)
+        mp_saber = ensure_pitcher_saber(mp)
         top_pitchers = mp_saber[mp_saber["IP"] >= 100].nsmallest(3, "FIP")
 
         for i, (_, row) in enumerate(top_pitchers.iterrows()):
@@ -847,7 +754,7 @@ def page_top(data: dict):
             st.markdown(f"<div style='text-align:center;font-size:24px;'>{medals[i]}</div>",
                         unsafe_allow_html=True)
             components.html(render_pitcher_card(row, glow=glow), height=360)
-            st.plotly_chart(render_pitcher_radar_chart(row, title=row["player"], color=glow), use_container_width=True, config={"staticPlot": True})
+            show_radar_chart(row, "pitcher", color=glow)
 
         # リリーフ投手 TOP3
         st.markdown(f"### {t('top3_relievers')}")
@@ -858,7 +765,7 @@ def page_top(data: dict):
             st.markdown(f"<div style='text-align:center;font-size:24px;'>{medals[i]}</div>",
                         unsafe_allow_html=True)
             components.html(render_pitcher_card(row, glow=glow), height=360)
-            st.plotly_chart(render_pitcher_radar_chart(row, title=row["player"], color=glow), use_container_width=True, config={"staticPlot": True})
+            show_radar_chart(row, "pitcher", color=glow)
 
 
 QUICK_HITTERS = ["牧", "近藤", "サンタナ", "宮崎", "佐藤輝", "細川", "坂倉", "万波"]
@@ -886,15 +793,16 @@ def page_hitter_prediction(data: dict):
         st.info(t("search_prompt_btn"))
         return
 
-    mh = _ensure_hitter_saber(data["marcel_hitters"], data)
-    marcel = _search(mh, name)
+    _search_suggestions(name, "marcel_hitters", "hitter_search")
+    mh = ensure_hitter_saber(data["marcel_hitters"], data)
+    marcel = _search(mh, name, "marcel_hitters")
     if marcel.empty:
         st.warning(t("no_player_found").format(name=name))
         return
 
     saber = data.get("sabermetrics", pd.DataFrame())
 
-    for _, row in marcel.iterrows():
+    for i, (_, row) in enumerate(marcel.iterrows()):
         glow = NPB_TEAM_GLOW.get(row["team"], "#00e5ff")
         dy = int(row.get("data_years", 3))
         if dy == 1:
@@ -903,8 +811,9 @@ def page_hitter_prediction(data: dict):
             st.warning(t("data_years_note_2") or "📊 NPBデータが2年のみのため、予測値はリーグ平均にやや補正されています。")
 
         components.html(render_hitter_card(row, glow=glow), height=310)
-        st.plotly_chart(render_radar_chart(row, title=row["player"], color=glow),
-                        use_container_width=True, config={"staticPlot": True})
+        # 2人目以降のレーダーはトグルを開いたときだけ描く
+        if i == 0 or st.toggle(t("show_radar"), key=f"radar_h_{row['player']}"):
+            show_radar_chart(row, "hitter", color=glow)
 
         # wOBA / wRC+ / wRAA カード（2列+単独行）
         if "wOBA" in row.index and not pd.isna(row.get("wOBA")):
@@ -968,7 +877,7 @@ def page_hitter_prediction(data: dict):
 
         # wRC+推移グラフ（sabermetrics履歴データから）
         if not saber.empty:
-            player_saber = _search(saber, row["player"])
+            player_saber = _search(saber, row["player"], "sabermetrics")
             if len(player_saber) > 1:
                 player_name = player_saber.iloc[0]["player"]
                 all_trend = player_saber[player_saber["player"] == player_name].sort_values("year")
@@ -1024,13 +933,14 @@ def page_pitcher_prediction(data: dict):
         st.info(t("search_prompt_btn"))
         return
 
-    mp = _ensure_pitcher_saber(data["marcel_pitchers"])
-    marcel = _search(mp, name)
+    _search_suggestions(name, "marcel_pitchers", "pitcher_search")
+    mp = ensure_pitcher_saber(data["marcel_pitchers"])
+    marcel = _search(mp, name, "marcel_pitchers")
     if marcel.empty:
         st.warning(t("no_player_found").format(name=name))
         return
 
-    for _, row in marcel.iterrows():
+    for i, (_, row) in enumerate(marcel.iterrows()):
         glow = NPB_TEAM_GLOW.get(row["team"], "#00e5ff")
         dy = int(row.get("data_years", 3))
         if dy == 1:
@@ -1039,8 +949,9 @@ def page_pitcher_prediction(data: dict):
             st.warning(t("data_years_note_2") or "📊 NPBデータが2年のみのため、予測値はリーグ平均にやや補正されています。")
 
         components.html(render_pitcher_card(row, glow=glow), height=360)
-        st.plotly_chart(render_pitcher_radar_chart(row, title=row["player"], color=glow),
-                        use_container_width=True, config={"staticPlot": True})
+        # 2人目以降のレーダーはトグルを開いたときだけ描く
+        if i == 0 or st.toggle(t("show_radar"), key=f"radar_p_{row['player']}"):
+            show_radar_chart(row, "pitcher", color=glow)
 
         # FIP / K% / BB% / K-BB% カード（2列×2行）
         has_fip = "FIP" in row.index and not pd.isna(row.get("FIP"))
@@ -1132,7 +1043,7 @@ def page_pitcher_prediction(data: dict):
         ph = data.get("pitcher_history", pd.DataFrame())
         if not ph.empty:
             ph_fip = _add_fip_to_pitcher_history(ph)
-            player_hist = _search(ph_fip, row["player"])
+            player_hist = _search(ph_fip, row["player"], "pitcher_history")
             if not player_hist.empty:
                 player_name = player_hist.iloc[0]["player"]
                 all_hist = player_hist[player_hist["player"] == player_name].sort_values("year")
@@ -1191,7 +1102,7 @@ def page_team_wpct(data: dict):
     team = col1.selectbox(t("team_label"), TEAMS, key="team_wpct", format_func=team_disp)
     year = col2.slider(t("year_label"), 2015, 2025, 2025, key="team_year")
 
-    mask = pyth["team"].str.contains(_norm(team), na=False) & (pyth["year"] == year)
+    mask = pyth["team"].str.contains(normalize_name(team), na=False) & (pyth["year"] == year)
     matched = pyth[mask]
     if matched.empty:
         st.warning(t("no_data_team_year").format(team=team_disp(team), year=year))
@@ -1244,47 +1155,9 @@ def page_team_wpct(data: dict):
     st.plotly_chart(fig, use_container_width=True, config={"staticPlot": True})
 
 
-def _leaderboard_card(rank: int, row: pd.Series, stat_key: str, fmt: str, glow: str) -> str:
-    """ランキングカード1行"""
-    medal = {1: "👑", 2: "🥈", 3: "🥉"}.get(rank, "")
-    border_color = {1: "#ffd700", 2: "#c0c0c0", 3: "#cd7f32"}.get(rank, "#333")
-    val = row[stat_key]
-    dy_badge = _data_years_badge(int(row.get("data_years", 3)))
-
-    return f"""
-    <div style="overflow-x:auto;-webkit-overflow-scrolling:touch;">
-      <div style="display:flex;align-items:center;gap:8px;padding:8px 12px;margin:4px 0;
-                  background:#0d0d24;border:1px solid {border_color}88;border-radius:8px;
-                  font-family:'Segoe UI',sans-serif;min-width:max-content;">
-        <span style="min-width:24px;font-size:16px;text-align:center;">{medal or rank}</span>
-        <span style="flex:1;color:#e0e0e0;font-weight:bold;white-space:nowrap;">{row['player']}{dy_badge}</span>
-        <span style="color:#888;font-size:12px;white-space:nowrap;">{row['team']}</span>
-        <span style="min-width:50px;text-align:right;color:#00e5ff;font-size:16px;font-weight:bold;">{val:{fmt}}</span>
-      </div>
-    </div>"""
-
-
-def _ensure_hitter_saber(mh: pd.DataFrame, data: dict) -> pd.DataFrame:
-    """wOBA/wRC+/wRAA列がなければ計算して追加"""
-    if "wOBA" in mh.columns:
-        return mh
-    saber = data.get("sabermetrics", pd.DataFrame())
-    if saber.empty:
-        return mh
-    df_fit = saber[saber["PA"] >= 100].dropna(subset=["wOBA", "OBP", "SLG"])
-    if len(df_fit) < 10:
-        return mh
-    X = np.column_stack([df_fit["OBP"].values, df_fit["SLG"].values, np.ones(len(df_fit))])
-    coeffs, _, _, _ = np.linalg.lstsq(X, df_fit["wOBA"].values, rcond=None)
-    a, b, c = coeffs
-    recent_s = saber[saber["year"] >= 2022]
-    lg_woba = recent_s[recent_s["PA"] >= 50]["wOBA"].mean()
-    ws = 1.15
-    mh["wOBA"] = (a * mh["OBP"] + b * mh["SLG"] + c).round(3)
-    mh["wRAA"] = ((mh["wOBA"] - lg_woba) / ws * mh["PA"]).round(1)
-    lg_r = lg_woba / ws
-    mh["wRC+"] = (((mh["wOBA"] - lg_woba) / ws + lg_r) / lg_r * 100).round(0).astype(int)
-    return mh
+def _data_years_badges() -> dict[int, str]:
+    """data_years → バッジHTML（ランキングカード用、言語ごとに文言が変わる）"""
+    return {1: _data_years_badge(1), 2: _data_years_badge(2)}
 
 
 def _add_fip_to_pitcher_history(df: pd.DataFrame) -> pd.DataFrame:
@@ -1309,28 +1182,6 @@ def _add_fip_to_pitcher_history(df: pd.DataFrame) -> pd.DataFrame:
     return pd.concat(results, ignore_index=True)
 
 
-def _ensure_pitcher_saber(mp: pd.DataFrame) -> pd.DataFrame:
-    """FIP/K%/BB%/K-BB%/K9/BB9/HR9列がなければ計算して追加"""
-    if "FIP" in mp.columns:
-        return mp
-    if not all(c in mp.columns for c in ["BB", "HBP", "HRA", "BF"]):
-        return mp
-    ip_safe = mp["IP"].replace(0, np.nan)
-    bf_safe = mp["BF"].replace(0, np.nan)
-    mp["K_pct"] = (mp["SO"] / bf_safe * 100).round(1)
-    mp["BB_pct"] = (mp["BB"] / bf_safe * 100).round(1)
-    mp["K_BB_pct"] = (mp["K_pct"] - mp["BB_pct"]).round(1)
-    mp["K9"] = (mp["SO"] * 9 / ip_safe).round(2)
-    mp["BB9"] = (mp["BB"] * 9 / ip_safe).round(2)
-    mp["HR9"] = (mp["HRA"] * 9 / ip_safe).round(2)
-    lg_ip = mp["IP"].sum()
-    if lg_ip > 0:
-        lg_era = (mp["ERA"] * mp["IP"]).sum() / lg_ip
-        fip_c = lg_era - (13 * mp["HRA"].sum() + 3 * (mp["BB"].sum() + mp["HBP"].sum()) - 2 * mp["SO"].sum()) / lg_ip
-        mp["FIP"] = ((13 * mp["HRA"] + 3 * (mp["BB"] + mp["HBP"]) - 2 * mp["SO"]) / mp["IP"] + fip_c).round(2)
-    return mp
-
-
 def page_hitter_rankings(data: dict):
     st.markdown(f"### {t('hitter_rank_title')}")
     mh = data["marcel_hitters"]
@@ -1338,32 +1189,18 @@ def page_hitter_rankings(data: dict):
         st.error(t("no_data"))
         return
 
-    mh = _ensure_hitter_saber(mh, data)
+    mh = ensure_hitter_saber(mh, data)
 
     col1, col2 = st.columns(2)
     top_n = col1.slider(t("show_n"), 5, 50, 20, key="hitter_rank_n")
-    sort_labels = {
-        t("sort_ops"): "OPS", t("sort_avg"): "AVG",
-        t("sort_hr"): "HR", t("sort_rbi"): "RBI",
-    }
-    if "wOBA" in mh.columns:
-        sort_labels[t("sort_woba")] = "wOBA"
-        sort_labels[t("sort_wrcplus")] = "wRC+"
-    if "bayes_OPS" in mh.columns:
-        sort_labels[t("sort_bayes_ops")] = "bayes_OPS"
+    sort_labels = {t(key): col for key, col in sort_options(mh, HITTER_SORT_OPTIONS)}
     sort_label = col2.selectbox(t("sort_by"), list(sort_labels.keys()), key="hitter_rank_sort")
     sort_by = sort_labels[sort_label]
 
-    df = mh[mh["PA"] >= 200].sort_values(sort_by, ascending=False).head(top_n).reset_index(drop=True)
-
-    fmt_map = {"OPS": ".3f", "AVG": ".3f", "HR": ".0f", "RBI": ".0f", "wOBA": ".3f", "wRC+": ".0f",
-               "bayes_OPS": ".3f"}
-    fmt = fmt_map.get(sort_by, ".3f")
+    df = hitter_ranking(mh, sort_by, top_n)
+    fmt = HITTER_RANK_FORMATS.get(sort_by, ".3f")
 
-    cards = ""
-    for i, (_, row) in enumerate(df.iterrows()):
-        glow = NPB_TEAM_GLOW.get(row["team"], "#00e5ff")
-        cards += _leaderboard_card(i + 1, row, sort_by, fmt, glow)
+    cards = leaderboard_cards_html(df, sort_by, fmt, _data_years_badges())
 
     components.html(f"""
     <div style="max-height:600px;overflow-y:auto;padding:4px;">
@@ -1378,43 +1215,18 @@ def page_pitcher_rankings(data: dict):
         st.error(t("no_data"))
         return
 
-    mp = _ensure_pitcher_saber(mp)
+    mp = ensure_pitcher_saber(mp)
 
     col1, col2 = st.columns(2)
     top_n = col1.slider(t("show_n"), 5, 50, 20, key="pitcher_rank_n")
-    sort_labels = {
-        t("sort_era"): "ERA", t("sort_whip"): "WHIP",
-        t("sort_so"): "SO", t("sort_w"): "W",
-    }
-    if "FIP" in mp.columns:
-        sort_labels[t("sort_fip")] = "FIP"
-        sort_labels[t("sort_k_pct")] = "K_pct"
-        sort_labels[t("sort_bb_pct")] = "BB_pct"
-        sort_labels[t("sort_k_bb_pct")] = "K_BB_pct"
-        sort_labels[t("sort_k9")] = "K9"
-        sort_labels[t("sort_bb9")] = "BB9"
-        sort_labels[t("sort_hr9")] = "HR9"
-    if "bayes_ERA" in mp.columns:
-        sort_labels[t("sort_bayes_era")] = "bayes_ERA"
+    sort_labels = {t(key): col for key, col in sort_options(mp, PITCHER_SORT_OPTIONS)}
     sort_label = col2.selectbox(t("sort_by"), list(sort_labels.keys()), key="pitcher_rank_sort")
     sort_by = sort_labels[sort_label]
 
-    ascending = sort_by in ("ERA", "WHIP", "FIP", "BB_pct", "BB9", "HR9", "bayes_ERA")
-    df = mp[mp["IP"] >= 100].sort_values(sort_by, ascending=ascending).head(top_n).reset_index(drop=True)
-
-    fmt_map = {"ERA": ".2f", "WHIP": ".2f", "SO": ".0f", "W": ".0f",
-               "FIP": ".2f", "K_pct": ".1f", "BB_pct": ".1f", "K_BB_pct": ".1f",
-               "K9": ".2f", "BB9": ".2f", "HR9": ".2f", "bayes_ERA": ".2f"}
-    fmt = fmt_map.get(sort_by, ".2f")
+    df = pitcher_ranking(mp, sort_by, top_n)
+    fmt = PITCHER_RANK_FORMATS.get(sort_by, ".2f")
 
-    # 表示ラベル（K_pct → K% のように変換）
-    display_suffix = {"K_pct": "%", "BB_pct": "%", "K_BB_pct": "%"}
-    suffix = display_suffix.get(sort_by, "")
-
-    cards = ""
-    for i, (_, row) in enumerate(df.iterrows()):
-        glow = NPB_TEAM_GLOW.get(row["team"], "#00e5ff")
-        cards += _leaderboard_card(i + 1, row, sort_by, fmt, glow)
+    cards = leaderboard_cards_html(df, sort_by, fmt, _data_years_badges())
 
     components.html(f"""
     <div style="max-height:600px;overflow-y:auto;padding:4px;">
@@ -1424,101 +1236,35 @@ def page_pitcher_rankings(data: dict):
     st.markdown("---")
     with st.expander(t("reliever_rank_title")):
         st.caption(t("reliever_rank_caption"))
-        df_rel = mp[(mp["IP"] >= 20) & (mp["IP"] < 100)].sort_values(sort_by, ascending=ascending).head(top_n).reset_index(drop=True)
-        cards_rel = ""
-        for i, (_, row) in enumerate(df_rel.iterrows()):
-            glow = NPB_TEAM_GLOW.get(row["team"], "#00e5ff")
-            cards_rel += _leaderboard_card(i + 1, row, sort_by, fmt, glow)
+        df_rel = pitcher_ranking(mp, sort_by, top_n, relievers=True)
+        cards_rel = leaderboard_cards_html(df_rel, sort_by, fmt, _data_years_badges())
         components.html(f"""
         <div style="max-height:600px;overflow-y:auto;padding:4px;">
           {cards_rel}
         </div>""", height=min(650, top_n * 50 + 20))
 
 
-def _build_2026_standings(data: dict, missing_all: dict | None = None) -> pd.DataFrame:
-    """2026年の予測順位表。
-
-    RS推定: wOBA = a×OBP + b×SLG の回帰 → wRAA → リーグ平均+wRAA合計
-    RA推定: (ERA - lgERA) × IP/9 → リーグ平均+超過失点合計
-    両方を歴史的リーグ平均にスケーリングして絶対水準を揃える。
-    """
-    mh = data["marcel_hitters"]
-    mp = data["marcel_pitchers"]
-    saber = data["sabermetrics"]
-    pyth = data["pythagorean"]
-    if mh.empty or mp.empty or saber.empty or pyth.empty:
-        return pd.DataFrame()
-
-    # 歴史的リーグ平均得点・失点（1チームあたり）
-    recent_p = pyth[pyth["year"] >= 2022]
-    lg_avg_rs = recent_p.groupby("year")["RS"].mean().mean()
-    lg_avg_ra = recent_p.groupby("year")["RA"].mean().mean()
-
-    # Marcel投手全体の加重平均ERA（リーグ基準ERA）
-    lg_era = (mp["ERA"] * mp["IP"]).sum() / mp["IP"].sum() if mp["IP"].sum() > 0 else 3.5
-
-    # --- lg_woba ---
-    recent_s = saber[saber["year"] >= 2022]
-    if not recent_s.empty and "wOBA" in saber.columns:
-        lg_woba = recent_s[recent_s["PA"] >= 50]["wOBA"].mean()
-    else:
-        lg_woba = 0.310
+def _standings_inputs_key(data) -> str:
+    """2026年予測順位の入力（予測データの内容・ロースター・パークファクター）のハッシュ"""
+    from roster_current import ROSTER_CURRENT
 
-    # --- 選手ごとのwOBA・wRAA推定 ---
-    mh = mh.copy()
-    if "wOBA" in mh.columns and "wRAA" in mh.columns:
-        mh["wOBA_est"] = mh["wOBA"]
-        mh["wRAA_est"] = mh["wRAA"]
-    else:
-        # フォールバック: 回帰係数を計算
-        df_fit = saber[saber["PA"] >= 100].dropna(subset=["wOBA", "OBP", "SLG"])
-        X = np.column_stack([df_fit["OBP"].values, df_fit["SLG"].values, np.ones(len(df_fit))])
-        coeffs, _, _, _ = np.linalg.lstsq(X, df_fit["wOBA"].values, rcond=None)
-        a_obp, b_slg, intercept_w = coeffs
-        woba_scale = 1.15
-        mh["wOBA_est"] = a_obp * mh["OBP"] + b_slg * mh["SLG"] + intercept_w
-        mh["wRAA_est"] = (mh["wOBA_est"] - lg_woba) / woba_scale * mh["PA"]
-
-    mp = mp.copy()
-    mp["era_above_avg"] = mp["ERA"] - lg_era  # 正=平均より悪い（失点多い）
-
-    # --- チームごとにRS/RA算出 ---
-    # ※ ロースター登録済みだがMarcel対象外の選手（新人・新外国人等）は
-    #    wRAA=0（リーグ平均貢献）として扱う。
-    if missing_all is None:
-        missing_all = _get_missing_players(data)
-    pf_map = _load_park_factors()
-    rows = []
-    for team in TEAMS:
-        h = mh[mh["team"] == team]
-        p = mp[mp["team"] == team]
-        rs_raw = lg_avg_rs + (h["wRAA_est"].sum() if not h.empty else 0)
-        ra_raw = lg_avg_ra + ((p["era_above_avg"] * p["IP"] / 9.0).sum() if not p.empty else 0)
-        rs_raw, ra_raw = _apply_park_factor(rs_raw, ra_raw, team, pf_map)
-
-        team_missing = missing_all.get(team, [])
-        league = "CL" if team in CENTRAL_TEAMS else "PL"
-        rows.append({
-            "league": league, "team": team, "rs_raw": rs_raw, "ra_raw": ra_raw,
-            "missing_count": len(team_missing),
-        })
+    return _hash_json([
+        data.get("_fingerprint", ""),
+        ROSTER_CURRENT,
+        sorted(_load_park_factors().items()),
+    ])
 
-    df = pd.DataFrame(rows)
 
-    # スケーリング: 全12チーム平均をリーグ平均RS/RAに合わせる（選択バイアス除去）
-    rs_scale = lg_avg_rs / df["rs_raw"].mean()
-    ra_scale = lg_avg_ra / df["ra_raw"].mean()
-    df["pred_RS"] = df["rs_raw"] * rs_scale
-    df["pred_RA"] = df["ra_raw"] * ra_scale
+@st.cache_data(ttl=3600, max_entries=4, show_spinner=False)
+def _missing_players_for(key: str, _data) -> dict:
+    """get_missing_players の結果を入力ハッシュ key ごとにキャッシュ（_data はハッシュしない）"""
+    return get_missing_players(_data)
 
-    df["pred_WPCT"] = df.apply(
-        lambda r: _pythagorean_wpct(r["pred_RS"], r["pred_RA"], k=1.72), axis=1
-    )
-    df["pred_W"] = df["pred_WPCT"] * 143
-    df["pred_L"] = 143 - df["pred_W"]
 
-    return df[["league", "team", "pred_RS", "pred_RA", "pred_WPCT",
-               "pred_W", "pred_L", "missing_count"]]
+@st.cache_data(ttl=3600, max_entries=4, show_spinner=False)
+def _standings_2026_for(key: str, _data) -> pd.DataFrame:
+    """build_2026_standings の結果を入力ハッシュ key ごとにキャッシュ（_data はハッシュしない）"""
+    return build_2026_standings(_data, _load_park_factors(), _missing_players_for(key, _data))
 
 
 def page_pythagorean_standings(data: dict):
@@ -1527,8 +1273,9 @@ def page_pythagorean_standings(data: dict):
     st.caption(t("stan_standings_note"))
 
     # --- 2026年予測 ---
-    missing_all = _get_missing_players(data)
-    standings_2026 = _build_2026_standings(data, missing_all)
+    key = _standings_inputs_key(data)
+    missing_all = _missing_players_for(key, data)
+    standings_2026 = _standings_2026_for(key, data)
     if not standings_2026.empty:
         st.markdown(f"## {t('standings_2026_title')}")
         st.caption(t("standings_2026_caption"))
@@ -1600,13 +1347,12 @@ def page_pythagorean_standings(data: dict):
                 if mc_lg.empty:
                     continue
                 st.markdown(f"**{label}**")
-                mc_disp = mc_lg[["team", "p_pennant", "p_cs", "median_wins"]].copy()
-                mc_disp.columns = [t("team_label"), t("p_pennant"), t("p_cs"), t("median_wins")]
-                mc_disp[t("team_label")] = mc_lg["team"].apply(team_disp)
-                mc_disp[t("p_pennant")] = mc_lg["p_pennant"].apply(lambda x: f"{x * 100:.1f}%")
-                mc_disp[t("p_cs")] = mc_lg["p_cs"].apply(lambda x: f"{x * 100:.1f}%")
-                mc_disp[t("median_wins")] = mc_lg["median_wins"].apply(lambda x: f"{x:.1f}")
-                mc_disp = mc_disp.reset_index(drop=True)
+                mc_disp = pd.DataFrame({
+                    t("team_label"): team_disp_col(mc_lg["team"]).to_numpy(),
+                    t("p_pennant"): percent(mc_lg["p_pennant"]),
+                    t("p_cs"): percent(mc_lg["p_cs"]),
+                    t("median_wins"): fixed(mc_lg["median_wins"], 1),
+                })
                 mc_disp.index = mc_disp.index + 1
                 st.dataframe(mc_disp, use_container_width=True)
 
@@ -1730,6 +1476,71 @@ def page_pythagorean_standings(data: dict):
 # --- チームシミュレーション ---
 
 
+def _whatif_panel():
+    """出場選手・出場機会を変えてチームシミュレーションを再計算するパネル"""
+    st.markdown(f"## {t('whatif_title')}")
+    st.caption(t("whatif_caption").format(n=WHATIF_N_SIM))
+    season = _whatif_draws(_data_version())
+    if season is None:
+        st.info(t("no_data"))
+        return
+    draws, base = season
+
+    teams = [tm for tm in TEAMS if tm in draws.all_teams]
+    team = st.selectbox(t("team_label"), teams, format_func=team_disp, key="whatif_team")
+    roster = draws.roster(team)
+    is_hitter = roster["group"].isin(["hitter", "foreign_hitter"]).to_numpy()
+    proj = np.where(is_hitter, fixed(roster["center"], 3), fixed(roster["center"], 2))
+
+    col_inc, col_share = t("whatif_include"), t("whatif_share")
+    editor_df = pd.DataFrame({
+        col_inc: True,
+        t("col_player"): roster["player"],
+        t("whatif_kind"): roster["group"].map(lambda g: t(f"whatif_{g}")),
+        t("whatif_proj"): proj,
+        t("whatif_playing_time"): roster["playing_time"].round(0).astype(int),
+        col_share: 100,
+    })
+    edited = st.data_editor(
+        editor_df, key=f"whatif_editor_{team}", hide_index=True, use_container_width=True,
+        disabled=[c for c in editor_df.columns if c not in (col_inc, col_share)],
+        column_config={
+            col_share: st.column_config.NumberColumn(min_value=0, max_value=300, step=10, format="%d%%"),
+        },
+    )
+
+    groups, rows = roster["group"].tolist(), roster["row"].tolist()
+    include = edited[col_inc].fillna(True).to_numpy(dtype=bool)
+    share = edited[col_share].fillna(100).to_numpy(dtype=float) / 100
+    moves = {(g, r): None for g, r, inc in zip(groups, rows, include) if not inc}
+    shares = {(g, r): s for g, r, s in zip(groups, rows, share.tolist()) if s != 1.0}
+
+    t0 = time.perf_counter()
+    probs = compute_probabilities(draws.wins(moves, shares)) if (moves or shares) else base
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+
+    league = next(lg for lg, lg_teams in LEAGUES.items() if team in lg_teams)
+    lg_teams = [tm for tm in LEAGUES[league] if tm in probs]
+    after = pd.DataFrame([probs[tm] for tm in lg_teams], index=lg_teams)
+    before = pd.DataFrame([base[tm] for tm in lg_teams], index=lg_teams)
+    order = after["p_pennant"].sort_values(ascending=False).index
+    after, before = after.loc[order], before.loc[order]
+
+    label = t("central_league") if league == "CL" else t("pacific_league")
+    st.markdown(f"**{t('whatif_result').format(league=label)}**")
+    result_df = pd.DataFrame({
+        t("team_label"): team_disp_col(pd.Series(order)).to_numpy(),
+        t("p_pennant"): percent(after["p_pennant"]),
+        t("whatif_delta_pct"): signed((after["p_pennant"] - before["p_pennant"]) * 100, 1),
+        t("p_cs"): percent(after["p_cs"]),
+        t("median_wins"): fixed(after["median_wins"], 1),
+        t("whatif_delta_wins"): signed(after["median_wins"] - before["median_wins"], 1),
+    })
+    result_df.index = result_df.index + 1
+    st.dataframe(result_df, use_container_width=True)
+    st.caption(t("whatif_elapsed").format(ms=elapsed_ms))
+
+
 def page_team_simulation(data: dict):
     """モンテカルロ・チームシミュレーション結果ページ"""
     st.markdown(f"### {t('team_sim_title')}")
@@ -1753,20 +1564,14 @@ def page_team_simulation(data: dict):
 
         # 確率テーブル
         st.markdown(f"**{t('prob_table_title')}**")
-        prob_df = lg[["team", "p_pennant", "p_cs", "p_last",
-                      "median_wins", "mean_wins"]].copy()
-        prob_df.columns = [
-            t("team_label"), t("p_pennant"), t("p_cs"), t("p_last"),
-            t("median_wins"), t("mean_wins"),
-        ]
-        # Format percentages
-        for col in [t("p_pennant"), t("p_cs"), t("p_last")]:
-            prob_df[col] = prob_df[col].apply(lambda x: f"{x * 100:.1f}%")
-        for col in [t("median_wins"), t("mean_wins")]:
-            prob_df[col] = prob_df[col].apply(lambda x: f"{x:.1f}")
-        # チーム名を言語に合わせる
-        prob_df[t("team_label")] = lg["team"].apply(team_disp)
-        prob_df = prob_df.reset_index(drop=True)
+        prob_df = pd.DataFrame({
+            t("team_label"): team_disp_col(lg["team"]).to_numpy(),
+            t("p_pennant"): percent(lg["p_pennant"]),
+            t("p_cs"): percent(lg["p_cs"]),
+            t("p_last"): percent(lg["p_last"]),
+            t("median_wins"): fixed(lg["median_wins"], 1),
+            t("mean_wins"): fixed(lg["mean_wins"], 1),
+        })
         prob_df.index = prob_df.index + 1
         st.dataframe(prob_df, use_container_width=True)
 
@@ -1823,6 +1628,8 @@ def page_team_simulation(data: dict):
         )
         st.plotly_chart(fig, use_container_width=True, config={"staticPlot": True})
 
+    _whatif_panel()
+
     with st.expander(t("mc_method_expander")):
         st.markdown(t("mc_method_content"))
 
@@ -2018,6 +1825,13 @@ def main():
 
     st.caption(t("data_source"))
 
+    # 運用向け: テーブル別メモリ使用量（NPB_DASHBOARD_MEMORY_PANEL=1 のときだけ表示）
+    if os.environ.get("NPB_DASHBOARD_MEMORY_PANEL") == "1":
+        with st.sidebar.expander(t("memory_report")):
+            report = data["_memory_report"]
+            st.dataframe(report, hide_index=True, use_container_width=True)
+            st.caption(f"total {report['MB'].sum():.1f} MB")
+
     PAGE_FUNCS[page_key](data)
 
 
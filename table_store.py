@@ -0,0 +1,238 @@
+"""
+表データの保存・読み込み（CSV + 型付き Parquet）
+
+data/raw と data/projections の表は UTF-8 BOM付きCSVで保存・コミットしているが、読むたびに
+CSVをパースし、数値列の型変換（"-" や "∞" を含む ERA・RC27 等の pd.to_numeric）をやり直していた。
+ここでは CSV の隣に型付きの Parquet（npb_hitters_2015_2025.csv → npb_hitters_2015_2025.parquet）を
+置き、CSVが変わっていなければ Parquet から読む。
+
+  - Parquet は常に「CSVを読んで数値列を変換した結果」から作る。どちらから読んでも同じ DataFrame になる
+  - 投手成績の投球回は、取り込み時に付けたアウト数の整数列 IP_outs（"123.1" → 370）と、
+    そこから作る小数の IP_num（IP_outs / 3）を持つ。各予測で投球回の文字列を解析し直さない
+  - team / player 等の繰り返しの多い列は辞書エンコード（Arrow の dictionary 型）で保存する
+    （categories=True で読むと category 型のまま返す。既定は元の文字列型に戻す）
+  - Parquet のメタデータに元CSVのサイズ・mtime・SHA-1 を記録し、一致しなければ作り直す
+    （mtime だけ変わった場合は SHA-1 を比べるので、git checkout 後も作り直さない）
+  - Parquet は派生物なのでコミットしない（.gitignore）。書けない場所では黙ってCSVだけ使う
+  - pyarrow が無い環境では常にCSVを読む
+
+Usage:
+  python table_store.py                 # data/raw・data/projections の Parquet を作成・更新
+  python table_store.py --check         # 古い・無い Parquet の一覧
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+DATA_DIR = Path(__file__).parent / "data"
+TABLE_DIRS = [DATA_DIR / "raw", DATA_DIR / "projections"]
+
+# 辞書エンコードで保存する列
+CATEGORY_COLUMNS = ("team", "player", "league", "home_team", "away_team", "method")
+
+# CSV に文字列で入っている数値列（ファイル名の先頭 → 列）。読み込み時に数値化する
+NUMERIC_COLUMNS = {
+    "npb_hitters_": ["AVG", "OBP", "SLG", "OPS", "PA", "G", "HR", "RBI", "SB", "BB", "SO", "H",
+                     "RC27", "XR27"],
+    "npb_pitchers_": ["ERA", "WHIP", "DIPS", "IP", "ER", "HA", "W", "L", "SV", "SO", "BB", "HBP",
+                      "HRA", "BF", "G"],
+}
+
+# Parquet のメタデータに元CSVの情報を入れるキー
+_SOURCE_KEY = b"npb_source"
+
+
+def numeric_columns(name: str) -> list[str]:
+    """ファイル名から数値化する列を返す"""
+    for prefix, columns in NUMERIC_COLUMNS.items():
+        if name.startswith(prefix):
+            return columns
+    return []
+
+
+def ip_outs(ip: pd.Series) -> pd.Series:
+    """投球回の表記（123.1 = 123回1/3）をアウト数の整数にする（欠損があれば Int64）"""
+    ip = pd.to_numeric(ip, errors="coerce")
+    whole = np.floor(ip)
+    outs = whole * 3 + np.rint((ip - whole) * 10)
+    return outs.astype("Int64" if outs.isna().any() else "int64")
+
+
+def add_innings(df: pd.DataFrame) -> pd.DataFrame:
+    """IP 列から IP_outs（アウト数）と IP_num（投球回の小数、IP_outs / 3）を付ける（揃っていればそのまま）"""
+    if "IP" not in df.columns:
+        return df
+    if "IP_outs" not in df.columns or df["IP_outs"].isna().any():
+        df["IP_outs"] = ip_outs(df["IP"])
+    if "IP_num" not in df.columns:
+        df["IP_num"] = (df["IP_outs"] / 3).astype("float64")
+    return df
+
+
+def typed(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """ファイル名に応じて数値列を変換する（変換できない値は NaN）。投手成績には投球回の列も付ける"""
+    for col in numeric_columns(name):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    if name.startswith("npb_pitchers_"):
+        add_innings(df)
+    return df
+
+
+def parquet_path(path: str | Path) -> Path:
+    return Path(path).with_suffix(".parquet")
+
+
+def source_version(path: str | Path) -> dict:
+    """CSVのサイズ・mtime・SHA-1"""
+    path = Path(path)
+    st = path.stat()
+    return {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha1": hashlib.sha1(path.read_bytes()).hexdigest(),
+    }
+
+
+def _is_fresh(recorded: dict, path: Path) -> bool:
+    st = path.stat()
+    if recorded.get("size") != st.st_size:
+        return False
+    if recorded.get("mtime_ns") == st.st_mtime_ns:
+        return True
+    return recorded.get("sha1") == hashlib.sha1(path.read_bytes()).hexdigest()
+
+
+def read_parquet(path: str | Path, source: Path | str | None = None,
+                 categories: bool = False) -> pd.DataFrame | None:
+    """Parquet を読む。無い・読めない・元データと合わない場合は None
+
+    source が Path なら書いたときのCSVの情報（source_version）と比べ、文字列なら記録した
+    version とそのまま比べる。None なら比べない。
+    """
+    path = Path(path)
+    if not HAS_PYARROW or not path.exists():
+        return None
+    try:
+        pf = pq.ParquetFile(path)
+        if source is not None:
+            recorded = json.loads((pf.schema_arrow.metadata or {}).get(_SOURCE_KEY, b"null"))
+            if recorded is None:
+                return None
+            if isinstance(source, str) and recorded != source:
+                return None
+            if isinstance(source, Path) and not (isinstance(recorded, dict) and _is_fresh(recorded, source)):
+                return None
+        table = pf.read()
+        if not categories:
+            # 辞書エンコードの列は Arrow 側で元の型に戻す（pandas で category から戻すより速い）
+            schema = pa.schema([f.with_type(f.type.value_type) if pa.types.is_dictionary(f.type) else f
+                                for f in table.schema], metadata=table.schema.metadata)
+            table = table.cast(schema)
+        return table.to_pandas()
+    except Exception:
+        return None
+
+
+def write_parquet(df: pd.DataFrame, path: str | Path, version: dict | str | None = None) -> bool:
+    """DataFrame を Parquet に書く（team/player 等は辞書エンコード）。書けなければ False"""
+    if not HAS_PYARROW:
+        return False
+    path = Path(path)
+    out = df.copy()
+    for col in CATEGORY_COLUMNS:
+        if col in out.columns and not isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype("category")
+    try:
+        table = pa.Table.from_pandas(out, preserve_index=False)
+        meta = dict(table.schema.metadata or {})
+        meta[_SOURCE_KEY] = json.dumps(version).encode("utf-8")
+        table = table.replace_schema_metadata(meta)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        pq.write_table(table, tmp)
+        tmp.replace(path)
+    except Exception:
+        return False
+    return True
+
+
+def read_csv(path: str | Path) -> pd.DataFrame:
+    """CSV（UTF-8 BOM付き）を読んで数値列を変換する（Parquet を使わない読み方）"""
+    path = Path(path)
+    return typed(pd.read_csv(path, encoding="utf-8-sig"), path.name)
+
+
+def load_table(path: str | Path, categories: bool = False) -> pd.DataFrame:
+    """表を読む。隣の Parquet がCSVと一致すれば Parquet から、無ければCSVから読んで Parquet を作る
+
+    CSV が無ければ空の DataFrame を返す。
+    """
+    path = Path(path)
+    if not path.exists():
+        return pd.DataFrame()
+    pq_path = parquet_path(path)
+    df = read_parquet(pq_path, source=path, categories=categories)
+    if df is not None:
+        return df
+    version = source_version(path) if HAS_PYARROW else None
+    df = read_csv(path)
+    if HAS_PYARROW:
+        write_parquet(df, pq_path, version)
+        if categories:
+            return read_parquet(pq_path, categories=True)
+    return df
+
+
+def save_table(df: pd.DataFrame, path: str | Path) -> Path:
+    """CSV（UTF-8 BOM付き）を書き、隣に Parquet も作る"""
+    path = Path(path)
+    df.to_csv(path, index=False, encoding="utf-8-sig")
+    if HAS_PYARROW:
+        write_parquet(read_csv(path), parquet_path(path), source_version(path))
+    return path
+
+
+def table_paths() -> list[Path]:
+    return sorted(p for d in TABLE_DIRS if d.exists() for p in d.glob("*.csv"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV の隣の型付き Parquet を作成・確認")
+    parser.add_argument("--check", action="store_true", help="古い・無い Parquet を表示するだけ")
+    args = parser.parse_args()
+
+    if not HAS_PYARROW:
+        print("pyarrow が無いため Parquet は使えません（CSV から読みます）")
+        return
+
+    stale = []
+    for path in table_paths():
+        if read_parquet(parquet_path(path), source=path) is None:
+            stale.append(path)
+    if args.check:
+        for path in stale:
+            print(f"  stale: {path}")
+        print(f"{len(stale)} / {len(table_paths())} 件が古い・未作成")
+        return
+    for path in stale:
+        df = load_table(path)
+        print(f"  Saved: {parquet_path(path)} ({len(df)} rows)")
+    print(f"{len(stale)} 件を作成（{len(table_paths()) - len(stale)} 件は最新）")
+
+
+if __name__ == "__main__":
+    main()
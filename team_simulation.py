@@ -23,13 +23,14 @@ Data sources:
 """
 
 import json
-import time
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
 
 from config import TARGET_YEAR, PROJECTIONS_DIR
+from step_timer import StepTimer
+from table_store import load_table, save_table
 
 DATA_DIR = Path(__file__).parent / "data"
 OUT_DIR = PROJECTIONS_DIR
@@ -58,47 +59,44 @@ LEAGUES: dict[str, list[str]] = {
 CS_SPOTS = 3
 
 
-def _log_elapsed(label: str, start: float, budget_min: int = 180):
-    elapsed_min = (time.time() - start) / 60
-    print(f"  [{label}] elapsed: {elapsed_min:.1f} min / {budget_min} min budget")
-    if elapsed_min > budget_min * 0.8:
-        print(f"  WARNING: {label} used {elapsed_min:.0f}/{budget_min} min "
-              f"({elapsed_min / budget_min * 100:.0f}%) -- timeout risk!")
-
-
 def load_bayes_hitters() -> pd.DataFrame:
     path = OUT_DIR / f"bayes_hitters_{TARGET_YEAR}.csv"
     if not path.exists():
         return pd.DataFrame()
-    return pd.read_csv(path, encoding="utf-8-sig")
+    return load_table(path)
 
 
 def load_bayes_pitchers() -> pd.DataFrame:
     path = OUT_DIR / f"bayes_pitchers_{TARGET_YEAR}.csv"
     if not path.exists():
         return pd.DataFrame()
-    return pd.read_csv(path, encoding="utf-8-sig")
+    return load_table(path)
 
 
 def load_foreign_hitters() -> pd.DataFrame:
     path = OUT_DIR / f"foreign_hitters_{TARGET_YEAR}.csv"
     if not path.exists():
         return pd.DataFrame()
-    return pd.read_csv(path, encoding="utf-8-sig")
+    return load_table(path)
 
 
 def load_foreign_pitchers() -> pd.DataFrame:
     path = OUT_DIR / f"foreign_pitchers_{TARGET_YEAR}.csv"
     if not path.exists():
         return pd.DataFrame()
-    return pd.read_csv(path, encoding="utf-8-sig")
+    return load_table(path)
 
 
-def load_park_factors() -> dict[str, float]:
+def load_park_factors(max_year: int | None = None) -> dict[str, float]:
+    """PF_5yr（max_year 以前の最新年、省略時は全体の最新年）をチーム別に返す"""
     path = OUT_DIR / "npb_park_factors.csv"
     if not path.exists():
         return {}
-    pf_df = pd.read_csv(path, encoding="utf-8-sig")
+    pf_df = load_table(path)
+    if max_year is not None:
+        pf_df = pf_df[pf_df["year"] <= max_year]
+        if pf_df.empty:
+            return {}
     latest_year = pf_df["year"].max()
     latest = pf_df[pf_df["year"] == latest_year][["team", "PF_5yr"]].copy()
     return dict(zip(latest["team"], latest["PF_5yr"]))
@@ -128,142 +126,246 @@ def normalize_ip(pitchers: pd.DataFrame) -> pd.DataFrame:
     return pitchers
 
 
-def simulate(
-    hitters: pd.DataFrame,
-    pitchers: pd.DataFrame,
-    foreign_h: pd.DataFrame,
-    foreign_p: pd.DataFrame,
-    n_sim: int = N_SIM,
-    seed: int = 42,
-    park_factors: dict[str, float] | None = None,
-) -> dict[str, np.ndarray]:
-    """Run Monte Carlo simulation.
-
-    ベイズ予測がある選手はbayes_OPS/bayes_ERAを中心にサンプリング。
-    外国人選手はforeign CSVのbayes_OPS/bayes_ERAを使用（PA/IPは推定値）。
-    """
-    rng = np.random.default_rng(seed)
-
-    # 日本人打者: bayes_OPS があればそれを使う、なければmarcel_OPS
-    ops_vals = hitters["bayes_OPS"].fillna(hitters["marcel_OPS"]).values
-    pa_vals = hitters["PA"].values
-    h_teams = hitters["team"].values
+class SeasonDraws:
+    """選手ごとのモンテカルロ・ドロー（RS/RAへの寄与）を保持し、チーム勝利数分布に集計する。
 
-    # 日本人打者サンプリング
-    ops_sim = np.clip(
-        ops_vals[:, None] + rng.normal(0, SIGMA_OPS, size=(len(hitters), n_sim)),
-        0.250, 1.200,
-    )
+    行 = 1選手、列 = 1シミュレーション。チームRS/RAは所属選手の行の和なので、
+    移籍・除外・出場機会（PA/IP配分）の what-if は影響チームの行集合と重みだけを
+    入れ替えて再集計すればよい（乱数は引き直さない）。
 
-    # 日本人投手: bayes_ERA があればそれを使う、なければmarcel_ERA
-    era_vals = pitchers["bayes_ERA"].fillna(pitchers["marcel_ERA"]).values
-    ip_vals = pitchers["IP"].values
-    p_teams = pitchers["team"].values
+    日本人選手の寄与は未正規化のPA/IPで持ち、チーム集計時に NPB_TARGET_PA /
+    NPB_TARGET_IP へスケーリングする（normalize_pa / normalize_ip と同じ結果）。
+    外国人選手の寄与は推定PA/IPのまま加算する。
+    """
 
-    era_sim = np.clip(
-        era_vals[:, None] + rng.normal(0, SIGMA_ERA, size=(len(pitchers), n_sim)),
-        0.50, 12.0,
-    )
+    GROUPS = ("hitter", "pitcher", "foreign_hitter", "foreign_pitcher")
+
+    def __init__(
+        self,
+        hitters: pd.DataFrame,
+        pitchers: pd.DataFrame,
+        foreign_h: pd.DataFrame,
+        foreign_p: pd.DataFrame,
+        n_sim: int = N_SIM,
+        seed: int = 42,
+        park_factors: dict[str, float] | None = None,
+        dtype=np.float64,
+    ):
+        """dtype=np.float32 にするとドロー行列のメモリが半分になる（ダッシュボードの what-if 用）"""
+        rng = np.random.default_rng(seed)
+        self.n_sim = n_sim
+        self.park_factors = park_factors or {}
+
+        # 日本人打者: bayes_OPS があればそれを使う、なければmarcel_OPS
+        ops_vals = hitters["bayes_OPS"].fillna(hitters["marcel_OPS"]).values
+        pa_vals = hitters["PA"].values.astype(float)
+        ops_sim = np.clip(
+            ops_vals[:, None] + rng.normal(0, SIGMA_OPS, size=(len(hitters), n_sim)),
+            0.250, 1.200,
+        )
 
-    # 全チーム収集
-    all_teams = sorted(
-        set(h_teams) | set(p_teams)
-        | (set(foreign_h["team"]) if len(foreign_h) > 0 else set())
-        | (set(foreign_p["team"]) if len(foreign_p) > 0 else set())
-    )
+        # 日本人投手: bayes_ERA があればそれを使う、なければmarcel_ERA
+        era_vals = pitchers["bayes_ERA"].fillna(pitchers["marcel_ERA"]).values
+        ip_vals = pitchers["IP"].values.astype(float)
+        era_sim = np.clip(
+            era_vals[:, None] + rng.normal(0, SIGMA_ERA, size=(len(pitchers), n_sim)),
+            0.50, 12.0,
+        )
 
-    # 外国人打者のRS貢献（チーム別に集計）
-    foreign_h_rs: dict[str, np.ndarray] = {}
-    if len(foreign_h) > 0:
-        for _, row in foreign_h.iterrows():
-            team = row["team"]
-            ops = row["bayes_OPS"]
-            # 外国人のPA推定: 1軍定着なら300PA、それ以外100PA
+        # 外国人打者: 1軍定着なら300PA、それ以外100PA。不確実性1.5倍
+        fh_rows = []
+        fh_pa = []
+        for ops in (foreign_h["bayes_OPS"] if len(foreign_h) > 0 else []):
             est_pa = 300 if ops >= 0.680 else 100
-            player_ops_sim = np.clip(
-                rng.normal(ops, SIGMA_OPS * 1.5, n_sim),  # 外国人は不確実性1.5倍
-                0.200, 1.200,
-            )
-            contrib = K_HIT * player_ops_sim * est_pa
-            if team not in foreign_h_rs:
-                foreign_h_rs[team] = np.zeros(n_sim)
-            foreign_h_rs[team] += contrib
-
-    # 外国人投手のRA貢献
-    foreign_p_ra: dict[str, np.ndarray] = {}
-    if len(foreign_p) > 0:
-        for _, row in foreign_p.iterrows():
-            team = row["team"]
-            era = row["bayes_ERA"]
+            fh_pa.append(est_pa)
+            player_ops_sim = np.clip(rng.normal(ops, SIGMA_OPS * 1.5, n_sim), 0.200, 1.200)
+            fh_rows.append(K_HIT * player_ops_sim * est_pa)
+
+        # 外国人投手
+        fp_rows = []
+        fp_ip = []
+        for era in (foreign_p["bayes_ERA"] if len(foreign_p) > 0 else []):
             est_ip = 80 if era <= 4.0 else 40
-            player_era_sim = np.clip(
-                rng.normal(era, SIGMA_ERA * 1.5, n_sim),
-                0.50, 12.0,
-            )
-            contrib = player_era_sim * est_ip / 9.0
-            if team not in foreign_p_ra:
-                foreign_p_ra[team] = np.zeros(n_sim)
-            foreign_p_ra[team] += contrib
-
-    # チーム別RS/RA集計
-    rs_raw: dict[str, np.ndarray] = {}
-    ra_raw: dict[str, np.ndarray] = {}
-
-    for team in all_teams:
-        # 日本人打者
-        h_mask = h_teams == team
-        if h_mask.any():
-            rs = K_HIT * (ops_sim[h_mask] * pa_vals[h_mask, None]).sum(axis=0)
+            fp_ip.append(est_ip)
+            player_era_sim = np.clip(rng.normal(era, SIGMA_ERA * 1.5, n_sim), 0.50, 12.0)
+            fp_rows.append(player_era_sim * est_ip / 9.0)
+
+        def _frame_col(df: pd.DataFrame, col: str) -> np.ndarray:
+            return df[col].to_numpy(dtype=object) if len(df) > 0 else np.array([], dtype=object)
+
+        # group → (寄与行列, 正規化の重み(PA/IP、外国人はNone), 選手名, 所属チーム)
+        self.contrib = {
+            "hitter": (K_HIT * ops_sim * pa_vals[:, None]).astype(dtype, copy=False),
+            "pitcher": (era_sim * ip_vals[:, None] / 9.0).astype(dtype, copy=False),
+            "foreign_hitter": np.array(fh_rows, dtype=dtype).reshape(len(fh_rows), n_sim),
+            "foreign_pitcher": np.array(fp_rows, dtype=dtype).reshape(len(fp_rows), n_sim),
+        }
+        self.weight = {"hitter": pa_vals, "pitcher": ip_vals}
+        # 表示用: 予測の中心値（OPS / ERA）と想定出場機会（PA / IP、外国人は推定値）
+        self.center = {
+            "hitter": np.asarray(ops_vals, dtype=float),
+            "pitcher": np.asarray(era_vals, dtype=float),
+            "foreign_hitter": np.asarray(foreign_h["bayes_OPS"] if len(foreign_h) > 0 else [], dtype=float),
+            "foreign_pitcher": np.asarray(foreign_p["bayes_ERA"] if len(foreign_p) > 0 else [], dtype=float),
+        }
+        self.playing_time = {
+            "hitter": pa_vals,
+            "pitcher": ip_vals,
+            "foreign_hitter": np.asarray(fh_pa, dtype=float),
+            "foreign_pitcher": np.asarray(fp_ip, dtype=float),
+        }
+        self.names = {
+            "hitter": _frame_col(hitters, "player"),
+            "pitcher": _frame_col(pitchers, "player"),
+            "foreign_hitter": _frame_col(foreign_h, "player"),
+            "foreign_pitcher": _frame_col(foreign_p, "player"),
+        }
+        self.teams = {
+            "hitter": _frame_col(hitters, "team"),
+            "pitcher": _frame_col(pitchers, "team"),
+            "foreign_hitter": _frame_col(foreign_h, "team"),
+            "foreign_pitcher": _frame_col(foreign_p, "team"),
+        }
+        self.all_teams = sorted(set().union(*(set(v) for v in self.teams.values())))
+        self._members = {
+            g: {t: np.flatnonzero(self.teams[g] == t) for t in self.all_teams}
+            for g in self.GROUPS
+        }
+
+        self._base_rs: dict[str, np.ndarray] = {}
+        self._base_ra: dict[str, np.ndarray] = {}
+        for team in self.all_teams:
+            self._base_rs[team], self._base_ra[team] = self._reduce_team(team, {})
+
+    def _team_rows(self, group: str, team: str, moves: dict[tuple[str, int], str | None]) -> np.ndarray:
+        """moves（(group, idx) → 移籍先チーム、None=除外）を反映した所属選手の行番号"""
+        rows = self._members[group].get(team, np.array([], dtype=int))
+        if not moves:
+            return rows
+        keep = [i for i in rows if (group, i) not in moves]
+        keep += [i for (g, i), dest in moves.items() if g == group and dest == team]
+        return np.array(sorted(keep), dtype=int)
+
+    def roster(self, team: str) -> pd.DataFrame:
+        """チームの所属選手一覧（group, row, player, center=予測OPS/ERA, playing_time=PA/IP）"""
+        frames = []
+        for g in self.GROUPS:
+            rows = self._members[g].get(team, np.array([], dtype=int))
+            frames.append(pd.DataFrame({
+                "group": g,
+                "row": rows,
+                "player": self.names[g][rows],
+                "center": self.center[g][rows],
+                "playing_time": self.playing_time[g][rows],
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+    def _sum_rows(self, group: str, rows: np.ndarray,
+                  shares: dict[tuple[str, int], float]) -> tuple[np.ndarray, float]:
+        """行の寄与の和と重み（PA/IP）の和。shares（(group, 行番号) → 出場機会の倍率）があれば重み付き"""
+        weight = self.weight.get(group)
+        s = None
+        if shares:
+            s = np.array([shares.get((group, i), 1.0) for i in rows])
+            if (s == 1.0).all():
+                s = None
+        if s is None:
+            total = self.contrib[group][rows].sum(axis=0)
+            return total, (weight[rows].sum() if weight is not None else 0.0)
+        total = s.astype(self.contrib[group].dtype) @ self.contrib[group][rows]
+        return total, (float((weight[rows] * s).sum()) if weight is not None else 0.0)
+
+    def _reduce_team(self, team: str, moves: dict[tuple[str, int], str | None],
+                     shares: dict[tuple[str, int], float] | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """1チーム分のRS/RA（n_sim本、パークファクター補正前）を集計する"""
+        shares = shares or {}
+        h = self._team_rows("hitter", team, moves)
+        if len(h) > 0:
+            rs, total_pa = self._sum_rows("hitter", h, shares)
+            scale = NPB_TARGET_PA / total_pa if total_pa > 0 else 1.0
+            rs = rs * scale
         else:
-            rs = np.full(n_sim, NPB_HIST_RS)
-
-        # 外国人打者のRS追加
-        if team in foreign_h_rs:
-            rs = rs + foreign_h_rs[team]
-
-        rs_raw[team] = rs
-
-        # 日本人投手
-        p_mask = p_teams == team
-        if p_mask.any():
-            ra = (era_sim[p_mask] * ip_vals[p_mask, None]).sum(axis=0) / 9.0
+            rs = np.full(self.n_sim, NPB_HIST_RS)
+        fh = self._team_rows("foreign_hitter", team, moves)
+        if len(fh) > 0:
+            rs = rs + self._sum_rows("foreign_hitter", fh, shares)[0]
+
+        p = self._team_rows("pitcher", team, moves)
+        if len(p) > 0:
+            ra, total_ip = self._sum_rows("pitcher", p, shares)
+            scale = NPB_TARGET_IP / total_ip if total_ip > 0 else 1.0
+            ra = ra * scale
         else:
-            ra = np.full(n_sim, NPB_HIST_RS)
-
-        # 外国人投手のRA追加
-        if team in foreign_p_ra:
-            ra = ra + foreign_p_ra[team]
-
-        ra_raw[team] = ra
-
-    # パークファクター補正
-    if park_factors:
+            ra = np.full(self.n_sim, NPB_HIST_RS)
+        fp = self._team_rows("foreign_pitcher", team, moves)
+        if len(fp) > 0:
+            ra = ra + self._sum_rows("foreign_pitcher", fp, shares)[0]
+        return rs, ra
+
+    def wins(self, moves: dict[tuple[str, int], str | None] | None = None,
+             shares: dict[tuple[str, int], float] | None = None) -> dict[str, np.ndarray]:
+        """チーム別の勝利数分布を返す。
+
+        moves に (group, 行番号) → 移籍先チーム（None で除外）を渡すと、
+        移籍元・移籍先のチームだけを再集計して what-if の分布を返す。
+        shares に (group, 行番号) → 出場機会の倍率（1.0 = 予測どおり）を渡すと、
+        その選手のPA/IPの配分を変えて再集計する（日本人選手はチーム合計PA/IPを保ったまま按分）。
+        """
+        moves = moves or {}
+        shares = {k: float(v) for k, v in (shares or {}).items() if float(v) != 1.0}
+        affected = ({self.teams[g][i] for g, i in moves} | {d for d in moves.values() if d}
+                    | {self.teams[g][i] for g, i in shares})
+        rs_raw = dict(self._base_rs)
+        ra_raw = dict(self._base_ra)
+        for team in affected:
+            rs_raw[team], ra_raw[team] = self._reduce_team(team, moves, shares)
+
+        # パークファクター補正
         for team in list(rs_raw.keys()):
-            pf = park_factors.get(team)
+            pf = self.park_factors.get(team)
             if pf is None or pf <= 0:
                 continue
             pf_factor = (pf + 1.0) / 2.0
             rs_raw[team] = rs_raw[team] / pf_factor
             ra_raw[team] = ra_raw[team] / pf_factor
 
-    # Post-hoc calibration: scale league-avg RS/RA to NPB_HIST_RS
-    valid_teams = [t for t in all_teams if t in rs_raw and t in ra_raw]
-    rs_matrix = np.stack([rs_raw[t] for t in valid_teams])
-    ra_matrix = np.stack([ra_raw[t] for t in valid_teams])
-    scale_rs = NPB_HIST_RS / rs_matrix.mean(axis=0)
-    scale_ra = NPB_HIST_RS / ra_matrix.mean(axis=0)
+        # Post-hoc calibration: scale league-avg RS/RA to NPB_HIST_RS
+        valid_teams = [t for t in sorted(rs_raw) if t in ra_raw]
+        rs_matrix = np.stack([rs_raw[t] for t in valid_teams])
+        ra_matrix = np.stack([ra_raw[t] for t in valid_teams])
+        scale_rs = NPB_HIST_RS / rs_matrix.mean(axis=0)
+        scale_ra = NPB_HIST_RS / ra_matrix.mean(axis=0)
+
+        wins_sim: dict[str, np.ndarray] = {}
+        for i, team in enumerate(valid_teams):
+            rs = rs_matrix[i] * scale_rs
+            ra = ra_matrix[i] * scale_ra
 
-    wins_sim: dict[str, np.ndarray] = {}
-    for i, team in enumerate(valid_teams):
-        rs = rs_matrix[i] * scale_rs
-        ra = ra_matrix[i] * scale_ra
+            rs_exp = np.power(np.clip(rs, 1.0, None), NPB_PYTH_EXP)
+            ra_exp = np.power(np.clip(ra, 1.0, None), NPB_PYTH_EXP)
+            wpct = rs_exp / (rs_exp + ra_exp)
+            wins_sim[team] = wpct * NPB_GAMES
 
-        rs_exp = np.power(np.clip(rs, 1.0, None), NPB_PYTH_EXP)
-        ra_exp = np.power(np.clip(ra, 1.0, None), NPB_PYTH_EXP)
-        wpct = rs_exp / (rs_exp + ra_exp)
-        wins_sim[team] = wpct * NPB_GAMES
+        return wins_sim
+
+
+def simulate(
+    hitters: pd.DataFrame,
+    pitchers: pd.DataFrame,
+    foreign_h: pd.DataFrame,
+    foreign_p: pd.DataFrame,
+    n_sim: int = N_SIM,
+    seed: int = 42,
+    park_factors: dict[str, float] | None = None,
+) -> dict[str, np.ndarray]:
+    """Run Monte Carlo simulation.
 
-    return wins_sim
+    ベイズ予測がある選手はbayes_OPS/bayes_ERAを中心にサンプリング。
+    外国人選手はforeign CSVのbayes_OPS/bayes_ERAを使用（PA/IPは推定値）。
+    """
+    draws = SeasonDraws(hitters, pitchers, foreign_h, foreign_p,
+                        n_sim=n_sim, seed=seed, park_factors=park_factors)
+    return draws.wins()
 
 
 def compute_probabilities(wins_sim: dict[str, np.ndarray]) -> dict[str, dict]:
@@ -296,7 +398,7 @@ def compute_probabilities(wins_sim: dict[str, np.ndarray]) -> dict[str, dict]:
 
 
 def main(n_sim: int = N_SIM) -> None:
-    t0 = time.time()
+    timer = StepTimer("team_simulation")
     print("=" * 60)
     print(f"チームモンテカルロシミュレーション (target: {TARGET_YEAR})")
     print("=" * 60)
@@ -325,13 +427,13 @@ def main(n_sim: int = N_SIM) -> None:
     else:
         print("\nWARNING: パークファクターなし")
 
-    _log_elapsed("data_load", t0)
+    timer.mark("data_load")
 
     # シミュレーション実行
     print(f"\n{n_sim:,} simulations...")
     wins_sim = simulate(hitters, pitchers, foreign_h, foreign_p,
                         n_sim=n_sim, park_factors=park_factors)
-    _log_elapsed("monte_carlo_sim", t0)
+    timer.mark("monte_carlo_sim")
 
     results = compute_probabilities(wins_sim)
 
@@ -378,14 +480,12 @@ def main(n_sim: int = N_SIM) -> None:
             "pf_5yr": round(park_factors.get(team, float("nan")), 3)
             if park_factors else float("nan"),
         })
-    (
-        pd.DataFrame(rows)
-        .sort_values(["league", "median_wins"], ascending=[True, False])
-        .to_csv(OUT_DIR / f"team_sim_{TARGET_YEAR}.csv",
-                index=False, encoding="utf-8-sig")
+    save_table(
+        pd.DataFrame(rows).sort_values(["league", "median_wins"], ascending=[True, False]),
+        OUT_DIR / f"team_sim_{TARGET_YEAR}.csv",
     )
     print(f"Saved: {OUT_DIR / f'team_sim_{TARGET_YEAR}.csv'}")
-    _log_elapsed("team_simulation_total", t0)
+    timer.finish()
 
 
 if __name__ == "__main__":
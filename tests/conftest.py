@@ -0,0 +1,10 @@
+"""
+テスト共通: リポジトリ直下のモジュール（fetch_engine, raw_store 等）を import できるようにする
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
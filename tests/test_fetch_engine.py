@@ -0,0 +1,252 @@
+"""
+fetch_engine.FetchEngine をローカルの StubServer に向けて動かすテスト
+
+再試行（5xx・429 と Retry-After）、ホストごと・全体の同時リクエスト数の上限、トークンバケットの
+間隔、付け替え先ではなく元のホスト名での集計、HTTP キャッシュ（終了したシーズンは通信なし・
+それ以外は ETag で再検証して 304）を確認する。
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from fetch_engine import FetchEngine, StubServer, TokenBucket
+from http_cache import HTTPCache
+
+HOSTS = ["baseball-data.com", "npb.jp"]
+
+
+class FlakyStub(StubServer):
+    """パスごとに最初の failures 回は status を返し、その後は本文を返すスタブ"""
+
+    def __init__(self, failures: int, status: int = 503, retry_after: str | None = None, **kwargs):
+        super().__init__(latency=0.0, **kwargs)
+        self.failures = failures
+        self.status = status
+        self.retry_after = retry_after
+        self.seen: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def respond(self, path, headers):
+        with self._lock:
+            self.seen[path] = self.seen.get(path, 0) + 1
+            n = self.seen[path]
+        if n <= self.failures:
+            extra = {"Retry-After": self.retry_after} if self.retry_after is not None else {}
+            return self.status, extra, b""
+        return super().respond(path, headers)
+
+
+class CountingStub(StubServer):
+    """処理中のリクエスト数の最大値を数えるスタブ"""
+
+    def __init__(self, latency: float = 0.1):
+        super().__init__(latency=latency)
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def delay(self, path):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        return self.latency
+
+    def respond(self, path, headers):
+        with self._lock:
+            self.active -= 1
+        return super().respond(path, headers)
+
+
+def _engine(stub_urls: dict[str, str], **kwargs) -> FetchEngine:
+    """テスト用: レート制限は緩め、キャッシュ・記録なし、進捗表示なし"""
+    options = {"rates": {h: (1000.0, 10) for h in stub_urls}, "backoff": 0.01,
+               "progress": False, "cache": False, "recorder": False}
+    options.update(kwargs)
+    return FetchEngine(redirect=stub_urls, **options)
+
+
+def _run(engine: FetchEngine, urls: list[str]):
+    try:
+        return engine.run(urls)
+    finally:
+        engine.close()
+
+
+@pytest.mark.parametrize("status", [500, 503, 429])
+def test_retries_until_success(status):
+    with FlakyStub(failures=2, status=status, retry_after="0" if status == 429 else None) as stub:
+        engine = _engine({"npb.jp": stub.url}, retries=3)
+        results = _run(engine, ["https://npb.jp/bis/2025/stats/idb1_g.html"])
+
+    result = results[0]
+    assert result.ok
+    assert result.attempts == 3
+    assert result.content == stub.body
+    stats = engine.stats["npb.jp"]
+    assert stats.requests == 3
+    assert stats.retries == 2
+    assert stats.errors == 0
+
+
+def test_retry_after_overrides_backoff():
+    # バックオフの待ち時間（10秒以上）ではなく Retry-After: 0 に従えばすぐに終わる
+    with FlakyStub(failures=1, status=429, retry_after="0") as stub:
+        engine = _engine({"npb.jp": stub.url}, retries=1, backoff=10.0)
+        t0 = time.monotonic()
+        results = _run(engine, ["https://npb.jp/bis/2025/stats/idb1_g.html"])
+        wall = time.monotonic() - t0
+
+    assert results[0].ok
+    assert wall < 5.0
+
+
+def test_gives_up_after_retries():
+    with FlakyStub(failures=10, status=503) as stub:
+        engine = _engine({"npb.jp": stub.url}, retries=2)
+        results = _run(engine, ["https://npb.jp/bis/2025/stats/idb1_g.html"])
+
+    result = results[0]
+    assert not result.ok
+    assert result.status == 503
+    assert result.error == "HTTP 503"
+    assert result.attempts == 3
+    assert stub.hits == 3
+    assert engine.stats["npb.jp"].errors == 1
+
+
+def test_client_error_is_not_retried():
+    with FlakyStub(failures=10, status=404) as stub:
+        engine = _engine({"npb.jp": stub.url}, retries=3)
+        results = _run(engine, ["https://npb.jp/bis/2025/missing.html"])
+
+    assert results[0].status == 404
+    assert results[0].attempts == 1
+    assert stub.hits == 1
+
+
+def test_dropped_connection_is_retried():
+    # error_status=0 は応答せずに接続を切る（requests の ConnectionError になる）
+    with StubServer(latency=0.0, error_rate=1.0, error_status=0) as stub:
+        engine = _engine({"npb.jp": stub.url}, retries=1)
+        results = _run(engine, ["https://npb.jp/bis/2025/stats/idb1_g.html"])
+
+    result = results[0]
+    assert result.status is None
+    assert result.error is not None
+    assert stub.hits == 2
+    assert engine.stats["npb.jp"].retries == 1
+
+
+def test_per_host_concurrency_cap():
+    with CountingStub() as a, CountingStub() as b:
+        engine = _engine({HOSTS[0]: a.url, HOSTS[1]: b.url}, per_host_concurrency=2, max_concurrency=8)
+        urls = [f"https://{HOSTS[i % 2]}/page/{i}.html" for i in range(12)]
+        results = _run(engine, urls)
+
+    assert all(r.ok for r in results)
+    assert a.max_active == 2
+    assert b.max_active == 2
+
+
+def test_global_concurrency_cap():
+    with CountingStub() as stub:
+        hosts = [f"host{i}.example" for i in range(4)]
+        engine = _engine({h: stub.url for h in hosts}, per_host_concurrency=3, max_concurrency=4)
+        urls = [f"https://{hosts[i % 4]}/page/{i}.html" for i in range(16)]
+        results = _run(engine, urls)
+
+    assert all(r.ok for r in results)
+    assert stub.max_active == 4
+
+
+def test_results_keep_input_order_and_original_hosts():
+    with StubServer(latency=0.0) as stub:
+        engine = _engine({h: stub.url for h in HOSTS})
+        urls = [f"https://{HOSTS[i % 2]}/page/{i}.html" for i in range(6)]
+        results = _run(engine, urls)
+
+    assert [r.url for r in results] == urls
+    # 付け替えてもレート制限・集計は元のホスト名で行う
+    assert sorted(engine.stats) == sorted(HOSTS)
+    assert engine.stats["npb.jp"].requests == 3
+    assert "npb.jp" in engine.report()
+
+
+def test_token_bucket_spaces_requests():
+    async def acquire_all(bucket: TokenBucket, n: int) -> float:
+        waited = 0.0
+        for _ in range(n):
+            waited += await bucket.acquire()
+        return waited
+
+    bucket = TokenBucket(rate=20.0, burst=1)
+    t0 = time.monotonic()
+    waited = asyncio.run(acquire_all(bucket, 5))
+    wall = time.monotonic() - t0
+
+    # 1件目はバーストで即時、残り4件は 1/20 秒ずつ
+    assert wall >= 4 / 20 * 0.9
+    assert waited == pytest.approx(4 / 20, abs=0.05)
+
+
+def test_rate_limit_applies_per_host():
+    with StubServer(latency=0.0) as stub:
+        engine = _engine({"npb.jp": stub.url}, rates={"npb.jp": (10.0, 1)})
+        t0 = time.monotonic()
+        results = _run(engine, [f"https://npb.jp/page/{i}.html" for i in range(4)])
+        wall = time.monotonic() - t0
+
+    assert all(r.ok for r in results)
+    assert wall >= 3 / 10 * 0.9
+    assert engine.stats["npb.jp"].wait > 0
+
+
+def test_cache_revalidates_in_season_pages_with_etag(tmp_path):
+    cache = HTTPCache(tmp_path / "http", final_before=2025)
+    url = "https://npb.jp/bis/2025/stats/idb1_g.html"
+    with StubServer(latency=0.0) as stub:
+        first = _run(_engine({"npb.jp": stub.url}, cache=cache), [url])[0]
+        engine = _engine({"npb.jp": stub.url}, cache=cache)
+        second = _run(engine, [url])[0]
+
+    assert first.ok and first.cached is None
+    assert cache.load(url)[0]["etag"] == stub.etag
+    # 当年のページは If-None-Match 付きで再検証し、304 ならキャッシュの本文を返す
+    assert second.ok
+    assert second.cached == "304"
+    assert second.content == stub.body
+    assert stub.hits == 2
+    assert engine.stats["npb.jp"].not_modified == 1
+
+
+def test_cache_skips_network_for_final_seasons(tmp_path):
+    cache = HTTPCache(tmp_path / "http", final_before=2025)
+    url = "https://npb.jp/bis/2020/stats/idb1_g.html"
+    with StubServer(latency=0.0) as stub:
+        _run(_engine({"npb.jp": stub.url}, cache=cache), [url])
+        engine = _engine({"npb.jp": stub.url}, cache=cache)
+        result = _run(engine, [url])[0]
+
+    assert result.ok
+    assert result.cached == "hit"
+    assert result.content == stub.body
+    assert stub.hits == 1
+    assert engine.stats["npb.jp"].cache_hits == 1
+    assert engine.stats["npb.jp"].requests == 0
+
+
+def test_changed_page_replaces_cached_body(tmp_path):
+    cache = HTTPCache(tmp_path / "http", final_before=2025)
+    url = "https://npb.jp/bis/2025/stats/idb1_g.html"
+    with StubServer(body=b"<html>old</html>", latency=0.0) as stub:
+        _run(_engine({"npb.jp": stub.url}, cache=cache), [url])
+    with StubServer(body=b"<html>new</html>", latency=0.0) as stub:
+        result = _run(_engine({"npb.jp": stub.url}, cache=cache), [url])[0]
+
+    # ETag が変わっていれば 200 で新しい本文を受け取り、キャッシュも更新する
+    assert result.cached is None
+    assert result.content == b"<html>new</html>"
+    assert cache.load(url)[1] == b"<html>new</html>"
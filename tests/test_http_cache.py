@@ -0,0 +1,84 @@
+"""
+http_cache.HTTPCache の保存・読み込み・検証用ヘッダーのテスト（通信を伴う経路は test_fetch_engine）
+"""
+
+import gzip
+
+import pytest
+
+from http_cache import HTTPCache, default_cache, season_of
+
+
+@pytest.mark.parametrize("url, season", [
+    ("https://npb.jp/bis/2024/stats/idb1_g.html", 2024),
+    ("https://npb.jp/games/2025/schedule_04_detail.html", 2025),
+    ("https://baseball-data.com/23/stats/hitter-g/tpa-1.html", 2023),
+    ("https://baseball-data.com/stats/hitter-g/tpa-1.html", None),
+])
+def test_season_of(url, season):
+    assert season_of(url) == season
+
+
+def test_is_final(tmp_path):
+    cache = HTTPCache(tmp_path, final_before=2025)
+    assert cache.is_final("https://npb.jp/bis/2024/stats/idb1_g.html")
+    assert not cache.is_final("https://npb.jp/bis/2025/stats/idb1_g.html")
+    # 年度を含まないページ（当年の一覧等）は常に再検証
+    assert not cache.is_final("https://baseball-data.com/stats/hitter-g/tpa-1.html")
+
+
+def test_store_and_load(tmp_path):
+    cache = HTTPCache(tmp_path)
+    url = "https://npb.jp/bis/2024/stats/idb1_g.html"
+    meta = cache.store(url, b"<html>a</html>", {"ETag": '"v1"', "Last-Modified": "Mon, 01 Apr 2024 00:00:00 GMT"})
+
+    loaded_meta, body = cache.load(url)
+    assert body == b"<html>a</html>"
+    assert loaded_meta == meta
+    assert HTTPCache.conditional_headers(loaded_meta) == {
+        "If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Apr 2024 00:00:00 GMT"}
+    assert cache.load("https://npb.jp/bis/2023/stats/idb1_g.html") is None
+
+
+def test_same_body_is_stored_once(tmp_path):
+    cache = HTTPCache(tmp_path)
+    cache.store("https://npb.jp/bis/2024/a.html", b"same", {})
+    cache.store("https://npb.jp/bis/2024/b.html", b"same", {})
+
+    assert len(cache.entries()) == 2
+    assert len(list((tmp_path / "objects").glob("*/*.gz"))) == 1
+    assert HTTPCache.conditional_headers(cache.load("https://npb.jp/bis/2024/a.html")[0]) == {}
+
+
+def test_corrupted_body_is_a_miss(tmp_path):
+    cache = HTTPCache(tmp_path)
+    url = "https://npb.jp/bis/2024/stats/idb1_g.html"
+    meta = cache.store(url, b"<html>a</html>", {})
+    cache._object_path(meta["sha256"]).write_bytes(gzip.compress(b"<html>tampered</html>"))
+
+    assert cache.load(url) is None
+
+
+def test_touch_updates_checked_at_only(tmp_path):
+    cache = HTTPCache(tmp_path)
+    url = "https://npb.jp/bis/2025/stats/idb1_g.html"
+    meta = cache.store(url, b"<html>a</html>", {"ETag": '"v1"'})
+    fetched_at = meta["fetched_at"]
+    meta["checked_at"] = 0.0
+
+    cache.touch(url, meta)
+
+    loaded = cache.load(url)[0]
+    assert loaded["checked_at"] > 0.0
+    assert loaded["fetched_at"] == fetched_at
+
+
+def test_default_cache_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("NPB_HTTP_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("NPB_HTTP_CACHE_FINAL_BEFORE", "2020")
+    cache = default_cache()
+    assert cache.root == tmp_path
+    assert cache.final_before == 2020
+
+    monkeypatch.setenv("NPB_HTTP_CACHE_DIR", "")
+    assert default_cache() is None
@@ -0,0 +1,109 @@
+"""
+player_registry の名寄せと同名の別人（生年月日の異なる同じ名前の選手）のテスト
+"""
+
+import pandas as pd
+import pytest
+
+from player_registry import PLAYER_IDS_NAME, PlayerRegistry, build_registry
+
+
+def _write(path, rows, columns):
+    pd.DataFrame(rows, columns=columns).to_csv(path, index=False, encoding="utf-8-sig")
+
+
+@pytest.fixture
+def raw_dir(tmp_path):
+    _write(tmp_path / "npb_hitters_2015_2025.csv",
+           [("坂本　勇人", "巨人", 2023), ("坂本 勇人", "巨人", 2024), ("マルティネス", "日本ハム", 2023),
+            ("マルティネス", "日本ハム", 2024), ("マルティネス", "中日", 2024), ("マルティネス", "巨人", 2025)],
+           ["player", "team", "year"])
+    _write(tmp_path / "npb_players_profile_2024.csv",
+           [("坂本　勇人", "1988/12/14", "巨人"), ("坂本　勇人", "2002/04/15", "巨人"),
+            ("マルティネス", "1996/05/28", "日本ハム"), ("マルティネス", "1996/10/11", "中日")],
+           ["選手名", "生年月日", "team"])
+    _write(tmp_path / "npb_player_birthdays.csv",
+           [("坂本　勇人", "1988-12-14"), ("マルティネス", "1996-05-28")], ["player", "birthday"])
+    return tmp_path
+
+
+def test_homonyms_get_separate_ids(raw_dir):
+    registry = build_registry(raw_dir)
+
+    homonyms = registry.homonyms()
+    assert set(homonyms) == {"坂本勇人", "マルティネス"}
+    table = registry.frame().set_index("player_id")
+    bdays = {key: sorted(table.loc[pids, "birthday"]) for key, pids in homonyms.items()}
+    assert bdays == {"坂本勇人": ["1988-12-14", "2002-04-15"], "マルティネス": ["1996-05-28", "1996-10-11"]}
+    assert len(registry.birthdays()) == 4
+
+
+def test_lookup_by_birthday_and_team(raw_dir):
+    registry = build_registry(raw_dir)
+    veteran = registry.lookup("坂本勇人", birthday="1988-12-14")
+    rookie = registry.lookup("坂本勇人", birthday="2002-04-15")
+
+    assert veteran != rookie
+    # 名前だけなら代表（生年月日ファイルの選手）
+    assert registry.lookup("坂本 勇人") == veteran
+    # 同じ年度・球団に2人いて見分けられなければ代表
+    assert registry.lookup("坂本勇人", year=2024, team="巨人") == veteran
+    # 知らない生年月日は未登録（別人）
+    assert registry.lookup("坂本勇人", birthday="1970-01-01") is None
+
+
+def test_stamp_resolves_homonyms_by_team_and_year(raw_dir):
+    registry = build_registry(raw_dir)
+    df = pd.read_csv(raw_dir / "npb_hitters_2015_2025.csv", encoding="utf-8-sig")
+
+    ids = registry.stamp(df, add=False).set_index(["team", "year"])["player_id"]
+
+    nippon_ham = registry.lookup("マルティネス", birthday="1996-05-28")
+    chunichi = registry.lookup("マルティネス", birthday="1996-10-11")
+    assert ids[("日本ハム", 2023)] == ids[("日本ハム", 2024)] == nippon_ham
+    assert ids[("中日", 2024)] == chunichi
+    # プロフィールに無い球団は代表
+    assert ids[("巨人", 2025)] == registry.lookup("マルティネス")
+
+
+def test_stamp_without_year_matches_team(raw_dir):
+    registry = build_registry(raw_dir)
+    df = pd.DataFrame({"player": ["マルティネス", "マルティネス"], "team": ["中日", "日本ハム"]})
+
+    ids = registry.stamp(df, add=False)["player_id"].tolist()
+
+    assert ids == [registry.lookup("マルティネス", birthday="1996-10-11"),
+                   registry.lookup("マルティネス", birthday="1996-05-28")]
+
+
+def test_rebuild_keeps_ids(raw_dir):
+    first = build_registry(raw_dir)
+    first.save()
+    # 新しい同名の選手が増えても既存のIDは変わらない
+    _write(raw_dir / "npb_players_profile_2025.csv",
+           [("坂本　勇人", "1988/12/14", "巨人"), ("マルティネス", "2000/01/10", "阪神")],
+           ["選手名", "生年月日", "team"])
+
+    second = build_registry(raw_dir)
+
+    old = first.frame().set_index("player_id")[["key", "birthday"]]
+    new = second.frame().set_index("player_id")[["key", "birthday"]]
+    assert new.loc[old.index].to_dict("index") == old.to_dict("index")
+    assert len(second.homonyms()["マルティネス"]) == 3
+
+
+def test_register_new_birthday_creates_player(raw_dir):
+    registry = build_registry(raw_dir)
+    registry.save()
+    df = pd.DataFrame({"player": ["新人　太郎", "新人　太郎", "新人 太郎"],
+                       "birthday": ["2000-01-01", "2001-02-02", "2000-01-01"]})
+
+    ids = registry.stamp(df)["player_id"].tolist()
+
+    assert ids[0] == ids[2] != ids[1]
+    assert registry.dirty
+    registry.save()
+    reloaded = PlayerRegistry.load(raw_dir)
+    assert (raw_dir / PLAYER_IDS_NAME).exists()
+    assert sorted(reloaded.homonyms()["新人太郎"]) == sorted(set(ids))
+    assert reloaded.lookup("新人太郎", birthday="2001-02-02") == ids[1]
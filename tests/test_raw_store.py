@@ -0,0 +1,151 @@
+"""
+raw_store.RawStore の upsert・manifest・従来CSVとの往復のテスト（一時ディレクトリのストアで行う）
+"""
+
+import pandas as pd
+import pytest
+
+from raw_store import RawStore, read_raw, save_raw
+from table_store import HAS_PYARROW
+
+
+def _hitters(rows):
+    return pd.DataFrame(rows, columns=["player", "team", "HR", "year"])
+
+
+@pytest.fixture
+def store(tmp_path):
+    # legacy_dir（従来のCSV・選手IDレジストリの置き場所）は tmp_path
+    return RawStore(tmp_path / "store")
+
+
+def test_upsert_writes_partitions_and_manifest(store):
+    df = _hitters([("村上　宗隆", "ヤクルト", 33, 2024), ("岡本　和真", "巨人", 27, 2024),
+                   ("村上　宗隆", "ヤクルト", 22, 2025)])
+    changes = store.upsert("hitters", df)
+
+    assert [(c.year, c.added, c.changed) for c in changes] == [(2024, 2, True), (2025, 1, True)]
+    assert store.years("hitters") == [2024, 2025]
+    part = store.manifest()["tables"]["hitters"]["2024"]
+    assert part["rows"] == 2
+    assert part["key"] == ["player", "team"]
+    assert part["columns"] == ["player", "player_id", "team", "HR", "year"]
+    assert (store.root / "hitters" / "2024.csv").exists()
+    assert (store.root / "hitters" / "2024.rows.json").exists()
+
+
+def test_upsert_same_rows_leaves_partition_untouched(store):
+    df = _hitters([("村上　宗隆", "ヤクルト", 33, 2024), ("村上　宗隆", "ヤクルト", 22, 2025)])
+    store.upsert("hitters", df)
+    path = store.root / "hitters" / "2024.csv"
+    before = (path.stat().st_mtime_ns, store.partition_hashes("hitters"))
+
+    changes = store.upsert("hitters", df)
+
+    assert [(c.unchanged, c.changed) for c in changes] == [(1, False), (1, False)]
+    assert (path.stat().st_mtime_ns, store.partition_hashes("hitters")) == before
+
+
+def test_upsert_changes_only_touched_year(store):
+    store.upsert("hitters", _hitters([("村上　宗隆", "ヤクルト", 33, 2024), ("村上　宗隆", "ヤクルト", 10, 2025)]))
+    hashes = store.partition_hashes("hitters")
+
+    changes = store.upsert("hitters", _hitters([("村上　宗隆", "ヤクルト", 22, 2025),
+                                                ("岡本　和真", "巨人", 15, 2025)]))
+
+    assert [(c.year, c.added, c.updated, c.deleted) for c in changes] == [(2025, 1, 1, 0)]
+    assert store.changed_years("hitters", hashes) == [2025]
+    df = store.read("hitters", [2025])
+    assert df.set_index("player")["HR"].to_dict() == {"村上　宗隆": 22, "岡本　和真": 15}
+    # 2024 は変わらない
+    assert store.partition_hashes("hitters")[2024] == hashes[2024]
+
+
+def test_upsert_keeps_other_rows_unless_replace(store):
+    store.upsert("hitters", _hitters([("村上　宗隆", "ヤクルト", 33, 2024), ("岡本　和真", "巨人", 27, 2024)]))
+
+    store.upsert("hitters", _hitters([("村上　宗隆", "ヤクルト", 34, 2024)]))
+    assert len(store.read("hitters")) == 2
+
+    changes = store.upsert("hitters", _hitters([("村上　宗隆", "ヤクルト", 34, 2024)]), replace=True)
+    assert changes[0].deleted == 1
+    assert store.read("hitters")["player"].tolist() == ["村上　宗隆"]
+    assert store.manifest()["tables"]["hitters"]["2024"]["rows"] == 1
+
+
+def test_upsert_same_key_twice_keeps_last(store):
+    df = _hitters([("村上　宗隆", "ヤクルト", 1, 2024), ("村上　宗隆", "ヤクルト", 2, 2024)])
+    changes = store.upsert("hitters", df)
+
+    assert changes[0].added == 1
+    assert store.read("hitters")["HR"].tolist() == [2]
+
+
+def test_new_column_rewrites_existing_rows(store):
+    store.upsert("hitters", _hitters([("村上　宗隆", "ヤクルト", 33, 2024)]))
+    df = _hitters([("岡本　和真", "巨人", 27, 2024)]).assign(SB=3)
+
+    changes = store.upsert("hitters", df)
+
+    assert changes[0].schema_changed
+    out = store.read("hitters").set_index("player")
+    assert list(out.columns)[-1] == "SB"
+    assert out.at["岡本　和真", "SB"] == 3
+    assert pd.isna(out.at["村上　宗隆", "SB"])
+
+
+def test_upsert_stamps_player_ids(store):
+    store.upsert("hitters", _hitters([("村上　宗隆", "ヤクルト", 33, 2024), ("村上 宗隆", "ヤクルト", 22, 2025)]))
+
+    df = store.read("hitters")
+    # 表記の揺れ（全角/半角スペース）は同じID。レジストリは legacy_dir に保存される
+    assert df["player_id"].nunique() == 1
+    assert (store.legacy_dir / "npb_player_ids.csv").exists()
+
+
+def test_read_raw_prefers_store_and_types_columns(store):
+    store.upsert("hitters", _hitters([("村上　宗隆", "ヤクルト", 33, 2024)]))
+
+    df = read_raw("hitters", store=store)
+
+    assert df["HR"].dtype.kind == "i"
+    assert df["player_id"].notna().all()
+
+
+@pytest.mark.skipif(not HAS_PYARROW, reason="pyarrow が無い")
+def test_read_typed_snapshot_follows_partition_hashes(store):
+    store.upsert("hitters", _hitters([("村上　宗隆", "ヤクルト", 33, 2024)]))
+    assert len(store.read_typed("hitters")) == 1
+    assert store.snapshot_path("hitters").exists()
+
+    store.upsert("hitters", _hitters([("岡本　和真", "巨人", 27, 2025)]))
+
+    # パーティションが変わればスナップショットも作り直す
+    assert len(store.read_typed("hitters")) == 2
+
+
+def test_save_raw_imports_legacy_before_partial_update(store, capsys):
+    legacy = store.legacy_path("hitters")
+    legacy.parent.mkdir(parents=True, exist_ok=True)
+    _hitters([("村上　宗隆", "ヤクルト", 33, 2024), ("村上　宗隆", "ヤクルト", 10, 2025)]).to_csv(
+        legacy, index=False, encoding="utf-8-sig")
+
+    # 当年だけ取得しても、従来のCSVの過去の年度は消えない
+    save_raw("hitters", _hitters([("村上　宗隆", "ヤクルト", 22, 2025)]), store=store)
+
+    assert store.years("hitters") == [2024, 2025]
+    written = pd.read_csv(legacy, encoding="utf-8-sig")
+    assert written.set_index("year")["HR"].to_dict() == {2024: 33, 2025: 22}
+    assert "store: hitters/2025" in capsys.readouterr().out
+
+
+def test_import_legacy_round_trip(store):
+    legacy = store.legacy_path("hitters")
+    legacy.parent.mkdir(parents=True, exist_ok=True)
+    _hitters([("村上　宗隆", "ヤクルト", 33, 2024), ("岡本　和真", "巨人", 27, 2025)]).to_csv(
+        legacy, index=False, encoding="utf-8-sig")
+
+    changes = store.import_legacy(tables=["hitters"])
+    assert sum(c.added for c in changes) == 2
+    # 2回目は変更なし
+    assert not any(c.changed for c in store.import_legacy(tables=["hitters"]))
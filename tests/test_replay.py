@@ -0,0 +1,119 @@
+"""
+応答の記録（fixture_archive.FixtureArchive）と再生（replay.ReplayServer）のテスト
+"""
+
+import pytest
+
+from fetch_engine import FetchEngine, StubServer
+from fixture_archive import FixtureArchive
+from http_cache import HTTPCache
+from replay import ReplayServer, synthesize_archive
+
+URL = "https://npb.jp/bis/2025/stats/idb1_g.html"
+
+
+def _engine(redirect: dict[str, str], **kwargs) -> FetchEngine:
+    options = {"rates": {h: (1000.0, 10) for h in redirect}, "backoff": 0.01,
+               "progress": False, "cache": False, "recorder": False}
+    options.update(kwargs)
+    return FetchEngine(redirect=redirect, **options)
+
+
+def _run(engine: FetchEngine, urls: list[str]):
+    try:
+        return engine.run(urls)
+    finally:
+        engine.close()
+
+
+def test_engine_records_responses(tmp_path):
+    archive = FixtureArchive(tmp_path / "fixtures")
+    with StubServer(latency=0.0) as stub:
+        _run(_engine({"npb.jp": stub.url}, recorder=archive), [URL])
+
+    entry = archive.lookup(URL)
+    assert entry["status"] == 200
+    assert entry["headers"] == {"ETag": stub.etag, "Content-Type": "text/html; charset=utf-8"}
+    assert archive.body(entry) == stub.body
+    assert archive.hosts() == ["npb.jp"]
+
+
+def test_cache_hits_are_recorded(tmp_path):
+    cache = HTTPCache(tmp_path / "http", final_before=2025)
+    url = "https://npb.jp/bis/2020/stats/idb1_g.html"
+    with StubServer(latency=0.0) as stub:
+        _run(_engine({"npb.jp": stub.url}, cache=cache), [url])
+        archive = FixtureArchive(tmp_path / "fixtures")
+        result = _run(_engine({"npb.jp": stub.url}, cache=cache, recorder=archive), [url])[0]
+
+    # 通信せずキャッシュから返したページも 200 として記録する
+    assert result.cached == "hit"
+    assert stub.hits == 1
+    entry = archive.lookup(url)
+    assert entry["status"] == 200
+    assert entry["headers"] == {"ETag": stub.etag}
+    assert archive.body(entry) == stub.body
+
+
+def test_replay_serves_recorded_responses(tmp_path):
+    archive = FixtureArchive(tmp_path / "fixtures")
+    archive.record(URL, 200, {"Content-Type": "text/html", "ETag": '"v1"', "Set-Cookie": "x"}, b"<html>a</html>")
+    archive.record("https://npb.jp/bis/2025/gone.html", 404, {}, b"")
+
+    with ReplayServer(archive) as server:
+        engine = _engine(server.redirect())
+        ok, gone, missing = _run(engine, [URL, "https://npb.jp/bis/2025/gone.html",
+                                          "https://npb.jp/bis/2025/unknown.html"])
+
+    assert ok.ok and ok.content == b"<html>a</html>"
+    assert ok.headers["ETag"] == '"v1"'
+    # 記録するのは再生に使うヘッダーだけ
+    assert "Set-Cookie" not in ok.headers
+    assert gone.status == 404
+    assert missing.status == 404
+    assert server.misses == ["/npb.jp/bis/2025/unknown.html"]
+
+
+def test_replay_revalidates_with_recorded_etag(tmp_path):
+    archive = FixtureArchive(tmp_path / "fixtures")
+    archive.record(URL, 200, {"ETag": '"v1"'}, b"<html>a</html>")
+    cache = HTTPCache(tmp_path / "http", final_before=2025)
+
+    with ReplayServer(archive) as server:
+        _run(_engine(server.redirect(), cache=cache), [URL])
+        result = _run(_engine(server.redirect(), cache=cache), [URL])[0]
+
+    assert result.cached == "304"
+    assert result.content == b"<html>a</html>"
+
+
+def test_replay_error_injection_is_retried(tmp_path):
+    archive = FixtureArchive(tmp_path / "fixtures")
+    archive.record(URL, 200, {}, b"<html>a</html>")
+
+    with ReplayServer(archive, error_rate=1.0, error_status=503) as server:
+        result = _run(_engine(server.redirect(), retries=2), [URL])[0]
+
+    assert result.status == 503
+    assert server.errors == 3
+
+
+def test_synthesized_season_parses_like_stored_rows(tmp_path):
+    from fetch_npb_data import fetch_all
+    from raw_store import read_raw
+
+    season = 2025
+    stored = read_raw("hitters")
+    stored = stored[stored["year"] == season]
+    if stored.empty:
+        pytest.skip(f"data/raw に {season} 年の打者成績が無い")
+
+    archive = FixtureArchive(tmp_path / "fixtures")
+    assert synthesize_archive(archive, season) > 0
+    with ReplayServer(archive) as server:
+        parsed = fetch_all("hitter", [season], _engine(server.redirect()))
+
+    assert len(parsed) == len(stored)
+    key = ["team", "HR", "PA"]
+    assert (parsed.sort_values(key)[key].reset_index(drop=True)
+            .equals(stored.sort_values(key)[key].reset_index(drop=True)))
@@ -14,6 +14,7 @@ TEXTS: dict[str, dict[str, str]] = {
         "glossary_woba": "**wOBA** — 打席あたりの得点貢献度。四球・単打・本塁打等を重みづけ",
         "glossary_wrcplus": "**wRC+** — リーグ平均を100とした打撃力。120なら平均より2割上",
         "data_source": "データソース: [プロ野球データFreak](https://baseball-data.com) / [日本野球機構 NPB](https://npb.jp)",
+        "memory_report": "メモリ使用量（テーブル別）",
 
         # --- Page names ---
         "page_top": "トップ",
@@ -42,6 +43,8 @@ TEXTS: dict[str, dict[str, str]] = {
         "ai_pred": "機械学習",
         "search_by_name": "選手名で検索（部分一致）",
         "search_prompt_btn": "選手名を入力するか、上のボタンをタップしてください",
+        "search_suggestions": "候補（タップで選択）",
+        "show_radar": "レーダーチャートを表示",
         "no_player_found": "「{name}」に該当する選手が見つかりません",
         "no_data_team_year": "{team} ({year}) のデータがありません",
         "search_label": "選手名で検索",
@@ -362,6 +365,25 @@ TEXTS: dict[str, dict[str, str]] = {
         "fan_chart_title": "{league} 勝数分布（ファンチャート）",
         "fan_chart_note": "濃い帯 = 80%信頼区間、薄い帯 = 95%信頼区間、線 = 中央値",
         "prob_table_title": "確率テーブル",
+        "whatif_title": "What-if シミュレーション",
+        "whatif_caption": (
+            "選手の出場をオフにしたり出場機会（予測PA/IPに対する%）を変えると、"
+            "{n:,}回の縮小版シミュレーションをその場で再計算します。"
+            "乱数は固定なので、差分は変更の効果だけを表します。"
+        ),
+        "whatif_include": "出場",
+        "whatif_kind": "区分",
+        "whatif_proj": "予測OPS/ERA",
+        "whatif_playing_time": "予測PA/IP",
+        "whatif_share": "出場機会(%)",
+        "whatif_hitter": "打者",
+        "whatif_pitcher": "投手",
+        "whatif_foreign_hitter": "外国人打者",
+        "whatif_foreign_pitcher": "外国人投手",
+        "whatif_delta_pct": "優勝確率の変化(pt)",
+        "whatif_delta_wins": "勝数の変化",
+        "whatif_result": "{league} の変更後の確率",
+        "whatif_elapsed": "再計算 {ms:.0f}ms",
         "mc_method_expander": "シミュレーション手法の説明",
         "mc_method_content": (
             "**モンテカルロ法によるチーム成績シミュレーション**\n\n"
@@ -415,6 +437,7 @@ TEXTS: dict[str, dict[str, str]] = {
         "glossary_woba": "**wOBA** — Weighted On-Base Average. Weights each outcome by run value",
         "glossary_wrcplus": "**wRC+** — Weighted Runs Created Plus. League average = 100. 120 = 20% above average",
         "data_source": "Data: [Baseball Data Freak](https://baseball-data.com) / [NPB Official](https://npb.jp)",
+        "memory_report": "Memory by table",
 
         # --- Page names ---
         "page_top": "Home",
@@ -443,6 +466,8 @@ TEXTS: dict[str, dict[str, str]] = {
         "ai_pred": "ML",
         "search_by_name": "Search by player name (partial match)",
         "search_prompt_btn": "Enter a name or tap a quick-button above",
+        "search_suggestions": "Suggestions (tap to select)",
+        "show_radar": "Show radar chart",
         "no_player_found": '"{name}" not found',
         "no_data_team_year": "No data for {team} ({year})",
         "search_label": "Search by player name",
@@ -763,6 +788,25 @@ TEXTS: dict[str, dict[str, str]] = {
         "fan_chart_title": "{league} Win Distribution (Fan Chart)",
         "fan_chart_note": "Dark band = 80% CI, light band = 95% CI, line = median",
         "prob_table_title": "Probability Table",
+        "whatif_title": "What-if Simulation",
+        "whatif_caption": (
+            "Toggle players off or change their playing time (% of projected PA/IP) "
+            "to rerun a reduced {n:,}-draw simulation instantly. "
+            "Random draws are fixed, so the deltas reflect only your changes."
+        ),
+        "whatif_include": "Play",
+        "whatif_kind": "Type",
+        "whatif_proj": "Proj. OPS/ERA",
+        "whatif_playing_time": "Proj. PA/IP",
+        "whatif_share": "Playing time (%)",
+        "whatif_hitter": "Hitter",
+        "whatif_pitcher": "Pitcher",
+        "whatif_foreign_hitter": "Foreign hitter",
+        "whatif_foreign_pitcher": "Foreign pitcher",
+        "whatif_delta_pct": "Δ P(Pennant) (pt)",
+        "whatif_delta_wins": "Δ Wins",
+        "whatif_result": "{league} probabilities after changes",
+        "whatif_elapsed": "Recomputed in {ms:.0f}ms",
         "mc_method_expander": "Simulation Methodology",
         "mc_method_content": (
             "**Monte Carlo Team Performance Simulation**\n\n"